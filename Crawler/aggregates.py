@@ -0,0 +1,309 @@
+import argparse
+import logging
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'user_test_attempts'
+AGGREGATE_TABLES = ['agg_user_test_best', 'agg_user_chapter_progress', 'agg_test_daily']
+
+INSERT_BEST = ("INSERT INTO agg_user_test_best (user_id, test_id, attempts, passed_attempts, "
+               "best_percentage, best_time_taken, last_completed_at)")
+# Assignments run left to right in MySQL but all see the old row in SQLite,
+# so best_time_taken is worked out before best_percentage changes
+UPDATE_BEST = """
+    best_time_taken = CASE
+        WHEN best_percentage IS NULL OR VALUES(best_percentage) > best_percentage THEN VALUES(best_time_taken)
+        WHEN VALUES(best_percentage) = best_percentage
+            THEN LEAST(COALESCE(best_time_taken, VALUES(best_time_taken)), COALESCE(VALUES(best_time_taken), best_time_taken))
+        ELSE best_time_taken END,
+    best_percentage = GREATEST(COALESCE(best_percentage, VALUES(best_percentage)), COALESCE(VALUES(best_percentage), best_percentage)),
+    attempts = attempts + VALUES(attempts),
+    passed_attempts = passed_attempts + VALUES(passed_attempts),
+    last_completed_at = GREATEST(last_completed_at, VALUES(last_completed_at))
+"""
+INSERT_CHAPTER = "INSERT INTO agg_user_chapter_progress (user_id, chapter_id, attempts, passed_attempts, percentage_sum)"
+INSERT_DAILY = "INSERT INTO agg_test_daily (test_id, day, attempts, passed_attempts, percentage_sum)"
+# Chapter and daily rows are plain counters
+UPDATE_SUMS = """
+    attempts = attempts + VALUES(attempts),
+    passed_attempts = passed_attempts + VALUES(passed_attempts),
+    percentage_sum = percentage_sum + VALUES(percentage_sum)
+"""
+
+
+def _as_datetime(value) -> datetime:
+    # mysql-connector returns datetimes, the SQLite stand-in returns strings
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
+
+
+def _fold(attempts: List[Dict]) -> Dict[str, List[Tuple]]:
+    """Collapse a batch of completed attempts into one delta row per aggregate key"""
+    best: Dict[Tuple, list] = {}
+    chapters: Dict[Tuple, list] = {}
+    daily: Dict[Tuple, list] = {}
+    for attempt in attempts:
+        percentage = float(attempt['percentage']) if attempt['percentage'] is not None else None
+        passed = 1 if attempt['is_passed'] else 0
+        completed_at = _as_datetime(attempt['completed_at'])
+
+        key = (attempt['user_id'], attempt['test_id'])
+        entry = best.get(key)
+        if entry is None:
+            best[key] = [1, passed, percentage, attempt['time_taken'], completed_at]
+        else:
+            entry[0] += 1
+            entry[1] += passed
+            if percentage is not None and (entry[2] is None or percentage > entry[2]):
+                entry[2], entry[3] = percentage, attempt['time_taken']
+            elif percentage is not None and percentage == entry[2] and attempt['time_taken'] is not None:
+                entry[3] = attempt['time_taken'] if entry[3] is None else min(entry[3], attempt['time_taken'])
+            entry[4] = max(entry[4], completed_at)
+
+        for totals, key in ((chapters, (attempt['user_id'], attempt['chapter_id'] or 0)),
+                            (daily, (attempt['test_id'], completed_at.date()))):
+            entry = totals.setdefault(key, [0, 0, 0.0])
+            entry[0] += 1
+            entry[1] += passed
+            entry[2] += percentage or 0.0
+
+    return {
+        'best': [(user, test, *values[:4], values[4].strftime('%Y-%m-%d %H:%M:%S')) for (user, test), values in best.items()],
+        'chapters': [(user, chapter, count, passed, round(total, 2)) for (user, chapter), (count, passed, total) in chapters.items()],
+        'daily': [(test, day.isoformat(), count, passed, round(total, 2)) for (test, day), (count, passed, total) in daily.items()],
+    }
+
+
+def _refresh_batch(session, cutoff, batch_size: int) -> int:
+    """Fold the next batch after the watermark into the aggregates; returns attempts processed"""
+    session.execute("INSERT IGNORE INTO agg_watermarks (name) VALUES (%s)", (WATERMARK,))
+    # Locking the watermark row serializes concurrent workers
+    mark = session.query_one(
+        "SELECT last_completed_at, last_attempt_id FROM agg_watermarks WHERE name = %s FOR UPDATE", (WATERMARK,)
+    )
+    attempts = session.query(
+        """SELECT uta.id, uta.user_id, uta.test_id, uta.percentage, uta.time_taken, uta.is_passed,
+                  uta.completed_at, t.chapter_id
+           FROM user_test_attempts uta
+           JOIN tests t ON t.id = uta.test_id
+           WHERE uta.completed_at <= %s
+             AND (uta.completed_at > %s OR (uta.completed_at = %s AND uta.id > %s))
+           ORDER BY uta.completed_at, uta.id
+           LIMIT %s""",
+        (cutoff, mark['last_completed_at'], mark['last_completed_at'], mark['last_attempt_id'], batch_size)
+    )
+    if not attempts:
+        return 0
+
+    deltas = _fold(attempts)
+    session.upsert_rows(INSERT_BEST, deltas['best'], UPDATE_BEST)
+    session.upsert_rows(INSERT_CHAPTER, deltas['chapters'], UPDATE_SUMS)
+    session.upsert_rows(INSERT_DAILY, deltas['daily'], UPDATE_SUMS)
+    last = attempts[-1]
+    session.execute(
+        "UPDATE agg_watermarks SET last_completed_at = %s, last_attempt_id = %s WHERE name = %s",
+        (last['completed_at'], last['id'], WATERMARK)
+    )
+    return len(attempts)
+
+
+def refresh_aggregates(database, batch_size: Optional[int] = None, lag: Optional[float] = None) -> Dict:
+    """Fold attempts completed since the last refresh into the aggregate tables.
+
+    Attempts are read in (completed_at, id) order after the stored
+    watermark, batch_size at a time. Each batch's deltas and the new
+    watermark commit together, so an interrupted or repeated run never
+    counts an attempt twice, and the work done is proportional to the new
+    completions rather than to the whole history. Completions within lag
+    seconds of the database clock are left for the next run, so an attempt
+    whose transaction commits late is not skipped.
+    """
+    batch_size = batch_size or Config.AGGREGATE_BATCH_SIZE
+    lag = Config.AGGREGATE_LAG_SEC if lag is None else lag
+    started = time.perf_counter()
+
+    with database.transaction() as session:
+        now = _as_datetime(session.query_one("SELECT CURRENT_TIMESTAMP AS now")['now'])
+    cutoff = (now - timedelta(seconds=lag)).strftime('%Y-%m-%d %H:%M:%S')
+
+    processed = batches = 0
+    while True:
+        with database.transaction() as session:
+            count = _refresh_batch(session, cutoff, batch_size)
+        if not count:
+            break
+        processed += count
+        batches += 1
+        if count < batch_size:
+            break
+
+    with database.transaction() as session:
+        mark = session.query_one(
+            "SELECT last_completed_at, last_attempt_id FROM agg_watermarks WHERE name = %s", (WATERMARK,)
+        )
+    return {
+        'attempts': processed,
+        'batches': batches,
+        'watermark': {'completed_at': str(mark['last_completed_at']), 'attempt_id': mark['last_attempt_id']} if mark else None,
+        'elapsed_sec': round(time.perf_counter() - started, 3)
+    }
+
+
+def rebuild_aggregates(database, batch_size: Optional[int] = None, lag: Optional[float] = None) -> Dict:
+    """Empty the aggregates, reset the watermark and fold in the whole attempt history"""
+    with database.transaction() as session:
+        for table in AGGREGATE_TABLES:
+            session.execute(f"DELETE FROM {table}")
+        session.execute("DELETE FROM agg_watermarks WHERE name = %s", (WATERMARK,))
+    return refresh_aggregates(database, batch_size=batch_size, lag=lag)
+
+
+def rolling_pass_rates(database, days: int = 30) -> List[Dict]:
+    """Pass rate and average score per test over the last days, from the daily buckets"""
+    with database.transaction() as session:
+        now = _as_datetime(session.query_one("SELECT CURRENT_TIMESTAMP AS now")['now'])
+        since = (now - timedelta(days=days)).date().isoformat()
+        rows = session.query(
+            """SELECT test_id, SUM(attempts) AS attempts, SUM(passed_attempts) AS passed,
+                      SUM(percentage_sum) AS percentage_sum
+               FROM agg_test_daily WHERE day > %s
+               GROUP BY test_id ORDER BY test_id""",
+            (since,)
+        )
+    return [
+        {
+            'test_id': row['test_id'],
+            'attempts': int(row['attempts']),
+            'pass_rate': round(int(row['passed']) / int(row['attempts']), 4),
+            'avg_percentage': round(float(row['percentage_sum']) / int(row['attempts']), 2)
+        }
+        for row in rows
+    ]
+
+
+def _aggregate_snapshot(database) -> Dict[str, List]:
+    with database.transaction() as session:
+        return {
+            # Sums are floating point in SQLite, so compare them to the cent
+            table: [
+                tuple(round(value, 2) if isinstance(value, float) else value for value in row.values())
+                for row in session.query(f"SELECT * FROM {table} ORDER BY 1, 2")
+            ]
+            for table in AGGREGATE_TABLES
+        }
+
+
+def _add_attempts(database, count: int, users: int, tests: int, start: datetime, span_sec: float):
+    """Synthetic completed attempts spread over span_sec after start"""
+    rows = []
+    for _ in range(count):
+        percentage = round(random.uniform(30, 100), 2)
+        completed = start + timedelta(seconds=random.uniform(0, span_sec))
+        rows.append((random.randint(1, users), random.randint(1, tests), percentage, random.randint(120, 1800),
+                     1 if percentage >= 75 else 0, completed.strftime('%Y-%m-%d %H:%M:%S')))
+    with database.transaction() as session:
+        for start_row in range(0, len(rows), 1000):
+            batch = rows[start_row:start_row + 1000]
+            session.execute(
+                "INSERT INTO user_test_attempts (user_id, test_id, percentage, time_taken, is_passed, completed_at) VALUES "
+                + ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(batch)),
+                [value for row in batch for value in row]
+            )
+
+
+def benchmark(history: int, new: int, users: int = 2000, tests: int = 86) -> Dict:
+    """Time an incremental refresh of new attempts against a full recompute, on the SQLite stand-in.
+
+    Builds a history of attempts, folds it in, adds new attempts, then
+    times refresh_aggregates() and rebuild_aggregates() and checks that
+    both leave identical tables.
+    """
+    import sqlite_standin
+    from db import Database
+
+    random.seed(7)
+    directory = tempfile.mkdtemp(prefix='aggregates_')
+    path = os.path.join(directory, 'bench.db')
+    database = Database({'database': path}, pool_size=1, connect=lambda: sqlite_standin.connect(path))
+    with database.transaction() as session:
+        session.execute("INSERT INTO chapters (chapter_number, name) VALUES (1, 'Chapter 1'), (2, 'Chapter 2')")
+        for number in range(1, tests + 1):
+            session.execute("INSERT INTO tests (chapter_id, test_number, test_type) VALUES (%s, %s, %s)",
+                            (number % 3 or None, str(number), 'chapter' if number % 3 else 'comprehensive'))
+        for user in range(1, users + 1):
+            session.execute("INSERT INTO users (email) VALUES (%s)", (f"user{user}@example.com",))
+
+    with database.transaction() as session:
+        now = _as_datetime(session.query_one("SELECT CURRENT_TIMESTAMP AS now")['now'])
+    day = 24 * 3600
+    start = now - timedelta(days=60)
+    _add_attempts(database, history, users, tests, start, 59 * day)
+    rebuild_aggregates(database, lag=0)
+    _add_attempts(database, new, users, tests, start + timedelta(days=59), day - 60)
+
+    incremental = refresh_aggregates(database, lag=0)
+    incremental_snapshot = _aggregate_snapshot(database)
+    repeat = refresh_aggregates(database, lag=0)
+    full = rebuild_aggregates(database, lag=0)
+    identical = _aggregate_snapshot(database) == incremental_snapshot
+    database.close()
+    os.remove(path)
+    os.rmdir(directory)
+
+    return {
+        'history_attempts': history,
+        'new_attempts': new,
+        'incremental': incremental,
+        'repeat_refresh_attempts': repeat['attempts'],
+        'full_recompute': full,
+        'speedup': round(full['elapsed_sec'] / max(incremental['elapsed_sec'], 1e-6), 1),
+        'identical': identical
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Keep leaderboard and progress aggregates up to date')
+    parser.add_argument('--rebuild', action='store_true',
+                       help='Recompute the aggregates from the whole attempt history')
+    parser.add_argument('--watch', type=float, metavar='SECONDS',
+                       help='Keep running, refreshing every SECONDS')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Compare incremental refresh with a full recompute on the SQLite stand-in')
+    parser.add_argument('--history', type=int, default=200000,
+                       help='Existing attempts in the benchmark')
+    parser.add_argument('--new', type=int, default=1000,
+                       help='New attempts the benchmark refresh folds in')
+
+    args = parser.parse_args()
+
+    if args.benchmark:
+        result = benchmark(args.history, args.new)
+        print(f"🏁 {result['new_attempts']} new attempts on top of {result['history_attempts']}")
+        print(f"  incremental     {result['incremental']['elapsed_sec']:8.3f}s  ({result['incremental']['attempts']} attempts)")
+        print(f"  full recompute  {result['full_recompute']['elapsed_sec']:8.3f}s  ({result['full_recompute']['attempts']} attempts)")
+        print(f"  Speedup: {result['speedup']}x; repeat refresh folded {result['repeat_refresh_attempts']} attempts; "
+              f"{'identical' if result['identical'] else 'DIFFERENT'} results")
+        return
+
+    from db import get_database
+
+    database = get_database(Config.DB_CONFIG)
+    while True:
+        result = rebuild_aggregates(database) if args.rebuild else refresh_aggregates(database)
+        print(f"📊 Folded {result['attempts']} attempts in {result['batches']} batches ({result['elapsed_sec']}s), "
+              f"watermark {result['watermark']}")
+        if not args.watch:
+            break
+        args.rebuild = False
+        time.sleep(args.watch)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_TABLES = {
+    'analytics_question_stats': ('question_id', 'test_id', 'times_answered', 'times_correct', 'difficulty'),
+    'analytics_answer_stats': ('answer_id', 'question_id', 'is_correct', 'times_selected', 'selection_rate'),
+    'analytics_test_stats': ('test_id', 'attempts', 'completed', 'passed', 'pass_rate', 'avg_percentage', 'avg_time_taken'),
+    'analytics_user_chapter_stats': ('user_id', 'chapter_id', 'answered', 'correct', 'accuracy'),
+}
+# Distinct selected_answer_ids strings are parsed once and then referred to
+# by code; the same few strings ("["r1"]", ...) repeat across every question
+SELECTION_CACHE_LIMIT = 100_000
+_UNPARSEABLE = None
+
+
+def _lookup(rows: List[Dict], column: str) -> np.ndarray:
+    """Array indexed by row id holding column (0 where there is no row or the value is NULL)"""
+    size = max((row['id'] for row in rows), default=0) + 1
+    values = np.zeros(size, dtype=np.int64)
+    for row in rows:
+        values[row['id']] = row[column] or 0
+    return values
+
+
+class Dimensions:
+    """Questions, tests and answers as arrays indexed by primary key, for vectorized joins"""
+
+    def __init__(self, session):
+        questions = session.query("SELECT id, test_id FROM questions")
+        tests = session.query("SELECT id, chapter_id FROM tests")
+        answers = session.query("SELECT id, question_id, answer_id, is_correct FROM answers")
+        users = session.query_one("SELECT COALESCE(MAX(id), 0) AS max_id FROM users")
+
+        self.question_test = _lookup(questions, 'test_id')
+        self.test_chapter = _lookup(tests, 'chapter_id')
+        self.answer_question = _lookup(answers, 'question_id')
+        self.answer_correct = _lookup(answers, 'is_correct')
+        self.chapter_slots = int(self.test_chapter.max(initial=0)) + 1
+        self.user_slots = int(users['max_id']) + 1
+        # user_answers stores the scraped answer ids ('r0', 'c1', ...), which
+        # are only unique within a question: answer_matrix[question, code]
+        # is the answers.id of that question's answer with that scraped id
+        self.answer_codes: Dict[str, int] = {}
+        for row in answers:
+            self.answer_codes.setdefault(str(row['answer_id']), len(self.answer_codes))
+        self.answer_matrix = np.zeros((len(self.question_test), max(len(self.answer_codes), 1)), dtype=np.int64)
+        for row in answers:
+            if row['question_id'] < len(self.question_test):
+                self.answer_matrix[row['question_id'], self.answer_codes[str(row['answer_id'])]] = row['id']
+
+    def parse_selection(self, raw: Optional[str]):
+        """Answer codes of a selected_answer_ids JSON array, or _UNPARSEABLE"""
+        try:
+            selected = json.loads(raw) if raw else []
+        except ValueError:
+            return _UNPARSEABLE
+        if not isinstance(selected, list):
+            return _UNPARSEABLE
+        codes = (self.answer_codes.get(str(answer_id)) for answer_id in selected)
+        return tuple(code for code in codes if code is not None)
+
+
+class Accumulator:
+    """Running totals for one analytics pass, as dense NumPy arrays"""
+
+    def __init__(self, dims: Dimensions):
+        self.dims = dims
+        tests = len(dims.test_chapter)
+        self.attempts = np.zeros(tests, dtype=np.int64)
+        self.completed = np.zeros(tests, dtype=np.int64)
+        self.passed = np.zeros(tests, dtype=np.int64)
+        self.percentage_sum = np.zeros(tests)
+        self.time_sum = np.zeros(tests)
+        self.time_count = np.zeros(tests, dtype=np.int64)
+
+        questions = len(dims.question_test)
+        self.times_answered = np.zeros(questions, dtype=np.int64)
+        self.times_correct = np.zeros(questions, dtype=np.int64)
+        self.times_selected = np.zeros(len(dims.answer_question), dtype=np.int64)
+        self.user_answered = np.zeros(dims.user_slots * dims.chapter_slots, dtype=np.int32)
+        self.user_correct = np.zeros(dims.user_slots * dims.chapter_slots, dtype=np.int32)
+
+        self.selection_codes: Dict[Optional[str], int] = {}
+        self.selections: List[Optional[Tuple[int, ...]]] = []
+        self.attempt_rows = 0
+        self.answer_rows = 0
+        self.unparseable = 0
+
+    def add_attempts(self, rows: Sequence[Tuple]):
+        """rows of (id, user_id, test_id, is_passed, percentage, time_taken, completed)"""
+        _, _, tests, passed, percentage, taken, completed = zip(*rows)
+        tests = np.array(tests, dtype=np.int64)
+        passed = np.array(passed, dtype=float)
+        percentage = np.array(percentage, dtype=float)
+        taken = np.array(taken, dtype=float)
+        completed = np.array(completed, dtype=bool)
+        self.attempt_rows += len(rows)
+
+        size = len(self.attempts)
+        known = tests < size
+        done = known & completed
+        self.attempts += np.bincount(tests[known], minlength=size)
+        self.completed += np.bincount(tests[done], minlength=size)
+        self.passed += np.bincount(tests[done], weights=np.nan_to_num(passed[done]), minlength=size).astype(np.int64)
+        scored = done & ~np.isnan(percentage)
+        self.percentage_sum += np.bincount(tests[scored], weights=percentage[scored], minlength=size)
+        timed = done & ~np.isnan(taken)
+        self.time_sum += np.bincount(tests[timed], weights=taken[timed], minlength=size)
+        self.time_count += np.bincount(tests[timed], minlength=size)
+
+    def add_answers(self, rows: Sequence[Tuple]):
+        """rows of (user_id, question_id, is_correct, selected_answer_ids), user_id 0 when the attempt is gone"""
+        dims = self.dims
+        users, questions, correct, selections = zip(*rows)
+        user = np.array(users, dtype=np.int64)
+        question = np.array(questions, dtype=np.int64)
+        correct = np.array(correct, dtype=np.int64)
+        self.answer_rows += len(rows)
+
+        known = question < len(dims.question_test)
+        known[known] = dims.question_test[question[known]] > 0
+        size = len(self.times_answered)
+        self.times_answered += np.bincount(question[known], minlength=size)
+        self.times_correct += np.bincount(question[known], weights=correct[known], minlength=size).astype(np.int64)
+
+        # Chapter accuracy per user; comprehensive and exam tests have no chapter
+        chapter = np.zeros(len(rows), dtype=np.int64)
+        test = dims.question_test[question[known]]
+        chapter[known] = np.where(test < len(dims.test_chapter), dims.test_chapter[np.minimum(test, len(dims.test_chapter) - 1)], 0)
+        scoped = known & (user > 0) & (user < dims.user_slots) & (chapter > 0)
+        slot = user[scoped] * dims.chapter_slots + chapter[scoped]
+        np.add.at(self.user_answered, slot, 1)
+        np.add.at(self.user_correct, slot, correct[scoped].astype(np.int32))
+
+        # One dict lookup per row; the counting is vectorized per distinct selection
+        if len(self.selection_codes) > SELECTION_CACHE_LIMIT:
+            self.selection_codes.clear()
+            self.selections.clear()
+        lookup = self.selection_codes.get
+        codes = [lookup(raw, -1) for raw in selections]
+        if -1 in codes:
+            for index, raw in enumerate(selections):
+                if codes[index] < 0:
+                    code = lookup(raw)
+                    if code is None:
+                        code = self.selection_codes[raw] = len(self.selections)
+                        self.selections.append(dims.parse_selection(raw))
+                    codes[index] = code
+        codes = np.array(codes, dtype=np.int64)
+        for code in np.unique(codes).tolist():
+            answers = self.selections[code]
+            rows_with = codes == code
+            if answers is _UNPARSEABLE:
+                self.unparseable += int(rows_with.sum())
+                continue
+            selected_questions = question[rows_with & known]
+            for answer_code in answers:
+                picked = dims.answer_matrix[selected_questions, answer_code]
+                picked = picked[picked > 0]
+                self.times_selected += np.bincount(picked, minlength=len(self.times_selected))
+
+    def summary_rows(self) -> Dict[str, List[Tuple]]:
+        """Rows for each summary table, as plain Python values"""
+        dims = self.dims
+        rows: Dict[str, List[Tuple]] = {}
+
+        answered = np.flatnonzero(self.times_answered)
+        counts = self.times_answered[answered]
+        difficulty = np.round(1 - self.times_correct[answered] / counts, 4)
+        rows['analytics_question_stats'] = list(zip(
+            answered.tolist(), dims.question_test[answered].tolist(), counts.tolist(),
+            self.times_correct[answered].tolist(), difficulty.tolist()
+        ))
+
+        answer_ids = np.flatnonzero(dims.answer_question)
+        answer_questions = dims.answer_question[answer_ids]
+        in_range = answer_questions < len(self.times_answered)
+        answer_ids, answer_questions = answer_ids[in_range], answer_questions[in_range]
+        shown = self.times_answered[answer_questions]
+        answer_ids, answer_questions, shown = answer_ids[shown > 0], answer_questions[shown > 0], shown[shown > 0]
+        rows['analytics_answer_stats'] = list(zip(
+            answer_ids.tolist(), answer_questions.tolist(), dims.answer_correct[answer_ids].tolist(),
+            self.times_selected[answer_ids].tolist(), np.round(self.times_selected[answer_ids] / shown, 4).tolist()
+        ))
+
+        tests = np.flatnonzero(self.attempts)
+        completed = self.completed[tests]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pass_rate = np.where(completed > 0, np.round(self.passed[tests] / completed, 4), np.nan)
+            average = np.where(completed > 0, np.round(self.percentage_sum[tests] / completed, 2), np.nan)
+            timed = self.time_count[tests]
+            average_time = np.where(timed > 0, np.round(self.time_sum[tests] / timed), np.nan)
+        rows['analytics_test_stats'] = [
+            (test, attempts, done, passed,
+             None if np.isnan(rate) else rate, None if np.isnan(avg) else avg, None if np.isnan(taken) else int(taken))
+            for test, attempts, done, passed, rate, avg, taken in zip(
+                tests.tolist(), self.attempts[tests].tolist(), completed.tolist(), self.passed[tests].tolist(),
+                pass_rate.tolist(), average.tolist(), average_time.tolist()
+            )
+        ]
+
+        slots = np.flatnonzero(self.user_answered)
+        answered = self.user_answered[slots].astype(np.int64)
+        correct = self.user_correct[slots].astype(np.int64)
+        rows['analytics_user_chapter_stats'] = list(zip(
+            (slots // dims.chapter_slots).tolist(), (slots % dims.chapter_slots).tolist(),
+            answered.tolist(), correct.tolist(), np.round(correct / answered, 4).tolist()
+        ))
+        return rows
+
+
+def _replace_table(session, table: str, columns: Sequence[str], rows: List[Tuple], batch_size: int):
+    session.execute(f"DELETE FROM {table}")
+    session.insert_rows(f"INSERT INTO {table} ({', '.join(columns)})", rows, batch_size)
+
+
+def _top(rows: List[Tuple], columns: Sequence[str], key, limit: int = 5) -> List[Dict]:
+    return [dict(zip(columns, row)) for row in sorted(rows, key=key)[:limit]]
+
+
+def refresh_analytics(database, chunk_size: Optional[int] = None, batch_size: Optional[int] = None,
+                      min_answers: int = 20, write: bool = True) -> Dict:
+    """Recompute every analytics summary table from user_test_attempts and user_answers.
+
+    Both tables are streamed in chunks through an unbuffered cursor, each
+    answer joined to its attempt's user, and folded into NumPy accumulators
+    sized by the question, answer, test and user counts, so memory does not
+    grow with the number of attempts or answers. Reads share one transaction (one snapshot); the summary
+    tables are then replaced in a second transaction, so the backend sees
+    either the old numbers or the new ones. Returns a report; min_answers
+    is the sample size a question needs to be listed as hard.
+    """
+    chunk_size = chunk_size or Config.ANALYTICS_CHUNK_SIZE
+    batch_size = batch_size or Config.DB_BATCH_SIZE
+    started = time.perf_counter()
+
+    with database.transaction() as session:
+        dims = Dimensions(session)
+        totals = Accumulator(dims)
+        for rows in session.stream(
+            "SELECT id, user_id, test_id, is_passed, percentage, time_taken, completed_at IS NOT NULL "
+            "FROM user_test_attempts", (), chunk_size, dictionary=False
+        ):
+            totals.add_attempts(rows)
+        for rows in session.stream(
+            # The attempt's user comes with each answer, so no attempt -> user map is held
+            "SELECT COALESCE(uta.user_id, 0), ua.question_id, ua.is_correct, ua.selected_answer_ids "
+            "FROM user_answers ua LEFT JOIN user_test_attempts uta ON uta.id = ua.attempt_id",
+            (), chunk_size, dictionary=False
+        ):
+            totals.add_answers(rows)
+    read_sec = time.perf_counter() - started
+
+    summary = totals.summary_rows()
+    if write:
+        with database.transaction() as session:
+            for table, columns in SUMMARY_TABLES.items():
+                _replace_table(session, table, columns, summary[table], batch_size)
+        logger.info(f"Analytics refreshed from {totals.answer_rows} answers in {time.perf_counter() - started:.1f}s")
+
+    questions = SUMMARY_TABLES['analytics_question_stats']
+    answers = SUMMARY_TABLES['analytics_answer_stats']
+    tests = SUMMARY_TABLES['analytics_test_stats']
+    return {
+        'attempts': totals.attempt_rows,
+        'user_answers': totals.answer_rows,
+        'unparseable_selections': totals.unparseable,
+        'tables': {table: len(rows) for table, rows in summary.items()},
+        'written': write,
+        'hardest_questions': _top(
+            [row for row in summary['analytics_question_stats'] if row[2] >= min_answers], questions,
+            key=lambda row: -row[4]
+        ),
+        'top_distractors': _top(
+            [row for row in summary['analytics_answer_stats'] if not row[2]], answers, key=lambda row: -row[4]
+        ),
+        'lowest_pass_rates': _top(
+            [row for row in summary['analytics_test_stats'] if row[4] is not None], tests, key=lambda row: row[4]
+        ),
+        'read_sec': round(read_sec, 3),
+        'elapsed_sec': round(time.perf_counter() - started, 3)
+    }
@@ -0,0 +1,279 @@
+import argparse
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+
+# Bump whenever a change alters which answers are resolved, so page caches re-parse
+RESOLVER_VERSION = 2
+
+# Numbers keep their decimals and percent sign, so "1%" is not found inside "1.5%"
+TOKEN_RE = re.compile(r'\d+(?:[.,]\d+)*%?|\w+')
+# Leading words answers often carry but explanations drop ("To respect the law" -> "respect the law")
+LEADING_STOPWORDS = frozenset(['to', 'the', 'a', 'an'])
+
+# Explanation phrasings that name the correct answer, applied per sentence and
+# only to sentences mentioning "correct". The lazy group plus \s* also splits
+# text glued onto the phrase ("... governmentis the correct answer").
+SENTENCE_RE = re.compile(r'[^.]+')
+EXPLANATION_PATTERNS = [
+    re.compile(r"correct answers?[:\s]*(.+)", re.IGNORECASE),
+    re.compile(r"answers?[:\s]*(.+?)\s*(?:is|are) correct", re.IGNORECASE),
+    re.compile(r"^\s*(.+?)\s*(?:is|are) the correct answers?", re.IGNORECASE),
+]
+
+# Confidence of each kind of evidence
+EXACT = 1.0
+SPAN_CONTAINS_ANSWER = 0.9
+ANSWER_CONTAINS_SPAN = 0.6   # scaled up to 0.9 by how much of the answer the span covers
+PATTERN_FACTOR = 0.95        # explanation phrasing is slightly weaker than <strong> emphasis
+SUBSTRING = 0.7              # answer text found inside a phrasing span, across glued words
+MENTION = 0.4                # answer merely appears in the explanation prose
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """Lowercase word tokens, so punctuation, spacing and nbsp never matter"""
+    return tuple(TOKEN_RE.findall(text.lower()))
+
+
+@dataclass
+class Resolution:
+    answer_id: str
+    confidence: float
+    method: str       # 'strong', 'pattern', 'substring' or 'mention'
+    evidence: str
+
+
+def core_tokens(tokens: Tuple[str, ...]) -> Tuple[str, ...]:
+    """tokens without leading stopwords, unless that leaves a single word ("A-Day" stays whole)"""
+    start = 0
+    while start < len(tokens) and tokens[start] in LEADING_STOPWORDS:
+        start += 1
+    return tokens[start:] if len(tokens) - start >= 2 else tokens
+
+
+class _AnswerIndex:
+    """Token index over one question's answers.
+
+    postings maps token -> [(answer position, token offset)] for containment
+    checks; heads maps the first token of each answer (and of its core, without
+    leading stopwords) to the sequences to try when scanning a span.
+    """
+
+    def __init__(self, answer_tokens: List[Tuple[str, ...]]):
+        self.answer_tokens = answer_tokens
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.heads: Dict[str, List[Tuple[int, Tuple[str, ...]]]] = {}
+        for position, tokens in enumerate(answer_tokens):
+            for offset, token in enumerate(tokens):
+                self.postings.setdefault(token, []).append((position, offset))
+            for sequence in {tokens, core_tokens(tokens)}:
+                if sequence:
+                    self.heads.setdefault(sequence[0], []).append((position, sequence))
+
+    def answers_in(self, span: Tuple[str, ...]) -> List[int]:
+        """Answers whose token sequence (or its core) occurs in span"""
+        found = []
+        for start, token in enumerate(span):
+            for position, tokens in self.heads.get(token, ()):
+                if position not in found and span[start:start + len(tokens)] == tokens:
+                    found.append(position)
+        return found
+
+    def answers_containing(self, span: Tuple[str, ...]) -> List[int]:
+        """Answers that contain span's whole token sequence"""
+        if not span:
+            return []
+        found = []
+        for position, offset in self.postings.get(span[0], ()):
+            if position not in found and self.answer_tokens[position][offset:offset + len(span)] == span:
+                found.append(position)
+        return found
+
+
+class AnswerResolver:
+    """Decides which answers an explanation marks as correct.
+
+    Evidence comes from <strong> spans first and from explanation phrasings
+    when there are none. Answers are tokenised once per question and spans
+    are matched through a token index on whole words, so "No" never matches
+    inside "Not". Every decision carries a confidence; answers at or above
+    min_confidence are marked correct.
+
+    Explanations scraped with get_text(strip=True) can glue words together
+    ("The correct answer isCharles II"), which whole-word matching cannot
+    see through. When nothing else is confident, answers are looked for as
+    plain substrings of the phrasing spans, as the original resolver did.
+    """
+
+    def __init__(self, min_confidence: Optional[float] = None):
+        self.min_confidence = Config.ANSWER_MIN_CONFIDENCE if min_confidence is None else min_confidence
+
+    @staticmethod
+    def _match_spans(index: _AnswerIndex, spans: Sequence[str], method: str, factor: float,
+                     answer_ids: List[str]) -> Dict[int, Resolution]:
+        best: Dict[int, Resolution] = {}
+
+        def offer(position: int, confidence: float, span: str):
+            confidence = round(confidence * factor, 3)
+            if position not in best or best[position].confidence < confidence:
+                best[position] = Resolution(answer_ids[position], confidence, method, span)
+
+        for span in spans:
+            tokens = tokenize(span)
+            if not tokens:
+                continue
+            for position in index.answers_in(tokens):
+                exact = core_tokens(index.answer_tokens[position]) == core_tokens(tokens)
+                offer(position, EXACT if exact else SPAN_CONTAINS_ANSWER, span)
+            for position in index.answers_containing(tokens):
+                coverage = len(tokens) / len(index.answer_tokens[position])
+                offer(position, ANSWER_CONTAINS_SPAN + 0.3 * coverage, span)
+        return best
+
+    @staticmethod
+    def explanation_spans(explanation: str) -> List[str]:
+        """Text that explanation phrasings single out as the correct answer"""
+        if 'correct' not in explanation.lower():
+            return []
+        spans = []
+        for sentence in SENTENCE_RE.findall(explanation):
+            if 'correct' in sentence.lower():
+                for pattern in EXPLANATION_PATTERNS:
+                    spans.extend(match.group(1) for match in pattern.finditer(sentence))
+        return spans
+
+    @staticmethod
+    def _substring_matches(answers: Sequence, spans: Sequence[str]) -> List[int]:
+        """Answers whose text, less leading stopwords, occurs in a span regardless of word breaks"""
+        found = []
+        span_texts = [' '.join(tokenize(span)) for span in spans]
+        for position, answer in enumerate(answers):
+            text = ' '.join(core_tokens(tokenize(answer.text)))
+            if text and any(text in span_text for span_text in span_texts):
+                found.append(position)
+        return found
+
+    def resolve(self, answers: Sequence, strong_texts: Sequence[str], explanation: Optional[str]) -> List[Resolution]:
+        """Evidence for every answer that has any, in answer order (answers need .id and .text)"""
+        answer_ids = [answer.id for answer in answers]
+        index = _AnswerIndex([tokenize(answer.text) for answer in answers])
+
+        found = self._match_spans(index, strong_texts, 'strong', 1.0, answer_ids)
+        if not any(resolution.confidence >= self.min_confidence for resolution in found.values()) and explanation:
+            spans = self.explanation_spans(explanation)
+            for position, resolution in self._match_spans(index, spans, 'pattern', PATTERN_FACTOR, answer_ids).items():
+                if position not in found or found[position].confidence < resolution.confidence:
+                    found[position] = resolution
+
+            if not any(resolution.confidence >= self.min_confidence for resolution in found.values()):
+                for position in self._substring_matches(answers, spans):
+                    if position not in found or found[position].confidence < SUBSTRING:
+                        found[position] = Resolution(answer_ids[position], SUBSTRING, 'substring', answers[position].text)
+
+        # Bare mentions are only worth recording when nothing stronger was found
+        if explanation and not any(resolution.confidence >= self.min_confidence for resolution in found.values()):
+            for position in index.answers_in(tokenize(explanation)):
+                if position not in found:
+                    found[position] = Resolution(answer_ids[position], MENTION, 'mention', answers[position].text)
+
+        return [found[position] for position in sorted(found)]
+
+    def mark_correct(self, answers: Sequence, resolutions: List[Resolution]) -> List[str]:
+        """Set is_correct on confidently resolved answers and return their ids in answer order"""
+        confident = {r.answer_id for r in resolutions if r.confidence >= self.min_confidence}
+        correct_ids = []
+        for answer in answers:
+            if answer.id in confident:
+                answer.is_correct = True
+                correct_ids.append(answer.id)
+        return correct_ids
+
+
+def _legacy_resolve(answers: List, strong_texts: List[str], explanation: str) -> List[str]:
+    """The nested-loop matching this module replaced, kept for the benchmark"""
+    correct_answers = []
+    for strong_text in strong_texts:
+        for answer in answers:
+            if strong_text.lower() in answer.text.lower() or answer.text.lower() in strong_text.lower():
+                correct_answers.append(answer.id)
+    if not correct_answers:
+        patterns = [
+            r"correct answer[s]?[:\s]*([^.]+)",
+            r"answer[s]?[:\s]*([^.]+)\s+is correct",
+            r"([^.]+)\s+is the correct answer"
+        ]
+        explanation_lower = explanation.lower()
+        for pattern in patterns:
+            for match in re.findall(pattern, explanation_lower, re.IGNORECASE):
+                for answer in answers:
+                    if answer.text.lower() in match.lower() or match.lower() in answer.text.lower():
+                        if answer.id not in correct_answers:
+                            correct_answers.append(answer.id)
+    return correct_answers
+
+
+def benchmark(cases: List[Tuple[List, List[str], str]], repeat: int = 5) -> Dict[str, Dict]:
+    """Questions per second of the legacy loops and the resolver over (answers, strong_texts, explanation) cases"""
+    resolver = AnswerResolver()
+    results = {}
+    for name, resolve in (('legacy', _legacy_resolve), ('indexed', resolver.resolve)):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for answers, strong_texts, explanation in cases:
+                resolve(answers, strong_texts, explanation)
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            'elapsed_sec': round(elapsed, 3),
+            'questions_per_sec': round(len(cases) * repeat / elapsed, 1)
+        }
+    return results
+
+
+def main():
+    from parsers import load_pages, get_parser
+    from uk_visa_test import Answer
+
+    parser = argparse.ArgumentParser(description='Benchmark and audit correct-answer resolution')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Saved bank, rendered to pages with <strong> emphasis')
+    parser.add_argument('--pages-dir', help='Use saved HTML pages instead')
+    parser.add_argument('--repeat', type=int, default=5,
+                       help='Passes over the bank per timing')
+
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages_dir) if args.pages_dir else load_pages(json_file=args.json_file)
+    html_parser = get_parser('lxml')
+    cases = []
+    for html in pages.values():
+        for record in html_parser.parse(html):
+            answers = [Answer(id=answer_id, text=text) for answer_id, text in record.answers]
+            cases.append((answers, record.strong_texts, record.explanation or ''))
+
+    resolver = AnswerResolver()
+    by_method: Dict[str, int] = {}
+    confidence_bands = {'>=0.9': 0, '0.5-0.9': 0, '<0.5': 0}
+    unresolved = 0
+    for answers, strong_texts, explanation in cases:
+        resolutions = resolver.resolve(answers, strong_texts, explanation)
+        if not resolver.mark_correct(answers, resolutions):
+            unresolved += 1
+        for resolution in resolutions:
+            by_method[resolution.method] = by_method.get(resolution.method, 0) + 1
+            band = '>=0.9' if resolution.confidence >= 0.9 else '0.5-0.9' if resolution.confidence >= 0.5 else '<0.5'
+            confidence_bands[band] += 1
+
+    print(f"🎯 Resolved {len(cases) - unresolved}/{len(cases)} questions "
+          f"(min confidence {resolver.min_confidence})")
+    print(f"  Decisions by method: {by_method}")
+    print(f"  Decisions by confidence: {confidence_bands}")
+
+    for name, result in benchmark(cases, args.repeat).items():
+        print(f"  {name:8} {result['elapsed_sec']:8.3f}s  {result['questions_per_sec']:10.1f} questions/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from config import Config
+from metrics import metrics
+from rate_limit import HostRateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CrawlStats:
+    """Throughput and latency figures for one async crawl"""
+    pages: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+    latencies: List[float] = field(default_factory=list)
+
+    @property
+    def pages_per_sec(self) -> float:
+        return self.pages / self.elapsed if self.elapsed > 0 else 0.0
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of fetch latency in seconds"""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        # p * n / 100 rather than p / 100 * n, which turns 7% of 100 into 7.000000000000001
+        rank = max(1, math.ceil(p * len(ordered) / 100))
+        return ordered[min(rank, len(ordered)) - 1]
+
+    def summary(self) -> Dict:
+        return {
+            'pages': self.pages,
+            'errors': self.errors,
+            'elapsed_sec': round(self.elapsed, 3),
+            'pages_per_sec': round(self.pages_per_sec, 2),
+            'fetch_p50_ms': round(self.percentile(50) * 1000, 1),
+            'fetch_p99_ms': round(self.percentile(99) * 1000, 1)
+        }
+
+
+class AsyncCrawlEngine:
+    """Fetch test pages concurrently and parse them with the crawler's extractor"""
+
+    def __init__(self, crawler, concurrency: Optional[int] = None, rate: Optional[float] = None,
+                 burst: Optional[int] = None, timeout: Optional[float] = None):
+        self.crawler = crawler
+        self.concurrency = concurrency or Config.CRAWLER_CONCURRENCY
+        self.limiter = HostRateLimiter(
+            Config.CRAWLER_RATE if rate is None else rate,
+            Config.CRAWLER_BURST if burst is None else burst
+        )
+        self.timeout = timeout or Config.CRAWLER_TIMEOUT
+        self.stats = CrawlStats()
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str, headers: Dict) -> Optional[Tuple]:
+        """Fetch one page as (html, response headers), returning None on failure.
+
+        html is None when the server answered 304 Not Modified. With the
+        crawler's adaptive scheduler, failures it deems retryable are retried
+        after the delay it prescribes.
+        """
+        scheduler = self.crawler.scheduler
+        attempt = 0
+        while True:
+            if scheduler is None:
+                await self.limiter.acquire(url)
+            else:
+                sent_at = await scheduler.acquire()
+            started = time.perf_counter()
+            status = retry_after = None
+            try:
+                with metrics.timer('fetch', attributes={'url': url}):
+                    async with session.get(url, headers=headers) as response:
+                        status, retry_after = response.status, response.headers.get('Retry-After')
+                        response.raise_for_status()
+                        html = None if response.status == 304 else await response.text()
+                if html is None:
+                    metrics.count('pages_not_modified')
+                if scheduler is not None:
+                    scheduler.complete(sent_at, status)
+                self.stats.pages += 1
+                return html, response.headers
+            except Exception as e:
+                if not isinstance(e, aiohttp.ClientResponseError):
+                    # Timeouts and dropped connections, even mid-body
+                    status = None
+                delay = scheduler.complete(sent_at, status, retry_after, attempt) if scheduler is not None else None
+                if delay is None:
+                    logger.error(f"Error crawling {url}: {e}")
+                    self.stats.errors += 1
+                    return None
+                logger.warning(f"Retrying {url} in {delay:.2f}s after: {e}")
+            finally:
+                self.stats.latencies.append(time.perf_counter() - started)
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    async def crawl_job(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, job: Tuple) -> Optional[List]:
+        """Questions for one job, or None if the page could not be fetched or parsed"""
+        test_path, chapter, test_number, test_type = job
+        url = f"{self.crawler.base_url}/{test_path}"
+
+        page_cache = self.crawler.page_cache
+        headers = page_cache.conditional_headers(test_path) if page_cache else {}
+
+        async with semaphore:
+            logger.info(f"Crawling: {url}")
+            result = await self.fetch(session, url, headers)
+
+        if result is None:
+            return None
+
+        html, response_headers = result
+        try:
+            questions = self.crawler.process_page(test_path, chapter, test_number, test_type, html, response_headers)
+        except Exception as e:
+            logger.error(f"Error parsing {url}: {e}")
+            return None
+        logger.info(f"Extracted {len(questions)} questions from {test_path}")
+        return questions
+
+    async def run_jobs(self, jobs: List[Tuple]) -> List[Optional[List]]:
+        """Crawl all jobs and return each job's questions (None where it failed), in job order"""
+        self.stats = CrawlStats()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        headers = {'User-Agent': self.crawler.session.headers['User-Agent']}
+
+        started = time.perf_counter()
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+            results = await asyncio.gather(*(self.crawl_job(session, semaphore, job) for job in jobs))
+        self.stats.elapsed = time.perf_counter() - started
+
+        summary = self.stats.summary()
+        logger.info(
+            f"Async crawl finished: {summary['pages']} pages, {summary['errors']} errors in "
+            f"{summary['elapsed_sec']}s ({summary['pages_per_sec']} pages/sec), "
+            f"fetch latency p50={summary['fetch_p50_ms']}ms p99={summary['fetch_p99_ms']}ms"
+        )
+
+        return results
+
+    async def run(self, jobs: List[Tuple]) -> List:
+        """Crawl all jobs and return their questions in job order"""
+        results = await self.run_jobs(jobs)
+        return [question for questions in results if questions for question in questions]
+
+    def crawl(self, jobs: List[Tuple]) -> List:
+        """Blocking entry point for synchronous callers"""
+        return asyncio.run(self.run(jobs))
+
+    def crawl_jobs(self, jobs: List[Tuple]) -> List[Optional[List]]:
+        """Blocking variant of run_jobs"""
+        return asyncio.run(self.run_jobs(jobs))
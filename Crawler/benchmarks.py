@@ -0,0 +1,219 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+from config import Config
+from stub_server import StubServer, build_pages_from_json, load_recording
+from uk_visa_test import UKVisaTestCrawler
+import sqlite_standin
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_baseline.json')
+# Slowdowns smaller than this are treated as timer noise whatever the ratio
+MIN_REGRESSION_SEC = 0.005
+
+
+def measure(run: Callable, rounds: int, setup: Optional[Callable] = None) -> Dict:
+    """Time run(state) for each round, with an untimed setup() producing the state.
+
+    Like timeit, garbage collection is paused while a round is timed.
+    """
+    timings = []
+    for _ in range(rounds):
+        state = setup() if setup else None
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            run(state)
+            timings.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    return {
+        'median_sec': round(statistics.median(timings), 4),
+        'min_sec': round(min(timings), 4),
+        'rounds': rounds
+    }
+
+
+class BenchmarkSuite:
+    """Replays a page corpus through the crawler's hot paths against a local stub site"""
+
+    def __init__(self, pages: Dict[str, str], rounds: int = 5, latency: float = 0.002, jitter: float = 0.001):
+        self.pages = pages
+        self.rounds = rounds
+        self.latency = latency
+        self.jitter = jitter
+
+        # Same test → page mapping the crawler uses; a page shared by two chapters is parsed once per job
+        self.jobs = [job for job in UKVisaTestCrawler().get_test_jobs() if job[0] in pages]
+        self.questions = self._extract_all(UKVisaTestCrawler())
+
+    @property
+    def settings(self) -> Dict:
+        return {
+            'pages': len(self.pages),
+            'jobs': len(self.jobs),
+            'latency_ms': self.latency * 1000,
+            'jitter_ms': self.jitter * 1000
+        }
+
+    def _extract_all(self, crawler: UKVisaTestCrawler) -> List:
+        questions = []
+        for test_path, chapter, test_number, test_type in self.jobs:
+            questions.extend(crawler.extract_question_data(self.pages[test_path], chapter, test_number, test_type))
+        return questions
+
+    def bench_extract_question_data(self) -> Dict:
+        crawler = UKVisaTestCrawler()
+        return measure(lambda _: self._extract_all(crawler), self.rounds)
+
+    def bench_crawl_all_tests(self) -> Dict:
+        # Unthrottled, so the numbers track the crawler rather than the politeness delay
+        delay = Config.CRAWLER_DELAY
+        Config.CRAWLER_DELAY = 0
+        try:
+            with StubServer(self.pages, latency=self.latency, jitter=self.jitter, seed=1) as server:
+                def run(crawler):
+                    crawler.crawl_all_tests()
+                    if len(crawler.questions_data) != len(self.questions):
+                        raise RuntimeError(f"Crawl returned {len(crawler.questions_data)} questions, expected {len(self.questions)}")
+                return measure(run, self.rounds, setup=lambda: self._corpus_crawler(server.base_url))
+        finally:
+            Config.CRAWLER_DELAY = delay
+
+    def _corpus_crawler(self, base_url: str) -> UKVisaTestCrawler:
+        """A crawler whose test list is limited to the pages in the corpus"""
+        crawler = UKVisaTestCrawler(base_url=base_url)
+        configs = crawler.test_configs
+        for chapter, paths in configs['chapter_tests'].items():
+            configs['chapter_tests'][chapter] = [path for path in paths if path in self.pages]
+        for key in ('comprehensive_tests', 'exam_tests'):
+            configs[key] = [path for path in configs[key] if path in self.pages]
+        return crawler
+
+    def _crawler_with_questions(self) -> UKVisaTestCrawler:
+        crawler = UKVisaTestCrawler()
+        crawler.questions_data = list(self.questions)
+        return crawler
+
+    def bench_save_to_json(self) -> Dict:
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'questions.json')
+            return measure(lambda crawler: crawler.save_to_json(filename), self.rounds,
+                           setup=self._crawler_with_questions)
+
+    def _bench_database(self, **options) -> Dict:
+        def setup():
+            return self._crawler_with_questions(), sqlite_standin.connect()
+
+        def run(state):
+            crawler, connection = state
+            crawler.save_to_database(connection=connection, **options)
+            connection.close()
+
+        return measure(run, self.rounds, setup=setup)
+
+    def bench_save_to_database(self) -> Dict:
+        return self._bench_database()
+
+    def bench_save_to_database_bulk(self) -> Dict:
+        return self._bench_database(bulk=True)
+
+    CASES = ['extract_question_data', 'crawl_all_tests', 'save_to_json', 'save_to_database', 'save_to_database_bulk']
+
+    def run(self, cases: Optional[List[str]] = None) -> Dict[str, Dict]:
+        return {case: getattr(self, f'bench_{case}')() for case in (cases or self.CASES)}
+
+
+def compare(results: Dict[str, Dict], baseline: Dict, tolerance: float) -> List[str]:
+    """Cases whose best round is more than tolerance (and MIN_REGRESSION_SEC) slower than the baseline's.
+
+    The minimum is compared rather than the median because it is far less
+    sensitive to other load on the machine.
+    """
+    regressions = []
+    for case, result in results.items():
+        reference = baseline.get('cases', {}).get(case)
+        if reference is None:
+            continue
+        slower = result['min_sec'] - reference['min_sec']
+        if result['min_sec'] > reference['min_sec'] * (1 + tolerance) and slower > MIN_REGRESSION_SEC:
+            regressions.append(case)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline crawler benchmarks with regression checks against a baseline')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Question bank rendered into the page corpus')
+    parser.add_argument('--record-dir',
+                       help='Replay pages recorded with the crawler\'s --record-dir instead')
+    parser.add_argument('--cases', nargs='+', choices=BenchmarkSuite.CASES,
+                       help='Benchmarks to run (default: all)')
+    parser.add_argument('--rounds', type=int, default=5,
+                       help='Timed rounds per benchmark; the best round is compared')
+    parser.add_argument('--latency-ms', type=float, default=2.0,
+                       help='Stub server latency for the crawl benchmark')
+    parser.add_argument('--jitter-ms', type=float, default=1.0,
+                       help='Stub server latency jitter for the crawl benchmark')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                       help='Baseline file to compare against or update')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                       help='Allowed slowdown over the baseline\'s best round (0.3 = 30%%)')
+    parser.add_argument('--update-baseline', action='store_true',
+                       help='Record these results as the new baseline')
+
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    pages = load_recording(args.record_dir) if args.record_dir else build_pages_from_json(args.json_file)
+    suite = BenchmarkSuite(pages, rounds=args.rounds, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000)
+    results = suite.run(args.cases)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print(f"⏱️  {len(suite.questions)} questions from {len(pages)} pages, {args.rounds} rounds each")
+    for case, result in results.items():
+        reference = baseline.get('cases', {}).get(case)
+        versus = f"  (baseline min {reference['min_sec']:.4f}s)" if reference else ''
+        print(f"  {case:24} median {result['median_sec']:8.4f}s  min {result['min_sec']:8.4f}s{versus}")
+
+    if args.update_baseline:
+        baseline = {
+            'settings': suite.settings,
+            'python': platform.python_version(),
+            'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'cases': {**baseline.get('cases', {}), **results}
+        }
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, indent=2)
+        print(f"📌 Baseline written to {args.baseline}")
+        return
+
+    if not baseline:
+        print("No baseline recorded yet; run with --update-baseline")
+        return
+    if baseline.get('settings') != suite.settings:
+        print(f"⚠️  Baseline was recorded with {baseline.get('settings')}, not {suite.settings}; skipping comparison")
+        return
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"❌ Slower than baseline by more than {args.tolerance:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+    print("✅ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
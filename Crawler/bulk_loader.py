@@ -0,0 +1,212 @@
+import argparse
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from config import Config
+from db import Session
+from uk_visa_test import CHAPTERS, Question, UKVisaTestCrawler, question_from_dict
+
+logger = logging.getLogger(__name__)
+
+
+def chunked(rows: Sequence, size: int):
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+
+class BulkLoader:
+    """Set-based loader for crawled questions.
+
+    Chapter and test IDs are resolved with a handful of queries, questions and
+    answers go in as multi-row INSERTs of batch_size rows, and new question IDs
+    are mapped back with one SELECT per batch.
+    """
+
+    def __init__(self, connection, batch_size: Optional[int] = None, commit_per_batch: bool = False):
+        self.connection = connection
+        self.session = Session.wrap(connection)
+        self.batch_size = batch_size or Config.DB_BATCH_SIZE
+        self.commit_per_batch = commit_per_batch
+        self.statements = 0
+
+    def _query(self, sql: str, params: Sequence = ()) -> List[Dict]:
+        self.statements += 1
+        return self.session.query(sql, params)
+
+    def _execute(self, sql: str, params: Sequence = ()):
+        self.statements += 1
+        self.session.execute(sql, params)
+
+    def _insert_values(self, sql_prefix: str, rows: List[Tuple], batch_size: Optional[int] = None):
+        """Run INSERT ... VALUES (...), (...) statements of up to batch_size rows (one for all rows by default)"""
+        self.statements += self.session.insert_rows(sql_prefix, rows, batch_size)
+
+    def _chapter_ids(self) -> Dict[str, int]:
+        self._insert_values("INSERT IGNORE INTO chapters (chapter_number, name)", CHAPTERS)
+        rows = self._query("SELECT id, chapter_number FROM chapters")
+        return {f"chapter_{row['chapter_number']}": row['id'] for row in rows}
+
+    def _select_tests(self, tests: Dict[Tuple, int], after_id: int = 0) -> int:
+        """Add (chapter_id, test_number, test_type) -> id for tests above after_id; returns the max id"""
+        rows = self._query("SELECT id, chapter_id, test_number, test_type FROM tests WHERE id > %s ORDER BY id", (after_id,))
+        max_id = after_id
+        for row in rows:
+            # Keep the oldest row for a key, as the row-by-row loader's SELECT does
+            tests.setdefault((row['chapter_id'], row['test_number'], row['test_type']), row['id'])
+            max_id = max(max_id, row['id'])
+        return max_id
+
+    def _test_ids(self, questions: List[Question], chapter_ids: Dict[str, int]) -> Dict[Tuple, int]:
+        tests: Dict[Tuple, int] = {}
+        max_id = self._select_tests(tests)
+
+        keys = (
+            (chapter_ids.get(q.chapter) if q.chapter else None, q.test_number, q.test_type) for q in questions
+        )
+        missing = [key for key in dict.fromkeys(keys) if key not in tests]
+
+        for batch in chunked(missing, self.batch_size):
+            rows = [(chapter_id, test_number, test_type, f"test-{test_number}") for chapter_id, test_number, test_type in batch]
+            self._insert_values("INSERT INTO tests (chapter_id, test_number, test_type, url)", rows)
+        if missing:
+            self._select_tests(tests, max_id)
+
+        return tests
+
+    def _insert_answers(self, answer_rows: List[Tuple]):
+        self._insert_values("INSERT INTO answers (question_id, answer_id, answer_text, is_correct)",
+                            answer_rows, self.batch_size)
+
+    def _insert_questions(self, questions: List[Question], chapter_ids: Dict[str, int], tests: Dict[Tuple, int]) -> int:
+        """Insert questions with their answers in batches, returning the number of answers written"""
+        answer_count = 0
+
+        watermark = self._query("SELECT COALESCE(MAX(id), 0) AS max_id FROM questions")[0]['max_id']
+
+        for batch in chunked(questions, self.batch_size):
+            rows = []
+            for question in batch:
+                chapter_id = chapter_ids.get(question.chapter) if question.chapter else None
+                test_id = tests[(chapter_id, question.test_number, question.test_type)]
+                rows.append((test_id, question.id, question.question_text, question.question_type, question.explanation))
+            self._insert_values(
+                "INSERT INTO questions (test_id, question_id, question_text, question_type, explanation)", rows
+            )
+
+            # Map the new auto-increment IDs back by (test_id, question_id)
+            new_ids: Dict[Tuple, List[int]] = {}
+            for row in self._query("SELECT id, test_id, question_id FROM questions WHERE id > %s ORDER BY id", (watermark,)):
+                new_ids.setdefault((row['test_id'], row['question_id']), []).append(row['id'])
+                watermark = max(watermark, row['id'])
+
+            answer_rows = []
+            for question, row in zip(batch, rows):
+                question_db_id = new_ids[(row[0], row[1])].pop(0)
+                for answer in question.answers:
+                    answer_rows.append((question_db_id, answer.id, answer.text, answer.is_correct))
+            self._insert_answers(answer_rows)
+            answer_count += len(answer_rows)
+
+            if self.commit_per_batch:
+                self.connection.commit()
+
+        return answer_count
+
+    def load(self, questions: List[Question]) -> Dict:
+        """Insert all questions and answers, returning load statistics"""
+        started = time.perf_counter()
+        self.statements = 0
+
+        chapter_ids = self._chapter_ids()
+        tests = self._test_ids(questions, chapter_ids)
+        answer_count = self._insert_questions(questions, chapter_ids, tests)
+
+        elapsed = time.perf_counter() - started
+        rows_loaded = len(questions) + answer_count
+        stats = {
+            'questions': len(questions),
+            'answers': answer_count,
+            'statements': self.statements,
+            'elapsed_sec': round(elapsed, 3),
+            'rows_per_sec': round(rows_loaded / elapsed, 1) if elapsed > 0 else 0.0
+        }
+        logger.info(
+            f"Bulk load: {stats['questions']} questions and {stats['answers']} answers in "
+            f"{stats['elapsed_sec']}s ({stats['rows_per_sec']} rows/sec, {stats['statements']} statements)"
+        )
+        return stats
+
+
+def load_questions(json_file: str) -> List[Question]:
+    with open(json_file, 'r', encoding='utf-8') as f:
+        return [question_from_dict(q) for q in json.load(f)['questions']]
+
+
+def benchmark(questions: List[Question], connect, batch_size: int) -> Dict[str, Dict]:
+    """Time the row-by-row and bulk loaders on fresh connections from connect()"""
+    crawler = UKVisaTestCrawler()
+    crawler.questions_data = questions
+    rows = len(questions) + sum(len(q.answers) for q in questions)
+    results = {}
+
+    connection = connect()
+    started = time.perf_counter()
+    crawler._save_rows(Session.wrap(connection))
+    connection.commit()
+    elapsed = time.perf_counter() - started
+    connection.close()
+    results['row_by_row'] = {'elapsed_sec': round(elapsed, 3), 'rows_per_sec': round(rows / elapsed, 1)}
+
+    connection = connect()
+    started = time.perf_counter()
+    stats = BulkLoader(connection, batch_size=batch_size).load(questions)
+    connection.commit()
+    elapsed = time.perf_counter() - started
+    connection.close()
+    results['bulk'] = {'elapsed_sec': round(elapsed, 3), 'rows_per_sec': round(rows / elapsed, 1),
+                       'statements': stats['statements']}
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare row-by-row and bulk database loading')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Question bank to load')
+    parser.add_argument('--batch-size', type=int, default=Config.DB_BATCH_SIZE,
+                       help='Rows per INSERT batch')
+    parser.add_argument('--mysql', action='store_true',
+                       help='Load into the MySQL/MariaDB from Config.DB_CONFIG (tables are appended to)')
+    parser.add_argument('--rtt-ms', type=float, default=0.2,
+                       help='Simulated round-trip time for the SQLite stand-in')
+
+    args = parser.parse_args()
+
+    questions = load_questions(args.json_file)
+
+    if args.mysql:
+        import mysql.connector
+
+        def connect():
+            return mysql.connector.connect(**Config.DB_CONFIG)
+        target = f"MySQL at {Config.DB_CONFIG['host']}:{Config.DB_CONFIG['port']}"
+    else:
+        import sqlite_standin
+
+        def connect():
+            return sqlite_standin.connect(rtt_ms=args.rtt_ms)
+        target = f"SQLite stand-in ({args.rtt_ms} ms simulated RTT)"
+
+    results = benchmark(questions, connect, args.batch_size)
+
+    print(f"📦 Loading {len(questions)} questions into {target}")
+    for mode, result in results.items():
+        print(f"  {mode:11} {result['elapsed_sec']:8.3f}s  {result['rows_per_sec']:10.1f} rows/sec")
+    speedup = results['row_by_row']['elapsed_sec'] / results['bulk']['elapsed_sec']
+    print(f"  Speedup: {speedup:.1f}x ({results['bulk']['statements']} statements in bulk mode)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import gzip
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List
+
+BUNDLE_FORMAT_VERSION = 2
+MANIFEST_FILE = 'manifest.json'
+# Test content as the API serves it without and with ?include_answers=true
+VARIANTS = ('questions', 'answers')
+
+# Column order of Test::getTestWithQuestions with Vietnamese enabled
+QUESTION_COLUMNS = ('id', 'question_id', 'question_text', 'question_type', 'explanation',
+                    'question_text_vi', 'explanation_vi')
+ANSWER_COLUMNS = ('id', 'answer_id', 'answer_text', 'answer_text_vi', 'is_correct')
+
+
+def load_bank(session) -> Dict[str, List[Dict]]:
+    """Every test with its questions and answers, shaped like Test::getTestWithQuestions, plus the chapters.
+
+    Three reads replace the API's query per question: tests (t.* and the
+    chapter name, as the API selects them), questions and answers, joined
+    here by database id.
+    """
+    chapters = session.query("SELECT id, chapter_number, name FROM chapters ORDER BY chapter_number")
+    tests = session.query(
+        "SELECT t.*, c.name AS chapter_name FROM tests t LEFT JOIN chapters c ON t.chapter_id = c.id ORDER BY t.id"
+    )
+    questions_by_test: Dict[int, List[Dict]] = {test['id']: [] for test in tests}
+    questions_by_id: Dict[int, Dict] = {}
+    for row in session.query(f"SELECT test_id, {', '.join(QUESTION_COLUMNS)} FROM questions ORDER BY id"):
+        question = {column: row[column] for column in QUESTION_COLUMNS}
+        question['answers'] = []
+        questions_by_id[question['id']] = question
+        questions_by_test.setdefault(row['test_id'], []).append(question)
+    for row in session.query(f"SELECT question_id AS question_db_id, {', '.join(ANSWER_COLUMNS)} FROM answers ORDER BY id"):
+        question = questions_by_id.get(row['question_db_id'])
+        if question is not None:
+            question['answers'].append({column: row[column] for column in ANSWER_COLUMNS})
+
+    for test in tests:
+        test['questions'] = questions_by_test[test['id']]
+    return {'chapters': chapters, 'tests': tests}
+
+
+def _payload_question(question: Dict, with_answers: bool) -> Dict:
+    if with_answers:
+        return question
+    return {
+        **question,
+        'answers': [{key: value for key, value in answer.items() if key != 'is_correct'} for answer in question['answers']]
+    }
+
+
+def serialize(payload: Dict) -> bytes:
+    """Compact, deterministic JSON, so unchanged content always hashes the same.
+
+    Timestamps come out as MySQL prints them ('YYYY-MM-DD HH:MM:SS'), which is
+    what the API returns through PDO.
+    """
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+class BundleWriter:
+    """Writes content-addressed bundle files under output_dir.
+
+    A bundle's file name carries the hash of its bytes, so files are never
+    modified once written: a rebuild only adds files for content that
+    changed, and clients holding an older manifest keep working.
+    """
+
+    def __init__(self, output_dir: str, compress: bool = True):
+        self.output_dir = output_dir
+        self.compress = compress
+        self.written = 0
+        self.unchanged = 0
+        self.files: List[str] = []
+
+    def _write_file(self, relative_path: str, data: bytes):
+        self.files.append(relative_path)
+        path = os.path.join(self.output_dir, relative_path)
+        if os.path.exists(path):
+            self.unchanged += 1
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(data)
+        os.replace(temporary, path)
+        self.written += 1
+
+    def write(self, folder: str, slug: str, variant: str, payload: Dict) -> Dict:
+        body = serialize(payload)
+        digest = hashlib.sha256(body).hexdigest()
+        filename = f"{folder}/{slug}.{variant}.{digest[:16]}.json"
+        self._write_file(filename, body)
+        entry = {
+            'file': filename,
+            'sha256': digest,
+            'etag': f'"{digest[:32]}"',
+            'bytes': len(body)
+        }
+        if self.compress:
+            # mtime=0 keeps the gzip bytes reproducible
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            self._write_file(f"{filename}.gz", compressed)
+            entry['gzip'] = {
+                'file': f"{filename}.gz",
+                'etag': f'"{digest[:32]}-gzip"',
+                'bytes': len(compressed)
+            }
+        return entry
+
+
+def _bundle_entry(writer: BundleWriter, folder: str, slug: str, header: Dict, questions: List[Dict]) -> Dict:
+    variants = {}
+    for variant in VARIANTS:
+        payload = {
+            'format_version': BUNDLE_FORMAT_VERSION,
+            **header,
+            'questions': [_payload_question(q, with_answers=variant == 'answers') for q in questions],
+            'question_count': len(questions),
+            'vietnamese_enabled': True
+        }
+        variants[variant] = writer.write(folder, slug, variant, payload)
+    return {**header, 'question_count': len(questions), 'variants': variants}
+
+
+def build_bundles(bank: Dict[str, List[Dict]], output_dir: str, compress: bool = True, prune: bool = False) -> Dict:
+    """Write one bundle per test and per chapter, in both variants, plus manifest.json.
+
+    bank is what load_bank() reads from the database. A test bundle holds
+    what GET /tests/{id} returns for a user with Vietnamese enabled, keyed by
+    tests.id and carrying database question and answer ids, so clients can
+    submit attempts from it. Chapter bundles pool the questions of a
+    chapter's tests. The manifest is replaced last, so readers see either
+    the old set of bundles or the new one. With prune, files the new
+    manifest no longer references are deleted. Returns a build report.
+    """
+    started = time.perf_counter()
+    tests = bank['tests']
+    total = sum(len(test['questions']) for test in tests)
+
+    writer = BundleWriter(output_dir, compress=compress)
+    manifest = {
+        'format_version': BUNDLE_FORMAT_VERSION,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'total_questions': total,
+        'tests': {},
+        'chapters': {}
+    }
+    for test in tests:
+        header = {key: value for key, value in test.items() if key != 'questions'}
+        manifest['tests'][str(test['id'])] = _bundle_entry(writer, 'tests', f"test-{test['id']}", header, test['questions'])
+    for chapter in bank['chapters']:
+        questions = [question for test in tests if test['chapter_id'] == chapter['id'] for question in test['questions']]
+        if questions:
+            manifest['chapters'][str(chapter['id'])] = _bundle_entry(writer, 'chapters', f"chapter-{chapter['id']}", chapter, questions)
+
+    # One version string for the whole set: changes whenever any bundle does
+    digests = sorted(
+        f"{kind}:{key}:{variant}:{entry['sha256']}"
+        for kind in ('tests', 'chapters')
+        for key, bundle in manifest[kind].items()
+        for variant, entry in bundle['variants'].items()
+    )
+    manifest['version'] = hashlib.sha256('\n'.join(digests).encode('utf-8')).hexdigest()[:16]
+
+    os.makedirs(output_dir, exist_ok=True)
+    temporary = os.path.join(output_dir, f"{MANIFEST_FILE}.tmp")
+    with open(temporary, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False, default=str)
+    os.replace(temporary, os.path.join(output_dir, MANIFEST_FILE))
+
+    pruned = _prune(output_dir, set(writer.files)) if prune else 0
+
+    entries = [
+        entry
+        for kind in ('tests', 'chapters')
+        for bundle in manifest[kind].values()
+        for entry in bundle['variants'].values()
+    ]
+    largest = max(entries, key=lambda entry: entry['bytes'], default=None)
+    return {
+        'version': manifest['version'],
+        'questions': total,
+        'test_bundles': len(manifest['tests']),
+        'chapter_bundles': len(manifest['chapters']),
+        'files_written': writer.written,
+        'files_unchanged': writer.unchanged,
+        'files_pruned': pruned,
+        'bytes': sum(entry['bytes'] for entry in entries),
+        'gzip_bytes': sum(entry['gzip']['bytes'] for entry in entries) if compress else None,
+        'largest': {'file': largest['file'], 'bytes': largest['bytes']} if largest else None,
+        'build_sec': round(time.perf_counter() - started, 3)
+    }
+
+
+def _prune(output_dir: str, keep: set) -> int:
+    removed = 0
+    for folder in ('tests', 'chapters'):
+        directory = os.path.join(output_dir, folder)
+        if not os.path.isdir(directory):
+            continue
+        for name in os.listdir(directory):
+            if f"{folder}/{name}" not in keep:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+    return removed
+
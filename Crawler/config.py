@@ -12,12 +12,56 @@ class Config:
         'charset': 'utf8mb4'
     }
     
+    DB_BATCH_SIZE = int(os.getenv('DB_BATCH_SIZE', '500'))  # rows per multi-row INSERT in bulk mode
+    DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '4'))  # connections kept open per process
+    DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))  # seconds to wait for a free connection
+    DB_POOL_PING_AFTER = float(os.getenv('DB_POOL_PING_AFTER', '60'))  # idle seconds before a connection is pinged on checkout
+    DB_STATEMENT_CACHE_SIZE = int(os.getenv('DB_STATEMENT_CACHE_SIZE', '32'))  # prepared statements cached per connection
+    
+    # Backup settings
+    BACKUP_CHUNK_SIZE = int(os.getenv('BACKUP_CHUNK_SIZE', '5000'))  # rows fetched per round trip while backing up
+    RESTORE_WORKERS = int(os.getenv('RESTORE_WORKERS', '4'))  # tables restored in parallel
+    
+    # Validation settings
+    VALIDATION_WORKERS = int(os.getenv('VALIDATION_WORKERS', '4'))  # integrity checks run in parallel
+    VALIDATION_SAMPLE_SIZE = int(os.getenv('VALIDATION_SAMPLE_SIZE', '20'))  # offending rows kept per check in reports
+    
+    # Analytics settings
+    ANALYTICS_CHUNK_SIZE = int(os.getenv('ANALYTICS_CHUNK_SIZE', '20000'))  # user_answers rows fetched per round trip
+    AGGREGATE_BATCH_SIZE = int(os.getenv('AGGREGATE_BATCH_SIZE', '5000'))  # attempts folded into the aggregates per transaction
+    AGGREGATE_LAG_SEC = float(os.getenv('AGGREGATE_LAG_SEC', '5'))  # completions newer than this are left for the next refresh
+    
     # Crawler settings
     CRAWLER_DELAY = float(os.getenv('CRAWLER_DELAY', '1.0'))  # seconds between requests
     CRAWLER_TIMEOUT = int(os.getenv('CRAWLER_TIMEOUT', '10'))  # request timeout
     
+    # Async crawler settings
+    CRAWLER_CONCURRENCY = int(os.getenv('CRAWLER_CONCURRENCY', '8'))  # max in-flight requests
+    CRAWLER_RATE = float(os.getenv('CRAWLER_RATE', str(1.0 / CRAWLER_DELAY if CRAWLER_DELAY > 0 else 0)))  # requests per second per host, 0 = unlimited
+    CRAWLER_BURST = int(os.getenv('CRAWLER_BURST', '1'))  # token bucket capacity per host
+    
+    # Adaptive scheduler settings (--adaptive, see rate_limit.AdaptiveScheduler); CRAWLER_CONCURRENCY is the ceiling
+    ADAPTIVE_INITIAL_CONCURRENCY = int(os.getenv('ADAPTIVE_INITIAL_CONCURRENCY', '2'))  # window size before any response
+    ADAPTIVE_LATENCY_FACTOR = float(os.getenv('ADAPTIVE_LATENCY_FACTOR', '3.0'))  # responses this much slower than the fastest recent one count as congestion
+    ADAPTIVE_MAX_RETRIES = int(os.getenv('ADAPTIVE_MAX_RETRIES', '5'))  # retries per page after 429/5xx/timeouts
+    ADAPTIVE_BACKOFF = float(os.getenv('ADAPTIVE_BACKOFF', '0.5'))  # seconds, upper bound of the first jittered retry delay, doubled per attempt
+    
+    # Resumable crawl settings
+    CRAWL_MAX_ATTEMPTS = int(os.getenv('CRAWL_MAX_ATTEMPTS', '3'))  # tries per page before it stays failed
+    CRAWL_RETRY_BACKOFF = float(os.getenv('CRAWL_RETRY_BACKOFF', '2.0'))  # seconds before the first retry, doubled each attempt
+    
+    # Parser settings
+    PARSER_BACKEND = os.getenv('PARSER_BACKEND', 'lxml')  # 'lxml', 'bs4-lxml' or 'html.parser'
+    PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', '16'))  # fetched pages waiting to be parsed
+    ANSWER_MIN_CONFIDENCE = float(os.getenv('ANSWER_MIN_CONFIDENCE', '0.5'))  # resolver confidence needed to mark an answer correct
+    
     # Output settings
     JSON_OUTPUT_FILE = os.getenv('JSON_OUTPUT_FILE', 'uk_visa_questions.json')
     
+    # Observability settings (see metrics.py); an empty path leaves that output off
+    METRICS_OUTPUT = os.getenv('METRICS_OUTPUT', '')  # .prom for Prometheus text, anything else for a JSON summary
+    TRACE_OUTPUT = os.getenv('TRACE_OUTPUT', '')  # spans as JSON lines
+    METRICS_MAX_SPANS = int(os.getenv('METRICS_MAX_SPANS', '100000'))  # spans kept in memory per run
+    
     # Logging settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
\ No newline at end of file
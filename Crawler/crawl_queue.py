@@ -0,0 +1,177 @@
+import json
+import logging
+import random
+import sqlite3
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+FETCHED = 'fetched'
+PARSED = 'parsed'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS crawl_jobs (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    test_path TEXT NOT NULL,
+    chapter TEXT,
+    test_number TEXT NOT NULL,
+    test_type TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    html TEXT,
+    response_headers TEXT,
+    questions TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_crawl_jobs_state ON crawl_jobs (state, next_attempt_at);
+"""
+
+
+class CrawlQueue:
+    """Persistent crawl work queue in a SQLite file.
+
+    Every job moves pending -> fetched -> parsed, or to failed with an
+    attempt count and a backoff deadline. Each transition is committed
+    straight away, so a run that dies keeps everything up to its last page:
+    fetched pages are re-parsed from the stored HTML, and parsed pages keep
+    their questions as JSON (in the export layout).
+    """
+
+    def __init__(self, path: str, max_attempts: Optional[int] = None, backoff: Optional[float] = None):
+        self.path = path
+        self.max_attempts = max_attempts or Config.CRAWL_MAX_ATTEMPTS
+        self.backoff = Config.CRAWL_RETRY_BACKOFF if backoff is None else backoff
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def _update(self, job: Tuple, **fields):
+        fields['updated_at'] = time.time()
+        assignments = ', '.join(f"{name} = ?" for name in fields)
+        test_path, chapter, test_number, test_type = job
+        with self.connection:
+            self.connection.execute(
+                f"UPDATE crawl_jobs SET {assignments} "
+                "WHERE test_path = ? AND chapter IS ? AND test_number = ? AND test_type = ?",
+                (*fields.values(), test_path, chapter, test_number, test_type)
+            )
+
+    def enqueue(self, jobs: List[Tuple]) -> int:
+        """Add jobs not seen before as pending; returns how many were new.
+
+        Uniqueness is checked here because SQLite treats NULL chapters as distinct.
+        """
+        with self.connection:
+            before = self.connection.total_changes
+            for test_path, chapter, test_number, test_type in jobs:
+                exists = self.connection.execute(
+                    "SELECT 1 FROM crawl_jobs WHERE test_path = ? AND chapter IS ? AND test_number = ? AND test_type = ?",
+                    (test_path, chapter, test_number, test_type)
+                ).fetchone()
+                if not exists:
+                    self.connection.execute(
+                        "INSERT INTO crawl_jobs (test_path, chapter, test_number, test_type, updated_at) VALUES (?, ?, ?, ?, ?)",
+                        (test_path, chapter, test_number, test_type, time.time())
+                    )
+            return self.connection.total_changes - before
+
+    def _jobs(self, where: str, params: Tuple = ()) -> List[Tuple]:
+        rows = self.connection.execute(
+            f"SELECT test_path, chapter, test_number, test_type FROM crawl_jobs WHERE {where} ORDER BY seq", params
+        )
+        return [tuple(row) for row in rows]
+
+    def due_jobs(self, now: Optional[float] = None) -> List[Tuple]:
+        """Pending jobs plus failed jobs whose backoff has expired and that have attempts left"""
+        now = time.time() if now is None else now
+        return self._jobs(
+            "state = ? OR (state = ? AND attempts < ? AND next_attempt_at <= ?)",
+            (PENDING, FAILED, self.max_attempts, now)
+        )
+
+    def fetched_jobs(self) -> List[Tuple]:
+        """Jobs whose HTML was checkpointed but never parsed"""
+        return self._jobs("state = ?", (FETCHED,))
+
+    def next_retry_at(self) -> Optional[float]:
+        """When the earliest retryable failure comes off backoff, or None if nothing is left to retry"""
+        row = self.connection.execute(
+            "SELECT MIN(next_attempt_at) FROM crawl_jobs WHERE state = ? AND attempts < ?", (FAILED, self.max_attempts)
+        ).fetchone()
+        return row[0]
+
+    def mark_fetched(self, job: Tuple, html: str, response_headers: Optional[Dict] = None):
+        self._update(job, state=FETCHED, html=html, response_headers=json.dumps(dict(response_headers or {})))
+
+    def fetched_page(self, job: Tuple) -> Tuple[str, Dict]:
+        test_path, chapter, test_number, test_type = job
+        html, headers = self.connection.execute(
+            "SELECT html, response_headers FROM crawl_jobs "
+            "WHERE test_path = ? AND chapter IS ? AND test_number = ? AND test_type = ?",
+            (test_path, chapter, test_number, test_type)
+        ).fetchone()
+        return html, json.loads(headers or '{}')
+
+    def mark_parsed(self, job: Tuple, questions: List[Dict]):
+        # The raw page is no longer needed once its questions are checkpointed
+        self._update(job, state=PARSED, questions=json.dumps(questions, ensure_ascii=False), html=None,
+                     response_headers=None, last_error=None)
+
+    def mark_failed(self, job: Tuple, error: str):
+        """Record a failed attempt and schedule the retry with jittered exponential backoff"""
+        test_path, chapter, test_number, test_type = job
+        attempts = self.connection.execute(
+            "SELECT attempts FROM crawl_jobs WHERE test_path = ? AND chapter IS ? AND test_number = ? AND test_type = ?",
+            (test_path, chapter, test_number, test_type)
+        ).fetchone()[0] + 1
+        delay = self.backoff * (2 ** (attempts - 1)) * random.uniform(0.5, 1.5)
+        self._update(job, state=FAILED, attempts=attempts, last_error=error, next_attempt_at=time.time() + delay)
+        metrics.count('crawl_failures' if attempts >= self.max_attempts else 'crawl_retries')
+        if attempts >= self.max_attempts:
+            logger.error(f"Giving up on {test_path} after {attempts} attempts: {error}")
+        else:
+            logger.warning(f"Attempt {attempts} for {test_path} failed ({error}); retrying in {delay:.1f}s")
+
+    def retry_failed(self) -> int:
+        """Give jobs that used up their attempts a fresh set; returns how many were reset"""
+        with self.connection:
+            cursor = self.connection.execute(
+                "UPDATE crawl_jobs SET state = ?, attempts = 0, next_attempt_at = 0, updated_at = ? WHERE state = ?",
+                (PENDING, time.time(), FAILED)
+            )
+        return cursor.rowcount
+
+    def reset(self):
+        """Forget all progress so the next run crawls everything again"""
+        with self.connection:
+            self.connection.execute("DELETE FROM crawl_jobs")
+
+    def results(self) -> List[Dict]:
+        """Checkpointed question dicts of all parsed jobs, in job order"""
+        questions = []
+        for (payload,) in self.connection.execute("SELECT questions FROM crawl_jobs WHERE state = ? ORDER BY seq", (PARSED,)):
+            questions.extend(json.loads(payload))
+        return questions
+
+    def failures(self) -> List[Dict]:
+        rows = self.connection.execute(
+            "SELECT test_path, attempts, last_error FROM crawl_jobs WHERE state = ? ORDER BY seq", (FAILED,)
+        )
+        return [{'test_path': path, 'attempts': attempts, 'error': error} for path, attempts, error in rows]
+
+    def summary(self) -> Dict[str, int]:
+        counts = {PENDING: 0, FETCHED: 0, PARSED: 0, FAILED: 0}
+        for state, count in self.connection.execute("SELECT state, COUNT(*) FROM crawl_jobs GROUP BY state"):
+            counts[state] = count
+        return counts
@@ -1,87 +1,77 @@
 
 
 import json
-import mysql.connector
 from typing import Dict, List, Any
-from collections import defaultdict, Counter
 import argparse
+import time
+
+from analytics import refresh_analytics
+from bundles import build_bundles, load_bank
+from config import Config
+from db import get_database
+from db_checks import CHECK_QUERIES, run_checks
+from metrics import metrics
+from near_duplicates import find_near_duplicates
+from question_bank import QuestionBank, is_question_bank, write_question_bank
+from question_stats import QuestionFrame, compute_statistics
+from question_stream import convert, is_ndjson, iter_questions, read_metadata
+from schema import HOT_QUERIES, QUERIES, create_database, explain_queries, migrate, migration_status
 
 class DataAnalyzer:
-    def __init__(self, db_config: Dict = None, json_file: str = None):
+    def __init__(self, db_config: Dict = None, json_file: str = None, streaming: bool = False):
         self.db_config = db_config
+        self.database = get_database(db_config) if db_config else None
         self.json_file = json_file
+        self.streaming = streaming
         self.data = None
         
         if json_file:
             self.load_from_json()
     
     def load_from_json(self):
-        """Load data from JSON file"""
+        """Load data from JSON, NDJSON or question bank file (in streaming mode only the metadata is kept)"""
         try:
-            with open(self.json_file, 'r', encoding='utf-8') as f:
-                self.data = json.load(f)
+            metadata = {}
+            if is_question_bank(self.json_file):
+                with QuestionBank(self.json_file) as bank:
+                    self.data = {'metadata': bank.metadata()}
+                    if not self.streaming:
+                        self.data['questions'] = list(bank.iter_questions())
+            elif self.streaming:
+                self.data = {'metadata': read_metadata(self.json_file)}
+            elif is_ndjson(self.json_file):
+                questions = list(iter_questions(self.json_file, metadata))
+                self.data = {'metadata': metadata, 'questions': questions}
+            else:
+                with open(self.json_file, 'r', encoding='utf-8') as f:
+                    self.data = json.load(f)
         except FileNotFoundError:
             print(f"JSON file {self.json_file} not found!")
             self.data = None
     
+    def iter_questions(self):
+        """Yield questions from memory, or straight from the file in streaming mode"""
+        if self.streaming and is_question_bank(self.json_file):
+            with QuestionBank(self.json_file) as bank:
+                yield from bank.iter_questions()
+        elif self.streaming:
+            yield from iter_questions(self.json_file)
+        else:
+            yield from self.data['questions']
+    
+    def get_frame(self) -> QuestionFrame:
+        """Load the questions into NumPy columns once; banks in streaming mode are read column-wise"""
+        if self.streaming and is_question_bank(self.json_file):
+            with QuestionBank(self.json_file) as bank:
+                return QuestionFrame.from_bank(bank)
+        return QuestionFrame.from_questions(self.iter_questions())
+    
     def get_statistics(self) -> Dict[str, Any]:
-        """Get comprehensive statistics about the data"""
+        """Get comprehensive statistics about the data (distributions, coverage and quality)"""
         if not self.data:
             return {}
         
-        questions = self.data['questions']
-        stats = {
-            'total_questions': len(questions),
-            'by_test_type': defaultdict(int),
-            'by_chapter': defaultdict(int),
-            'by_question_type': defaultdict(int),
-            'by_test_number': defaultdict(int),
-            'answer_distribution': defaultdict(int),
-            'questions_with_explanations': 0,
-            'questions_with_correct_answers': 0,
-            'comprehensive_tests': defaultdict(int),
-            'chapter_tests': defaultdict(int)
-        }
-        
-        for q in questions:
-            # Test type distribution
-            test_type = q.get('test_type', 'unknown')
-            stats['by_test_type'][test_type] += 1
-            
-            # Chapter distribution
-            chapter = q.get('chapter', 'comprehensive')
-            if chapter:
-                stats['by_chapter'][chapter] += 1
-            else:
-                stats['by_chapter']['comprehensive'] += 1
-            
-            # Question type distribution
-            stats['by_question_type'][q['question_type']] += 1
-            
-            # Test number distribution
-            test_key = f"{test_type}_test_{q['test_number']}"
-            stats['by_test_number'][test_key] += 1
-            
-            # Separate comprehensive and chapter test tracking
-            if test_type == 'comprehensive':
-                stats['comprehensive_tests'][f"test_{q['test_number']}"] += 1
-            else:
-                chapter_key = f"{chapter}_test_{q['test_number']}"
-                stats['chapter_tests'][chapter_key] += 1
-            
-            # Answer count distribution
-            answer_count = len(q['answers'])
-            stats['answer_distribution'][f'{answer_count}_answers'] += 1
-            
-            # Questions with explanations
-            if q.get('explanation'):
-                stats['questions_with_explanations'] += 1
-            
-            # Questions with identified correct answers
-            if q.get('correct_answers'):
-                stats['questions_with_correct_answers'] += 1
-        
-        return dict(stats)
+        return compute_statistics(self.get_frame())
     
     def print_statistics(self):
         """Print formatted statistics"""
@@ -139,24 +129,19 @@ class DataAnalyzer:
                 print(f"  ✅ {missing_correct_answers} questions missing correct answer identification")
         
         # Show comprehensive test coverage
+        coverage = stats['coverage']
         print(f"\n🔄 Comprehensive Test Coverage:")
-        comp_tests = len(stats['comprehensive_tests'])
-        print(f"  Tests found: {comp_tests}/40")
-        if comp_tests < 40:
-            missing_tests = []
-            for i in range(1, 41):
-                if f"test_{i}" not in stats['comprehensive_tests']:
-                    missing_tests.append(str(i))
-            if missing_tests:
-                print(f"  Missing tests: {', '.join(missing_tests[:10])}")
-                if len(missing_tests) > 10:
-                    print(f"  ... and {len(missing_tests) - 10} more")
+        print(f"  Tests found: {coverage['comprehensive']['found']}/{coverage['comprehensive']['expected']}")
+        missing_tests = [str(number) for number in coverage['comprehensive']['missing']]
+        if missing_tests:
+            print(f"  Missing tests: {', '.join(missing_tests[:10])}")
+            if len(missing_tests) > 10:
+                print(f"  ... and {len(missing_tests) - 10} more")
         
         # Show chapter test coverage
         print(f"\n📚 Chapter Test Coverage:")
-        for chapter in ['chapter_1', 'chapter_2', 'chapter_3', 'chapter_4', 'chapter_5']:
-            chapter_tests = [k for k in stats['chapter_tests'].keys() if k.startswith(chapter)]
-            print(f"  {chapter.replace('_', ' ').title()}: {len(chapter_tests)} tests")
+        for chapter, test_count in coverage['chapter_tests'].items():
+            print(f"  {chapter.replace('_', ' ').title()}: {test_count} tests")
     
     def find_questions_without_correct_answers(self) -> List[Dict]:
         """Find questions where correct answers couldn't be identified"""
@@ -164,7 +149,7 @@ class DataAnalyzer:
             return []
         
         problematic = []
-        for q in self.data['questions']:
+        for q in self.iter_questions():
             if not q.get('correct_answers'):
                 problematic.append({
                     'id': q['id'],
@@ -178,42 +163,25 @@ class DataAnalyzer:
         
         return problematic
     
-    def find_duplicate_questions(self) -> List[Dict]:
-        """Find potential duplicate questions"""
+    def find_duplicate_questions(self, threshold: float = 0.8) -> List[Dict]:
+        """Find clusters of duplicate and near-duplicate questions (MinHash/LSH over question text)"""
         if not self.data:
             return []
         
-        question_texts = defaultdict(list)
-        for q in self.data['questions']:
-            # Normalize question text for comparison
-            normalized_text = q['question_text'].lower().strip()
-            question_texts[normalized_text].append({
-                'id': q['id'],
-                'chapter': q.get('chapter', 'comprehensive'),
-                'test_number': q['test_number'],
-                'test_type': q.get('test_type', 'unknown')
-            })
-        
-        duplicates = []
-        for text, questions in question_texts.items():
-            if len(questions) > 1:
-                duplicates.append({
-                    'question_text': text[:100] + "..." if len(text) > 100 else text,
-                    'occurrences': questions
-                })
-        
-        return duplicates
+        return find_near_duplicates(self.iter_questions(), threshold)
     
-    def export_for_manual_review(self, output_file: str = "questions_for_review.json"):
+    def export_for_manual_review(self, output_file: str = "questions_for_review.json", duplicate_threshold: float = 0.8):
         """Export questions that need manual review"""
         problematic = self.find_questions_without_correct_answers()
-        duplicates = self.find_duplicate_questions()
+        duplicates = self.find_duplicate_questions(duplicate_threshold)
         
         review_data = {
             'metadata': {
                 'export_date': json.dumps(None),
                 'problematic_count': len(problematic),
-                'duplicate_count': len(duplicates)
+                'duplicate_count': len(duplicates),
+                'duplicate_threshold': duplicate_threshold,
+                'conflicting_duplicate_count': sum(1 for d in duplicates if d['conflicting_correct_answers'])
             },
             'questions_without_correct_answers': problematic,
             'potential_duplicates': duplicates
@@ -224,149 +192,197 @@ class DataAnalyzer:
         
         print(f"📤 Exported {len(problematic)} problematic questions and {len(duplicates)} potential duplicates to {output_file}")
     
-    def validate_database_data(self) -> Dict[str, Any]:
-        """Validate data in MySQL database"""
+    def validate_database_data(self, workers: int = None) -> Dict[str, Any]:
+        """Validate data in MySQL database: counts and distributions, then the integrity checks in db_checks"""
         if not self.db_config:
             return {"error": "No database configuration provided"}
         
         try:
-            connection = mysql.connector.connect(**self.db_config)
-            cursor = connection.cursor(dictionary=True)
-            
-            cursor.execute("USE uk_visa_test")
-            
-            # Get counts from each table
-            results = {}
-            
-            cursor.execute("SELECT COUNT(*) as count FROM chapters")
-            results['chapters'] = cursor.fetchone()['count']
-            
-            cursor.execute("SELECT COUNT(*) as count FROM tests")
-            results['tests'] = cursor.fetchone()['count']
-            
-            cursor.execute("SELECT COUNT(*) as count FROM questions")
-            results['questions'] = cursor.fetchone()['count']
-            
-            cursor.execute("SELECT COUNT(*) as count FROM answers")
-            results['answers'] = cursor.fetchone()['count']
-            
-            # Get test type distribution
-            cursor.execute("""
-                SELECT test_type, COUNT(*) as count 
-                FROM tests 
-                GROUP BY test_type
-            """)
-            results['test_type_distribution'] = cursor.fetchall()
-            
-            # Get questions without correct answers
-            cursor.execute("""
-                SELECT q.id, q.question_text, t.test_type, c.name as chapter_name
-                FROM questions q 
-                JOIN tests t ON q.test_id = t.id
-                LEFT JOIN chapters c ON t.chapter_id = c.id
-                WHERE q.id NOT IN (
-                    SELECT DISTINCT a.question_id 
-                    FROM answers a 
-                    WHERE a.is_correct = TRUE
-                )
-                LIMIT 10
-            """)
-            results['questions_without_correct_answers'] = cursor.fetchall()
-            
-            # Get distribution by chapter
-            cursor.execute("""
-                SELECT 
-                    COALESCE(c.name, 'Comprehensive Tests') as chapter_name,
-                    t.test_type,
-                    COUNT(q.id) as question_count
-                FROM tests t
-                LEFT JOIN chapters c ON t.chapter_id = c.id
-                LEFT JOIN questions q ON t.id = q.test_id
-                GROUP BY c.id, c.name, t.test_type
-                ORDER BY c.chapter_number, t.test_type
-            """)
-            results['chapter_distribution'] = cursor.fetchall()
-            
-            # Get comprehensive test coverage
-            cursor.execute("""
-                SELECT test_number, COUNT(q.id) as question_count
-                FROM tests t
-                LEFT JOIN questions q ON t.id = q.test_id
-                WHERE t.test_type = 'comprehensive'
-                GROUP BY t.test_number
-                ORDER BY CAST(t.test_number AS UNSIGNED)
-            """)
-            results['comprehensive_test_coverage'] = cursor.fetchall()
+            # One connection from the pool for the counts
+            with self.database.transaction() as session:
+                results = self._collect_validation(session)
             
+            # Integrity checks in parallel, one pooled connection each
+            results['integrity'] = run_checks(self.database, workers=workers)
             return results
             
         except Exception as e:
             return {"error": f"Database error: {str(e)}"}
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
-            if 'connection' in locals():
-                connection.close()
+    
+    def _collect_validation(self, session) -> Dict[str, Any]:
+        # Get counts from each table
+        results = {}
+        
+        results['chapters'] = session.query_one("SELECT COUNT(*) as count FROM chapters")['count']
+        results['tests'] = session.query_one("SELECT COUNT(*) as count FROM tests")['count']
+        results['questions'] = session.query_one("SELECT COUNT(*) as count FROM questions")['count']
+        results['answers'] = session.query_one("SELECT COUNT(*) as count FROM answers")['count']
+        
+        # Get test type distribution (queries live in schema.QUERIES so `explain` audits these exact statements)
+        results['test_type_distribution'] = session.query(QUERIES['test_type_distribution'].sql)
+        
+        # Get distribution by chapter
+        results['chapter_distribution'] = session.query(QUERIES['chapter_distribution'].sql)
+        
+        # Get comprehensive test coverage; sorted here since test_number is a
+        # VARCHAR and ordering by CAST() in SQL forces a filesort
+        coverage = session.query(QUERIES['comprehensive_test_coverage'].sql)
+        results['comprehensive_test_coverage'] = sorted(
+            coverage, key=lambda row: int(row['test_number']) if str(row['test_number']).isdigit() else float('inf')
+        )
+        
+        return results
 
 class DataManager:
     def __init__(self, db_config: Dict):
         self.db_config = db_config
+        self.database = get_database(db_config)
     
-    def backup_database_to_json(self, output_file: str = "database_backup.json"):
-        """Backup entire database to JSON"""
+    def backup_database(self, output_dir: str = "database_backup", since: str = None):
+        """Stream the database to gzipped NDJSON files with a manifest (incremental when since is a previous backup)"""
+        from db_backup import backup_database
+        
         try:
-            connection = mysql.connector.connect(**self.db_config)
-            cursor = connection.cursor(dictionary=True)
+            manifest = backup_database(self.database, output_dir, since=since)
             
-            cursor.execute("USE uk_visa_test")
+            total_rows = sum(entry['rows'] for entry in manifest['tables'].values())
+            total_bytes = sum(entry['bytes'] for entry in manifest['tables'].values())
+            print(f"📦 {manifest['kind'].capitalize()} backup of {total_rows} rows "
+                  f"({total_bytes / 1024:.1f} KiB compressed) written to {output_dir} in {manifest['elapsed_sec']}s")
+            for table, entry in manifest['tables'].items():
+                print(f"  {table}: {entry['rows']} rows ({entry['mode']}, ids {entry['since_id'] + 1}-{entry['high_water']})")
             
-            # Get all data
-            backup_data = {
-                'metadata': {
-                    'backup_date': json.dumps(None),
-                    'version': '2.0'
-                },
-                'chapters': [],
-                'tests': [],
-                'questions': [],
-                'answers': []
-            }
-            
-            # Chapters
-            cursor.execute("SELECT * FROM chapters ORDER BY chapter_number")
-            backup_data['chapters'] = cursor.fetchall()
+        except Exception as e:
+            print(f"❌ Backup failed: {e}")
+    
+    def restore_database(self, backup_dir: str, confirm: bool = False, workers: int = None):
+        """Replace the tables in a backup with its rows (be careful!)"""
+        from db_backup import restore_database
+        
+        if not confirm:
+            print("❌ This operation requires confirmation. Use --confirm flag.")
+            return
+        
+        try:
+            started = time.perf_counter()
+            results = restore_database(self.database, backup_dir, workers=workers)
             
-            # Tests
-            cursor.execute("SELECT * FROM tests ORDER BY id")
-            backup_data['tests'] = cursor.fetchall()
+            print(f"♻️  Restored {sum(results.values())} rows from {backup_dir} in {time.perf_counter() - started:.2f}s")
+            for table, rows in results.items():
+                print(f"  {table}: {rows} rows")
             
-            # Questions
-            cursor.execute("SELECT * FROM questions ORDER BY id")
-            backup_data['questions'] = cursor.fetchall()
+        except Exception as e:
+            print(f"❌ Restore failed: {e}")
+    
+    def build_bundles(self, output_dir: str, compress: bool = True, prune: bool = False):
+        """Write the API bundles for every test and chapter from the current database"""
+        try:
+            with self.database.transaction() as session:
+                bank = load_bank(session)
+            print_bundle_report(build_bundles(bank, output_dir, compress=compress, prune=prune), output_dir)
             
-            # Answers
-            cursor.execute("SELECT * FROM answers ORDER BY id")
-            backup_data['answers'] = cursor.fetchall()
+        except Exception as e:
+            print(f"❌ Bundle build failed: {e}")
+    
+    def sync_from_json(self, json_file: str, dry_run: bool = False, delete_missing: bool = False):
+        """Sync the question bank in the database with a crawled JSON file"""
+        from db_sync import SyncLoader
+        from uk_visa_test import question_from_dict
+        
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                questions = [question_from_dict(q) for q in json.load(f)['questions']]
             
-            # Convert datetime objects to strings
-            def serialize_datetime(obj):
-                if hasattr(obj, 'isoformat'):
-                    return obj.isoformat()
-                return obj
+            with self.database.connection() as connection:
+                stats = SyncLoader(connection).sync(questions, delete_missing=delete_missing, dry_run=dry_run)
             
-            # Save to file
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(backup_data, f, indent=2, ensure_ascii=False, default=serialize_datetime)
+            prefix = "🔍 Dry run" if dry_run else "🔄 Synced"
+            print(f"{prefix}: {stats['inserted']} inserted, {stats['updated']} updated, "
+                  f"{stats['deleted']} deleted, {stats['unchanged']} unchanged")
             
-            print(f"📦 Database backed up to {output_file}")
+        except Exception as e:
+            print(f"❌ Sync failed: {e}")
+    
+    def migrate_schema(self, target: int = None, dry_run: bool = False):
+        """Create the database if needed and apply pending schema migrations"""
+        try:
+            if not dry_run:
+                create_database(self.db_config)
+            results = migrate(self.database, target=target, dry_run=dry_run)
+            
+            if not results:
+                print("✅ Schema is up to date")
+            for result in results:
+                verb = "Would apply" if dry_run else "Applied"
+                print(f"🧱 {verb} migration {result['version']}: {result['description']} ({len(result['statements'])} statements)")
+                if dry_run:
+                    for sql in result['statements']:
+                        print(f"    {' '.join(sql.split())};")
+            
+            for migration in migration_status(self.database):
+                state = migration['applied_at'] or 'pending'
+                print(f"  {migration['version']:3}  {state!s:20}  {migration['description']}")
             
         except Exception as e:
-            print(f"❌ Backup failed: {e}")
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
-            if 'connection' in locals():
-                connection.close()
+            print(f"❌ Migration failed: {e}")
+    
+    def explain_queries(self, output_file: str = None):
+        """EXPLAIN the hot queries, flag scans and sorts, and suggest missing indexes"""
+        try:
+            report = explain_queries(self.database, queries=HOT_QUERIES + CHECK_QUERIES)
+        except Exception as e:
+            print(f"❌ Explain failed: {e}")
+            return
+        
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+            print(f"🔍 Query plans written to {output_file}")
+        
+        for entry in report:
+            if 'error' in entry:
+                print(f"❌ {entry['name']} ({entry['source']}): {entry['error']}")
+                continue
+            marker = "⚠️ " if entry['findings'] or entry['suggestions'] else "✅"
+            print(f"{marker} {entry['name']} ({entry['source']})")
+            for row in entry['plan']:
+                print(f"    {row['table']}: {row['type']} via {row['key'] or '-'}, ~{row['rows']} rows  {row['Extra'] or ''}")
+            for finding in entry['findings']:
+                print(f"    ⚠️  {finding}")
+            for suggestion in entry['suggestions']:
+                print(f"    💡 {suggestion};")
+    
+    def refresh_analytics(self, dry_run: bool = False, output_file: str = None):
+        """Recompute the analytics summary tables from attempts and answers"""
+        try:
+            report = refresh_analytics(self.database, write=not dry_run)
+        except Exception as e:
+            print(f"❌ Analytics failed: {e}")
+            return
+        
+        verb = "Computed" if dry_run else "Refreshed"
+        print(f"📈 {verb} analytics from {report['attempts']} attempts and {report['user_answers']} answers "
+              f"in {report['elapsed_sec']}s")
+        for table, count in report['tables'].items():
+            print(f"  {table}: {count} rows")
+        if report['unparseable_selections']:
+            print(f"⚠️  {report['unparseable_selections']} answers with unreadable selected_answer_ids")
+        
+        print("\n🧗 Hardest questions:")
+        for item in report['hardest_questions']:
+            print(f"  question {item['question_id']} (test {item['test_id']}): "
+                  f"{item['difficulty']:.0%} wrong over {item['times_answered']} answers")
+        print("\n🎭 Most chosen distractors:")
+        for item in report['top_distractors']:
+            print(f"  answer {item['answer_id']} of question {item['question_id']}: chosen {item['selection_rate']:.0%}")
+        print("\n📉 Lowest pass rates:")
+        for item in report['lowest_pass_rates']:
+            print(f"  test {item['test_id']}: {item['pass_rate']:.0%} of {item['completed']} completed attempts")
+        
+        if output_file:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, ensure_ascii=False)
+            print(f"\n📤 Analytics report written to {output_file}")
     
     def clear_database(self, confirm: bool = False):
         """Clear all data from database (be careful!)"""
@@ -375,63 +391,104 @@ class DataManager:
             return
             
         try:
-            connection = mysql.connector.connect(**self.db_config)
-            cursor = connection.cursor()
-            
-            cursor.execute("USE uk_visa_test")
-            
-            # Disable foreign key checks
-            cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+            with self.database.transaction() as session:
+                # Disable foreign key checks
+                session.execute("SET FOREIGN_KEY_CHECKS = 0")
+                
+                # Clear tables in reverse order
+                tables = ['answers', 'questions', 'tests', 'chapters']
+                for table in tables:
+                    session.execute(f"DELETE FROM {table}")
+                    print(f"🗑️  Cleared table: {table}")
+                
+                # Re-enable foreign key checks
+                session.execute("SET FOREIGN_KEY_CHECKS = 1")
             
-            # Clear tables in reverse order
-            tables = ['answers', 'questions', 'tests', 'chapters']
-            for table in tables:
-                cursor.execute(f"DELETE FROM {table}")
-                print(f"🗑️  Cleared table: {table}")
-            
-            # Re-enable foreign key checks
-            cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
-            
-            connection.commit()
             print("✅ Database cleared successfully")
             
         except Exception as e:
             print(f"❌ Clear operation failed: {e}")
-        finally:
-            if 'cursor' in locals():
-                cursor.close()
-            if 'connection' in locals():
-                connection.close()
+
+def print_bundle_report(report: Dict[str, Any], output_dir: str):
+    print(f"🗂️  Built {report['test_bundles']} test and {report['chapter_bundles']} chapter bundles "
+          f"({report['questions']} questions) in {output_dir} in {report['build_sec']}s, version {report['version']}")
+    size = f"  {report['bytes'] / 1024:.1f} KiB"
+    if report['gzip_bytes'] is not None:
+        size += f", {report['gzip_bytes'] / 1024:.1f} KiB gzipped"
+    if report['largest']:
+        size += f"; largest {report['largest']['file']} ({report['largest']['bytes'] / 1024:.1f} KiB)"
+    print(size)
+    print(f"  Files: {report['files_written']} written, {report['files_unchanged']} unchanged, {report['files_pruned']} pruned")
+
+def print_database_timings(database):
+    """Pool wait and per-statement timings collected by a Database"""
+    summary = database.stats.summary()
+    pool = summary['pool']
+    print(f"\n⏱️  DB pool: {pool['connections_opened']} connections ({pool['connect_total_ms']}ms connecting), "
+          f"{pool['acquisitions']} checkouts, wait total {pool['wait_total_ms']}ms (max {pool['wait_max_ms']}ms)")
+    for entry in summary['queries']:
+        sql = entry['sql'] if len(entry['sql']) <= 70 else entry['sql'][:67] + '...'
+        print(f"  {entry['calls']:5}x {entry['total_ms']:10.3f}ms  avg {entry['avg_ms']:8.3f}ms  {sql}")
 
 def main():
     parser = argparse.ArgumentParser(description='UK Visa Test Data Utilities')
-    parser.add_argument('command', choices=['stats', 'validate', 'backup', 'review', 'clear'], 
+    parser.add_argument('command', choices=['stats', 'validate', 'backup', 'restore', 'review', 'clear', 'sync', 'convert', 'export', 'bundle', 'migrate', 'explain', 'analytics'], 
                        help='Command to run')
     parser.add_argument('--json-file', default='uk_visa_all_questions.json',
                        help='JSON file to analyze')
-    parser.add_argument('--output', help='Output file for export commands')
+    parser.add_argument('--output', help='Output file for export commands and JSON reports')
     parser.add_argument('--confirm', action='store_true', 
                        help='Confirm destructive operations')
+    parser.add_argument('--stream', action='store_true',
+                       help='Read the JSON file incrementally instead of loading it whole')
+    parser.add_argument('--dry-run', action='store_true',
+                       help='Report sync changes, pending migrations or analytics without applying them')
+    parser.add_argument('--delete-missing', action='store_true',
+                       help='With sync, delete questions of tests in the JSON file that no longer have them')
+    parser.add_argument('--threshold', type=float, default=0.8,
+                       help='Similarity threshold for near-duplicate questions in review exports')
+    parser.add_argument('--prune', action='store_true',
+                       help='Delete bundle files the new manifest no longer references')
+    parser.add_argument('--no-gzip', action='store_true',
+                       help='Skip the pre-compressed .gz copy of each bundle')
+    parser.add_argument('--since',
+                       help='Previous backup directory; back up only user answers added after it (other tables in full)')
+    parser.add_argument('--backup-dir', default='database_backup',
+                       help='Backup directory to restore from')
+    parser.add_argument('--workers', type=int,
+                       help='Tables restored or integrity checks run in parallel')
+    parser.add_argument('--timings', action='store_true',
+                       help='Print connection pool and query timings after database commands')
+    parser.add_argument('--target', type=int,
+                       help='Schema version to migrate up to (default: latest)')
+    parser.add_argument('--metrics-output',
+                       help='Write command metrics here: Prometheus text for .prom, else a JSON summary')
+    parser.add_argument('--trace-output',
+                       help='Write command and query spans here as JSON lines')
     
     args = parser.parse_args()
     
-    # Database config (update as needed)
-    db_config = {
-        'host': 'localhost',
-        'port': 3307,  # Default MySQL port
-        'user': 'root',
-        'password': '',
-        'database': 'uk_visa_test',
-        'charset': 'utf8mb4'
-    }
+    metrics.configure(args.metrics_output, args.trace_output)
+    with metrics.timer('command', command=args.command):
+        run_command(args)
+    metrics.flush()
+
+def run_command(args):
+    # Database settings come from Config.DB_CONFIG (.env)
+    db_config = Config.DB_CONFIG
     
     if args.command == 'stats':
-        analyzer = DataAnalyzer(json_file=args.json_file)
-        analyzer.print_statistics()
+        analyzer = DataAnalyzer(json_file=args.json_file, streaming=args.stream)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(analyzer.get_statistics(), f, indent=2, ensure_ascii=False)
+            print(f"📊 Statistics written to {args.output}")
+        else:
+            analyzer.print_statistics()
     
     elif args.command == 'validate':
         analyzer = DataAnalyzer(db_config=db_config)
-        results = analyzer.validate_database_data()
+        results = analyzer.validate_database_data(args.workers)
         
         if 'error' in results:
             print(f"❌ {results['error']}")
@@ -451,23 +508,70 @@ def main():
             for item in results['chapter_distribution']:
                 print(f"  {item['chapter_name']} ({item['test_type']}): {item['question_count']} questions")
             
-            problematic_count = len(results['questions_without_correct_answers'])
-            if problematic_count > 0:
-                print(f"\n⚠️  {problematic_count} questions without correct answers (showing first 10)")
+            integrity = results['integrity']
+            print(f"\n🔎 Integrity Checks ({integrity['elapsed_ms']:.0f}ms):")
+            for name, check in integrity['checks'].items():
+                if check['status'] == 'error':
+                    print(f"  ❌ {name}: {check['error']}")
+                elif check['status'] == 'fail':
+                    print(f"  ⚠️  {name}: {check['count']} rows - {check['description']}")
+                else:
+                    print(f"  ✅ {name}")
+            
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+                print(f"\n📤 Validation report written to {args.output}")
     
     elif args.command == 'backup':
         manager = DataManager(db_config)
-        output_file = args.output or 'database_backup.json'
-        manager.backup_database_to_json(output_file)
+        manager.backup_database(args.output or 'database_backup', since=args.since)
+    
+    elif args.command == 'restore':
+        manager = DataManager(db_config)
+        manager.restore_database(args.backup_dir, args.confirm, args.workers)
     
     elif args.command == 'review':
-        analyzer = DataAnalyzer(json_file=args.json_file)
+        analyzer = DataAnalyzer(json_file=args.json_file, streaming=args.stream)
         output_file = args.output or 'questions_for_review.json'
-        analyzer.export_for_manual_review(output_file)
+        analyzer.export_for_manual_review(output_file, args.threshold)
     
     elif args.command == 'clear':
         manager = DataManager(db_config)
         manager.clear_database(args.confirm)
+    
+    elif args.command == 'sync':
+        manager = DataManager(db_config)
+        manager.sync_from_json(args.json_file, args.dry_run, args.delete_missing)
+    
+    elif args.command == 'convert':
+        output_file = args.output or args.json_file.rsplit('.', 1)[0] + '.ndjson'
+        count = convert(args.json_file, output_file)
+        print(f"🔁 Converted {count} questions from {args.json_file} to {output_file}")
+    
+    elif args.command == 'export':
+        output_file = args.output or args.json_file.rsplit('.', 1)[0] + '.ukqb'
+        count = write_question_bank(iter_questions(args.json_file), output_file)
+        print(f"📦 Exported {count} questions from {args.json_file} to question bank {output_file}")
+    
+    elif args.command == 'bundle':
+        manager = DataManager(db_config)
+        manager.build_bundles(args.output or 'bundles', compress=not args.no_gzip, prune=args.prune)
+    
+    elif args.command == 'migrate':
+        manager = DataManager(db_config)
+        manager.migrate_schema(args.target, args.dry_run)
+    
+    elif args.command == 'explain':
+        manager = DataManager(db_config)
+        manager.explain_queries(args.output)
+    
+    elif args.command == 'analytics':
+        manager = DataManager(db_config)
+        manager.refresh_analytics(args.dry_run, args.output)
+    
+    if args.timings and args.command in ('validate', 'backup', 'restore', 'clear', 'sync', 'migrate', 'explain', 'analytics'):
+        print_database_timings(get_database(db_config))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
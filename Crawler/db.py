@@ -0,0 +1,457 @@
+import logging
+import queue
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from config import Config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def statement_key(sql: str) -> str:
+    """SQL with whitespace collapsed, used to group timings of the same statement"""
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class QueryStats:
+    """Call count and total/max time per statement, plus pool wait times"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries: Dict[str, Dict[str, float]] = {}
+        self.keys: Dict[str, str] = {}
+        self.acquisitions = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.connections_opened = 0
+        self.connect_total = 0.0
+
+    def record_query(self, sql: str, elapsed: float):
+        key = self.keys.get(sql)
+        if key is None:
+            key = self.keys[sql] = statement_key(sql)
+        with self.lock:
+            entry = self.queries.setdefault(key, {'calls': 0, 'total_sec': 0.0, 'max_sec': 0.0})
+            entry['calls'] += 1
+            entry['total_sec'] += elapsed
+            entry['max_sec'] = max(entry['max_sec'], elapsed)
+
+    def observe_query(self, sql: str, elapsed: float):
+        """record_query that also feeds the db_query_seconds metric; sessions pick it only while metrics are on"""
+        self.record_query(sql, elapsed)
+        metrics.observe('db_query_seconds', elapsed, statement=self.keys[sql].split(' ', 1)[0].upper())
+
+    def record_queries(self, sql: str, timings: List[float]):
+        """record_query for many runs of one statement, taking the lock once"""
+        if not timings:
+            return
+        key = self.keys.get(sql)
+        if key is None:
+            key = self.keys[sql] = statement_key(sql)
+        with self.lock:
+            entry = self.queries.setdefault(key, {'calls': 0, 'total_sec': 0.0, 'max_sec': 0.0})
+            entry['calls'] += len(timings)
+            entry['total_sec'] += sum(timings)
+            entry['max_sec'] = max(entry['max_sec'], max(timings))
+        if metrics.enabled:
+            statement = key.split(' ', 1)[0].upper()
+            for elapsed in timings:
+                metrics.observe('db_query_seconds', elapsed, statement=statement)
+
+    def record_connect(self, elapsed: float):
+        with self.lock:
+            self.connections_opened += 1
+            self.connect_total += elapsed
+
+    def record_wait(self, elapsed: float):
+        with self.lock:
+            self.acquisitions += 1
+            self.wait_total += elapsed
+            self.wait_max = max(self.wait_max, elapsed)
+
+    def summary(self) -> Dict[str, Any]:
+        with self.lock:
+            queries = sorted(self.queries.items(), key=lambda item: item[1]['total_sec'], reverse=True)
+            return {
+                'pool': {
+                    'connections_opened': self.connections_opened,
+                    'connect_total_ms': round(self.connect_total * 1000, 3),
+                    'acquisitions': self.acquisitions,
+                    'wait_total_ms': round(self.wait_total * 1000, 3),
+                    'wait_max_ms': round(self.wait_max * 1000, 3)
+                },
+                'queries': [
+                    {
+                        'sql': sql,
+                        'calls': int(entry['calls']),
+                        'total_ms': round(entry['total_sec'] * 1000, 3),
+                        'avg_ms': round(entry['total_sec'] * 1000 / entry['calls'], 3),
+                        'max_ms': round(entry['max_sec'] * 1000, 3)
+                    }
+                    for sql, entry in queries
+                ]
+            }
+
+
+class PooledConnection:
+    """A pooled DB-API connection with an LRU cache of prepared cursors.
+
+    MySQL's prepared cursor only re-prepares when its SQL changes, so keeping
+    one cursor per statement means each statement is prepared once per
+    connection rather than once per call.
+    """
+
+    def __init__(self, connection, cache_size: int):
+        self.connection = connection
+        self.cache_size = cache_size
+        self.statements: 'OrderedDict[tuple, Any]' = OrderedDict()
+        self.released_at = time.monotonic()
+
+    def prepared_cursor(self, sql: str, dictionary: bool):
+        key = (sql, dictionary)
+        cursor = self.statements.get(key)
+        if cursor is not None:
+            self.statements.move_to_end(key)
+            return cursor
+        cursor = self.connection.cursor(prepared=True, dictionary=dictionary)
+        self.statements[key] = cursor
+        if len(self.statements) > self.cache_size:
+            _, evicted = self.statements.popitem(last=False)
+            evicted.close()
+        return cursor
+
+    def clear_statements(self):
+        for cursor in self.statements.values():
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self.statements.clear()
+
+    def close(self):
+        self.clear_statements()
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+
+
+class Database:
+    """Connection pool over Config.DB_CONFIG shared by the crawler and the data utilities.
+
+    Connections are opened lazily up to pool_size and handed back after each
+    call or transaction, so a batch of admin commands pays the connect and
+    handshake once. Every statement is timed, and so is the wait for a free
+    connection; see stats().
+    """
+
+    def __init__(self, db_config: Optional[Dict] = None, pool_size: Optional[int] = None,
+                 timeout: Optional[float] = None, statement_cache_size: Optional[int] = None,
+                 connect: Optional[Callable] = None):
+        self.db_config = dict(db_config or Config.DB_CONFIG)
+        self.pool_size = pool_size or Config.DB_POOL_SIZE
+        self.timeout = Config.DB_POOL_TIMEOUT if timeout is None else timeout
+        self.statement_cache_size = statement_cache_size or Config.DB_STATEMENT_CACHE_SIZE
+        self._connect = connect or self._mysql_connect
+        self._idle: 'queue.LifoQueue[PooledConnection]' = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self.stats = QueryStats()
+
+    def _mysql_connect(self):
+        import mysql.connector
+
+        return mysql.connector.connect(**self.db_config)
+
+    def _open(self) -> PooledConnection:
+        started = time.perf_counter()
+        try:
+            pooled = PooledConnection(self._connect(), self.statement_cache_size)
+        except Exception:
+            # Hand the slot on so a waiting caller can try again
+            self._idle.put(None)
+            raise
+        self.stats.record_connect(time.perf_counter() - started)
+        return pooled
+
+    def _checkout(self) -> PooledConnection:
+        """An idle connection, a new one while below pool_size, or the next one handed back.
+
+        The idle queue also carries None for a slot whose connection was
+        discarded, so callers waiting on a full pool open a replacement.
+        """
+        started = time.perf_counter()
+        try:
+            pooled = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                opening = self._opened < self.pool_size
+                if opening:
+                    self._opened += 1
+            if opening:
+                pooled = None
+            else:
+                try:
+                    pooled = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(f"No database connection free after {self.timeout}s (pool size {self.pool_size})")
+        self.stats.record_wait(time.perf_counter() - started)
+
+        if pooled is None:
+            return self._open()
+
+        # Connections idle for a while may have been dropped by the server
+        ping = getattr(pooled.connection, 'ping', None)
+        if ping and time.monotonic() - pooled.released_at > Config.DB_POOL_PING_AFTER:
+            try:
+                ping(reconnect=True)
+            except Exception:
+                # Give the slot back, or after pool_size failed pings every checkout would wait forever
+                self._release(pooled, broken=True)
+                raise
+            pooled.clear_statements()
+        return pooled
+
+    def _release(self, pooled: PooledConnection, broken: bool = False):
+        if not broken:
+            try:
+                # End any implicit transaction so the next borrower sees fresh data
+                pooled.connection.rollback()
+            except Exception:
+                broken = True
+        if broken:
+            pooled.close()
+            self._idle.put(None)
+            return
+        pooled.released_at = time.monotonic()
+        self._idle.put(pooled)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a raw DB-API connection (e.g. for the bulk/sync loaders); the caller commits"""
+        pooled = self._checkout()
+        broken = False
+        try:
+            yield pooled.connection
+        except Exception:
+            broken = not self._is_connected(pooled)
+            raise
+        finally:
+            self._release(pooled, broken)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection as a Session, committing on success and rolling back on error"""
+        pooled = self._checkout()
+        broken = False
+        try:
+            yield Session(pooled, self.stats)
+            pooled.connection.commit()
+        except Exception:
+            broken = not self._is_connected(pooled)
+            raise
+        finally:
+            self._release(pooled, broken)
+
+    @staticmethod
+    def _is_connected(pooled: PooledConnection) -> bool:
+        is_connected = getattr(pooled.connection, 'is_connected', None)
+        return is_connected() if is_connected else True
+
+    def query(self, sql: str, params: Sequence = (), prepared: bool = False) -> List[Dict]:
+        """Rows of a single read as dicts"""
+        with self.transaction() as session:
+            return session.query(sql, params, prepared=prepared)
+
+    def query_one(self, sql: str, params: Sequence = (), prepared: bool = False) -> Optional[Dict]:
+        rows = self.query(sql, params, prepared=prepared)
+        return rows[0] if rows else None
+
+    def execute(self, sql: str, params: Sequence = (), prepared: bool = False) -> int:
+        """Run one write in its own transaction; returns the affected row count"""
+        with self.transaction() as session:
+            return session.execute(sql, params, prepared=prepared)
+
+    def close(self):
+        """Close idle connections; borrowed ones are closed when they come back"""
+        while True:
+            try:
+                pooled = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if pooled is not None:
+                pooled.close()
+            with self._lock:
+                self._opened -= 1
+
+    def log_stats(self, top: int = 5):
+        summary = self.stats.summary()
+        pool = summary['pool']
+        logger.info(
+            f"DB pool: {pool['connections_opened']} connections ({pool['connect_total_ms']}ms connecting) "
+            f"for {pool['acquisitions']} checkouts, wait total {pool['wait_total_ms']}ms max {pool['wait_max_ms']}ms"
+        )
+        for entry in summary['queries'][:top]:
+            logger.info(f"  {entry['calls']}x {entry['total_ms']}ms (max {entry['max_ms']}ms): {entry['sql'][:80]}")
+
+
+class PreparedStatement:
+    """One statement run many times on a session, for loops like the row-by-row save.
+
+    It holds its own prepared cursor rather than looking one up in the
+    connection's cache on every call, and collects timings locally; they
+    reach the session's QueryStats when the statement is closed.
+    """
+
+    def __init__(self, session: 'Session', sql: str, dictionary: bool = False):
+        self.session = session
+        self.sql = sql
+        self.cursor = session.connection.cursor(prepared=True, dictionary=dictionary)
+        self.timings: List[float] = []
+
+    def execute(self, params: Sequence = ()):
+        started = time.perf_counter()
+        self.cursor.execute(self.sql, params)
+        self.timings.append(time.perf_counter() - started)
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    def close(self):
+        self.session.stats.record_queries(self.sql, self.timings)
+        self.timings = []
+        self.cursor.close()
+
+    def __enter__(self) -> 'PreparedStatement':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class Session:
+    """Statements run on one connection, usually borrowed by Database.transaction()"""
+
+    def __init__(self, pooled: PooledConnection, stats: Optional[QueryStats] = None):
+        self.pooled = pooled
+        self.connection = pooled.connection
+        self.stats = stats or QueryStats()
+        # Chosen once per session, so with metrics off a statement costs no extra call
+        self.record_query = self.stats.observe_query if metrics.enabled else self.stats.record_query
+        self.lastrowid = None
+
+    @classmethod
+    def wrap(cls, connection, stats: Optional[QueryStats] = None) -> 'Session':
+        """A session over a connection the caller opened and will close"""
+        return cls(PooledConnection(connection, Config.DB_STATEMENT_CACHE_SIZE), stats)
+
+    def _run(self, sql: str, params: Sequence, prepared: bool, dictionary: bool, fetch: bool):
+        if prepared:
+            cursor = self.pooled.prepared_cursor(sql, dictionary)
+        else:
+            cursor = self.connection.cursor(dictionary=dictionary)
+        started = time.perf_counter()
+        try:
+            cursor.execute(sql, tuple(params))
+            rows = cursor.fetchall() if fetch else None
+            self.lastrowid = cursor.lastrowid
+            rowcount = cursor.rowcount
+        finally:
+            self.record_query(sql, time.perf_counter() - started)
+            if not prepared:
+                cursor.close()
+        return rows if fetch else rowcount
+
+    def query(self, sql: str, params: Sequence = (), prepared: bool = False) -> List[Dict]:
+        return self._run(sql, params, prepared, dictionary=True, fetch=True)
+
+    def query_one(self, sql: str, params: Sequence = (), prepared: bool = False) -> Optional[Dict]:
+        rows = self.query(sql, params, prepared=prepared)
+        return rows[0] if rows else None
+
+    def execute(self, sql: str, params: Sequence = (), prepared: bool = False) -> int:
+        return self._run(sql, params, prepared, dictionary=False, fetch=False)
+
+    def prepare(self, sql: str, dictionary: bool = False) -> PreparedStatement:
+        """A statement to run in a tight loop; close it (or use it as a context manager) when done"""
+        return PreparedStatement(self, sql, dictionary)
+
+    def stream(self, sql: str, params: Sequence = (), size: int = 1000, dictionary: bool = True) -> Iterator[List]:
+        """Rows of a read in chunks of up to size, without buffering the whole result.
+
+        The cursor is unbuffered, so the server streams the result and only
+        one chunk is held in memory; the connection is busy until the
+        iterator is exhausted or closed. Rows are dicts, or tuples in
+        column order when dictionary is False.
+        """
+        cursor = self.connection.cursor(dictionary=dictionary)
+        started = time.perf_counter()
+        try:
+            cursor.execute(sql, tuple(params))
+            while True:
+                rows = cursor.fetchmany(size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            self.record_query(sql, time.perf_counter() - started)
+            cursor.close()
+
+    def executemany(self, sql: str, seq_params: Sequence[Sequence]) -> int:
+        cursor = self.connection.cursor()
+        started = time.perf_counter()
+        try:
+            cursor.executemany(sql, [tuple(params) for params in seq_params])
+            return cursor.rowcount
+        finally:
+            self.record_query(sql, time.perf_counter() - started)
+            cursor.close()
+
+    def insert_rows(self, sql_prefix: str, rows: Sequence[Sequence], batch_size: Optional[int] = None,
+                    suffix: str = '') -> int:
+        """Insert rows with multi-row INSERT ... VALUES (...), (...) statements; returns the statements run.
+
+        sql_prefix is the statement up to VALUES ("INSERT IGNORE INTO t (a, b)")
+        and suffix anything after the row list. Each statement carries up to
+        batch_size rows, or all of them when batch_size is None.
+        """
+        if not rows:
+            return 0
+        batch_size = batch_size or len(rows)
+        placeholders = '(' + ', '.join(['%s'] * len(rows[0])) + ')'
+        statements = 0
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            sql = f"{sql_prefix} VALUES " + ', '.join([placeholders] * len(batch)) + suffix
+            self.execute(sql, [value for row in batch for value in row])
+            statements += 1
+        return statements
+
+    def upsert_rows(self, sql_prefix: str, rows: Sequence[Sequence], update: str,
+                    batch_size: Optional[int] = None) -> int:
+        """insert_rows where a row whose key exists applies update, an ON DUPLICATE KEY UPDATE assignment list"""
+        return self.insert_rows(sql_prefix, rows, batch_size, suffix=f" ON DUPLICATE KEY UPDATE {update}")
+
+
+_databases: Dict[tuple, Database] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_config: Optional[Dict] = None) -> Database:
+    """The process-wide pool for a DB config (Config.DB_CONFIG by default)"""
+    config = dict(db_config or Config.DB_CONFIG)
+    key = tuple(sorted((name, str(value)) for name, value in config.items()))
+    with _databases_lock:
+        if key not in _databases:
+            _databases[key] = Database(config)
+        return _databases[key]
@@ -0,0 +1,240 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = 'manifest.json'
+FORMAT = 'uk_visa_backup'
+VERSION = 1
+
+# Parents before children, so a serial restore never trips a foreign key
+BACKUP_TABLES = [
+    'chapters', 'tests', 'questions', 'answers',
+    'users', 'subscriptions', 'user_test_attempts', 'user_answers'
+]
+# Rows here are only ever added, so incremental backups copy just the new ids;
+# every other table is small or updated in place and is copied whole each time.
+# user_test_attempts is not among them: an attempt is inserted when it starts
+# and updated with its score and completed_at when it is submitted.
+APPEND_ONLY_TABLES = {'user_answers'}
+
+
+def _encode(value):
+    """JSON fallback for column types the json module does not know"""
+    if hasattr(value, 'isoformat'):
+        # MySQL parses 'YYYY-MM-DD HH:MM:SS' back into DATETIME/TIMESTAMP columns
+        return value.isoformat(sep=' ') if hasattr(value, 'hour') and hasattr(value, 'day') else value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return value.decode('utf-8', errors='replace')
+    return str(value)   # Decimal, timedelta, sets
+
+
+_ENCODER = json.JSONEncoder(ensure_ascii=False, default=_encode)
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_manifest(backup_dir: str) -> Dict:
+    with open(os.path.join(backup_dir, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format') != FORMAT:
+        raise ValueError(f"{backup_dir} is not a database backup")
+    return manifest
+
+
+def backup_chain(backup_dir: str) -> List[Tuple[str, Dict]]:
+    """(directory, manifest) of a backup and the backups it builds on, oldest first"""
+    chain = []
+    directory = backup_dir
+    while directory:
+        manifest = read_manifest(directory)
+        chain.append((directory, manifest))
+        base = manifest.get('base')
+        directory = os.path.normpath(os.path.join(directory, base)) if base else None
+    return list(reversed(chain))
+
+
+def _table_columns(session, table: str) -> Optional[List[str]]:
+    """Column names of table, or None if it does not exist"""
+    cursor = session.connection.cursor()
+    try:
+        cursor.execute(f"SELECT * FROM {table} LIMIT 0")
+        cursor.fetchall()
+        return [column[0] for column in cursor.description]
+    except Exception:
+        return None
+    finally:
+        cursor.close()
+
+
+def _backup_table(session, table: str, path: str, since_id: int, chunk_size: int) -> Dict:
+    rows = 0
+    high_water = since_id
+    with gzip.open(path, 'wt', encoding='utf-8', compresslevel=6) as f:
+        for chunk in session.stream(f"SELECT * FROM {table} WHERE id > %s ORDER BY id", (since_id,), chunk_size):
+            f.write(''.join(_ENCODER.encode(row) + '\n' for row in chunk))
+            rows += len(chunk)
+            high_water = chunk[-1]['id']
+    return {'rows': rows, 'high_water': high_water}
+
+
+def backup_database(database, output_dir: str, since: Optional[str] = None,
+                    chunk_size: Optional[int] = None, tables: Optional[List[str]] = None) -> Dict:
+    """Stream every table to output_dir as gzipped NDJSON plus a manifest.
+
+    All tables are read in one transaction, so the files are consistent with
+    each other. Rows are fetched in primary-key order through an unbuffered
+    cursor, chunk_size at a time, so memory does not grow with the table.
+    With since (a previous backup directory), append-only tables only
+    include rows above that backup's high-water mark.
+    """
+    chunk_size = chunk_size or Config.BACKUP_CHUNK_SIZE
+    previous = read_manifest(since) if since else None
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {
+        'format': FORMAT,
+        'version': VERSION,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'kind': 'incremental' if previous else 'full',
+        'base': os.path.relpath(os.path.abspath(since), os.path.abspath(output_dir)) if since else None,
+        'tables': {}
+    }
+
+    started = time.perf_counter()
+    with database.transaction() as session:
+        for table in tables or BACKUP_TABLES:
+            columns = _table_columns(session, table)
+            if columns is None:
+                logger.info(f"Skipping {table}: not in this database")
+                continue
+
+            since_id = 0
+            mode = 'full'
+            if previous and table in APPEND_ONLY_TABLES and table in previous['tables']:
+                since_id = previous['tables'][table]['high_water']
+                mode = 'append'
+
+            filename = f"{table}.ndjson.gz"
+            path = os.path.join(output_dir, filename)
+            result = _backup_table(session, table, path, since_id, chunk_size)
+            manifest['tables'][table] = {
+                'file': filename,
+                'mode': mode,
+                'columns': columns,
+                'since_id': since_id,
+                'high_water': result['high_water'],
+                'rows': result['rows'],
+                'bytes': os.path.getsize(path),
+                'sha256': file_sha256(path)
+            }
+            logger.info(f"Backed up {result['rows']} rows from {table} ({mode})")
+
+    manifest['elapsed_sec'] = round(time.perf_counter() - started, 3)
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def restore_plan(backup_dir: str) -> Dict[str, List[Tuple[str, Dict]]]:
+    """For each table, the (path, manifest entry) files to load in order: its last full copy, then appends"""
+    chain = backup_chain(backup_dir)
+    plan: Dict[str, List[Tuple[str, Dict]]] = {}
+    tables = [table for table in BACKUP_TABLES if table in chain[-1][1]['tables']]
+    for table in tables:
+        files = []
+        for directory, manifest in reversed(chain):
+            entry = manifest['tables'].get(table)
+            if entry is None:
+                continue
+            files.insert(0, (os.path.join(directory, entry['file']), entry))
+            if entry['mode'] == 'full':
+                break
+        else:
+            raise ValueError(f"No full backup of {table} in the chain behind {backup_dir}")
+        plan[table] = files
+    return plan
+
+
+def _read_rows(path: str) -> Iterator[Dict]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _insert_batch(session, table: str, columns: List[str], rows: List[Dict]):
+    session.insert_rows(f"INSERT INTO {table} ({', '.join(columns)})",
+                        [[row.get(column) for column in columns] for row in rows])
+
+
+def _restore_table(database, table: str, files: List[Tuple[str, Dict]], batch_size: int) -> int:
+    restored = 0
+    with database.transaction() as session:
+        # Tables load in parallel, so parents may arrive after their children
+        session.execute("SET FOREIGN_KEY_CHECKS = 0")
+        try:
+            session.execute(f"DELETE FROM {table}")
+            for path, entry in files:
+                columns = entry['columns']
+                batch = []
+                for row in _read_rows(path):
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        _insert_batch(session, table, columns, batch)
+                        restored += len(batch)
+                        batch = []
+                if batch:
+                    _insert_batch(session, table, columns, batch)
+                    restored += len(batch)
+        finally:
+            session.execute("SET FOREIGN_KEY_CHECKS = 1")
+    logger.info(f"Restored {restored} rows into {table}")
+    return restored
+
+
+def restore_database(database, backup_dir: str, workers: Optional[int] = None,
+                     batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Replace the tables in a backup (following its incremental chain) with its rows.
+
+    Files are checked against their manifest checksums first. Each table is
+    loaded in its own transaction with multi-row INSERTs, and up to workers
+    tables load at once on separate pooled connections.
+    """
+    workers = workers or Config.RESTORE_WORKERS
+    batch_size = batch_size or Config.DB_BATCH_SIZE
+    plan = restore_plan(backup_dir)
+
+    for table, files in plan.items():
+        for path, entry in files:
+            if file_sha256(path) != entry['sha256']:
+                raise ValueError(f"Checksum mismatch for {path}; backup is corrupt")
+
+    # Biggest tables first so they do not end up running alone at the end
+    order = sorted(plan, key=lambda table: sum(entry['rows'] for _, entry in plan[table]), reverse=True)
+    results: Dict[str, int] = {}
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, database.pool_size, len(order) or 1))) as executor:
+        futures = {table: executor.submit(_restore_table, database, table, plan[table], batch_size) for table in order}
+        for table in BACKUP_TABLES:
+            if table in futures:
+                results[table] = futures[table].result()
+
+    for table, restored in results.items():
+        expected = sum(entry['rows'] for _, entry in plan[table])
+        if restored != expected:
+            raise ValueError(f"Restored {restored} rows into {table}, backup has {expected}")
+    return results
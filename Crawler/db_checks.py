@@ -0,0 +1,116 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from schema import HotQuery
+
+logger = logging.getLogger(__name__)
+
+REPORT_FORMAT = 'uk_visa_validation'
+REPORT_VERSION = 1
+
+
+@dataclass
+class Check:
+    """A data-quality rule as one set-based query returning every offending row"""
+    name: str
+    description: str
+    sql: str
+    severity: str = 'error'
+    indexes: List[Tuple[str, Tuple[str, ...]]] = field(default_factory=list)
+
+
+CHECKS = [
+    Check('no_correct_answer', "Questions with no answer marked correct",
+          """SELECT q.id, q.test_id, q.question_id
+             FROM questions q
+             WHERE NOT EXISTS (
+                 SELECT 1 FROM answers a
+                 WHERE a.question_id = q.id AND a.is_correct = 1
+             )
+             ORDER BY q.id""",
+          indexes=[('answers', ('question_id', 'is_correct'))]),
+    Check('radio_multiple_correct', "Single-choice questions with more than one correct answer",
+          """SELECT q.id, q.test_id, q.question_id, COUNT(*) AS correct_count
+             FROM questions q
+             JOIN answers a ON a.question_id = q.id AND a.is_correct = 1
+             WHERE q.question_type = 'radio'
+             GROUP BY q.id, q.test_id, q.question_id
+             HAVING COUNT(*) > 1
+             ORDER BY q.id""",
+          indexes=[('answers', ('question_id', 'is_correct'))]),
+    # Foreign keys normally prevent these, but restores and bulk loads run with FOREIGN_KEY_CHECKS = 0
+    Check('orphan_answers', "Answers whose question does not exist",
+          """SELECT a.id, a.question_id, a.answer_id
+             FROM answers a
+             LEFT JOIN questions q ON q.id = a.question_id
+             WHERE q.id IS NULL
+             ORDER BY a.id""",
+          indexes=[('answers', ('question_id',))]),
+    Check('empty_tests', "Tests without any questions",
+          """SELECT t.id, t.test_type, t.test_number, t.chapter_id
+             FROM tests t
+             WHERE NOT EXISTS (SELECT 1 FROM questions q WHERE q.test_id = t.id)
+             ORDER BY t.id""",
+          indexes=[('questions', ('test_id',))]),
+    Check('duplicate_question_ids', "Scraped question ids stored more than once in the same test",
+          """SELECT test_id, question_id, COUNT(*) AS copies, MIN(id) AS first_id, MAX(id) AS last_id
+             FROM questions
+             GROUP BY test_id, question_id
+             HAVING COUNT(*) > 1
+             ORDER BY test_id, question_id""",
+          indexes=[('questions', ('test_id', 'question_id'))]),
+]
+
+# Audited by `data_utils.py explain` alongside schema.HOT_QUERIES
+CHECK_QUERIES = [HotQuery(check.name, 'data_utils validate', check.sql, indexes=check.indexes) for check in CHECKS]
+
+
+def _run_check(database, check: Check, sample_size: int) -> Dict:
+    started = time.perf_counter()
+    result = {'description': check.description, 'severity': check.severity}
+    try:
+        rows = database.query(check.sql)
+    except Exception as e:
+        logger.error(f"Check {check.name} failed: {e}")
+        result.update(status='error', error=str(e))
+    else:
+        result.update(status='pass' if not rows else 'fail', count=len(rows), sample=rows[:sample_size])
+    result['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+    return result
+
+
+def run_checks(database, names: Optional[List[str]] = None, workers: Optional[int] = None,
+               sample_size: Optional[int] = None) -> Dict:
+    """Run the checks (all, or those named) in parallel and return a JSON-ready report.
+
+    Each check runs as a single query on its own pooled connection, so the
+    slowest check bounds the total time. The checks do not share a
+    snapshot: a write landing mid-run can show up in some checks and not
+    others. Overall status is 'error' if any check could not run, else
+    'fail' if any check found rows, else 'pass'.
+    """
+    workers = workers or Config.VALIDATION_WORKERS
+    sample_size = Config.VALIDATION_SAMPLE_SIZE if sample_size is None else sample_size
+    checks = [check for check in CHECKS if not names or check.name in names]
+
+    started = time.perf_counter()
+    started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, database.pool_size, len(checks) or 1))) as executor:
+        futures = {check.name: executor.submit(_run_check, database, check, sample_size) for check in checks}
+        results = {name: future.result() for name, future in futures.items()}
+
+    statuses = [result['status'] for result in results.values()]
+    return {
+        'format': REPORT_FORMAT,
+        'version': REPORT_VERSION,
+        'database': database.db_config.get('database'),
+        'started_at': started_at,
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 3),
+        'status': 'error' if 'error' in statuses else 'fail' if 'fail' in statuses else 'pass',
+        'summary': {status: statuses.count(status) for status in ('pass', 'fail', 'error')},
+        'checks': results
+    }
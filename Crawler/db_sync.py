@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from bulk_loader import BulkLoader, chunked
+from uk_visa_test import Question
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(question_text: str, question_type: str, explanation: Optional[str], answers: List[Tuple]) -> str:
+    """Hash of everything the site controls about a question; answers are (answer_id, text, is_correct)"""
+    payload = [
+        question_text,
+        question_type,
+        explanation or '',
+        [[answer_id, text, bool(is_correct)] for answer_id, text, is_correct in answers]
+    ]
+    return hashlib.sha1(json.dumps(payload, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def question_hash(question: Question) -> str:
+    return content_hash(
+        question.question_text, question.question_type, question.explanation,
+        [(answer.id, answer.text, answer.is_correct) for answer in question.answers]
+    )
+
+
+class SyncLoader(BulkLoader):
+    """Idempotent sync of crawled questions into the database.
+
+    Questions are identified by (test_id, site question_id). The current rows
+    are hashed and diffed against the crawl, and only inserts, updates and
+    deletes are applied, all in one transaction. Updated questions keep their
+    database id, so user_answers rows stay attached.
+
+    Deleting questions the crawl no longer has is opt-in, as it cascades to
+    user_answers, and only reaches tests the crawl returned questions for:
+    a test whose page failed to fetch or parse is left alone.
+    """
+
+    def _current_state(self) -> Tuple[Dict[Tuple, int], Dict[int, str], List[int]]:
+        """Return key -> id, id -> content hash, and ids of duplicate rows left by earlier plain loads"""
+        answers: Dict[int, List[Tuple]] = {}
+        for row in self._query("SELECT question_id, answer_id, answer_text, is_correct FROM answers ORDER BY id"):
+            answers.setdefault(row['question_id'], []).append((row['answer_id'], row['answer_text'], row['is_correct']))
+
+        ids: Dict[Tuple, int] = {}
+        hashes: Dict[int, str] = {}
+        duplicates: List[int] = []
+        for row in self._query("SELECT id, test_id, question_id, question_text, question_type, explanation FROM questions ORDER BY id"):
+            db_id = row['id']
+            key = (row['test_id'], row['question_id'])
+            if key in ids:
+                duplicates.append(db_id)
+                continue
+            ids[key] = db_id
+            hashes[db_id] = content_hash(row['question_text'], row['question_type'], row['explanation'], answers.get(db_id, []))
+
+        return ids, hashes, duplicates
+
+    def _delete_questions(self, question_ids: List[int]):
+        for batch in chunked(question_ids, self.batch_size):
+            placeholders = ', '.join(['%s'] * len(batch))
+            self._execute(f"DELETE FROM answers WHERE question_id IN ({placeholders})", batch)
+            self._execute(f"DELETE FROM questions WHERE id IN ({placeholders})", batch)
+
+    def _update_questions(self, updates: List[Tuple[int, Question]]):
+        for db_id, question in updates:
+            self._execute(
+                "UPDATE questions SET question_text = %s, question_type = %s, explanation = %s WHERE id = %s",
+                (question.question_text, question.question_type, question.explanation, db_id)
+            )
+
+        # Answers are replaced wholesale; user_answers refers to them by answer_id, not row id
+        for batch in chunked(updates, self.batch_size):
+            placeholders = ', '.join(['%s'] * len(batch))
+            self._execute(f"DELETE FROM answers WHERE question_id IN ({placeholders})", [db_id for db_id, _ in batch])
+        self._insert_answers([
+            (db_id, answer.id, answer.text, answer.is_correct)
+            for db_id, question in updates for answer in question.answers
+        ])
+
+    def sync(self, questions: List[Question], delete_missing: bool = False, dry_run: bool = False) -> Dict:
+        """Bring the questions/answers tables in line with the crawl and commit once"""
+        started = time.perf_counter()
+        self.statements = 0
+        # Everything lands in a single transaction so readers never see a partial refresh
+        self.commit_per_batch = False
+
+        try:
+            chapter_ids = self._chapter_ids()
+            tests = self._test_ids(questions, chapter_ids)
+            current_ids, current_hashes, duplicates = self._current_state()
+
+            inserts: List[Question] = []
+            updates: List[Tuple[int, Question]] = []
+            seen = set()
+            unchanged = 0
+            for question in questions:
+                chapter_id = chapter_ids.get(question.chapter) if question.chapter else None
+                key = (tests[(chapter_id, question.test_number, question.test_type)], question.id)
+                if key in seen:
+                    logger.warning(f"Skipping duplicate crawled question {question.id} in test {question.test_type} {question.test_number}")
+                    continue
+                seen.add(key)
+
+                db_id = current_ids.get(key)
+                if db_id is None:
+                    inserts.append(question)
+                elif current_hashes[db_id] != question_hash(question):
+                    updates.append((db_id, question))
+                else:
+                    unchanged += 1
+
+            deletes = duplicates[:]
+            if delete_missing:
+                crawled_tests = {test_id for test_id, _ in seen}
+                deletes += [
+                    db_id for key, db_id in current_ids.items() if key[0] in crawled_tests and key not in seen
+                ]
+
+            if not dry_run:
+                self._delete_questions(deletes)
+                self._update_questions(updates)
+                self._insert_questions(inserts, chapter_ids, tests)
+                self.connection.commit()
+            else:
+                self.connection.rollback()
+
+        except Exception:
+            self.connection.rollback()
+            raise
+
+        stats = {
+            'inserted': len(inserts),
+            'updated': len(updates),
+            'deleted': len(deletes),
+            'unchanged': unchanged,
+            'statements': self.statements,
+            'elapsed_sec': round(time.perf_counter() - started, 3),
+            'dry_run': dry_run
+        }
+        logger.info(
+            f"Sync{' (dry run)' if dry_run else ''}: {stats['inserted']} inserted, {stats['updated']} updated, "
+            f"{stats['deleted']} deleted, {stats['unchanged']} unchanged in {stats['elapsed_sec']}s"
+        )
+        return stats
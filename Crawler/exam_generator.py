@@ -0,0 +1,247 @@
+import argparse
+import json
+import random
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from near_duplicates import NearDuplicateIndex, normalize_text
+from question_bank import test_key
+from uk_visa_test import Question, question_from_dict, question_to_dict
+
+EXAM_SIZE = 24
+PASS_MARK = 18
+# Questions crawled from comprehensive and exam tests that match no chapter question
+GENERAL = 'general'
+
+
+def question_key(question: Question) -> str:
+    """Bank-wide key of a question; crawled ids (p0, p1, ...) only identify it within its test"""
+    return f"{test_key(question.test_type, question.chapter, question.test_number)}/{question.id}"
+
+
+def allocate_quotas(size: int, weights: Dict[str, float], capacity: Dict[str, int]) -> Dict[str, int]:
+    """Split size questions over pools in proportion to weights (largest remainder).
+
+    Every pool with weight gets at least one question when size allows, and
+    no pool gets more than its capacity; the overflow goes to the others.
+    """
+    pools = [name for name, weight in weights.items() if weight > 0 and capacity.get(name, 0) > 0]
+    if sum(capacity[name] for name in pools) < size:
+        raise ValueError(f"Only {sum(capacity[name] for name in pools)} distinct questions for exams of {size}")
+
+    quotas = {name: 0 for name in pools}
+    if size >= len(pools):
+        for name in pools:
+            quotas[name] = 1
+    remaining = size - sum(quotas.values())
+    while remaining > 0:
+        open_pools = [name for name in pools if quotas[name] < capacity[name]]
+        total = sum(weights[name] for name in open_pools)
+        shares = {name: remaining * weights[name] / total for name in open_pools}
+        granted = 0
+        for name in open_pools:
+            extra = min(int(shares[name]), capacity[name] - quotas[name])
+            quotas[name] += extra
+            granted += extra
+        if granted == 0:
+            # Hand out the leftover one at a time, largest fractional share first
+            name = max(open_pools, key=lambda pool: (shares[pool] - int(shares[pool]), weights[pool]))
+            quotas[name] += 1
+            granted = 1
+        remaining -= granted
+    return quotas
+
+
+class ExamGenerator:
+    """Draws random mock exams from the crawled question bank.
+
+    Everything expensive happens once, in the constructor: near-duplicate
+    questions (MinHash/LSH, as in review exports) are grouped into concepts,
+    each concept is assigned a chapter (comprehensive and exam questions
+    inherit one from a chapter question they duplicate, or fall into the
+    general pool), and each chapter gets a tuple of its concept ids plus a
+    question quota. A draw then samples concepts per chapter and one
+    wording per concept, so an exam never holds two versions of the same
+    question, in a few microseconds.
+    """
+
+    def __init__(self, questions: Iterable[Question], size: int = EXAM_SIZE, threshold: float = 0.8,
+                 weights: Optional[Dict[str, float]] = None):
+        self.questions = list(questions)
+        self.size = size
+        self.keys = [question_key(question) for question in self.questions]
+        self.positions = {key: position for position, key in enumerate(self.keys)}
+
+        texts = [normalize_text(question.question_text) for question in self.questions]
+        unique = list(dict.fromkeys(texts))
+        text_position = {text: position for position, text in enumerate(unique)}
+        index = NearDuplicateIndex(threshold)
+        index.add(unique)
+        root = list(range(len(unique)))
+        for members, _ in index.clusters():
+            for member in members:
+                root[member] = members[0]
+
+        concept_ids: Dict[int, int] = {}
+        self.concept_of: List[int] = []
+        variants: List[List[int]] = []
+        for position, text in enumerate(texts):
+            concept = concept_ids.setdefault(root[text_position[text]], len(concept_ids))
+            if concept == len(variants):
+                variants.append([])
+            variants[concept].append(position)
+            self.concept_of.append(concept)
+        self.variants: List[Tuple[int, ...]] = [tuple(members) for members in variants]
+
+        pools: Dict[str, List[int]] = {}
+        self.concept_chapter: List[str] = []
+        for concept, members in enumerate(self.variants):
+            chapters = Counter(self.questions[position].chapter for position in members if self.questions[position].chapter)
+            # Most common chapter among the variants, ties to the lowest chapter
+            chapter = min(chapters, key=lambda name: (-chapters[name], name)) if chapters else GENERAL
+            self.concept_chapter.append(chapter)
+            pools.setdefault(chapter, []).append(concept)
+        self.pools: Dict[str, Tuple[int, ...]] = {chapter: tuple(pools[chapter]) for chapter in sorted(pools)}
+        self.stale: Dict[str, Tuple[int, ...]] = {}
+
+        # Default mix follows how much distinct material each chapter has
+        self.weights = weights or {chapter: len(pool) for chapter, pool in self.pools.items()}
+        self.quotas = allocate_quotas(size, self.weights, {chapter: len(pool) for chapter, pool in self.pools.items()})
+
+    @classmethod
+    def from_json(cls, json_file: str, **options) -> 'ExamGenerator':
+        with open(json_file, 'r', encoding='utf-8') as f:
+            return cls((question_from_dict(q) for q in json.load(f)['questions']), **options)
+
+    def excluding(self, seen_keys: Iterable[str]) -> 'ExamGenerator':
+        """A generator for one user that prefers questions whose concept they have not seen.
+
+        Seeing any wording of a concept counts as seeing it. Chapter pools are
+        split into fresh and seen concepts once, here; draws take seen ones only
+        when a chapter has run out of fresh ones.
+        """
+        seen = {self.concept_of[self.positions[key]] for key in seen_keys if key in self.positions}
+        view = object.__new__(ExamGenerator)
+        view.__dict__.update(self.__dict__)
+        view.pools = {chapter: tuple(c for c in pool if c not in seen) for chapter, pool in self.pools.items()}
+        view.stale = {chapter: tuple(c for c in pool if c in seen) for chapter, pool in self.pools.items()}
+        return view
+
+    def draw(self, seed: Optional[int] = None) -> Tuple[List[int], int]:
+        """Bank positions of one exam's questions in random order, and how many are repeats of seen concepts"""
+        rng = random.Random(seed)
+        sample = rng.sample
+        randrange = rng.randrange
+        variants = self.variants
+        picked: List[int] = []
+        repeats = 0
+        for chapter, quota in self.quotas.items():
+            pool = self.pools[chapter]
+            if len(pool) >= quota:
+                concepts = sample(pool, quota)
+            else:
+                concepts = list(pool) + sample(self.stale[chapter], quota - len(pool))
+                repeats += quota - len(pool)
+            for concept in concepts:
+                members = variants[concept]
+                picked.append(members[0] if len(members) == 1 else members[randrange(len(members))])
+        rng.shuffle(picked)
+        return picked, repeats
+
+    def generate(self, seed: Optional[int] = None) -> Dict:
+        """One exam as a JSON-ready dict of question keys"""
+        if seed is None:
+            seed = random.randrange(1 << 32)
+        positions, repeats = self.draw(seed)
+        return {
+            'seed': seed,
+            'question_keys': [self.keys[position] for position in positions],
+            'chapters': dict(Counter(self.concept_chapter[self.concept_of[position]] for position in positions)),
+            'repeats': repeats
+        }
+
+    def generate_many(self, count: int, seed: int = 0) -> List[Dict]:
+        """count exams; exam i uses seed + i, so any one of them can be regenerated alone"""
+        return [self.generate(seed + i) for i in range(count)]
+
+    def exam_questions(self, exam: Dict) -> List[Question]:
+        return [self.questions[self.positions[key]] for key in exam['question_keys']]
+
+    def summary(self) -> Dict:
+        return {
+            'questions': len(self.questions),
+            'concepts': len(self.variants),
+            'pools': {chapter: len(pool) for chapter, pool in self.pools.items()},
+            'quotas': self.quotas,
+            'exam_size': self.size,
+            'pass_mark': PASS_MARK
+        }
+
+
+def _load_seen(path: str) -> List[str]:
+    """Seen question keys from a JSON list, or from an exams file written by this tool"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict):
+        return [key for exam in data.get('exams', []) for key in exam['question_keys']]
+    return list(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate randomized mock exams from the question bank')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Crawled question bank')
+    parser.add_argument('--count', type=int, default=1,
+                       help='Number of exams to generate')
+    parser.add_argument('--seed', type=int, default=0,
+                       help='Seed of the first exam; exam i uses seed + i')
+    parser.add_argument('--size', type=int, default=EXAM_SIZE,
+                       help='Questions per exam')
+    parser.add_argument('--threshold', type=float, default=0.8,
+                       help='Similarity at which two questions count as the same question')
+    parser.add_argument('--seen',
+                       help='JSON list of question keys (or an exams file) the user has already seen')
+    parser.add_argument('--with-questions', action='store_true',
+                       help='Include full question content in the output')
+    parser.add_argument('--output', help='Write the exams to this JSON file')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Time exam draws instead of writing exams')
+
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    generator = ExamGenerator.from_json(args.json_file, size=args.size, threshold=args.threshold)
+    setup_sec = time.perf_counter() - started
+    summary = generator.summary()
+    print(f"🎲 {summary['questions']} questions in {summary['concepts']} distinct concepts, indexed in {setup_sec:.2f}s")
+    print(f"  Mix per exam: " + ', '.join(f"{chapter} {quota}" for chapter, quota in summary['quotas'].items()))
+
+    if args.seen:
+        generator = generator.excluding(_load_seen(args.seen))
+
+    if args.benchmark:
+        rounds = max(args.count, 10000)
+        started = time.perf_counter()
+        for i in range(rounds):
+            generator.draw(args.seed + i)
+        elapsed = time.perf_counter() - started
+        print(f"⏱️  {rounds} draws in {elapsed:.3f}s ({elapsed / rounds * 1e6:.1f} µs per exam)")
+        return
+
+    exams = generator.generate_many(args.count, args.seed)
+    if args.with_questions:
+        for exam in exams:
+            exam['questions'] = [question_to_dict(question) for question in generator.exam_questions(exam)]
+    repeats = sum(exam['repeats'] for exam in exams)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'summary': summary, 'exams': exams}, f, indent=2, ensure_ascii=False)
+        print(f"📝 {len(exams)} exams written to {args.output}" + (f" ({repeats} repeated questions)" if repeats else ""))
+    else:
+        for exam in exams:
+            print(f"  seed {exam['seed']}: {', '.join(exam['question_keys'])}")
+
+
+if __name__ == "__main__":
+    main()
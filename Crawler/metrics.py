@@ -0,0 +1,334 @@
+import bisect
+import contextvars
+import json
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+PREFIX = 'ukvisa_'
+# Seconds; the same spread as the Prometheus client defaults, plus a 1 ms bucket for parsing and queries
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('current_span', default=None)
+
+LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict) -> LabelKey:
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus exposes them"""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'Histogram'):
+        self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+        self.count += other.count
+        self.sum += other.sum
+        self.max = max(self.max, other.max)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total = 0
+        result = []
+        for bound, count in zip(list(self.buckets) + ['+Inf'], self.counts):
+            total += count
+            result.append((str(bound), total))
+        return result
+
+
+class Span:
+    """A timed operation in OpenTelemetry's shape: trace and span ids, parent, attributes, status"""
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'start_ns', 'end_ns', 'attributes', 'status', 'token')
+
+    def __init__(self, name: str, attributes: Dict):
+        parent = _current_span.get()
+        self.name = name
+        self.trace_id = parent.trace_id if parent else f"{random.getrandbits(128):032x}"
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent.span_id if parent else None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.status = 'OK'
+        self.token = _current_span.set(self)
+
+    def to_dict(self) -> Dict:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_span_id': self.parent_id,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'attributes': self.attributes,
+            'status': self.status
+        }
+
+
+class _NoopTimer:
+    """What timer() hands out while metrics and tracing are both off"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attributes):
+        pass
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class _Timer:
+    __slots__ = ('registry', 'name', 'labels', 'attributes', 'span', 'started')
+
+    def __init__(self, registry: 'Metrics', name: str, labels: Dict, attributes: Optional[Dict]):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+        self.attributes = attributes
+        self.span = None
+
+    def __enter__(self):
+        if self.registry.tracing:
+            attributes = {key: str(value) for key, value in self.labels.items()}
+            attributes.update(self.attributes or {})
+            self.span = Span(self.name, attributes)
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        registry = self.registry
+        registry.observe(f"{self.name}_seconds", elapsed, **self.labels)
+        if exc_type is not None:
+            registry.count(f"{self.name}_errors", **self.labels)
+        if self.span is not None:
+            span = self.span
+            span.end_ns = time.time_ns()
+            if exc_type is not None:
+                span.status = 'ERROR'
+                span.attributes['error'] = f"{exc_type.__name__}: {exc}"
+            _current_span.reset(span.token)
+            registry.record_span(span)
+        return False
+
+    def set(self, **attributes):
+        """Attach attributes to the span (e.g. how many questions a page held)"""
+        if self.span is not None:
+            self.span.attributes.update(attributes)
+
+
+class Metrics:
+    """Process-wide counters, gauges, histograms and trace spans for crawls and data commands.
+
+    Everything is off until configure() is given an output file. While off,
+    count()/gauge()/observe() return after one attribute check and timer()
+    returns a shared no-op context manager, so instrumented hot paths cost
+    well under a microsecond per call. Metrics export as Prometheus text
+    (.prom, for the node_exporter textfile collector) or a JSON summary;
+    spans export as one JSON object per line.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.tracing = False
+        self.output: Optional[str] = None
+        self.trace_output: Optional[str] = None
+        self.max_spans = Config.METRICS_MAX_SPANS
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.counters: Dict[LabelKey, float] = {}
+            self.gauges: Dict[LabelKey, float] = {}
+            self.histograms: Dict[LabelKey, Histogram] = {}
+            self.spans: List[Span] = []
+            self.dropped_spans = 0
+
+    def configure(self, output: Optional[str] = None, trace_output: Optional[str] = None,
+                  max_spans: Optional[int] = None):
+        """Turn metrics on when output is set and tracing on when trace_output is set; both default to .env"""
+        self.output = output or Config.METRICS_OUTPUT or None
+        self.trace_output = trace_output or Config.TRACE_OUTPUT or None
+        self.enabled = self.output is not None
+        self.tracing = self.trace_output is not None
+        if max_spans is not None:
+            self.max_spans = max_spans
+
+    def collect_only(self):
+        """Record without any output, in a worker process whose metrics the parent merges (see collect())"""
+        self.enabled = True
+
+    def collect(self) -> Tuple[Dict, Dict, Dict]:
+        """Hand over the counters, gauges and histograms recorded so far and start afresh"""
+        with self.lock:
+            collected = self.counters, self.gauges, self.histograms
+            self.counters, self.gauges, self.histograms = {}, {}, {}
+        return collected
+
+    def merge(self, collected: Tuple[Dict, Dict, Dict]):
+        """Add what another process's collect() returned"""
+        if not self.enabled:
+            return
+        counters, gauges, histograms = collected
+        with self.lock:
+            for key, value in counters.items():
+                self.counters[key] = self.counters.get(key, 0) + value
+            self.gauges.update(gauges)
+            for key, histogram in histograms.items():
+                if key in self.histograms:
+                    self.histograms[key].merge(histogram)
+                else:
+                    self.histograms[key] = histogram
+
+    def count(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def timer(self, name: str, attributes: Optional[Dict] = None, **labels):
+        """Context manager feeding <name>_seconds (and <name>_errors on exceptions) and, if tracing, a span.
+
+        Labels become metric labels and span attributes, so keep them low
+        cardinality; per-item details such as a test path go in attributes,
+        which only spans carry.
+        """
+        if not self.enabled and not self.tracing:
+            return _NOOP_TIMER
+        return _Timer(self, name, labels, attributes)
+
+    def record_span(self, span: Span):
+        with self.lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped_spans += 1
+
+    def summary(self) -> Dict:
+        def name_of(key: LabelKey) -> str:
+            name, labels = key
+            return name + ('{' + ','.join(f"{label}={value}" for label, value in labels) + '}' if labels else '')
+
+        with self.lock:
+            return {
+                'counters': {name_of(key): value for key, value in sorted(self.counters.items())},
+                'gauges': {name_of(key): value for key, value in sorted(self.gauges.items())},
+                'histograms': {
+                    name_of(key): {
+                        'count': histogram.count,
+                        'sum_sec': round(histogram.sum, 6),
+                        'avg_ms': round(histogram.sum / histogram.count * 1000, 3) if histogram.count else 0.0,
+                        'max_ms': round(histogram.max * 1000, 3),
+                        'buckets': dict(histogram.cumulative())
+                    }
+                    for key, histogram in sorted(self.histograms.items())
+                },
+                'spans': len(self.spans),
+                'dropped_spans': self.dropped_spans
+            }
+
+    def prometheus(self) -> str:
+        """The text exposition format, one HELP-less TYPE block per metric family"""
+        def labels_text(labels: Tuple, extra: Tuple = ()) -> str:
+            pairs = labels + extra
+            if not pairs:
+                return ''
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+            return '{' + ','.join(f'{label}="{value}"' for (label, _), value in zip(pairs, escaped)) + '}'
+
+        lines = []
+        with self.lock:
+            families: Dict[Tuple[str, str], List] = {}
+            for (name, labels), value in sorted(self.counters.items()):
+                families.setdefault((f"{PREFIX}{name}_total", 'counter'), []).append((labels, value))
+            for (name, labels), value in sorted(self.gauges.items()):
+                families.setdefault((PREFIX + name, 'gauge'), []).append((labels, value))
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                families.setdefault((PREFIX + name, 'histogram'), []).append((labels, histogram))
+
+            for (name, kind), samples in families.items():
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    if kind != 'histogram':
+                        lines.append(f"{name}{labels_text(labels)} {value}")
+                        continue
+                    for bound, count in value.cumulative():
+                        lines.append(f"{name}_bucket{labels_text(labels, (('le', bound),))} {count}")
+                    lines.append(f"{name}_sum{labels_text(labels)} {value.sum}")
+                    lines.append(f"{name}_count{labels_text(labels)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+    def export(self, path: str):
+        """Prometheus text for .prom/.txt files, a JSON summary otherwise; written atomically"""
+        if path.endswith(('.prom', '.txt')):
+            content = self.prometheus()
+        else:
+            content = json.dumps(self.summary(), indent=2)
+        temporary = f"{path}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(temporary, path)
+
+    def export_spans(self, path: str):
+        with self.lock:
+            spans = list(self.spans)
+        with open(path, 'w', encoding='utf-8') as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), ensure_ascii=False) + '\n')
+
+    def flush(self):
+        """Write whatever is enabled to its configured output"""
+        if self.enabled:
+            self.export(self.output)
+            logger.info(f"Metrics written to {self.output}")
+        if self.tracing:
+            self.export_spans(self.trace_output)
+            logger.info(f"{len(self.spans)} spans written to {self.trace_output}"
+                        + (f" ({self.dropped_spans} dropped)" if self.dropped_spans else ""))
+
+
+metrics = Metrics()
@@ -0,0 +1,281 @@
+import argparse
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from question_stream import iter_questions
+
+# MinHash permutations are multiply-shift hashes, ((a * x + b) mod 2**64) >> 32,
+# which need no modulo and let uint64 arithmetic wrap
+HASH_SHIFT = np.uint64(32)
+MAX_CHUNK_SHINGLES = 1 << 16
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace"""
+    return ' '.join(re.findall(r'\w+', text.lower()))
+
+
+def lsh_params(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """Pick (bands, rows) whose S-curve midpoint (1/b)^(1/r) sits just under the threshold"""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        midpoint = (1 / bands) ** (1 / rows)
+        if midpoint <= threshold and (best is None or midpoint > best[0]):
+            best = (midpoint, bands, rows)
+    return (best[1], best[2]) if best else (num_perm, 1)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+class NearDuplicateIndex:
+    """MinHash/LSH index over normalised question texts.
+
+    Texts are cut into character shingles, hashed and summarised by num_perm
+    MinHash values, all with NumPy over the whole bank. LSH banding turns
+    each signature into bucket keys, so candidate pairs only come from shared
+    buckets; candidates are then kept if their estimated Jaccard similarity
+    reaches the threshold. Identical normalised texts are collapsed up front.
+    """
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = lsh_params(num_perm, threshold)
+
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.b = rng.integers(0, 1 << 63, size=num_perm, dtype=np.uint64)
+        self.band_mix = rng.integers(1, 1 << 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+
+        self.texts: List[str] = []
+        self.signatures = np.zeros((0, num_perm), dtype=np.uint32)
+
+    def _shingle_hashes(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """32-bit hashes of every k-character window, plus each text's start offset"""
+        k = self.shingle_size
+        padded = [text.ljust(k).encode('utf-8') for text in texts]
+        lengths = np.fromiter((len(text) for text in padded), dtype=np.int64, count=len(padded))
+        data = np.frombuffer(b''.join(padded), dtype=np.uint8).astype(np.uint64)
+
+        # Polynomial hash of each window, then drop windows that straddle two texts
+        windows = np.lib.stride_tricks.sliding_window_view(data, k)
+        powers = np.uint64(257) ** np.arange(k - 1, -1, -1, dtype=np.uint64)
+        hashes = (windows * powers).sum(axis=1, dtype=np.uint64)
+
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        valid = np.ones(len(hashes), dtype=bool)
+        for offset in range(1, k):
+            cut = starts[1:] - offset
+            valid[cut[cut >= 0]] = False
+
+        hashes = hashes[valid]
+        hashes = (hashes * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+        counts = lengths - k + 1
+        return hashes, np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    def _minhash(self, texts: List[str]) -> np.ndarray:
+        hashes, offsets = self._shingle_hashes(texts)
+        ends = np.append(offsets[1:], len(hashes))
+        signatures = np.empty((len(texts), self.num_perm), dtype=np.uint32)
+
+        # Process whole texts in chunks so the (num_perm x shingles) matrix stays small
+        first = 0
+        while first < len(texts):
+            last = int(np.searchsorted(ends, offsets[first] + MAX_CHUNK_SHINGLES, side='right'))
+            last = max(last, first + 1)
+            chunk = hashes[offsets[first]:ends[last - 1]]
+            permuted = ((np.outer(self.a, chunk) + self.b[:, None]) >> HASH_SHIFT).astype(np.uint32)
+            signatures[first:last] = np.minimum.reduceat(permuted, offsets[first:last] - offsets[first], axis=1).T
+            first = last
+        return signatures
+
+    def add(self, texts: List[str]):
+        """Index more normalised texts (positions continue from earlier calls)"""
+        if not texts:
+            return
+        self.texts.extend(texts)
+        self.signatures = np.vstack([self.signatures, self._minhash(texts)])
+
+    def similarity(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """Estimated Jaccard similarity for pairs of text positions"""
+        return (self.signatures[left] == self.signatures[right]).mean(axis=1)
+
+    def candidate_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairs sharing at least one LSH bucket, linking each bucket's members to its first member"""
+        lefts, rights = [], []
+        if len(self.texts) < 2:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        for band in range(self.bands):
+            rows = self.signatures[:, band * self.rows:(band + 1) * self.rows]
+            keys = (rows.astype(np.uint64) * self.band_mix).sum(axis=1, dtype=np.uint64)
+            order = np.argsort(keys, kind='stable')
+            sorted_keys = keys[order]
+            new_bucket = np.concatenate(([True], sorted_keys[1:] != sorted_keys[:-1]))
+            heads = order[np.flatnonzero(new_bucket)[np.cumsum(new_bucket) - 1]]
+            linked = heads != order
+            lefts.append(heads[linked])
+            rights.append(order[linked])
+
+        pairs = np.unique(np.stack([np.concatenate(lefts), np.concatenate(rights)], axis=1), axis=0)
+        return pairs[:, 0], pairs[:, 1]
+
+    def clusters(self) -> List[Tuple[List[int], float]]:
+        """Groups of text positions above the threshold, with each group's lowest verified similarity"""
+        lefts, rights = self.candidate_pairs()
+        scores = self.similarity(lefts, rights) if len(lefts) else np.zeros(0)
+        keep = scores >= self.threshold
+
+        groups = _UnionFind(len(self.texts))
+        for left, right in zip(lefts[keep].tolist(), rights[keep].tolist()):
+            groups.union(left, right)
+
+        members: Dict[int, List[int]] = {}
+        for position in range(len(self.texts)):
+            members.setdefault(groups.find(position), []).append(position)
+        lowest: Dict[int, float] = {}
+        for left, score in zip(lefts[keep].tolist(), scores[keep].tolist()):
+            root = groups.find(left)
+            lowest[root] = min(lowest.get(root, 1.0), score)
+
+        return [(positions, lowest.get(root, 1.0)) for root, positions in members.items() if len(positions) > 1]
+
+
+def _answer_agreement(questions: List[Dict]) -> Dict:
+    """How consistently a cluster's questions offer and mark the same answers"""
+    answer_sets = [frozenset(normalize_text(a['text']) for a in q['answers']) for q in questions]
+    correct_sets = [
+        frozenset(normalize_text(a['text']) for a in q['answers'] if a.get('is_correct')) for q in questions
+    ]
+    answer_share = Counter(answer_sets).most_common(1)[0][1] / len(questions)
+    known = [correct for correct in correct_sets if correct]
+    correct_share = Counter(known).most_common(1)[0][1] / len(known) if known else 0.0
+    return {
+        'answer_set_agreement': round(answer_share, 3),
+        'correct_answer_agreement': round(correct_share, 3),
+        'conflicting_correct_answers': len(set(known)) > 1
+    }
+
+
+def find_near_duplicates(questions: Iterable[Dict], threshold: float = 0.8, num_perm: int = 128,
+                         shingle_size: int = 5) -> List[Dict]:
+    """Cluster near-duplicate questions, largest clusters first"""
+    by_text: Dict[str, List[Dict]] = {}
+    for q in questions:
+        by_text.setdefault(normalize_text(q['question_text']), []).append(q)
+
+    texts = list(by_text)
+    index = NearDuplicateIndex(threshold, num_perm, shingle_size)
+    index.add(texts)
+
+    groups = index.clusters()
+    clustered = {position for positions, _ in groups for position in positions}
+    # Texts repeated verbatim but without reworded variants are clusters of their own
+    groups += [([position], 1.0) for position, text in enumerate(texts)
+               if len(by_text[text]) > 1 and position not in clustered]
+
+    duplicates = []
+    for positions, similarity in groups:
+        members = [q for position in positions for q in by_text[texts[position]]]
+        text = texts[positions[0]]
+        cluster = {
+            'question_text': text[:100] + "..." if len(text) > 100 else text,
+            'similarity': round(similarity, 3),
+            'variants': len(positions),
+            'occurrences': [
+                {
+                    'id': q['id'],
+                    'chapter': q.get('chapter', 'comprehensive'),
+                    'test_number': q['test_number'],
+                    'test_type': q.get('test_type', 'unknown'),
+                    'question_text': q['question_text']
+                }
+                for q in members
+            ]
+        }
+        cluster.update(_answer_agreement(members))
+        duplicates.append(cluster)
+
+    duplicates.sort(key=lambda cluster: len(cluster['occurrences']), reverse=True)
+    return duplicates
+
+
+def perturb(question: Dict, rng: random.Random, copy: int, vocabulary: List[str]) -> Dict:
+    """A reworded copy of a question: one word swapped for a random one, punctuation varied"""
+    words = question['question_text'].rstrip('?').split()
+    words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    text = ' '.join(words) + rng.choice(['?', ' ?', ''])
+    return dict(question, id=f"{question['id']}-{copy}", question_text=text)
+
+
+def benchmark(questions: List[Dict], sizes: List[int], threshold: float, seed: int = 7) -> List[Dict]:
+    """Time clustering on synthetic banks of reworded copies of the given questions"""
+    rng = random.Random(seed)
+    vocabulary = sorted({word for q in questions for word in normalize_text(q['question_text']).split()})
+    results = []
+    for size in sizes:
+        bank = [perturb(questions[i % len(questions)], rng, i, vocabulary) for i in range(size)]
+        started = time.perf_counter()
+        clusters = find_near_duplicates(bank, threshold)
+        elapsed = time.perf_counter() - started
+        results.append({
+            'questions': size,
+            'distinct_texts': len({normalize_text(q['question_text']) for q in bank}),
+            'clusters': len(clusters),
+            'elapsed_sec': round(elapsed, 3),
+            'questions_per_sec': round(size / elapsed, 1)
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find near-duplicate questions with MinHash/LSH')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='JSON or NDJSON export to scan')
+    parser.add_argument('--threshold', type=float, default=0.8,
+                       help='Minimum estimated Jaccard similarity of question texts')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Time synthetic banks of 1k, 10k and 100k questions')
+
+    args = parser.parse_args()
+
+    questions = list(iter_questions(args.json_file))
+
+    if args.benchmark:
+        for result in benchmark(questions, [1000, 10000, 100000], args.threshold):
+            print(f"  {result['questions']:7} questions ({result['distinct_texts']} distinct)  {result['elapsed_sec']:8.3f}s  "
+                  f"{result['questions_per_sec']:10.1f} questions/sec  {result['clusters']} clusters")
+        return
+
+    clusters = find_near_duplicates(questions, args.threshold)
+    conflicts = sum(1 for cluster in clusters if cluster['conflicting_correct_answers'])
+    print(f"🔍 {len(clusters)} duplicate clusters in {len(questions)} questions "
+          f"({sum(1 for c in clusters if c['variants'] > 1)} with reworded variants, {conflicts} with conflicting answers)")
+    for cluster in clusters[:10]:
+        print(f"  {len(cluster['occurrences']):3}x  sim {cluster['similarity']:.2f}  {cluster['question_text']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class PageCache:
+    """On-disk cache of raw test pages and the questions parsed from them.
+
+    HTML bodies are stored content-addressed under objects/<sha256>.html.
+    index.json maps each test path to its validators (ETag/Last-Modified),
+    current body hash and the parsed questions for every chapter/test
+    context the page was crawled under. Parsed questions are tagged with the
+    parse_version (parser backend and resolver versions) that produced them;
+    under any other version they count as a miss and the page is re-parsed.
+    """
+
+    def __init__(self, cache_dir: str, parse_version: str = ''):
+        self.cache_dir = cache_dir
+        self.parse_version = parse_version
+        self.objects_dir = os.path.join(cache_dir, 'objects')
+        self.index_file = os.path.join(cache_dir, 'index.json')
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.index: Dict[str, Dict] = {}
+        if os.path.exists(self.index_file):
+            with open(self.index_file, 'r', encoding='utf-8') as f:
+                self.index = json.load(f)
+
+        self.hits = 0
+        self.not_modified = 0
+        self.misses = 0
+
+    @staticmethod
+    def content_hash(html: str) -> str:
+        return hashlib.sha256(html.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def context_key(chapter: Optional[str], test_number: str, test_type: str) -> str:
+        return f"{test_type}|{chapter or ''}|{test_number}"
+
+    def _object_path(self, body_hash: str) -> str:
+        return os.path.join(self.objects_dir, f"{body_hash}.html")
+
+    def conditional_headers(self, test_path: str) -> Dict[str, str]:
+        """Validators to send so the server can answer 304 Not Modified"""
+        entry = self.index.get(test_path)
+        if not entry or not os.path.exists(self._object_path(entry['body_hash'])):
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def lookup(self, test_path: str, context_key: str, html: Optional[str]) -> Optional[List[Dict]]:
+        """Return cached question dicts if the page is unchanged, None on a miss.
+
+        Pass html=None for a 304 response.
+        """
+        entry = self.index.get(test_path)
+        if entry is not None:
+            body_hash = entry['body_hash'] if html is None else self.content_hash(html)
+            questions = entry['parsed'].get(context_key) if entry.get('parse_version') == self.parse_version else None
+            if body_hash == entry['body_hash'] and questions is not None:
+                self.hits += 1
+                if html is None:
+                    self.not_modified += 1
+                return questions
+
+        self.misses += 1
+        return None
+
+    def read_html(self, test_path: str) -> str:
+        """Load the cached body of a page (used after a 304 with nothing parsed yet)"""
+        with open(self._object_path(self.index[test_path]['body_hash']), 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def store(self, test_path: str, context_key: str, html: str, headers: Dict, questions: List[Dict]):
+        """Record a freshly parsed page"""
+        body_hash = self.content_hash(html)
+        object_path = self._object_path(body_hash)
+        if not os.path.exists(object_path):
+            with open(object_path, 'w', encoding='utf-8') as f:
+                f.write(html)
+
+        entry = self.index.get(test_path)
+        if entry is None or entry['body_hash'] != body_hash:
+            entry = {'body_hash': body_hash, 'parsed': {}}
+            self.index[test_path] = entry
+        if entry.get('parse_version') != self.parse_version:
+            # Never mix results of different parsers or resolvers in one entry
+            entry['parse_version'] = self.parse_version
+            entry['parsed'] = {}
+
+        # Keep validators from the previous response when the server omits them (e.g. 304)
+        if headers.get('ETag'):
+            entry['etag'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            entry['last_modified'] = headers['Last-Modified']
+        entry['parsed'][context_key] = questions
+
+    def save(self):
+        """Write the index atomically"""
+        tmp_file = f"{self.index_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(self.index, f, ensure_ascii=False)
+        os.replace(tmp_file, self.index_file)
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            'hits': self.hits,
+            'not_modified': self.not_modified,
+            'misses': self.misses
+        }
@@ -0,0 +1,266 @@
+import argparse
+import glob
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import lxml.html
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change alters what any backend extracts, so page caches re-parse
+PARSER_VERSION = 1
+
+
+@dataclass
+class ParsedQuestion:
+    """Raw fields of one question container, before correct answers are resolved"""
+    question_id: str
+    question_text: str
+    question_type: str  # 'radio' or 'checkbox'
+    answers: List[Tuple[str, str]]  # (answer_id, answer_text)
+    explanation: Optional[str]  # None when the page has no explanation block
+    strong_texts: List[str] = field(default_factory=list)
+
+
+class SoupParser:
+    """BeautifulSoup backend; 'html.parser' with reparse_labels=True is the original code path"""
+
+    def __init__(self, features: str = 'html.parser', reparse_labels: bool = False):
+        self.features = features
+        self.reparse_labels = reparse_labels
+
+    def _answer_text(self, item, label) -> str:
+        if not label:
+            return item.get_text(strip=True)
+
+        if self.reparse_labels:
+            # Clone the label and remove input to get clean text
+            label_copy = BeautifulSoup(str(label), 'html.parser').find('label')
+            input_in_label = label_copy.find('input')
+            if input_in_label:
+                input_in_label.decompose()
+            return label_copy.get_text(strip=True)
+
+        # <input> is a void element, so it never contributes text to the label
+        return label.get_text(strip=True)
+
+    def parse(self, html_content: str) -> List[ParsedQuestion]:
+        soup = BeautifulSoup(html_content, self.features)
+        records = []
+
+        for container in soup.find_all('div', class_='container_question'):
+            try:
+                question_element = container.find('div', class_='question')
+                if not question_element:
+                    continue
+
+                answer_container = container.find('ul', class_='container_answer')
+                if not answer_container:
+                    continue
+
+                answers = []
+                question_type = 'radio'  # default
+                for item in answer_container.find_all('li'):
+                    input_element = item.find('input')
+                    if not input_element:
+                        continue
+                    if input_element.get('type', 'radio') == 'checkbox':
+                        question_type = 'checkbox'
+                    answers.append((input_element.get('data-id_answer', ''), self._answer_text(item, item.find('label'))))
+
+                explanation = None
+                strong_texts = []
+                explanation_container = container.find('div', class_='container_explication')
+                if explanation_container:
+                    explanation = explanation_container.get_text(strip=True)
+                    strong_texts = [strong.get_text(strip=True) for strong in explanation_container.find_all('strong')]
+
+                records.append(ParsedQuestion(
+                    question_id=container.get('data-id_question', ''),
+                    question_text=question_element.get_text(strip=True),
+                    question_type=question_type,
+                    answers=answers,
+                    explanation=explanation,
+                    strong_texts=strong_texts
+                ))
+
+            except Exception as e:
+                logger.error(f"Error extracting question from container: {e}")
+                continue
+
+        return records
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+class LxmlParser:
+    """lxml/XPath backend that reads text straight from the tree without re-serializing"""
+
+    # Text in these elements is not part of get_text() in BeautifulSoup either
+    SKIP_TEXT_TAGS = {'script', 'style', 'template'}
+
+    CONTAINERS = f"//div[{_has_class('container_question')}]"
+    QUESTION = f".//div[{_has_class('question')}]"
+    ANSWER_CONTAINER = f".//ul[{_has_class('container_answer')}]"
+    EXPLANATION = f".//div[{_has_class('container_explication')}]"
+
+    def _text(self, element) -> str:
+        """Equivalent of BeautifulSoup's get_text(strip=True)"""
+        parts = []
+
+        def walk(node):
+            if node.text and node.tag not in self.SKIP_TEXT_TAGS:
+                parts.append(node.text)
+            for child in node:
+                # Comments and processing instructions have a non-string tag
+                if isinstance(child.tag, str) and child.tag not in self.SKIP_TEXT_TAGS:
+                    walk(child)
+                if child.tail:
+                    parts.append(child.tail)
+
+        walk(element)
+        return ''.join(part.strip() for part in parts if part.strip())
+
+    @staticmethod
+    def _first(element, path: str):
+        matches = element.xpath(path)
+        return matches[0] if matches else None
+
+    def parse(self, html_content: str) -> List[ParsedQuestion]:
+        if not html_content.strip():
+            return []
+
+        tree = lxml.html.fromstring(html_content)
+        records = []
+
+        for container in tree.xpath(self.CONTAINERS):
+            try:
+                question_element = self._first(container, self.QUESTION)
+                if question_element is None:
+                    continue
+
+                answer_container = self._first(container, self.ANSWER_CONTAINER)
+                if answer_container is None:
+                    continue
+
+                answers = []
+                question_type = 'radio'  # default
+                for item in answer_container.iter('li'):
+                    input_element = self._first(item, './/input')
+                    if input_element is None:
+                        continue
+                    if input_element.get('type', 'radio') == 'checkbox':
+                        question_type = 'checkbox'
+                    label = self._first(item, './/label')
+                    answer_text = self._text(label if label is not None else item)
+                    answers.append((input_element.get('data-id_answer', ''), answer_text))
+
+                explanation = None
+                strong_texts = []
+                explanation_container = self._first(container, self.EXPLANATION)
+                if explanation_container is not None:
+                    explanation = self._text(explanation_container)
+                    strong_texts = [self._text(strong) for strong in explanation_container.iter('strong')]
+
+                records.append(ParsedQuestion(
+                    question_id=container.get('data-id_question', ''),
+                    question_text=self._text(question_element),
+                    question_type=question_type,
+                    answers=answers,
+                    explanation=explanation,
+                    strong_texts=strong_texts
+                ))
+
+            except Exception as e:
+                logger.error(f"Error extracting question from container: {e}")
+                continue
+
+        return records
+
+
+PARSER_BACKENDS = {
+    'html.parser': lambda: SoupParser('html.parser', reparse_labels=True),
+    'bs4-lxml': lambda: SoupParser('lxml'),
+    'lxml': LxmlParser
+}
+
+
+def get_parser(name: str):
+    """Create a parser backend by name"""
+    if name not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{name}', choose from {', '.join(PARSER_BACKENDS)}")
+    return PARSER_BACKENDS[name]()
+
+
+def load_pages(pages_dir: Optional[str] = None, json_file: Optional[str] = None) -> Dict[str, str]:
+    """Load saved HTML pages from a directory, or render them from a question bank"""
+    if pages_dir:
+        pages = {}
+        for path in sorted(glob.glob(os.path.join(pages_dir, '*.html'))):
+            with open(path, 'r', encoding='utf-8') as f:
+                pages[os.path.basename(path)] = f.read()
+        return pages
+
+    from stub_server import build_pages_from_json
+    return build_pages_from_json(json_file)
+
+
+def compare_backends(pages: Dict[str, str], backends: List[str], reference: str = 'html.parser') -> Dict[str, List[str]]:
+    """Parse every page with each backend and list pages whose output differs from the reference"""
+    expected = {name: get_parser(reference).parse(html) for name, html in pages.items()}
+    mismatches = {}
+    for backend in backends:
+        parser = get_parser(backend)
+        mismatches[backend] = [name for name, html in pages.items() if parser.parse(html) != expected[name]]
+    return mismatches
+
+
+def benchmark_backends(pages: Dict[str, str], backends: List[str], rounds: int = 3) -> Dict[str, float]:
+    """Best-of-N mean parse time per page in milliseconds for each backend"""
+    results = {}
+    for backend in backends:
+        parser = get_parser(backend)
+        best = None
+        for _ in range(rounds):
+            started = time.perf_counter()
+            for html in pages.values():
+                parser.parse(html)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[backend] = best / max(1, len(pages)) * 1000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Verify and benchmark HTML parser backends')
+    parser.add_argument('--pages-dir', help='Directory of saved *.html pages (e.g. .page_cache/objects)')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Question bank to render pages from when no pages dir is given')
+    parser.add_argument('--rounds', type=int, default=3, help='Benchmark rounds per backend')
+
+    args = parser.parse_args()
+
+    pages = load_pages(args.pages_dir, args.json_file)
+    backends = list(PARSER_BACKENDS)
+    print(f"📄 Loaded {len(pages)} pages")
+
+    mismatches = compare_backends(pages, backends)
+    timings = benchmark_backends(pages, backends, args.rounds)
+
+    baseline = timings['html.parser']
+    for backend in backends:
+        status = "✅ identical" if not mismatches[backend] else f"❌ {len(mismatches[backend])} pages differ"
+        print(f"  {backend:12} {timings[backend]:8.2f} ms/page  {baseline / timings[backend]:5.1f}x  {status}")
+
+    if any(mismatches.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
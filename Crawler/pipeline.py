@@ -0,0 +1,241 @@
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from config import Config
+from metrics import metrics
+from page_cache import PageCache
+from rate_limit import HostRateLimiter
+from uk_visa_test import Answer, Question, UKVisaTestCrawler, question_from_dict, question_to_dict
+
+logger = logging.getLogger(__name__)
+
+# Per-process extractor, created once by the pool initializer
+_worker_crawler = None
+
+
+def _init_parse_worker(parser_backend: str, collect_metrics: bool):
+    global _worker_crawler
+    _worker_crawler = UKVisaTestCrawler(parser_backend=parser_backend)
+    if collect_metrics:
+        # This process's registry is never flushed; each task hands its metrics back instead
+        metrics.collect_only()
+
+
+def question_to_record(question: Question) -> tuple:
+    """Pack a question into a flat tuple that pickles small and fast"""
+    return (
+        question.id, question.chapter, question.test_number, question.test_type,
+        question.question_text, question.question_type,
+        tuple((answer.id, answer.text, answer.is_correct) for answer in question.answers),
+        question.explanation, tuple(question.correct_answers)
+    )
+
+
+def question_from_record(record: tuple) -> Question:
+    question_id, chapter, test_number, test_type, question_text, question_type, answers, explanation, correct = record
+    return Question(
+        id=question_id,
+        chapter=chapter,
+        test_number=test_number,
+        test_type=test_type,
+        question_text=question_text,
+        question_type=question_type,
+        answers=[Answer(id=a[0], text=a[1], is_correct=a[2]) for a in answers],
+        explanation=explanation,
+        correct_answers=list(correct)
+    )
+
+
+def parse_page(html_content: str, chapter: Optional[str], test_number: str, test_type: str) -> Tuple[List[tuple], float, Tuple]:
+    """Process-pool task: parse one page into question records, the time it took and the metrics it recorded"""
+    started = time.perf_counter()
+    questions = _worker_crawler.extract_question_data(html_content, chapter, test_number, test_type)
+    return [question_to_record(q) for q in questions], time.perf_counter() - started, metrics.collect()
+
+
+@dataclass
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+    name: str
+    workers: int
+    items: int = 0
+    errors: int = 0
+    busy: float = 0.0  # summed time workers spent doing the stage's own work
+    blocked: float = 0.0  # summed time workers waited on the next stage
+    started: float = 0.0
+    finished: float = 0.0
+
+    def summary(self) -> Dict:
+        elapsed = max(self.finished - self.started, 0.0)
+        return {
+            'stage': self.name,
+            'workers': self.workers,
+            'items': self.items,
+            'errors': self.errors,
+            'elapsed_sec': round(elapsed, 3),
+            'items_per_sec': round(self.items / elapsed, 2) if elapsed > 0 else 0.0,
+            'busy_sec': round(self.busy, 3),
+            'blocked_sec': round(self.blocked, 3),
+            'utilisation': round(self.busy / (elapsed * self.workers), 3) if elapsed > 0 else 0.0
+        }
+
+
+class CrawlPipeline:
+    """Two-stage crawl: fetcher threads feed a bounded queue drained by a parser process pool.
+
+    The queue holds at most queue_size pages and at most two parse tasks per
+    worker are in flight, so when parsing falls behind the fetchers block on
+    put() instead of piling HTML up in memory.
+    """
+
+    def __init__(self, crawler: UKVisaTestCrawler, fetch_workers: Optional[int] = None,
+                 parse_workers: Optional[int] = None, queue_size: Optional[int] = None):
+        self.crawler = crawler
+        self.fetch_workers = fetch_workers or Config.CRAWLER_CONCURRENCY
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.queue_size = queue_size or Config.PIPELINE_QUEUE_SIZE
+        self.limiter = HostRateLimiter(Config.CRAWLER_RATE, Config.CRAWLER_BURST)
+        self._lock = threading.Lock()
+        self._reset_stats()
+
+    def _reset_stats(self):
+        self.pages = queue.Queue(maxsize=self.queue_size)
+        self.fetch_stats = StageStats('fetch', self.fetch_workers)
+        self.parse_stats = StageStats('parse', self.parse_workers)
+        self.max_queue_depth = 0
+
+    def _fetch(self, index: int, job: Tuple, headers: Dict):
+        test_path = job[0]
+        url = f"{self.crawler.base_url}/{test_path}"
+        if self.crawler.scheduler is None:
+            self.limiter.acquire_sync(url)
+        logger.info(f"Crawling: {url}")
+
+        started = time.perf_counter()
+        failed = False
+        try:
+            html_content, response_headers = self.crawler.fetch_page(test_path, headers)
+            # Parsing happens in worker processes, bypassing process_page, so pages are recorded here
+            if self.crawler.record_dir and html_content is not None:
+                self.crawler.record_page(test_path, html_content)
+        except Exception as e:
+            # Whatever fails, the job still puts exactly one item on the queue, or run_jobs waits forever
+            logger.error(f"Error crawling {url}: {e}")
+            html_content, response_headers, failed = None, {}, True
+        fetched = time.perf_counter()
+
+        # Blocks while the queue is full, throttling fetchers to the parse rate
+        self.pages.put((index, job, html_content, response_headers, failed))
+
+        with self._lock:
+            self.fetch_stats.items += 1
+            self.fetch_stats.errors += failed
+            self.fetch_stats.busy += fetched - started
+            self.fetch_stats.blocked += time.perf_counter() - fetched
+            self.fetch_stats.finished = time.perf_counter()
+
+    def _parse_done(self, future):
+        with self._lock:
+            self.parse_stats.items += 1
+            self.parse_stats.finished = time.perf_counter()
+            if future.exception() is not None:
+                self.parse_stats.errors += 1
+                metrics.count('parse_errors', parser=self.crawler.parser_backend)
+            else:
+                _, elapsed, collected = future.result()
+                self.parse_stats.busy += elapsed
+                # Parse workers are separate processes: parse and resolve timings, empty pages and
+                # unresolved answers come back with each result
+                metrics.merge(collected)
+
+    def run_jobs(self, jobs: List[Tuple]) -> List[Optional[List[Question]]]:
+        """Crawl all jobs and return each job's questions (None where it failed), in job order"""
+        self._reset_stats()
+        page_cache = self.crawler.page_cache
+        results: List[Optional[List[Question]]] = [None for _ in jobs]
+        parsing = []
+        slots = threading.BoundedSemaphore(self.parse_workers * 2)
+
+        # Validators are read up front so fetch threads never touch the cache index
+        headers = [page_cache.conditional_headers(job[0]) if page_cache else {} for job in jobs]
+
+        started = time.perf_counter()
+        self.fetch_stats.started = self.parse_stats.started = started
+
+        # spawn avoids forking while fetcher threads hold locks
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.parse_workers, mp_context=context, initializer=_init_parse_worker,
+                                 initargs=(self.crawler.parser_backend, metrics.enabled)) as parsers, \
+                ThreadPoolExecutor(self.fetch_workers) as fetchers:
+            for index, job in enumerate(jobs):
+                fetchers.submit(self._fetch, index, job, headers[index])
+
+            for _ in jobs:
+                self.max_queue_depth = max(self.max_queue_depth, self.pages.qsize())
+                index, job, html_content, response_headers, failed = self.pages.get()
+                if failed:
+                    continue
+
+                test_path, chapter, test_number, test_type = job
+                if page_cache:
+                    context_key = PageCache.context_key(chapter, test_number, test_type)
+                    cached = page_cache.lookup(test_path, context_key, html_content)
+                    if cached is not None:
+                        results[index] = [question_from_dict(q) for q in cached]
+                        continue
+                    if html_content is None:
+                        html_content = page_cache.read_html(test_path)
+
+                # Wait for a free parse slot; meanwhile the queue fills and fetchers stall
+                slots.acquire()
+                future = parsers.submit(parse_page, html_content, chapter, test_number, test_type)
+                future.add_done_callback(lambda f: slots.release())
+                future.add_done_callback(self._parse_done)
+                parsing.append((index, job, html_content, response_headers, future))
+
+            for index, job, html_content, response_headers, future in parsing:
+                test_path, chapter, test_number, test_type = job
+                try:
+                    records = future.result()[0]
+                except Exception as e:
+                    logger.error(f"Error parsing {test_path}: {e}")
+                    continue
+
+                results[index] = [question_from_record(record) for record in records]
+                logger.info(f"Extracted {len(records)} questions from {test_path}")
+                if page_cache:
+                    page_cache.store(test_path, PageCache.context_key(chapter, test_number, test_type),
+                                     html_content, response_headers, [question_to_dict(q) for q in results[index]])
+
+        self.elapsed = time.perf_counter() - started
+        self.log_summary()
+        return results
+
+    def run(self, jobs: List[Tuple]) -> List[Question]:
+        """Crawl all jobs and return their questions in job order"""
+        return [question for questions in self.run_jobs(jobs) if questions for question in questions]
+
+    def summary(self) -> Dict:
+        return {
+            'elapsed_sec': round(self.elapsed, 3),
+            'queue_size': self.queue_size,
+            'max_queue_depth': self.max_queue_depth,
+            'stages': [self.fetch_stats.summary(), self.parse_stats.summary()]
+        }
+
+    def log_summary(self):
+        summary = self.summary()
+        for stage in summary['stages']:
+            logger.info(
+                f"Pipeline {stage['stage']} stage: {stage['items']} pages, {stage['errors']} errors, "
+                f"{stage['items_per_sec']} pages/sec with {stage['workers']} workers "
+                f"(utilisation {stage['utilisation']:.0%}, blocked {stage['blocked_sec']}s)"
+            )
+        logger.info(f"Pipeline queue high-water mark: {summary['max_queue_depth']}/{summary['queue_size']}")
@@ -0,0 +1,337 @@
+import argparse
+import json
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import time
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from question_stream import iter_questions
+
+# File layout (all integers little-endian):
+#   header      MAGIC, version, question/answer/correct counts, section count
+#   directory   (name, offset, length) per section, every section 8-byte aligned
+#   sections    string blob + offsets, one array per column, and per-index
+#               keys / offsets / positions arrays for grouped lookups
+MAGIC = b'UKQB'
+VERSION = 1
+HEADER = struct.Struct('<4sIIIII')
+DIRECTORY_ENTRY = struct.Struct('<32sQQ')
+NO_STRING = 0xFFFFFFFF
+
+TEST_TYPES = ['chapter', 'comprehensive', 'exam']
+QUESTION_TYPES = ['radio', 'checkbox']
+INDEXES = ['test', 'chapter', 'test_type', 'question_type']
+BANK_EXTENSION = '.ukqb'
+
+
+def is_question_bank(filename: str) -> bool:
+    return filename.lower().endswith(BANK_EXTENSION)
+
+
+def test_key(test_type: str, chapter: Optional[str], test_number: str) -> str:
+    return f"{test_type}/{chapter or ''}/{test_number}"
+
+
+class _StringTable:
+    """Interns strings so repeated ids, chapters and answer texts are stored once"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.blob = bytearray()
+        self.offsets = array('I', [0])
+
+    def add(self, value: Optional[str]) -> int:
+        if value is None:
+            return NO_STRING
+        ref = self.index.get(value)
+        if ref is None:
+            ref = len(self.offsets) - 1
+            self.index[value] = ref
+            self.blob += value.encode('utf-8')
+            self.offsets.append(len(self.blob))
+        return ref
+
+
+def write_question_bank(questions: Iterable[Dict], path: str) -> int:
+    """Write question dicts (JSON export layout) to the columnar format, returning the count"""
+    strings = _StringTable()
+    columns = {name: array('I') for name in ('id', 'chapter', 'test_number', 'text', 'explanation',
+                                             'answer_start', 'correct_start', 'answer_id', 'answer_text', 'correct_id')}
+    codes = {'test_type': array('B'), 'question_type': array('B'), 'is_correct': array('B')}
+    groups: Dict[str, Dict[str, List[int]]] = {name: {} for name in INDEXES}
+
+    count = 0
+    for q in questions:
+        chapter = q.get('chapter')
+        test_type = q.get('test_type', 'chapter')
+        columns['id'].append(strings.add(q['id']))
+        columns['chapter'].append(strings.add(chapter))
+        columns['test_number'].append(strings.add(q['test_number']))
+        columns['text'].append(strings.add(q['question_text']))
+        columns['explanation'].append(strings.add(q.get('explanation')))
+        codes['test_type'].append(TEST_TYPES.index(test_type))
+        codes['question_type'].append(QUESTION_TYPES.index(q['question_type']))
+
+        columns['answer_start'].append(len(columns['answer_id']))
+        for answer in q['answers']:
+            columns['answer_id'].append(strings.add(answer['id']))
+            columns['answer_text'].append(strings.add(answer['text']))
+            codes['is_correct'].append(1 if answer.get('is_correct') else 0)
+
+        columns['correct_start'].append(len(columns['correct_id']))
+        for answer_id in q.get('correct_answers', []):
+            columns['correct_id'].append(strings.add(answer_id))
+
+        groups['test'].setdefault(test_key(test_type, chapter, q['test_number']), []).append(count)
+        groups['chapter'].setdefault(chapter or '', []).append(count)
+        groups['test_type'].setdefault(test_type, []).append(count)
+        groups['question_type'].setdefault(q['question_type'], []).append(count)
+        count += 1
+
+    columns['answer_start'].append(len(columns['answer_id']))
+    columns['correct_start'].append(len(columns['correct_id']))
+
+    sections = dict(columns)
+    sections.update(codes)
+    for name, index in groups.items():
+        keys = sorted(index)
+        offsets = array('I', [0])
+        positions = array('I')
+        for key in keys:
+            positions.extend(index[key])
+            offsets.append(len(positions))
+        sections[f'ix_{name}_keys'] = array('I', [strings.add(key) for key in keys])
+        sections[f'ix_{name}_offsets'] = offsets
+        sections[f'ix_{name}_pos'] = positions
+    # Index keys are interned too, so the string table goes in last
+    sections['str_blob'] = bytes(strings.blob)
+    sections['str_offsets'] = strings.offsets
+
+    payloads = {}
+    for name, data in sections.items():
+        if isinstance(data, array):
+            if sys.byteorder != 'little':
+                data = array(data.typecode, data)
+                data.byteswap()
+            payloads[name] = data.tobytes()
+        else:
+            payloads[name] = data
+
+    directory_size = HEADER.size + DIRECTORY_ENTRY.size * len(payloads)
+    offset = (directory_size + 7) & ~7
+    directory = []
+    for name, payload in payloads.items():
+        directory.append((name, offset, len(payload)))
+        offset = (offset + len(payload) + 7) & ~7
+
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, count, len(columns['answer_id']), len(columns['correct_id']), len(payloads)))
+        for name, section_offset, length in directory:
+            f.write(DIRECTORY_ENTRY.pack(name.encode('ascii'), section_offset, length))
+        for (name, section_offset, length) in directory:
+            f.write(b'\0' * (section_offset - f.tell()))
+            f.write(payloads[name])
+
+    return count
+
+
+class QuestionBank:
+    """Memory-mapped, read-only view of a columnar question bank.
+
+    Columns are memoryviews straight over the mapping, so opening a bank
+    costs a few syscalls and strings are only decoded when accessed.
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != 'little':
+            raise RuntimeError("Question bank files can only be mapped on little-endian hosts")
+
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+
+        magic, version, self.question_count, self.answer_count, _, section_count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} question bank")
+
+        self.sections = {}
+        for i in range(section_count):
+            raw_name, offset, length = DIRECTORY_ENTRY.unpack_from(self.mm, HEADER.size + i * DIRECTORY_ENTRY.size)
+            name = raw_name.rstrip(b'\0').decode('ascii')
+            section = self.view[offset:offset + length]
+            self.sections[name] = section if name == 'str_blob' else section.cast('B' if name in ('test_type', 'question_type', 'is_correct') else 'I')
+
+        self.str_blob = self.sections['str_blob']
+        self.str_offsets = self.sections['str_offsets']
+
+    def close(self):
+        for section in self.sections.values():
+            section.release()
+        self.str_blob = self.str_offsets = None
+        self.sections = {}
+        self.view.release()
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.question_count
+
+    def string(self, ref: int) -> Optional[str]:
+        if ref == NO_STRING:
+            return None
+        return str(self.str_blob[self.str_offsets[ref]:self.str_offsets[ref + 1]], 'utf-8')
+
+    def column(self, name: str) -> memoryview:
+        """Raw column (string refs or codes), for vectorised scans without decoding"""
+        return self.sections[name]
+
+    def question(self, i: int) -> Dict:
+        """Decode question i into the JSON export layout"""
+        s = self.sections
+        answer_start, answer_end = s['answer_start'][i], s['answer_start'][i + 1]
+        correct_start, correct_end = s['correct_start'][i], s['correct_start'][i + 1]
+        return {
+            'id': self.string(s['id'][i]),
+            'chapter': self.string(s['chapter'][i]),
+            'test_number': self.string(s['test_number'][i]),
+            'test_type': TEST_TYPES[s['test_type'][i]],
+            'question_text': self.string(s['text'][i]),
+            'question_type': QUESTION_TYPES[s['question_type'][i]],
+            'answers': [
+                {
+                    'id': self.string(s['answer_id'][a]),
+                    'text': self.string(s['answer_text'][a]),
+                    'is_correct': bool(s['is_correct'][a])
+                }
+                for a in range(answer_start, answer_end)
+            ],
+            'explanation': self.string(s['explanation'][i]),
+            'correct_answers': [self.string(s['correct_id'][c]) for c in range(correct_start, correct_end)]
+        }
+
+    def iter_questions(self) -> Iterator[Dict]:
+        for i in range(self.question_count):
+            yield self.question(i)
+
+    def metadata(self) -> Dict:
+        return {
+            'total_questions': self.question_count,
+            'test_types': {
+                test_type: len(self.positions('test_type', test_type)) for test_type in self.index_keys('test_type')
+            }
+        }
+
+    def index_keys(self, index: str) -> List[str]:
+        return [self.string(ref) for ref in self.sections[f'ix_{index}_keys']]
+
+    def positions(self, index: str, key: str) -> memoryview:
+        """Question positions for one index key, as a zero-copy slice (empty if absent)"""
+        keys = self.sections[f'ix_{index}_keys']
+        offsets = self.sections[f'ix_{index}_offsets']
+        positions = self.sections[f'ix_{index}_pos']
+
+        # Keys are sorted, so binary search the decoded key strings
+        lo, hi = 0, len(keys)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.string(keys[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(keys) and self.string(keys[lo]) == key:
+            return positions[offsets[lo]:offsets[lo + 1]]
+        return positions[0:0]
+
+    def by_test(self, test_type: str, test_number: str, chapter: Optional[str] = None) -> List[Dict]:
+        return [self.question(i) for i in self.positions('test', test_key(test_type, chapter, test_number))]
+
+    def by_chapter(self, chapter: Optional[str]) -> List[Dict]:
+        return [self.question(i) for i in self.positions('chapter', chapter or '')]
+
+    def by_test_type(self, test_type: str) -> List[Dict]:
+        return [self.question(i) for i in self.positions('test_type', test_type)]
+
+    def by_question_type(self, question_type: str) -> List[Dict]:
+        return [self.question(i) for i in self.positions('question_type', question_type)]
+
+
+def _peak_rss_kb() -> int:
+    # ru_maxrss survives exec on Linux, so prefer the process's own high-water mark
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _measure(kind: str, path: str, results):
+    started = time.perf_counter()
+    if kind == 'json':
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        sample = [q for q in data['questions'] if q.get('test_type') == 'comprehensive' and q['test_number'] == '1']
+    elif kind == 'bank':
+        bank = QuestionBank(path)
+        sample = bank.by_test('comprehensive', '1')
+    else:
+        sample = []
+    elapsed = time.perf_counter() - started
+    results.put((kind, elapsed, _peak_rss_kb(), len(sample)))
+
+
+def benchmark(json_file: str, bank_file: str) -> Dict[str, Dict]:
+    """Compare file size, cold-load time (load + fetch one test) and peak RSS in fresh processes"""
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    measured = {}
+    for kind, path in (('baseline', ''), ('json', json_file), ('bank', bank_file)):
+        process = context.Process(target=_measure, args=(kind, path, results))
+        process.start()
+        _, elapsed, max_rss_kb, sample = results.get()
+        process.join()
+        measured[kind] = {'load_ms': round(elapsed * 1000, 2), 'max_rss_kb': max_rss_kb, 'sample': sample}
+
+    baseline_rss = measured.pop('baseline')['max_rss_kb']
+    for kind, path in (('json', json_file), ('bank', bank_file)):
+        measured[kind]['size_kb'] = round(os.path.getsize(path) / 1024, 1)
+        measured[kind]['rss_over_baseline_kb'] = measured[kind]['max_rss_kb'] - baseline_rss
+    return measured
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and benchmark the columnar question bank')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='JSON or NDJSON export to convert')
+    parser.add_argument('--output', default='uk_visa_questions.ukqb',
+                       help='Question bank file to write')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Compare size, cold-load time and RSS against the JSON export')
+
+    args = parser.parse_args()
+
+    count = write_question_bank(iter_questions(args.json_file), args.output)
+    print(f"📦 Wrote {count} questions to {args.output}")
+
+    if args.benchmark:
+        results = benchmark(args.json_file, args.output)
+        for kind, result in results.items():
+            print(f"  {kind:5} {result['size_kb']:9.1f} KiB  load {result['load_ms']:8.2f} ms  "
+                  f"RSS +{result['rss_over_baseline_kb']} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from question_bank import NO_STRING, QUESTION_TYPES, TEST_TYPES, QuestionBank
+
+EXPECTED_COMPREHENSIVE_TESTS = 40
+CHAPTERS = ['chapter_1', 'chapter_2', 'chapter_3', 'chapter_4', 'chapter_5']
+
+
+def _first_seen(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Re-encode arbitrary integer codes as 0..n-1 in order of first appearance.
+
+    Returns (new codes, original value of each new code).
+    """
+    values, first, inverse = np.unique(codes, return_index=True, return_inverse=True)
+    order = np.argsort(first, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[inverse], values[order]
+
+
+class QuestionFrame:
+    """The question bank as NumPy columns, one entry per question.
+
+    Categorical columns (test_type, chapter, test_number, question_type) hold
+    codes into the matching labels list, numbered in order of first appearance.
+    """
+
+    CATEGORICAL = ('test_type', 'chapter', 'test_number', 'question_type')
+
+    def __init__(self, columns: Dict[str, np.ndarray], labels: Dict[str, List[Optional[str]]]):
+        self.columns = columns
+        self.labels = labels
+
+    def __len__(self) -> int:
+        return len(self.columns['answer_count'])
+
+    @classmethod
+    def from_questions(cls, questions: Iterable[Dict]) -> 'QuestionFrame':
+        """Build the frame in a single pass over question dicts"""
+        lookups = {name: {} for name in cls.CATEGORICAL}
+        codes = {name: [] for name in cls.CATEGORICAL}
+        answer_count, has_explanation, has_correct = [], [], []
+
+        for q in questions:
+            values = (q.get('test_type', 'unknown'), q.get('chapter'), q['test_number'], q['question_type'])
+            for name, value in zip(cls.CATEGORICAL, values):
+                lookup = lookups[name]
+                code = lookup.get(value)
+                if code is None:
+                    code = lookup[value] = len(lookup)
+                codes[name].append(code)
+            answer_count.append(len(q['answers']))
+            has_explanation.append(bool(q.get('explanation')))
+            has_correct.append(bool(q.get('correct_answers')))
+
+        columns = {name: np.array(codes[name], dtype=np.int32) for name in cls.CATEGORICAL}
+        columns['answer_count'] = np.array(answer_count, dtype=np.int32)
+        columns['has_explanation'] = np.array(has_explanation, dtype=bool)
+        columns['has_correct'] = np.array(has_correct, dtype=bool)
+        return cls(columns, {name: list(lookup) for name, lookup in lookups.items()})
+
+    @classmethod
+    def from_bank(cls, bank: QuestionBank) -> 'QuestionFrame':
+        """Build the frame straight from a mapped question bank, decoding only distinct labels"""
+        def column(name):
+            view = bank.column(name)
+            return np.frombuffer(view, dtype=np.uint32 if view.format == 'I' else np.uint8)
+
+        string_lengths = np.diff(column('str_offsets').astype(np.int64))
+        columns, labels = {}, {}
+
+        test_type_codes, test_type_values = _first_seen(column('test_type'))
+        columns['test_type'] = test_type_codes
+        labels['test_type'] = [TEST_TYPES[value] for value in test_type_values]
+
+        question_type_codes, question_type_values = _first_seen(column('question_type'))
+        columns['question_type'] = question_type_codes
+        labels['question_type'] = [QUESTION_TYPES[value] for value in question_type_values]
+
+        for name in ('chapter', 'test_number'):
+            codes, refs = _first_seen(column(name))
+            columns[name] = codes
+            labels[name] = [bank.string(int(ref)) for ref in refs]
+
+        explanation = column('explanation')
+        present = explanation != NO_STRING
+        lengths = np.zeros(len(explanation), dtype=np.int64)
+        lengths[present] = string_lengths[explanation[present]]
+
+        columns['answer_count'] = np.diff(column('answer_start').astype(np.int64))
+        columns['has_explanation'] = lengths > 0
+        columns['has_correct'] = np.diff(column('correct_start').astype(np.int64)) > 0
+        return cls(columns, labels)
+
+    def counts(self, name: str, mask: Optional[np.ndarray] = None) -> Dict[Optional[str], int]:
+        """Rows per label of a categorical column, in order of first appearance"""
+        codes = self.columns[name] if mask is None else self.columns[name][mask]
+        counts = np.bincount(codes, minlength=len(self.labels[name]))
+        return {label: int(count) for label, count in zip(self.labels[name], counts) if count}
+
+    def pair_counts(self, first: str, second: str, mask: Optional[np.ndarray] = None) -> Dict[Tuple, int]:
+        """Rows per (first, second) label pair, from one bincount over a combined key"""
+        width = max(len(self.labels[second]), 1)
+        keys = self.columns[first].astype(np.int64) * width + self.columns[second]
+        if mask is not None:
+            keys = keys[mask]
+        counts = np.bincount(keys, minlength=len(self.labels[first]) * width)
+        nonzero = np.flatnonzero(counts)
+        return {
+            (self.labels[first][key // width], self.labels[second][key % width]): int(counts[key])
+            for key in nonzero
+        }
+
+
+def compute_statistics(frame: QuestionFrame, expected_comprehensive: int = EXPECTED_COMPREHENSIVE_TESTS) -> Dict:
+    """Distributions, coverage and data-quality metrics as plain (JSON-serialisable) data"""
+    total = len(frame)
+    test_types = frame.labels['test_type']
+    comprehensive = (
+        frame.columns['test_type'] == test_types.index('comprehensive')
+        if 'comprehensive' in test_types else np.zeros(total, dtype=bool)
+    )
+
+    by_chapter: Dict[str, int] = {}
+    for chapter, count in frame.counts('chapter').items():
+        key = chapter or 'comprehensive'
+        by_chapter[key] = by_chapter.get(key, 0) + count
+
+    answer_counts = np.bincount(frame.columns['answer_count']) if total else np.zeros(0, dtype=np.int64)
+    comprehensive_tests = {f"test_{number}": count for number, count in frame.counts('test_number', comprehensive).items()}
+    chapter_tests = {
+        f"{chapter}_test_{number}": count
+        for (chapter, number), count in frame.pair_counts('chapter', 'test_number', ~comprehensive).items()
+    }
+
+    tests_per_chapter: Dict[Optional[str], int] = {}
+    for chapter, _ in frame.pair_counts('chapter', 'test_number', ~comprehensive):
+        tests_per_chapter[chapter] = tests_per_chapter.get(chapter, 0) + 1
+
+    found = sorted(int(number) for number in frame.counts('test_number', comprehensive) if str(number).isdigit())
+    missing = sorted(set(range(1, expected_comprehensive + 1)) - set(found))
+
+    with_explanations = int(frame.columns['has_explanation'].sum())
+    with_correct = int(frame.columns['has_correct'].sum())
+    missing_correct = ~frame.columns['has_correct']
+
+    return {
+        'total_questions': total,
+        'by_test_type': frame.counts('test_type'),
+        'by_chapter': by_chapter,
+        'by_question_type': frame.counts('question_type'),
+        'by_test_number': {
+            f"{test_type}_test_{number}": count
+            for (test_type, number), count in frame.pair_counts('test_type', 'test_number').items()
+        },
+        'answer_distribution': {
+            f'{answers}_answers': int(count) for answers, count in enumerate(answer_counts) if count
+        },
+        'questions_with_explanations': with_explanations,
+        'questions_with_correct_answers': with_correct,
+        'comprehensive_tests': comprehensive_tests,
+        'chapter_tests': chapter_tests,
+        'coverage': {
+            'comprehensive': {
+                'expected': expected_comprehensive,
+                'found': len(comprehensive_tests),
+                'missing': missing
+            },
+            'chapter_tests': {chapter: tests_per_chapter.get(chapter, 0) for chapter in CHAPTERS}
+        },
+        'quality': {
+            'missing_explanations': total - with_explanations,
+            'missing_correct_answers': total - with_correct,
+            'missing_correct_by_test_type': frame.counts('test_type', missing_correct)
+        }
+    }
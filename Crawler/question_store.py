@@ -0,0 +1,189 @@
+import argparse
+import gc
+import json
+import tracemalloc
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from uk_visa_test import Answer, Question, question_from_dict
+
+
+class StringTable:
+    """Each distinct string stored once, referred to by a small integer code"""
+
+    def __init__(self):
+        self.values: List[Optional[str]] = []
+        self.codes: Dict[Optional[str], int] = {}
+
+    def code(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class QuestionStore:
+    """Crawled questions held column-wise instead of as one object graph each.
+
+    Per question the store keeps a handful of integers in typed arrays: codes
+    into a table of categorical strings (question and answer ids, chapter,
+    test number, test type, question type) and codes into a table of texts,
+    which also folds the chapter 1/2 test and repeated comprehensive
+    questions into one copy. Answers live in parallel arrays indexed through
+    answer_offsets, so question i owns answers answer_offsets[i] to
+    answer_offsets[i + 1].
+
+    It behaves like the list the crawler used to keep: extend() and append()
+    take Question objects, and len(), indexing and iteration hand back
+    Question objects rebuilt on demand, which is all save_to_json and the
+    database loaders need.
+    """
+
+    def __init__(self, questions: Iterable[Question] = ()):
+        self.labels = StringTable()
+        self.texts = StringTable()
+
+        self.ids = array('I')
+        self.chapters = array('I')
+        self.test_numbers = array('I')
+        self.test_types = array('I')
+        self.question_types = array('I')
+        self.question_texts = array('I')
+        self.explanations = array('I')
+
+        self.answer_offsets = array('I', [0])
+        self.answer_ids = array('I')
+        self.answer_texts = array('I')
+        self.answer_correct = bytearray()
+
+        self.correct_offsets = array('I', [0])
+        self.correct_ids = array('I')
+
+        self.extend(questions)
+
+    def append(self, question: Question):
+        label = self.labels.code
+        text = self.texts.code
+        self.ids.append(label(question.id))
+        self.chapters.append(label(question.chapter))
+        self.test_numbers.append(label(question.test_number))
+        self.test_types.append(label(question.test_type))
+        self.question_types.append(label(question.question_type))
+        self.question_texts.append(text(question.question_text))
+        self.explanations.append(text(question.explanation))
+
+        for answer in question.answers:
+            self.answer_ids.append(label(answer.id))
+            self.answer_texts.append(text(answer.text))
+            self.answer_correct.append(bool(answer.is_correct))
+        self.answer_offsets.append(len(self.answer_ids))
+
+        self.correct_ids.extend(label(answer_id) for answer_id in question.correct_answers)
+        self.correct_offsets.append(len(self.correct_ids))
+
+    def extend(self, questions: Iterable[Question]):
+        for question in questions:
+            self.append(question)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("question index out of range")
+        labels = self.labels.values
+        texts = self.texts.values
+        start, end = self.answer_offsets[index], self.answer_offsets[index + 1]
+        return Question(
+            id=labels[self.ids[index]],
+            chapter=labels[self.chapters[index]],
+            test_number=labels[self.test_numbers[index]],
+            test_type=labels[self.test_types[index]],
+            question_text=texts[self.question_texts[index]],
+            question_type=labels[self.question_types[index]],
+            answers=[
+                Answer(id=labels[self.answer_ids[i]], text=texts[self.answer_texts[i]], is_correct=bool(self.answer_correct[i]))
+                for i in range(start, end)
+            ],
+            explanation=texts[self.explanations[index]],
+            correct_answers=[labels[code] for code in self.correct_ids[self.correct_offsets[index]:self.correct_offsets[index + 1]]]
+        )
+
+    def __iter__(self) -> Iterator[Question]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def count(self, field: str, value: Optional[str]) -> int:
+        """Questions whose categorical field (chapter, test_type, ...) equals value, without rebuilding them"""
+        code = self.labels.codes.get(value)
+        return 0 if code is None else getattr(self, field + 's').count(code)
+
+
+def _traced_bytes(build) -> tuple:
+    """Bytes still allocated by what build() returns, and the result"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = build()
+        gc.collect()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return current, result
+
+
+def memory_benchmark(json_file: str) -> Dict:
+    """Bytes per question held by a list of Question objects versus a QuestionStore"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        raw = f.read()
+
+    list_bytes, questions = _traced_bytes(lambda: [question_from_dict(q) for q in json.loads(raw)['questions']])
+    store_bytes, store = _traced_bytes(lambda: QuestionStore(question_from_dict(q) for q in json.loads(raw)['questions']))
+    if len(store) != len(questions) or any(a != b for a, b in zip(store, questions)):
+        raise RuntimeError("QuestionStore did not round-trip the question bank")
+
+    count = len(questions)
+    return {
+        'questions': count,
+        'answers': len(store.answer_ids),
+        'distinct_labels': len(store.labels),
+        'distinct_texts': len(store.texts),
+        'list_bytes': list_bytes,
+        'store_bytes': store_bytes,
+        'list_bytes_per_question': round(list_bytes / count, 1),
+        'store_bytes_per_question': round(store_bytes / count, 1),
+        'saving': round(1 - store_bytes / list_bytes, 3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure the memory held per crawled question')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Crawled question bank to load')
+    parser.add_argument('--output', help='Write the measurements to this JSON file')
+
+    args = parser.parse_args()
+
+    report = memory_benchmark(args.json_file)
+    print(f"🧠 {report['questions']} questions, {report['answers']} answers "
+          f"({report['distinct_texts']} distinct texts, {report['distinct_labels']} distinct labels)")
+    print(f"  list of Question objects: {report['list_bytes']:,} bytes ({report['list_bytes_per_question']} per question)")
+    print(f"  QuestionStore:            {report['store_bytes']:,} bytes ({report['store_bytes_per_question']} per question)")
+    print(f"  Saving: {report['saving']:.1%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"📝 Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
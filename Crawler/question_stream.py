@@ -0,0 +1,209 @@
+import json
+import textwrap
+from typing import Dict, Iterator, Optional
+
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+CHUNK_SIZE = 64 * 1024
+
+
+def is_ndjson(filename: str) -> bool:
+    return filename.lower().endswith(NDJSON_EXTENSIONS)
+
+
+class QuestionWriter:
+    """Write questions one at a time, as NDJSON or in the pretty-printed JSON layout.
+
+    For NDJSON every line is a question, plus one {"metadata": ...} line.
+    The JSON layout matches json.dump(indent=2) of {"metadata", "questions"}.
+    Metadata passed up front is written first; otherwise a summary with
+    totals is written once the questions are done.
+    """
+
+    def __init__(self, filename: str, metadata: Optional[Dict] = None, ndjson: Optional[bool] = None):
+        self.filename = filename
+        self.ndjson = is_ndjson(filename) if ndjson is None else ndjson
+        self.metadata = metadata
+        self.count = 0
+        self.test_types: Dict[str, int] = {}
+        self.file = None
+
+    def __enter__(self):
+        self.file = open(self.filename, 'w', encoding='utf-8')
+        if self.ndjson:
+            if self.metadata is not None:
+                self.file.write(json.dumps({'metadata': self.metadata}, ensure_ascii=False) + '\n')
+        else:
+            self.file.write('{\n')
+            if self.metadata is not None:
+                self._write_member('metadata', self.metadata)
+                self.file.write(',\n')
+            self.file.write('  "questions": [')
+        return self
+
+    def _write_member(self, key: str, value):
+        body = textwrap.indent(json.dumps(value, indent=2, ensure_ascii=False), '  ')[2:]
+        self.file.write(f'  "{key}": {body}')
+
+    def write(self, question: Dict):
+        if self.ndjson:
+            self.file.write(json.dumps(question, ensure_ascii=False) + '\n')
+        else:
+            separator = ',\n' if self.count else '\n'
+            self.file.write(separator + textwrap.indent(json.dumps(question, indent=2, ensure_ascii=False), '    '))
+
+        self.count += 1
+        test_type = question.get('test_type', 'unknown')
+        self.test_types[test_type] = self.test_types.get(test_type, 0) + 1
+
+    def summary_metadata(self) -> Dict:
+        return {'total_questions': self.count, 'test_types': self.test_types}
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if self.ndjson:
+                if self.metadata is None:
+                    self.file.write(json.dumps({'metadata': self.summary_metadata()}, ensure_ascii=False) + '\n')
+            else:
+                self.file.write('\n  ]' if self.count else ']')
+                if self.metadata is None:
+                    self.file.write(',\n')
+                    self._write_member('metadata', self.summary_metadata())
+                self.file.write('\n}')
+        finally:
+            self.file.close()
+
+
+class _StreamDecoder:
+    """Incrementally decode JSON values from a file without loading it whole"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(CHUNK_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at end of file"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ''
+
+    def expect(self, char: str):
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos} of {getattr(self.f, 'name', 'stream')}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Probably cut off mid-value; read more and retry
+                if not self._fill():
+                    raise
+                continue
+            # A number at the very end of the buffer may be truncated
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+
+def _iter_json_layout(f, metadata: Dict) -> Iterator[Dict]:
+    stream = _StreamDecoder(f)
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+
+    while True:
+        key = stream.value()
+        stream.expect(':')
+        if key == 'questions':
+            stream.expect('[')
+            if stream.peek() == ']':
+                stream.pos += 1
+            else:
+                while True:
+                    yield stream.value()
+                    if stream.peek() == ',':
+                        stream.pos += 1
+                        continue
+                    stream.expect(']')
+                    break
+        elif key == 'metadata':
+            metadata.update(stream.value())
+        else:
+            stream.value()
+
+        if stream.peek() == ',':
+            stream.pos += 1
+            continue
+        stream.expect('}')
+        return
+
+
+def _iter_ndjson(f, metadata: Dict) -> Iterator[Dict]:
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        record = json.loads(line)
+        if len(record) == 1 and 'metadata' in record:
+            metadata.update(record['metadata'])
+        else:
+            yield record
+
+
+def iter_questions(filename: str, metadata: Optional[Dict] = None) -> Iterator[Dict]:
+    """Yield question dicts from an NDJSON or JSON export in constant memory.
+
+    The file's metadata is merged into the optional metadata dict as soon as
+    it is encountered.
+    """
+    metadata = {} if metadata is None else metadata
+    with open(filename, 'r', encoding='utf-8') as f:
+        if is_ndjson(filename):
+            yield from _iter_ndjson(f, metadata)
+        else:
+            yield from _iter_json_layout(f, metadata)
+
+
+def read_metadata(filename: str) -> Dict:
+    """Metadata of an export; the question list is skipped, not loaded"""
+    metadata: Dict = {}
+    for _ in iter_questions(filename, metadata):
+        if metadata:
+            break
+    return metadata
+
+
+def convert(source: str, destination: str) -> int:
+    """Stream an export from one layout to the other, returning the number of questions"""
+    metadata: Dict = {}
+    questions = iter_questions(source, metadata)
+    first = next(questions, None)
+
+    # Metadata that precedes the questions can be carried over up front
+    with QuestionWriter(destination, metadata=metadata or None) as writer:
+        if first is not None:
+            writer.write(first)
+        for question in questions:
+            writer.write(question)
+        return writer.count
@@ -0,0 +1,337 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from config import Config
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token-bucket rate limiter for a single host, usable from threads and coroutines"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def reserve(self) -> float:
+        """Take a token, returning how long the caller must wait before using it.
+
+        The balance may go negative, which queues callers in FIFO order
+        without holding a lock while they sleep.
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            self._refill()
+            self.tokens -= 1
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self):
+        """Wait until a token is available and take it"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def acquire_sync(self):
+        """Blocking variant of acquire for worker threads"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+
+class HostRateLimiter:
+    """Keeps one token bucket per host"""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def bucket_for(self, url: str) -> TokenBucket:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.capacity)
+            return self.buckets[host]
+
+    async def acquire(self, url: str):
+        await self.bucket_for(url).acquire()
+
+    def acquire_sync(self, url: str):
+        self.bucket_for(url).acquire_sync()
+
+
+# Responses worth another attempt; None stands for a timeout or connection error
+RETRYABLE_STATUSES = frozenset([None, 429, 500, 502, 503, 504])
+# Responses meaning the server wants less load
+CONGESTION_STATUSES = frozenset([None, 429, 503])
+# A slow response must also be this much slower than the fastest recent one, so timer noise on fast hosts is ignored
+MIN_SLOWDOWN_SEC = 0.05
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header: delay-seconds or an HTTP-date"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, retry_at.timestamp() - (time.time() if now is None else now))
+
+
+class AdaptiveScheduler:
+    """AIMD concurrency window for one host, steered by the server's responses.
+
+    Each request takes a slot with acquire() and hands it back with
+    complete(), reporting its status and latency. A fast success widens the
+    window by 1/window, so by one slot per window of successes, as long as
+    the window was full when it completed. A 429, 503, timeout or a success
+    slower than latency_factor times the fastest recent response multiplies
+    it by decrease. Only responses to requests sent
+    after the previous cut can cut it again, so one burst of errors counts
+    once. Retry-After pauses every new request until it expires. Other 5xx
+    responses are retried without narrowing the window.
+
+    Retries wait for the longer of Retry-After and a full-jitter
+    exponential backoff. Usable from threads (acquire_sync) and coroutines
+    (acquire).
+    """
+
+    def __init__(self, initial: Optional[int] = None, maximum: Optional[int] = None, minimum: int = 1,
+                 decrease: float = 0.5, latency_factor: Optional[float] = None, window: int = 20,
+                 max_retries: Optional[int] = None, backoff: Optional[float] = None, max_backoff: float = 30.0,
+                 poll_interval: float = 0.005, seed: Optional[int] = None):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or Config.CRAWLER_CONCURRENCY)
+        self.limit = float(min(self.maximum, max(self.minimum, initial or Config.ADAPTIVE_INITIAL_CONCURRENCY)))
+        self.decrease = decrease
+        self.latency_factor = latency_factor or Config.ADAPTIVE_LATENCY_FACTOR
+        self.max_retries = Config.ADAPTIVE_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff = Config.ADAPTIVE_BACKOFF if backoff is None else backoff
+        self.max_backoff = max_backoff
+        self.poll_interval = poll_interval
+        self.rng = random.Random(seed)
+
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self.last_cut = 0.0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.history: List[Tuple[float, float, str]] = []
+        self.counts = {'requests': 0, 'ok': 0, 'throttled': 0, 'errors': 0, 'slow': 0, 'retries': 0, 'cuts': 0}
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._record(self.limit, 'start')
+
+    def _record(self, limit: float, reason: str):
+        self.history.append((round(time.monotonic() - self.started, 3), round(limit, 2), reason))
+        metrics.gauge('crawl_concurrency_limit', limit)
+
+    def _try_acquire(self) -> float:
+        """Take a slot and return 0, or return how long to wait before trying again"""
+        with self._lock:
+            now = time.monotonic()
+            if now < self.paused_until:
+                return self.paused_until - now
+            if self.in_flight >= int(self.limit):
+                return self.poll_interval
+            self.in_flight += 1
+            self.counts['requests'] += 1
+            return 0.0
+
+    def acquire_sync(self) -> float:
+        """Block until a slot is free; returns the send time to pass to complete()"""
+        while True:
+            wait = self._try_acquire()
+            if wait == 0.0:
+                return time.monotonic()
+            time.sleep(min(wait, 1.0))
+
+    async def acquire(self) -> float:
+        while True:
+            wait = self._try_acquire()
+            if wait == 0.0:
+                return time.monotonic()
+            await asyncio.sleep(min(wait, 1.0))
+
+    def _cut(self, sent_at: float, now: float, reason: str):
+        if sent_at < self.last_cut:
+            return
+        self.last_cut = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.counts['cuts'] += 1
+        self._record(self.limit, reason)
+
+    def complete(self, sent_at: float, status: Optional[int], retry_after: Optional[str] = None,
+                 attempt: int = 0) -> Optional[float]:
+        """Release the slot and learn from the response.
+
+        status is the HTTP status, or None for a timeout or connection error.
+        Returns None when the request is finished (successfully or not
+        worth retrying), else the seconds to wait before attempt + 1.
+        """
+        now = time.monotonic()
+        latency = now - sent_at
+        pause = parse_retry_after(retry_after)
+        with self._lock:
+            # Only a full window says anything about whether a wider one would be accepted
+            window_full = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            ok = status is not None and status < 400
+            self.outcomes.append(ok)
+            if ok:
+                fastest = min(self.latencies) if self.latencies else latency
+                self.latencies.append(latency)
+                if len(self.latencies) > 1 and latency > max(self.latency_factor * fastest, fastest + MIN_SLOWDOWN_SEC):
+                    self.counts['slow'] += 1
+                    self._cut(sent_at, now, f'slow response ({latency * 1000:.0f} ms)')
+                else:
+                    self.counts['ok'] += 1
+                    if window_full and self.limit < self.maximum:
+                        before = int(self.limit)
+                        self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                        if int(self.limit) > before:
+                            self._record(self.limit, 'increase')
+                return None
+
+            if status == 429:
+                self.counts['throttled'] += 1
+                metrics.count('throttled_responses')
+            else:
+                self.counts['errors'] += 1
+            if status in CONGESTION_STATUSES:
+                self._cut(sent_at, now, f"status {status or 'timeout'}")
+            if pause is not None:
+                self.paused_until = max(self.paused_until, now + pause)
+            if status not in RETRYABLE_STATUSES or attempt >= self.max_retries:
+                return None
+            self.counts['retries'] += 1
+            metrics.count('crawl_retries')
+            backoff = self.rng.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            return max(pause or 0.0, backoff)
+
+    @property
+    def error_rate(self) -> float:
+        """Share of failed responses among the last window of responses"""
+        return 1 - sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+        limits = [limit for _, limit, _ in self.history] + [round(self.limit, 2)]
+        return dict(
+            self.counts,
+            limit=round(self.limit, 2),
+            limit_min=min(limits),
+            limit_max=max(limits),
+            recent_error_rate=round(self.error_rate, 3),
+            recent_latency_p50_ms=round(latencies[len(latencies) // 2] * 1000, 1) if latencies else 0.0,
+            elapsed_sec=round(time.monotonic() - self.started, 3)
+        )
+
+    def log_summary(self):
+        summary = self.summary()
+        logger.info(
+            f"Adaptive scheduler: {summary['requests']} requests, {summary['ok']} ok, {summary['throttled']} throttled, "
+            f"{summary['errors']} errors, {summary['slow']} slow, {summary['retries']} retries; concurrency "
+            f"{summary['limit_min']:g}-{summary['limit_max']:g} (final {summary['limit']:g}, {summary['cuts']} cuts)"
+        )
+        for offset, limit, reason in self.history:
+            logger.debug(f"  +{offset:.3f}s concurrency {limit:g} ({reason})")
+
+
+def compare(pages: Dict[str, str], concurrency: int, max_in_flight: int, load_latency: float, latency: float,
+            throttle_rate: float, retry_after: float, seed: int = 7) -> Dict[str, Dict]:
+    """Crawl a stub site that throttles past max_in_flight, at fixed concurrency and adaptively"""
+    from async_crawler import AsyncCrawlEngine
+    from stub_server import StubServer
+    from uk_visa_test import UKVisaTestCrawler
+
+    results = {}
+    for mode in ('fixed', 'adaptive'):
+        with StubServer(pages, latency=latency, throttle_rate=throttle_rate, retry_after=retry_after, seed=seed,
+                        max_in_flight=max_in_flight, load_latency=load_latency) as server:
+            crawler = UKVisaTestCrawler(base_url=server.base_url)
+            if mode == 'adaptive':
+                crawler.scheduler = AdaptiveScheduler(maximum=concurrency, seed=seed)
+            jobs = [job for job in crawler.get_test_jobs() if job[0] in pages]
+            engine = AsyncCrawlEngine(crawler, concurrency=concurrency, rate=0)
+            started = time.perf_counter()
+            fetched = [questions for questions in engine.crawl_jobs(jobs) if questions is not None]
+            result = {
+                'jobs': len(jobs),
+                'fetched': len(fetched),
+                'elapsed_sec': round(time.perf_counter() - started, 3),
+                'server': server.counts
+            }
+            if crawler.scheduler is not None:
+                crawler.scheduler.log_summary()
+                result['scheduler'] = crawler.scheduler.summary()
+            results[mode] = result
+    return results
+
+
+def main():
+    import argparse
+    from stub_server import build_pages_from_json
+
+    parser = argparse.ArgumentParser(description='Compare fixed and adaptive crawl concurrency against a throttling stub site')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Question bank to render stub pages from')
+    parser.add_argument('--concurrency', type=int, default=8,
+                       help='Fixed concurrency, and the adaptive ceiling')
+    parser.add_argument('--max-in-flight', type=int, default=3,
+                       help='Concurrent requests the stub serves before answering 429')
+    parser.add_argument('--load-latency-ms', type=float, default=20.0,
+                       help='Stub delay per request already in flight')
+    parser.add_argument('--latency-ms', type=float, default=10.0,
+                       help='Stub base latency')
+    parser.add_argument('--throttle-rate', type=float, default=0.02,
+                       help='Fraction of requests throttled at random on top of overload')
+    parser.add_argument('--retry-after', type=float, default=0.2,
+                       help='Retry-After seconds sent with 429 responses')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    results = compare(build_pages_from_json(args.json_file), args.concurrency, args.max_in_flight,
+                      args.load_latency_ms / 1000, args.latency_ms / 1000, args.throttle_rate, args.retry_after)
+    for mode, result in results.items():
+        server = result['server']
+        print(f"🚦 {mode:8} {result['fetched']}/{result['jobs']} pages in {result['elapsed_sec']}s; server saw "
+              f"{server['requests']} requests, {server['overloaded'] + server['throttled']} throttled, "
+              f"peak {server['max_in_flight']} in flight")
+        if 'scheduler' in result:
+            scheduler = result['scheduler']
+            print(f"   concurrency {scheduler['limit_min']:g}-{scheduler['limit_max']:g}, final {scheduler['limit']:g}, "
+                  f"{scheduler['cuts']} cuts, {scheduler['retries']} retries")
+
+
+if __name__ == "__main__":
+    main()
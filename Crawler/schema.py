@@ -0,0 +1,555 @@
+"""Database schema for uk_visa_test: versioned migrations and a query-plan audit.
+
+The migrations below are the one definition of the tables the crawler, the
+data utilities and the PHP backend share. Applied versions are recorded in
+schema_migrations, and every step is idempotent (CREATE ... IF NOT EXISTS,
+columns and indexes added only when information_schema lacks them), so a
+database created from uk_visa_test.sql or by an older crawler can be brought
+up to date the same way as an empty one.
+
+To try it against a throwaway MariaDB on the port in .env (DB_PORT=3307):
+
+    docker run -d --name uk-visa-mariadb -p 3307:3306 -e MARIADB_ALLOW_EMPTY_ROOT_PASSWORD=1 mariadb:11
+    python data_utils.py migrate
+    python data_utils.py explain
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+TABLE_OPTIONS = "ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci"
+# Full scans of tables estimated below this many rows are not worth reporting
+SMALL_TABLE_ROWS = 100
+
+
+@dataclass
+class AddColumn:
+    """ALTER TABLE ... ADD COLUMN, skipped when the column already exists"""
+    table: str
+    column: str
+    definition: str
+
+    @property
+    def sql(self) -> str:
+        return f"ALTER TABLE {self.table} ADD COLUMN {self.column} {self.definition}"
+
+    def needed(self, session) -> bool:
+        return session.query_one(
+            "SELECT 1 AS found FROM information_schema.columns "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+            (self.table, self.column)
+        ) is None
+
+
+@dataclass
+class AddIndex:
+    """CREATE INDEX, skipped when the table already has an index with that name"""
+    table: str
+    name: str
+    columns: Tuple[str, ...]
+
+    @property
+    def sql(self) -> str:
+        return f"CREATE INDEX {self.name} ON {self.table} ({', '.join(self.columns)})"
+
+    def needed(self, session) -> bool:
+        return session.query_one(
+            "SELECT 1 AS found FROM information_schema.statistics "
+            "WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s",
+            (self.table, self.name)
+        ) is None
+
+
+Step = Union[str, AddColumn, AddIndex]
+
+
+@dataclass
+class Migration:
+    version: int
+    description: str
+    steps: List[Step]
+
+
+MIGRATIONS = [
+    Migration(1, "Base tables as in uk_visa_test.sql", [
+        f"""CREATE TABLE IF NOT EXISTS chapters (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            chapter_number INT NOT NULL,
+            name VARCHAR(100) NOT NULL,
+            description TEXT DEFAULT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_chapter_number (chapter_number)
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS tests (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            chapter_id INT DEFAULT NULL,
+            test_number VARCHAR(10) NOT NULL,
+            test_type ENUM('chapter', 'comprehensive', 'exam') NOT NULL,
+            title VARCHAR(255) DEFAULT NULL,
+            url VARCHAR(255) DEFAULT NULL,
+            is_free TINYINT(1) DEFAULT 0 COMMENT 'Free users can access if 1',
+            is_premium TINYINT(1) DEFAULT 1 COMMENT 'Premium required if 1',
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY chapter_id (chapter_id),
+            KEY idx_test_type (test_type),
+            KEY idx_test_number (test_number),
+            KEY idx_is_free (is_free),
+            KEY idx_is_premium (is_premium),
+            CONSTRAINT tests_ibfk_1 FOREIGN KEY (chapter_id) REFERENCES chapters (id) ON DELETE SET NULL
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS questions (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            test_id INT NOT NULL,
+            question_id VARCHAR(50) NOT NULL,
+            question_text TEXT NOT NULL,
+            question_type ENUM('radio', 'checkbox') NOT NULL,
+            explanation TEXT DEFAULT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY test_id (test_id),
+            KEY idx_question_id (question_id),
+            KEY idx_question_type (question_type),
+            CONSTRAINT questions_ibfk_1 FOREIGN KEY (test_id) REFERENCES tests (id) ON DELETE CASCADE
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS answers (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            question_id INT NOT NULL,
+            answer_id VARCHAR(50) NOT NULL,
+            answer_text TEXT NOT NULL,
+            is_correct TINYINT(1) DEFAULT 0,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY question_id (question_id),
+            KEY idx_answer_id (answer_id),
+            KEY idx_is_correct (is_correct),
+            CONSTRAINT answers_ibfk_1 FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            email VARCHAR(255) NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            full_name VARCHAR(100) DEFAULT NULL,
+            is_premium TINYINT(1) DEFAULT 0,
+            premium_expires_at TIMESTAMP NULL DEFAULT NULL,
+            language_code VARCHAR(5) DEFAULT 'en' COMMENT 'vi, en, etc.',
+            free_tests_used INT DEFAULT 0,
+            free_tests_limit INT DEFAULT 5 COMMENT 'Number of free tests allowed',
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+            UNIQUE KEY unique_email (email),
+            KEY idx_is_premium (is_premium),
+            KEY idx_language_code (language_code)
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS user_test_attempts (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            test_id INT NOT NULL,
+            score INT DEFAULT NULL COMMENT 'Correct answers count',
+            total_questions INT DEFAULT NULL,
+            percentage DECIMAL(5,2) DEFAULT NULL,
+            time_taken INT DEFAULT NULL COMMENT 'Seconds taken to complete',
+            is_passed TINYINT(1) DEFAULT 0 COMMENT '1 if score >= 75%',
+            started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP NULL DEFAULT NULL,
+            KEY user_id (user_id),
+            KEY test_id (test_id),
+            KEY idx_is_passed (is_passed),
+            CONSTRAINT user_test_attempts_ibfk_1 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE,
+            CONSTRAINT user_test_attempts_ibfk_2 FOREIGN KEY (test_id) REFERENCES tests (id) ON DELETE CASCADE
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS user_answers (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            attempt_id INT NOT NULL,
+            question_id INT NOT NULL,
+            selected_answer_ids TEXT NOT NULL COMMENT 'JSON array of selected answer IDs',
+            is_correct TINYINT(1) DEFAULT 0,
+            answered_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY attempt_id (attempt_id),
+            KEY question_id (question_id),
+            CONSTRAINT user_answers_ibfk_1 FOREIGN KEY (attempt_id) REFERENCES user_test_attempts (id) ON DELETE CASCADE,
+            CONSTRAINT user_answers_ibfk_2 FOREIGN KEY (question_id) REFERENCES questions (id) ON DELETE CASCADE
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS subscriptions (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            user_id INT NOT NULL,
+            subscription_type ENUM('monthly', 'yearly', 'lifetime') NOT NULL,
+            amount DECIMAL(10,2) NOT NULL,
+            currency VARCHAR(3) DEFAULT 'USD',
+            payment_method VARCHAR(50) DEFAULT NULL COMMENT 'stripe, paypal, etc.',
+            payment_id VARCHAR(255) DEFAULT NULL COMMENT 'External payment ID',
+            starts_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            expires_at TIMESTAMP NULL DEFAULT NULL,
+            status ENUM('active', 'expired', 'cancelled') DEFAULT 'active',
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY user_id (user_id),
+            KEY idx_status (status),
+            CONSTRAINT subscriptions_ibfk_1 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        ) {TABLE_OPTIONS}""",
+    ]),
+    # Databases created by the crawler before this module existed have tests
+    # without the free/premium flags the backend filters on
+    Migration(2, "Free/premium flags on tests created by older crawlers", [
+        AddColumn('tests', 'is_free', "TINYINT(1) DEFAULT 0 COMMENT 'Free users can access if 1' AFTER url"),
+        AddColumn('tests', 'is_premium', "TINYINT(1) DEFAULT 1 COMMENT 'Premium required if 1' AFTER is_free"),
+        AddIndex('tests', 'idx_is_free', ('is_free',)),
+        AddIndex('tests', 'idx_is_premium', ('is_premium',)),
+    ]),
+    # The API selects these when Vietnamese is requested; neither SQL dump has them
+    Migration(3, "Vietnamese translation columns read by the API", [
+        AddColumn('questions', 'question_text_vi', "TEXT DEFAULT NULL AFTER question_text"),
+        AddColumn('questions', 'explanation_vi', "TEXT DEFAULT NULL AFTER explanation"),
+        AddColumn('answers', 'answer_text_vi', "TEXT DEFAULT NULL AFTER answer_text"),
+    ]),
+    Migration(4, "Covering indexes for the hot queries (see HOT_QUERIES)", [
+        AddIndex('answers', 'idx_question_correct', ('question_id', 'is_correct', 'answer_id')),
+        AddIndex('tests', 'idx_type_number', ('test_type', 'test_number')),
+        AddIndex('user_test_attempts', 'idx_user_test_completed', ('user_id', 'test_id', 'completed_at', 'percentage')),
+        AddIndex('user_test_attempts', 'idx_user_completed', ('user_id', 'completed_at')),
+        AddIndex('user_test_attempts', 'idx_test_score', ('test_id', 'percentage', 'time_taken')),
+        AddIndex('user_answers', 'idx_attempt_question', ('attempt_id', 'question_id')),
+    ]),
+    Migration(5, "Index for the duplicate question id check", [
+        AddIndex('questions', 'idx_test_question', ('test_id', 'question_id')),
+    ]),
+    # Rebuilt by analytics.py; the backend reads them instead of aggregating user_answers
+    Migration(6, "Analytics summary tables", [
+        f"""CREATE TABLE IF NOT EXISTS analytics_question_stats (
+            question_id INT PRIMARY KEY,
+            test_id INT NOT NULL,
+            times_answered INT NOT NULL,
+            times_correct INT NOT NULL,
+            difficulty DECIMAL(5,4) NOT NULL COMMENT 'Share of answers that were wrong',
+            computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_test_difficulty (test_id, difficulty)
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS analytics_answer_stats (
+            answer_id INT PRIMARY KEY COMMENT 'answers.id',
+            question_id INT NOT NULL,
+            is_correct TINYINT(1) NOT NULL,
+            times_selected INT NOT NULL,
+            selection_rate DECIMAL(5,4) NOT NULL COMMENT 'Share of answers to the question that selected it',
+            computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            KEY idx_question (question_id)
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS analytics_test_stats (
+            test_id INT PRIMARY KEY,
+            attempts INT NOT NULL,
+            completed INT NOT NULL,
+            passed INT NOT NULL,
+            pass_rate DECIMAL(5,4) DEFAULT NULL,
+            avg_percentage DECIMAL(5,2) DEFAULT NULL,
+            avg_time_taken INT DEFAULT NULL,
+            computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS analytics_user_chapter_stats (
+            user_id INT NOT NULL,
+            chapter_id INT NOT NULL,
+            answered INT NOT NULL,
+            correct INT NOT NULL,
+            accuracy DECIMAL(5,4) NOT NULL,
+            computed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, chapter_id),
+            KEY idx_user_accuracy (user_id, accuracy)
+        ) {TABLE_OPTIONS}""",
+    ]),
+    # Kept current by aggregates.py, which folds in only attempts completed after its watermark
+    Migration(7, "Incremental leaderboard and progress aggregates", [
+        AddIndex('user_test_attempts', 'idx_completed', ('completed_at', 'id')),
+        f"""CREATE TABLE IF NOT EXISTS agg_watermarks (
+            name VARCHAR(50) PRIMARY KEY,
+            last_completed_at DATETIME NOT NULL DEFAULT '1000-01-01 00:00:00',
+            last_attempt_id INT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS agg_user_test_best (
+            user_id INT NOT NULL,
+            test_id INT NOT NULL,
+            attempts INT NOT NULL,
+            passed_attempts INT NOT NULL,
+            best_percentage DECIMAL(5,2) DEFAULT NULL,
+            best_time_taken INT DEFAULT NULL COMMENT 'Fastest time at best_percentage',
+            last_completed_at DATETIME DEFAULT NULL,
+            PRIMARY KEY (user_id, test_id),
+            KEY idx_test_leaderboard (test_id, best_percentage, best_time_taken)
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS agg_user_chapter_progress (
+            user_id INT NOT NULL,
+            chapter_id INT NOT NULL COMMENT '0 for comprehensive and exam tests',
+            attempts INT NOT NULL,
+            passed_attempts INT NOT NULL,
+            percentage_sum DECIMAL(14,2) NOT NULL,
+            PRIMARY KEY (user_id, chapter_id)
+        ) {TABLE_OPTIONS}""",
+        f"""CREATE TABLE IF NOT EXISTS agg_test_daily (
+            test_id INT NOT NULL,
+            day DATE NOT NULL,
+            attempts INT NOT NULL,
+            passed_attempts INT NOT NULL,
+            percentage_sum DECIMAL(14,2) NOT NULL,
+            PRIMARY KEY (test_id, day)
+        ) {TABLE_OPTIONS}""",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def create_database(db_config: Optional[Dict] = None):
+    """CREATE DATABASE IF NOT EXISTS for the database named in db_config.
+
+    Connects without selecting a database, since the pool's connections
+    cannot be opened until it exists.
+    """
+    import mysql.connector
+
+    config = dict(db_config or Config.DB_CONFIG)
+    name = config.pop('database')
+    connection = mysql.connector.connect(**config)
+    try:
+        cursor = connection.cursor()
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{name}` CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci")
+        cursor.close()
+    finally:
+        connection.close()
+
+
+def _ensure_migrations_table(session):
+    session.execute(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INT PRIMARY KEY, "
+        "description VARCHAR(255) NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP"
+        f") {TABLE_OPTIONS}"
+    )
+
+
+def applied_migrations(session) -> Dict[int, Dict]:
+    exists = session.query_one(
+        "SELECT 1 AS found FROM information_schema.tables "
+        "WHERE table_schema = DATABASE() AND table_name = 'schema_migrations'"
+    )
+    if exists is None:
+        return {}
+    rows = session.query("SELECT version, description, applied_at FROM schema_migrations ORDER BY version")
+    return {row['version']: row for row in rows}
+
+
+def _pending_sql(session, migration: Migration) -> List[str]:
+    return [
+        step if isinstance(step, str) else step.sql
+        for step in migration.steps
+        if isinstance(step, str) or step.needed(session)
+    ]
+
+
+def migrate(database, target: Optional[int] = None, dry_run: bool = False) -> List[Dict]:
+    """Apply migrations above the recorded version, up to target (default: all).
+
+    MySQL commits DDL implicitly, so a migration that fails halfway is not
+    rolled back; its steps are idempotent, and running migrate again
+    finishes it. With dry_run, returns the statements each pending migration
+    would run without running them.
+    """
+    target = LATEST_VERSION if target is None else target
+    results = []
+    with database.transaction() as session:
+        if not dry_run:
+            _ensure_migrations_table(session)
+        applied = applied_migrations(session)
+        for migration in MIGRATIONS:
+            if migration.version in applied or migration.version > target:
+                continue
+            statements = _pending_sql(session, migration)
+            if not dry_run:
+                for sql in statements:
+                    session.execute(sql)
+                session.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                    (migration.version, migration.description)
+                )
+                logger.info(f"Applied migration {migration.version}: {migration.description}")
+            results.append({'version': migration.version, 'description': migration.description, 'statements': statements})
+    return results
+
+
+def migration_status(database) -> List[Dict]:
+    """Every known migration with when it was applied (None if pending)"""
+    with database.transaction() as session:
+        applied = applied_migrations(session)
+    return [
+        {
+            'version': migration.version,
+            'description': migration.description,
+            'applied_at': applied[migration.version]['applied_at'] if migration.version in applied else None
+        }
+        for migration in MIGRATIONS
+    ]
+
+
+def schema_sql() -> str:
+    """The full DDL of every migration, for review or for creating the schema by hand"""
+    statements = []
+    for migration in MIGRATIONS:
+        statements.append(f"-- {migration.version}: {migration.description}")
+        statements.extend(f"{step if isinstance(step, str) else step.sql};" for step in migration.steps)
+    return '\n'.join(statements)
+
+
+@dataclass
+class HotQuery:
+    """A query worth auditing, with sample parameters and the indexes it should be able to use"""
+    name: str
+    source: str
+    sql: str
+    params: Sequence[Any] = ()
+    indexes: List[Tuple[str, Tuple[str, ...]]] = field(default_factory=list)
+
+
+HOT_QUERIES = [
+    # data_utils.py validate
+    HotQuery('test_type_distribution', 'data_utils validate',
+             "SELECT test_type, COUNT(*) as count FROM tests GROUP BY test_type",
+             indexes=[('tests', ('test_type',))]),
+    HotQuery('chapter_distribution', 'data_utils validate',
+             """SELECT COALESCE(c.name, 'Comprehensive Tests') as chapter_name,
+                       t.test_type, COUNT(q.id) as question_count
+                FROM tests t
+                LEFT JOIN chapters c ON t.chapter_id = c.id
+                LEFT JOIN questions q ON t.id = q.test_id
+                GROUP BY c.id, c.name, t.test_type
+                ORDER BY c.chapter_number, t.test_type""",
+             indexes=[('questions', ('test_id',))]),
+    HotQuery('comprehensive_test_coverage', 'data_utils validate',
+             """SELECT t.test_number, COUNT(q.id) as question_count
+                FROM tests t
+                LEFT JOIN questions q ON t.id = q.test_id
+                WHERE t.test_type = 'comprehensive'
+                GROUP BY t.test_number""",
+             indexes=[('tests', ('test_type', 'test_number')), ('questions', ('test_id',))]),
+    # backend/app/Models
+    HotQuery('available_tests', 'Test::getAvailableTests',
+             """SELECT t.*, c.name as chapter_name, COUNT(uta.id) as attempt_count, MAX(uta.percentage) as best_score
+                FROM tests t
+                LEFT JOIN chapters c ON t.chapter_id = c.id
+                LEFT JOIN user_test_attempts uta
+                    ON t.id = uta.test_id AND uta.user_id = %s AND uta.completed_at IS NOT NULL
+                GROUP BY t.id
+                ORDER BY t.test_type, t.chapter_id, t.test_number""",
+             (1,), indexes=[('user_test_attempts', ('user_id', 'test_id', 'completed_at', 'percentage'))]),
+    HotQuery('tests_by_type', 'Test::getTestsByType',
+             "SELECT * FROM tests WHERE test_type = %s ORDER BY test_number",
+             ('comprehensive',), indexes=[('tests', ('test_type', 'test_number'))]),
+    HotQuery('test_questions', 'Test::getTestWithQuestions',
+             """SELECT q.id, q.question_id, q.question_text, q.question_type, q.explanation
+                FROM questions q WHERE q.test_id = %s ORDER BY q.id""",
+             (1,), indexes=[('questions', ('test_id',))]),
+    HotQuery('question_answers', 'Test::getTestWithQuestions',
+             "SELECT id, answer_id, answer_text, is_correct FROM answers WHERE question_id = %s ORDER BY id",
+             (1,), indexes=[('answers', ('question_id',))]),
+    HotQuery('correct_answers', 'TestAttempt::checkAnswer',
+             "SELECT answer_id FROM answers WHERE question_id = %s AND is_correct = 1",
+             (1,), indexes=[('answers', ('question_id', 'is_correct', 'answer_id'))]),
+    HotQuery('user_history', 'TestAttempt::getUserHistory',
+             """SELECT uta.*, t.title, t.test_number, t.test_type, c.name as chapter_name
+                FROM user_test_attempts uta
+                JOIN tests t ON uta.test_id = t.id
+                LEFT JOIN chapters c ON t.chapter_id = c.id
+                WHERE uta.user_id = %s AND uta.completed_at IS NOT NULL
+                ORDER BY uta.completed_at DESC
+                LIMIT 20 OFFSET 0""",
+             (1,), indexes=[('user_test_attempts', ('user_id', 'completed_at'))]),
+    HotQuery('attempt_answers', 'TestAttempt::getAttemptDetails',
+             """SELECT ua.*, q.question_text, q.question_type, COUNT(a.id) as answer_count
+                FROM user_answers ua
+                JOIN questions q ON ua.question_id = q.id
+                JOIN answers a ON q.id = a.question_id
+                WHERE ua.attempt_id = %s
+                GROUP BY ua.id, q.id
+                ORDER BY q.id""",
+             (1,), indexes=[('user_answers', ('attempt_id',)), ('answers', ('question_id',))]),
+    HotQuery('leaderboard', 'TestAttempt::getLeaderboard',
+             """SELECT u.full_name, uta.percentage, uta.time_taken, uta.completed_at, t.title as test_title
+                FROM user_test_attempts uta
+                JOIN users u ON uta.user_id = u.id
+                JOIN tests t ON uta.test_id = t.id
+                WHERE uta.test_id = %s
+                ORDER BY uta.percentage DESC, uta.time_taken ASC
+                LIMIT 10""",
+             (1,), indexes=[('user_test_attempts', ('test_id', 'percentage', 'time_taken'))]),
+]
+QUERIES = {query.name: query for query in HOT_QUERIES}
+
+
+def existing_indexes(session) -> Dict[str, Dict[str, List[str]]]:
+    """{table: {index name: [columns in order]}} for the current database"""
+    rows = session.query(
+        "SELECT table_name AS table_name, index_name AS index_name, column_name AS column_name "
+        "FROM information_schema.statistics WHERE table_schema = DATABASE() "
+        "ORDER BY table_name, index_name, seq_in_index"
+    )
+    indexes: Dict[str, Dict[str, List[str]]] = {}
+    for row in rows:
+        indexes.setdefault(row['table_name'], {}).setdefault(row['index_name'], []).append(row['column_name'])
+    return indexes
+
+
+def has_index(indexes: Dict[str, Dict[str, List[str]]], table: str, columns: Sequence[str]) -> bool:
+    """Whether some index on table starts with columns, in that order"""
+    wanted = [column.lower() for column in columns]
+    return any(
+        [column.lower() for column in existing[:len(wanted)]] == wanted
+        for existing in indexes.get(table, {}).values()
+    )
+
+
+def plan_findings(plan: List[Dict]) -> List[str]:
+    """Problems in EXPLAIN output rows (MySQL/MariaDB tabular format)"""
+    findings = []
+    for row in plan:
+        table = row.get('table') or '?'
+        access = (row.get('type') or '').upper()
+        extra = row.get('Extra') or ''
+        rows = int(row.get('rows') or 0)
+        if access == 'ALL' and rows >= SMALL_TABLE_ROWS:
+            findings.append(f"full table scan of {table} (~{rows} rows)")
+        elif access == 'INDEX' and rows >= SMALL_TABLE_ROWS:
+            findings.append(f"full index scan of {table} (~{rows} rows)")
+        if 'Using filesort' in extra:
+            findings.append(f"filesort on {table}")
+        if 'Using temporary' in extra:
+            findings.append(f"temporary table for {table}")
+        if (row.get('select_type') or '').upper().startswith('DEPENDENT') and access in ('ALL', 'INDEX'):
+            findings.append(f"dependent subquery scans {table} once per outer row")
+    return findings
+
+
+def explain_queries(database, names: Optional[List[str]] = None,
+                    queries: Optional[List[HotQuery]] = None) -> List[Dict]:
+    """EXPLAIN each query (HOT_QUERIES by default; all, or those named) and suggest the indexes it lacks"""
+    report = []
+    with database.transaction() as session:
+        indexes = existing_indexes(session)
+        for query in queries or HOT_QUERIES:
+            if names and query.name not in names:
+                continue
+            entry = {'name': query.name, 'source': query.source}
+            try:
+                plan = session.query(f"EXPLAIN {query.sql}", query.params)
+            except Exception as e:
+                entry['error'] = str(e)
+                report.append(entry)
+                continue
+            entry['plan'] = [
+                {key: row.get(key) for key in ('id', 'select_type', 'table', 'type', 'key', 'rows', 'Extra')}
+                for row in plan
+            ]
+            entry['findings'] = plan_findings(plan)
+            entry['suggestions'] = [
+                f"CREATE INDEX idx_{'_'.join(columns)} ON {table} ({', '.join(columns)})"
+                for table, columns in query.indexes
+                if not has_index(indexes, table, columns)
+            ]
+            report.append(entry)
+    return report
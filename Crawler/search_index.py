@@ -0,0 +1,534 @@
+import argparse
+import hashlib
+import mmap
+import os
+import random
+import re
+import statistics
+import struct
+import sys
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from answer_resolver import tokenize
+from question_bank import BANK_EXTENSION, is_question_bank, test_key, QuestionBank
+from question_stream import iter_questions
+
+# File layout (all integers little-endian), the same shape as a question bank:
+#   header      MAGIC, version, document/term/posting counts, section count
+#   directory   (name, offset, length) per section, every section 8-byte aligned
+#   sections    sorted term strings with offsets into the postings, postings
+#               (document, term frequency, offset into the positions array),
+#               positions, per-document length, content hash, key and text,
+#               and the SHA-256 of the export the index was built from
+MAGIC = b'UKSI'
+VERSION = 2
+HEADER = struct.Struct('<4sIIIII')
+DIRECTORY_ENTRY = struct.Struct('<32sQQ')
+SECTION_TYPES = {
+    'term_blob': np.uint8, 'key_blob': np.uint8, 'text_blob': np.uint8, 'source_sha256': np.uint8,
+    'post_tf': np.uint16, 'positions': np.uint16, 'doc_hash': np.uint64
+}
+INDEX_EXTENSION = '.uksi'
+
+# Positions jump this far between a question, each answer and the explanation,
+# so a phrase never matches across two of them
+FIELD_GAP = 16
+MAX_POSITION = 0xFFFF
+
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+
+PHRASE_RE = re.compile(r'"([^"]*)"')
+
+
+def stem(token: str) -> str:
+    """Light suffix stripping (plurals, -ed, -ing, final e), enough to match "vote", "votes", "voted" and "voting"."""
+    if len(token) <= 3 or not token.isalpha():
+        return token
+    if token.endswith('ies') and len(token) > 4:
+        token = token[:-3] + 'y'
+    elif token.endswith('sses'):
+        token = token[:-2]
+    elif token.endswith('s') and not token.endswith(('ss', 'us', 'is')):
+        token = token[:-1]
+    for suffix in ('ing', 'ed'):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3 and any(c in 'aeiouy' for c in token[:-len(suffix)]):
+            token = token[:-len(suffix)]
+            if len(token) > 3 and token[-1] == token[-2] and token[-1] not in 'lsz':
+                token = token[:-1]
+            break
+    if token.endswith('e') and len(token) > 3:
+        token = token[:-1]
+    return token
+
+
+_STEMS: Dict[str, str] = {}
+
+
+def terms(text: Optional[str]) -> List[str]:
+    """Index terms of a text: answer_resolver's word tokens, stemmed"""
+    result = []
+    for token in tokenize(text or ''):
+        term = _STEMS.get(token)
+        if term is None:
+            term = _STEMS[token] = stem(token)
+        result.append(term)
+    return result
+
+
+def document_key(question: Dict) -> str:
+    """Same key as exam_generator.question_key, from the JSON export layout"""
+    return f"{test_key(question.get('test_type', 'chapter'), question.get('chapter'), question['test_number'])}/{question['id']}"
+
+
+def document_fields(question: Dict) -> List[str]:
+    return [question['question_text']] + [answer['text'] for answer in question['answers']] + [question.get('explanation') or '']
+
+
+def document_hash(fields: List[str]) -> int:
+    digest = hashlib.blake2b(digest_size=8)
+    for field in fields:
+        digest.update(field.encode('utf-8'))
+        digest.update(b'\0')
+    return int.from_bytes(digest.digest(), 'little')
+
+
+def file_sha256(path: str) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _strings(values: List[str]) -> Tuple[bytes, np.ndarray]:
+    encoded = [value.encode('utf-8') for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint32)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return b''.join(encoded), offsets
+
+
+class _Postings:
+    """Postings of freshly tokenized documents, as flat lists ready for numpy"""
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.term: List[int] = []
+        self.doc: List[int] = []
+        self.start: List[int] = []
+        self.positions: List[int] = []
+
+    def add(self, doc: int, fields: List[str]) -> int:
+        """Index one document, returning its length in tokens"""
+        by_term: Dict[str, List[int]] = {}
+        position = 0
+        length = 0
+        for field in fields:
+            field_terms = terms(field)
+            for offset, term in enumerate(field_terms):
+                by_term.setdefault(term, []).append(min(position + offset, MAX_POSITION))
+            position += len(field_terms) + FIELD_GAP
+            length += len(field_terms)
+        for term, positions in by_term.items():
+            self.term.append(self.vocabulary.setdefault(term, len(self.vocabulary)))
+            self.doc.append(doc)
+            self.start.append(len(self.positions))
+            self.positions.extend(positions)
+        return length
+
+
+def write_search_index(questions: Iterable[Dict], path: str, source_sha256: bytes = b'',
+                       previous: Optional['SearchIndex'] = None) -> Dict:
+    """Build the index for question dicts (JSON export layout) and write it to path.
+
+    With a previous index, documents whose key and content hash are
+    unchanged keep their postings, which are remapped and merged in bulk;
+    only new and edited questions are tokenized. Returns build statistics.
+    """
+    started = time.perf_counter()
+    keys: List[str] = []
+    hashes: List[int] = []
+    texts: List[str] = []
+    lengths: List[int] = []
+    remap = np.full(previous.document_count if previous else 0, -1, dtype=np.int64)
+    old_docs = previous.document_positions() if previous else {}
+    fresh = _Postings()
+
+    for doc, question in enumerate(questions):
+        key = document_key(question)
+        fields = document_fields(question)
+        content_hash = document_hash(fields)
+        old = old_docs.get(key)
+        if old is not None and int(previous.doc_hash[old]) == content_hash and remap[old] < 0:
+            remap[old] = doc
+            lengths.append(int(previous.doc_len[old]))
+        else:
+            lengths.append(fresh.add(doc, fields))
+        keys.append(key)
+        hashes.append(content_hash)
+        texts.append(question['question_text'])
+
+    # Postings of reused documents, straight from the previous index
+    if previous is not None and previous.posting_count:
+        old_term = np.repeat(np.arange(previous.term_count), np.diff(previous.term_post))
+        new_doc = remap[previous.post_doc]
+        keep = new_doc >= 0
+        old_terms = previous.terms()
+        old_pool = np.array(previous.positions)
+        old_parts = (old_term[keep], old_terms, new_doc[keep], previous.post_tf[keep], previous.post_pos[:-1][keep])
+    else:
+        old_terms = []
+        old_pool = np.zeros(0, dtype=np.uint16)
+        old_parts = None
+
+    fresh_terms = list(fresh.vocabulary)
+    vocabulary = sorted(set(fresh_terms) | set(old_terms))
+    term_ids = {term: i for i, term in enumerate(vocabulary)}
+
+    fresh_start = np.asarray(fresh.start, dtype=np.int64)
+    fresh_tf = np.diff(np.append(fresh_start, len(fresh.positions))).astype(np.uint16)
+    term = np.asarray([term_ids[t] for t in fresh_terms], dtype=np.int64)[np.asarray(fresh.term, dtype=np.int64)] \
+        if fresh.term else np.zeros(0, dtype=np.int64)
+    doc = np.asarray(fresh.doc, dtype=np.int64)
+    tf = fresh_tf
+    start = fresh_start + len(old_pool)
+    if old_parts is not None:
+        kept_term, kept_vocabulary, kept_doc, kept_tf, kept_start = old_parts
+        kept_term = np.asarray([term_ids[t] for t in kept_vocabulary], dtype=np.int64)[kept_term]
+        term = np.concatenate([kept_term, term])
+        doc = np.concatenate([kept_doc, doc])
+        tf = np.concatenate([kept_tf, tf])
+        start = np.concatenate([kept_start.astype(np.int64), start])
+    pool = np.concatenate([old_pool, np.asarray(fresh.positions, dtype=np.uint16)])
+
+    # Terms only removed documents used drop out of the vocabulary
+    counts = np.bincount(term, minlength=len(vocabulary))
+    used = counts > 0
+    vocabulary = [t for t, keep_term in zip(vocabulary, used) if keep_term]
+    term = (np.cumsum(used) - 1)[term]
+    counts = counts[used]
+
+    order = np.lexsort((doc, term))
+    doc, tf, start = doc[order], tf[order], start[order]
+    lens = tf.astype(np.int64)
+    post_pos = np.zeros(len(lens) + 1, dtype=np.uint32)
+    np.cumsum(lens, out=post_pos[1:])
+    gather = np.repeat(start - post_pos[:-1].astype(np.int64), lens) + np.arange(int(post_pos[-1]))
+    term_post = np.zeros(len(vocabulary) + 1, dtype=np.uint32)
+    np.cumsum(counts, out=term_post[1:])
+
+    term_blob, term_offsets = _strings(vocabulary)
+    key_blob, key_offsets = _strings(keys)
+    text_blob, text_offsets = _strings(texts)
+    sections = {
+        'term_blob': term_blob,
+        'term_offsets': term_offsets,
+        'term_post': term_post,
+        'post_doc': doc.astype(np.uint32),
+        'post_tf': tf.astype(np.uint16),
+        'post_pos': post_pos,
+        'positions': pool[gather].astype(np.uint16),
+        'doc_len': np.asarray(lengths, dtype=np.uint32),
+        'doc_hash': np.asarray(hashes, dtype=np.uint64),
+        'key_blob': key_blob,
+        'key_offsets': key_offsets,
+        'text_blob': text_blob,
+        'text_offsets': text_offsets,
+        'source_sha256': source_sha256
+    }
+    payloads = {name: data if isinstance(data, bytes) else data.astype(data.dtype.newbyteorder('<')).tobytes()
+                for name, data in sections.items()}
+
+    directory_size = HEADER.size + DIRECTORY_ENTRY.size * len(payloads)
+    offset = (directory_size + 7) & ~7
+    directory = []
+    for name, payload in payloads.items():
+        directory.append((name, offset, len(payload)))
+        offset = (offset + len(payload) + 7) & ~7
+
+    reused = int((remap >= 0).sum())
+    if previous is not None:
+        previous.close()
+    temporary = f"{path}.tmp"
+    with open(temporary, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(keys), len(vocabulary), len(doc), len(payloads)))
+        for name, section_offset, length in directory:
+            f.write(DIRECTORY_ENTRY.pack(name.encode('ascii'), section_offset, length))
+        for name, section_offset, length in directory:
+            f.write(b'\0' * (section_offset - f.tell()))
+            f.write(payloads[name])
+    os.replace(temporary, path)
+
+    return {
+        'documents': len(keys),
+        'reused': reused,
+        'tokenized': len(keys) - reused,
+        'removed': len(old_docs.keys() - set(keys)),
+        'terms': len(vocabulary),
+        'postings': len(doc),
+        'bytes': os.path.getsize(path),
+        'build_sec': round(time.perf_counter() - started, 3)
+    }
+
+
+class SearchIndex:
+    """Memory-mapped BM25 index over question text, answers and explanations.
+
+    Arrays are numpy views straight over the mapping, so opening an index
+    costs a few syscalls; a query looks each term up by binary search over
+    the sorted term strings and scores its postings in one vectorised pass.
+    Quoted phrases must appear in order within one field.
+    """
+
+    def __init__(self, path: str):
+        if sys.byteorder != 'little':
+            raise RuntimeError("Search index files can only be mapped on little-endian hosts")
+
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.document_count, self.term_count, self.posting_count, section_count = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a version {VERSION} search index")
+
+        for i in range(section_count):
+            raw_name, offset, length = DIRECTORY_ENTRY.unpack_from(self.mm, HEADER.size + i * DIRECTORY_ENTRY.size)
+            name = raw_name.rstrip(b'\0').decode('ascii')
+            dtype = np.dtype(SECTION_TYPES.get(name, np.uint32))
+            setattr(self, name, np.frombuffer(self.mm, dtype=dtype, count=length // dtype.itemsize, offset=offset))
+
+        self.source_sha256 = self.source_sha256.tobytes()
+        average = float(self.doc_len.mean()) if self.document_count else 1.0
+        # The length-normalised part of BM25's denominator, per document
+        self.norm = K1 * (1 - B + B * self.doc_len / (average or 1.0))
+
+    def close(self):
+        # numpy views keep the mapping exported, so drop them before closing it
+        for name in list(self.__dict__):
+            if isinstance(self.__dict__[name], np.ndarray):
+                delattr(self, name)
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self) -> int:
+        return self.document_count
+
+    def _string(self, blob: np.ndarray, offsets: np.ndarray, i: int) -> str:
+        return blob[offsets[i]:offsets[i + 1]].tobytes().decode('utf-8')
+
+    def terms(self) -> List[str]:
+        return [self._string(self.term_blob, self.term_offsets, i) for i in range(self.term_count)]
+
+    def key(self, doc: int) -> str:
+        return self._string(self.key_blob, self.key_offsets, doc)
+
+    def question_text(self, doc: int) -> str:
+        return self._string(self.text_blob, self.text_offsets, doc)
+
+    def document_positions(self) -> Dict[str, int]:
+        return {self.key(doc): doc for doc in range(self.document_count)}
+
+    def term_id(self, term: str) -> Optional[int]:
+        """Binary search of the sorted term strings; UTF-8 byte order is code point order"""
+        target = term.encode('utf-8')
+        blob, offsets = self.term_blob, self.term_offsets
+        lo, hi = 0, self.term_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if blob[offsets[mid]:offsets[mid + 1]].tobytes() < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.term_count and blob[offsets[lo]:offsets[lo + 1]].tobytes() == target:
+            return lo
+        return None
+
+    def _postings(self, term_id: int) -> Tuple[int, int]:
+        return int(self.term_post[term_id]), int(self.term_post[term_id + 1])
+
+    def _phrase_docs(self, phrase: List[int]) -> np.ndarray:
+        """Documents containing the terms at consecutive positions.
+
+        Each term's occurrences become (document, position - offset in the
+        phrase) pairs packed into one integer, already sorted because
+        postings are stored by document and positions in order. Starting
+        from the rarest term, the surviving pairs are binary searched in
+        each other term's pairs.
+        """
+        def pairs(offset: int, term_id: int) -> np.ndarray:
+            start, end = self._postings(term_id)
+            docs = np.repeat(self.post_doc[start:end].astype(np.int64), self.post_tf[start:end])
+            return (docs << 17) + self.positions[self.post_pos[start]:self.post_pos[end]] - offset
+
+        def occurrences(item: Tuple[int, int]) -> int:
+            start, end = self._postings(item[1])
+            return int(self.post_pos[end] - self.post_pos[start])
+
+        ordered = sorted(enumerate(phrase), key=occurrences)
+        matches = pairs(*ordered[0])
+        for offset, term_id in ordered[1:]:
+            other = pairs(offset, term_id)
+            found = np.searchsorted(other, matches)
+            found[found == len(other)] = 0
+            matches = matches[other[found] == matches] if len(other) else matches[:0]
+            if not len(matches):
+                break
+        return np.unique(matches >> 17)
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Top questions by BM25 for the query's terms, restricted to those containing every quoted phrase"""
+        phrases = [[self.term_id(term) for term in terms(phrase)] for phrase in PHRASE_RE.findall(query)]
+        phrases = [phrase for phrase in phrases if phrase]
+        words = set(terms(PHRASE_RE.sub(' ', query)))
+        words.update(term for phrase in PHRASE_RE.findall(query) for term in terms(phrase))
+
+        scores = np.zeros(self.document_count, dtype=np.float32)
+        for term in words:
+            term_id = self.term_id(term)
+            if term_id is None:
+                continue
+            start, end = self._postings(term_id)
+            docs = self.post_doc[start:end]
+            tf = self.post_tf[start:end].astype(np.float32)
+            idf = np.log(1 + (self.document_count - (end - start) + 0.5) / ((end - start) + 0.5))
+            scores[docs] += idf * tf * (K1 + 1) / (tf + self.norm[docs])
+
+        for phrase in phrases:
+            if None in phrase:
+                return []
+            allowed = np.zeros(self.document_count, dtype=bool)
+            allowed[self._phrase_docs(phrase)] = True
+            scores[~allowed] = 0
+
+        candidates = np.flatnonzero(scores)
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(-scores[candidates], limit - 1)[:limit]]
+        candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+        return [
+            {'key': self.key(doc), 'score': round(float(scores[doc]), 4), 'question_text': self.question_text(doc)}
+            for doc in candidates.tolist()
+        ]
+
+
+def _iter_source(source: str) -> Iterable[Dict]:
+    if is_question_bank(source):
+        with QuestionBank(source) as bank:
+            yield from bank.iter_questions()
+    else:
+        yield from iter_questions(source)
+
+
+def default_index_path(source: str) -> str:
+    base = source[:-len(BANK_EXTENSION)] if is_question_bank(source) else source.rsplit('.', 1)[0]
+    return base + INDEX_EXTENSION
+
+
+def update_index(source: str, path: Optional[str] = None, rebuild: bool = False) -> Dict:
+    """Bring the index for an export (JSON, NDJSON or question bank) up to date.
+
+    Nothing is written if the export is byte-for-byte the one the index was
+    built from; otherwise only changed questions are re-tokenized, unless
+    rebuild is set.
+    """
+    path = path or default_index_path(source)
+    source_sha256 = file_sha256(source)
+    previous = None
+    if os.path.exists(path) and not rebuild:
+        try:
+            previous = SearchIndex(path)
+        except ValueError:
+            previous = None
+    if previous is not None and previous.source_sha256 == source_sha256:
+        report = {'documents': previous.document_count, 'reused': previous.document_count, 'tokenized': 0,
+                  'removed': 0, 'terms': previous.term_count, 'postings': previous.posting_count,
+                  'bytes': os.path.getsize(path), 'build_sec': 0.0, 'unchanged': True}
+        previous.close()
+        return report
+    report = write_search_index(_iter_source(source), path, source_sha256, previous)
+    report['unchanged'] = False
+    return report
+
+
+def benchmark(index: SearchIndex, queries: List[str], rounds: int = 20) -> Dict:
+    """Per-query latency over a query set, in microseconds"""
+    timings = []
+    for _ in range(rounds):
+        for query in queries:
+            started = time.perf_counter()
+            index.search(query)
+            timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {
+        'queries': len(timings),
+        'median_us': round(statistics.median(timings) * 1e6, 1),
+        'p99_us': round(timings[int(len(timings) * 0.99) - 1] * 1e6, 1),
+        'max_us': round(timings[-1] * 1e6, 1)
+    }
+
+
+def sample_queries(index: SearchIndex, count: int = 200, seed: int = 7) -> List[str]:
+    """Two- and three-word queries and quoted phrases taken from indexed question texts"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(count):
+        words = tokenize(index.question_text(rng.randrange(index.document_count)))
+        if len(words) < 3:
+            continue
+        size = rng.choice((2, 3))
+        start = rng.randrange(len(words) - size + 1)
+        query = ' '.join(words[start:start + size])
+        queries.append(f'"{query}"' if rng.random() < 0.25 else query)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build and query the full-text search index')
+    parser.add_argument('query', nargs='*', help='Search terms; quote phrases that must appear in order')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Export (JSON, NDJSON or question bank) to index')
+    parser.add_argument('--index', help='Index file (default: next to the export, with a .uksi extension)')
+    parser.add_argument('--limit', type=int, default=10,
+                       help='Results to show')
+    parser.add_argument('--rebuild', action='store_true',
+                       help='Tokenize every question again instead of updating incrementally')
+    parser.add_argument('--benchmark', action='store_true',
+                       help='Time a set of queries sampled from the bank')
+
+    args = parser.parse_args()
+
+    path = args.index or default_index_path(args.json_file)
+    report = update_index(args.json_file, path, rebuild=args.rebuild)
+    if report['unchanged']:
+        print(f"🔎 {path} is up to date ({report['documents']} questions, {report['terms']} terms)")
+    else:
+        print(f"🔎 Indexed {report['documents']} questions into {path} in {report['build_sec']}s "
+              f"({report['tokenized']} tokenized, {report['reused']} reused, {report['removed']} removed; "
+              f"{report['terms']} terms, {report['bytes']} bytes)")
+
+    with SearchIndex(path) as index:
+        if args.benchmark:
+            result = benchmark(index, sample_queries(index))
+            print(f"⏱️  {result['queries']} queries: median {result['median_us']} µs, "
+                  f"p99 {result['p99_us']} µs, max {result['max_us']} µs")
+        if args.query:
+            results = index.search(' '.join(args.query), args.limit)
+            if not results:
+                print("No matching questions")
+            for result in results:
+                print(f"  {result['score']:7.3f}  {result['key']:32}  {result['question_text']}")
+
+
+if __name__ == "__main__":
+    main()
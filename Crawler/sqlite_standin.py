@@ -0,0 +1,222 @@
+import functools
+import re
+import sqlite3
+import time
+from typing import Iterable, Optional, Sequence
+
+# SQLite equivalent of the question, attempt and aggregate tables created by schema.MIGRATIONS
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS chapters (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chapter_number INTEGER NOT NULL UNIQUE,
+    name VARCHAR(100) NOT NULL,
+    description TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chapter_id INTEGER NULL REFERENCES chapters(id) ON DELETE SET NULL,
+    test_number VARCHAR(10) NOT NULL,
+    test_type TEXT NOT NULL CHECK (test_type IN ('chapter', 'comprehensive', 'exam')),
+    title VARCHAR(255),
+    url VARCHAR(255),
+    is_free BOOLEAN DEFAULT FALSE,
+    is_premium BOOLEAN DEFAULT TRUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_test_type ON tests (test_type);
+CREATE INDEX IF NOT EXISTS idx_test_number ON tests (test_number);
+
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    test_id INTEGER NOT NULL REFERENCES tests(id) ON DELETE CASCADE,
+    question_id VARCHAR(50) NOT NULL,
+    question_text TEXT NOT NULL,
+    question_text_vi TEXT,
+    question_type TEXT NOT NULL CHECK (question_type IN ('radio', 'checkbox')),
+    explanation TEXT,
+    explanation_vi TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_question_id ON questions (question_id);
+CREATE INDEX IF NOT EXISTS idx_questions_test_id ON questions (test_id);
+
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    answer_id VARCHAR(50) NOT NULL,
+    answer_text TEXT NOT NULL,
+    answer_text_vi TEXT,
+    is_correct BOOLEAN DEFAULT FALSE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX IF NOT EXISTS idx_answer_id ON answers (answer_id);
+CREATE INDEX IF NOT EXISTS idx_answers_question_id ON answers (question_id);
+
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email VARCHAR(255) NOT NULL UNIQUE,
+    password_hash VARCHAR(255) NOT NULL DEFAULT '',
+    full_name VARCHAR(100)
+);
+
+CREATE TABLE IF NOT EXISTS user_test_attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    test_id INTEGER NOT NULL REFERENCES tests(id) ON DELETE CASCADE,
+    score INTEGER,
+    total_questions INTEGER,
+    percentage DECIMAL(5,2),
+    time_taken INTEGER,
+    is_passed BOOLEAN DEFAULT FALSE,
+    started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    completed_at TIMESTAMP NULL
+);
+CREATE INDEX IF NOT EXISTS idx_completed ON user_test_attempts (completed_at, id);
+
+CREATE TABLE IF NOT EXISTS agg_watermarks (
+    name VARCHAR(50) PRIMARY KEY,
+    last_completed_at DATETIME NOT NULL DEFAULT '1000-01-01 00:00:00',
+    last_attempt_id INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS agg_user_test_best (
+    user_id INTEGER NOT NULL,
+    test_id INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    passed_attempts INTEGER NOT NULL,
+    best_percentage DECIMAL(5,2),
+    best_time_taken INTEGER,
+    last_completed_at DATETIME,
+    PRIMARY KEY (user_id, test_id)
+);
+
+CREATE TABLE IF NOT EXISTS agg_user_chapter_progress (
+    user_id INTEGER NOT NULL,
+    chapter_id INTEGER NOT NULL,
+    attempts INTEGER NOT NULL,
+    passed_attempts INTEGER NOT NULL,
+    percentage_sum DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (user_id, chapter_id)
+);
+
+CREATE TABLE IF NOT EXISTS agg_test_daily (
+    test_id INTEGER NOT NULL,
+    day DATE NOT NULL,
+    attempts INTEGER NOT NULL,
+    passed_attempts INTEGER NOT NULL,
+    percentage_sum DECIMAL(14,2) NOT NULL,
+    PRIMARY KEY (test_id, day)
+);
+"""
+
+
+class StandinCursor:
+    """DB-API cursor that accepts the MySQL dialect used by the crawler"""
+
+    def __init__(self, connection: 'StandinConnection', dictionary: bool = False):
+        self.connection = connection
+        self.cursor = connection.sqlite.cursor()
+        if dictionary:
+            self.cursor.row_factory = lambda cursor, row: {col[0]: value for col, value in zip(cursor.description, row)}
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1024)
+    def translate(sql: str) -> Optional[str]:
+        """Rewrite a MySQL statement for SQLite, or return None to skip it.
+
+        Rewrites are cached per statement text, as a server caches parsed statements.
+        """
+        stripped = sql.strip()
+        if re.match(r'USE\s', stripped, re.IGNORECASE):
+            return None
+        match = re.match(r'SET\s+FOREIGN_KEY_CHECKS\s*=\s*(\d)', stripped, re.IGNORECASE)
+        if match:
+            return f"PRAGMA foreign_keys = {'ON' if match.group(1) == '1' else 'OFF'}"
+        sql = re.sub(r'\bINSERT\s+IGNORE\b', 'INSERT OR IGNORE', sql, flags=re.IGNORECASE)
+        sql = re.sub(r'\s+FOR\s+UPDATE\s*$', '', sql, flags=re.IGNORECASE)
+        match = re.search(r'\bON\s+DUPLICATE\s+KEY\s+UPDATE\b', sql, re.IGNORECASE)
+        if match:
+            # Upsert: VALUES(col) is SQLite's excluded.col, GREATEST/LEAST its scalar MAX/MIN
+            update = re.sub(r'\bVALUES\((\w+)\)', r'excluded.\1', sql[match.end():], flags=re.IGNORECASE)
+            sql = sql[:match.start()] + ' ON CONFLICT DO UPDATE SET' + update
+            sql = re.sub(r'\bGREATEST\(', 'MAX(', sql, flags=re.IGNORECASE)
+            sql = re.sub(r'\bLEAST\(', 'MIN(', sql, flags=re.IGNORECASE)
+        return sql.replace('%s', '?')
+
+    def execute(self, sql: str, params: Sequence = ()):
+        self.connection.round_trip()
+        sql = self.translate(sql)
+        if sql is not None:
+            self.cursor.execute(sql, tuple(params))
+
+    def executemany(self, sql: str, seq_params: Iterable[Sequence]):
+        # One round trip, like mysql-connector's multi-row rewrite
+        self.connection.round_trip()
+        sql = self.translate(sql)
+        if sql is not None:
+            self.cursor.executemany(sql, [tuple(params) for params in seq_params])
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def fetchmany(self, size: int = 1):
+        return self.cursor.fetchmany(size)
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def close(self):
+        self.cursor.close()
+
+
+class StandinConnection:
+    """SQLite connection posing as mysql.connector, with optional simulated network latency"""
+
+    def __init__(self, path: str = ':memory:', rtt_ms: float = 0.0):
+        self.sqlite = sqlite3.connect(path, isolation_level='DEFERRED')
+        self.sqlite.execute("PRAGMA foreign_keys = ON")
+        self.rtt = rtt_ms / 1000
+        self.round_trips = 0
+
+    def round_trip(self):
+        self.round_trips += 1
+        if self.rtt > 0:
+            time.sleep(self.rtt)
+
+    def cursor(self, dictionary: bool = False, **kwargs) -> StandinCursor:
+        return StandinCursor(self, dictionary=dictionary)
+
+    def commit(self):
+        self.round_trip()
+        self.sqlite.commit()
+
+    def rollback(self):
+        self.round_trip()
+        self.sqlite.rollback()
+
+    def close(self):
+        self.sqlite.close()
+
+    def create_schema(self):
+        self.sqlite.executescript(SQLITE_SCHEMA)
+
+
+def connect(path: str = ':memory:', rtt_ms: float = 0.0, create_schema: bool = True) -> StandinConnection:
+    connection = StandinConnection(path, rtt_ms)
+    if create_schema:
+        connection.create_schema()
+    return connection
@@ -0,0 +1,271 @@
+import argparse
+import glob
+import hashlib
+import html
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+
+def test_path_for(question: Dict) -> str:
+    """Map a saved question back to the site path it was crawled from"""
+    test_type = question.get('test_type', 'chapter')
+    test_number = question['test_number']
+
+    if test_type == 'comprehensive':
+        return f"test-{test_number}"
+    if test_type == 'exam':
+        return f"british-citizenship-test-{test_number}"
+
+    chapter_number = question['chapter'].split('_')[-1]
+    if chapter_number in ('1', '2'):
+        return "test-1-2"
+    return f"test-{chapter_number}-{test_number}"
+
+
+def render_explanation(question: Dict) -> str:
+    """Rebuild explanation markup, emphasising the correct answers like the site does"""
+    explanation = html.escape(question.get('explanation', ''))
+    for answer in question['answers']:
+        if not answer.get('is_correct'):
+            continue
+        answer_text = html.escape(answer['text'])
+        index = explanation.lower().find(answer_text.lower())
+        if index >= 0:
+            end = index + len(answer_text)
+            explanation = f"{explanation[:index]}<strong>{explanation[index:end]}</strong>{explanation[end:]}"
+    return explanation
+
+
+def render_test_page(questions: List[Dict]) -> str:
+    """Render questions using the markup of a lifeintheuktestweb.co.uk test page"""
+    parts = ['<html><head><title>Life in the UK Test</title></head><body><div class="content">']
+
+    for question in questions:
+        input_type = 'checkbox' if question['question_type'] == 'checkbox' else 'radio'
+        parts.append(f'<div class="container_question" data-id_question="{html.escape(question["id"])}">')
+        parts.append(f'<div class="question">{html.escape(question["question_text"])}</div>')
+        parts.append('<ul class="container_answer">')
+        for answer in question['answers']:
+            parts.append(
+                f'<li><label><input type="{input_type}" name="{html.escape(question["id"])}" '
+                f'data-id_answer="{html.escape(answer["id"])}"> {html.escape(answer["text"])}</label></li>'
+            )
+        parts.append('</ul>')
+        if question.get('explanation'):
+            parts.append(f'<div class="container_explication"><p>{render_explanation(question)}</p></div>')
+        parts.append('</div>')
+
+    parts.append('</div></body></html>')
+    return '\n'.join(parts)
+
+
+def build_pages_from_json(json_file: str) -> Dict[str, str]:
+    """Build a path -> HTML map for every test in a saved question bank"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+
+    grouped: Dict[str, Dict] = {}
+    for question in data['questions']:
+        path = test_path_for(question)
+        # Chapters 1 & 2 share one page, keep the first copy only
+        owner = (question.get('test_type'), question.get('chapter'), question['test_number'])
+        entry = grouped.setdefault(path, {'owner': owner, 'questions': []})
+        if entry['owner'] == owner:
+            entry['questions'].append(question)
+
+    return {path: render_test_page(entry['questions']) for path, entry in grouped.items()}
+
+
+def load_recording(record_dir: str) -> Dict[str, str]:
+    """Build a path -> HTML map from pages snapshotted with the crawler's --record-dir"""
+    pages = {}
+    for filename in sorted(glob.glob(os.path.join(record_dir, '*.html'))):
+        with open(filename, 'r', encoding='utf-8') as f:
+            pages[os.path.basename(filename)[:-len('.html')]] = f.read()
+    return pages
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Serve pages from the owning server's page map, with the server's injected latency and faults"""
+
+    def do_GET(self):
+        server = self.server
+        delay, fault = server.next_response()
+        try:
+            if delay > 0:
+                time.sleep(delay)
+            self._respond(server, fault)
+        finally:
+            server.finish_response()
+
+    def _respond(self, server, fault: int):
+        if fault == 429:
+            self.send_response(429)
+            self.send_header('Retry-After', f"{server.retry_after:g}")
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if fault:
+            self.send_error(fault)
+            return
+
+        path = self.path.split('?', 1)[0].strip('/')
+        page = server.pages.get(path)
+
+        if page is None:
+            self.send_error(404)
+            return
+
+        body = page.encode('utf-8')
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('ETag', etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _FaultyHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, pages: Dict[str, str], latency: float, jitter: float,
+                 throttle_rate: float, error_rate: float, retry_after: float, seed: Optional[int],
+                 max_in_flight: int = 0, load_latency: float = 0.0):
+        super().__init__(address, StubHandler)
+        self.pages = pages
+        self.latency = latency
+        self.jitter = jitter
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.max_in_flight = max_in_flight
+        self.load_latency = load_latency
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.counts = {'requests': 0, 'throttled': 0, 'overloaded': 0, 'errors': 0, 'max_in_flight': 0}
+
+    def next_response(self) -> Tuple[float, int]:
+        """Draw (delay in seconds, injected status or 0) for one request"""
+        with self.lock:
+            self.counts['requests'] += 1
+            self.in_flight += 1
+            self.counts['max_in_flight'] = max(self.counts['max_in_flight'], self.in_flight)
+            # Every request already in flight slows this one down
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter)) + self.load_latency * (self.in_flight - 1)
+            if self.max_in_flight and self.in_flight > self.max_in_flight:
+                self.counts['overloaded'] += 1
+                return 0.0, 429
+            roll = self.rng.random()
+            if roll < self.throttle_rate:
+                self.counts['throttled'] += 1
+                return delay, 429
+            if roll < self.throttle_rate + self.error_rate:
+                self.counts['errors'] += 1
+                return delay, self.rng.choice([500, 502, 503])
+            return delay, 0
+
+    def finish_response(self):
+        with self.lock:
+            self.in_flight -= 1
+
+
+class StubServer:
+    """Local HTTP stand-in for the test site, usable as a context manager.
+
+    latency and jitter are in seconds; throttle_rate and error_rate are the
+    fractions of requests answered with 429 (plus Retry-After) or a 5xx.
+    To model a server with limited capacity, max_in_flight answers 429 to
+    any request beyond that many concurrent ones, and load_latency adds
+    that many seconds per request already in flight.
+    """
+
+    def __init__(self, pages: Dict[str, str], host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 jitter: float = 0.0, throttle_rate: float = 0.0, error_rate: float = 0.0, retry_after: float = 1,
+                 seed: Optional[int] = None, max_in_flight: int = 0, load_latency: float = 0.0):
+        self.httpd = _FaultyHTTPServer((host, port), pages, latency, jitter, throttle_rate, error_rate,
+                                       retry_after, seed, max_in_flight, load_latency)
+        self.thread = None
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return dict(self.httpd.counts)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve a saved question bank as a local test site')
+    parser.add_argument('--json-file', default='uk_visa_all_questions.json',
+                       help='Question bank to render pages from')
+    parser.add_argument('--record-dir',
+                       help='Serve pages recorded with the crawler\'s --record-dir instead')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--latency-ms', type=float, default=0.0,
+                       help='Delay added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=0.0,
+                       help='Uniform +/- variation of the delay')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                       help='Fraction of requests answered with 429 Too Many Requests')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                       help='Fraction of requests answered with 500/502/503')
+    parser.add_argument('--retry-after', type=float, default=1,
+                       help='Retry-After seconds sent with 429 responses')
+    parser.add_argument('--max-in-flight', type=int, default=0,
+                       help='Answer 429 to requests beyond this many concurrent ones (0 = no limit)')
+    parser.add_argument('--load-latency-ms', type=float, default=0.0,
+                       help='Delay added per request already in flight')
+    parser.add_argument('--seed', type=int, help='Seed for reproducible jitter and faults')
+
+    args = parser.parse_args()
+
+    pages = load_recording(args.record_dir) if args.record_dir else build_pages_from_json(args.json_file)
+    server = StubServer(pages, args.host, args.port, latency=args.latency_ms / 1000, jitter=args.jitter_ms / 1000,
+                        throttle_rate=args.throttle_rate, error_rate=args.error_rate,
+                        retry_after=args.retry_after, seed=args.seed, max_in_flight=args.max_in_flight,
+                        load_latency=args.load_latency_ms / 1000)
+    print(f"🌐 Serving {len(server.httpd.pages)} test pages on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import json
+import os
+import sys
+
+import pytest
+
+# The crawler modules are flat files in the directory above
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+# user_answers is not part of the stand-in schema; tests that need it create it
+USER_ANSWERS_SQL = """
+CREATE TABLE user_answers (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    attempt_id INTEGER NOT NULL REFERENCES user_test_attempts(id) ON DELETE CASCADE,
+    question_id INTEGER NOT NULL REFERENCES questions(id) ON DELETE CASCADE,
+    selected_answer_ids TEXT,
+    is_correct BOOLEAN,
+    answered_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+"""
+
+
+def make_question(test_type, chapter, test_number, question_id, correct):
+    return {
+        'id': question_id,
+        'chapter': chapter,
+        'test_number': test_number,
+        'test_type': test_type,
+        'question_text': f"Which statement about {question_id} in test {test_number} is true?",
+        'question_type': 'radio',
+        'answers': [
+            {'id': f"r{i}", 'text': f"Statement number {i}", 'is_correct': i == correct} for i in range(4)
+        ],
+        'explanation': f"Statement number {correct} is the correct answer.",
+        'correct_answers': [f"r{correct}"]
+    }
+
+
+def make_bank():
+    """A small question bank covering a chapter, a comprehensive and an exam test"""
+    return [
+        make_question('chapter', 'chapter_3', '1', 'p0', 1),
+        make_question('chapter', 'chapter_3', '1', 'p1', 2),
+        make_question('comprehensive', None, '1', 'p0', 0),
+        make_question('exam', None, '1', 'p0', 3)
+    ]
+
+
+@pytest.fixture
+def bank_file(tmp_path):
+    path = tmp_path / 'bank.json'
+    path.write_text(json.dumps({'questions': make_bank()}), encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def bank_questions():
+    """The bank_file questions as Question objects"""
+    from uk_visa_test import question_from_dict
+
+    return [question_from_dict(data) for data in make_bank()]
+
+
+@pytest.fixture
+def standin(tmp_path):
+    """An open SQLite stand-in connection with the question and aggregate schema"""
+    import sqlite_standin
+
+    connection = sqlite_standin.connect(str(tmp_path / 'standin.sqlite'))
+    yield connection
+    connection.close()
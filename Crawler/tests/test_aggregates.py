@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+import pytest
+
+import sqlite_standin
+from aggregates import _aggregate_snapshot, _as_datetime, rebuild_aggregates, refresh_aggregates, rolling_pass_rates
+from bulk_loader import BulkLoader
+from db import Database
+
+
+@pytest.fixture
+def database(standin, bank_questions, tmp_path):
+    BulkLoader(standin).load(bank_questions)
+    standin.sqlite.execute("INSERT INTO users (email) VALUES ('a@example.com'), ('b@example.com'), ('c@example.com')")
+    standin.commit()
+    path = str(tmp_path / 'standin.sqlite')
+    database = Database(connect=lambda: sqlite_standin.connect(path, create_schema=False), pool_size=1)
+    yield database
+    database.close()
+
+
+def add_attempts(database, rows):
+    """rows of (user_id, test_id, percentage, completed_at); 75% or more passes"""
+    with database.transaction() as session:
+        for user_id, test_id, percentage, completed_at in rows:
+            session.execute(
+                "INSERT INTO user_test_attempts (user_id, test_id, percentage, time_taken, is_passed, completed_at) "
+                "VALUES (%s, %s, %s, %s, %s, %s)",
+                (user_id, test_id, percentage, 600, 1 if percentage >= 75 else 0, completed_at)
+            )
+
+
+def test_incremental_refresh_equals_a_rebuild(database):
+    now = _as_datetime(database.query_one("SELECT CURRENT_TIMESTAMP AS now")['now'])
+
+    def ago(**delta):
+        return (now - timedelta(**delta)).strftime('%Y-%m-%d %H:%M:%S')
+
+    add_attempts(database, [
+        (1, 1, 80.0, ago(days=3)), (1, 1, 60.0, ago(days=3, hours=-1)), (2, 1, 90.0, ago(days=2)),
+        (2, 2, 50.0, ago(days=2)), (3, 3, 75.0, ago(days=1)), (1, 2, 70.0, ago(days=1))
+    ])
+    first = refresh_aggregates(database, batch_size=2, lag=60)
+    assert (first['attempts'], first['batches']) == (6, 3)
+
+    # The second new attempt completes in the same second as the watermark, after it by id
+    add_attempts(database, [
+        (3, 1, 95.0, ago(hours=2)), (2, 2, 85.0, ago(days=1)), (1, 3, 40.0, ago(seconds=0))
+    ])
+    second = refresh_aggregates(database, batch_size=2, lag=60)
+    assert second['attempts'] == 2
+    assert refresh_aggregates(database, lag=60)['attempts'] == 0
+    incremental = _aggregate_snapshot(database)
+
+    assert rebuild_aggregates(database, batch_size=100, lag=60)['attempts'] == 8
+    assert _aggregate_snapshot(database) == incremental
+
+    # The attempt inside the lag window is picked up once it is old enough
+    assert refresh_aggregates(database, lag=0)['attempts'] == 1
+    assert rolling_pass_rates(database, days=30) == [
+        {'test_id': 1, 'attempts': 4, 'pass_rate': 0.75, 'avg_percentage': 81.25},
+        {'test_id': 2, 'attempts': 3, 'pass_rate': 0.3333, 'avg_percentage': 68.33},
+        {'test_id': 3, 'attempts': 2, 'pass_rate': 0.5, 'avg_percentage': 57.5}
+    ]
+
+
+def test_best_scores_and_chapter_progress(database):
+    add_attempts(database, [(1, 1, 60.0, '2026-01-01 10:00:00'), (1, 1, 80.0, '2026-01-02 10:00:00'),
+                            (1, 2, 90.0, '2026-01-03 10:00:00')])
+    refresh_aggregates(database, lag=0)
+
+    best = database.query_one("SELECT * FROM agg_user_test_best WHERE user_id = 1 AND test_id = 1")
+    assert (best['attempts'], best['passed_attempts'], float(best['best_percentage'])) == (2, 1, 80.0)
+    # Comprehensive and exam attempts are kept under chapter 0
+    progress = database.query("SELECT chapter_id, attempts FROM agg_user_chapter_progress ORDER BY chapter_id")
+    assert [(row['chapter_id'], row['attempts']) for row in progress] == [(0, 1), (3, 2)]
@@ -0,0 +1,73 @@
+import json
+import sqlite3
+
+import pytest
+
+import sqlite_standin
+from analytics import SUMMARY_TABLES, refresh_analytics
+from bulk_loader import BulkLoader
+from conftest import USER_ANSWERS_SQL
+from db import Database
+
+
+@pytest.fixture
+def database(standin, bank_questions, tmp_path):
+    """The bank, two users with three attempts, and their answers"""
+    standin.sqlite.executescript(USER_ANSWERS_SQL)
+    for table, columns in SUMMARY_TABLES.items():
+        standin.sqlite.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+    BulkLoader(standin).load(bank_questions)
+    standin.commit()
+
+    path = str(tmp_path / 'standin.sqlite')
+    # A plain sqlite3 connection leaves foreign keys off, so an answer can outlive its attempt
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO users (email) VALUES ('a@example.com'), ('b@example.com')")
+        connection.executemany(
+            "INSERT INTO user_test_attempts (user_id, test_id, is_passed, percentage, time_taken, completed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(1, 1, 1, 75.0, 100, '2026-10-17 10:00:00'), (2, 1, 0, 50.0, 200, '2026-10-17 11:00:00'),
+             (1, 2, None, None, None, None)]
+        )
+        connection.executemany(
+            "INSERT INTO user_answers (attempt_id, question_id, selected_answer_ids, is_correct) VALUES (?, ?, ?, ?)",
+            [(1, 1, json.dumps(['r1']), 1), (1, 2, json.dumps(['r0']), 0),
+             (2, 1, json.dumps(['r1']), 1), (2, 2, json.dumps(['r2', 'r3']), 1),
+             (3, 3, json.dumps(['r0']), 1), (3, 3, 'not json', 0),
+             (99, 1, json.dumps(['r3']), 0)]
+        )
+    return Database(connect=lambda: sqlite_standin.connect(path, create_schema=False), pool_size=1)
+
+
+def stored(database, table):
+    columns = SUMMARY_TABLES[table]
+    return [tuple(row[column] for column in columns)
+            for row in database.query(f"SELECT * FROM {table} ORDER BY {columns[0]}, {columns[1]}")]
+
+
+def test_refresh_writes_the_summary_tables(database):
+    report = refresh_analytics(database, chunk_size=2, batch_size=3, min_answers=3)
+
+    assert (report['attempts'], report['user_answers'], report['unparseable_selections']) == (3, 7, 1)
+    assert stored(database, 'analytics_question_stats') == [
+        (1, 1, 3, 2, 0.3333), (2, 1, 2, 1, 0.5), (3, 2, 2, 1, 0.5)
+    ]
+    # Question 1's answers are ids 1-4 and r1 is correct; question 2's are 5-8 with r2 correct
+    assert stored(database, 'analytics_answer_stats')[:8] == [
+        (1, 1, 0, 0, 0.0), (2, 1, 1, 2, 0.6667), (3, 1, 0, 0, 0.0), (4, 1, 0, 1, 0.3333),
+        (5, 2, 0, 1, 0.5), (6, 2, 0, 0, 0.0), (7, 2, 1, 1, 0.5), (8, 2, 0, 1, 0.5)
+    ]
+    assert stored(database, 'analytics_test_stats') == [
+        (1, 2, 2, 1, 0.5, 62.5, 150), (2, 1, 0, 0, None, None, None)
+    ]
+    # Only chapter tests count, and the answer without an attempt has no user
+    assert stored(database, 'analytics_user_chapter_stats') == [(1, 3, 2, 1, 0.5), (2, 3, 2, 2, 1.0)]
+    assert [q['question_id'] for q in report['hardest_questions']] == [1]
+
+
+def test_dry_run_leaves_the_tables_alone(database):
+    report = refresh_analytics(database, write=False)
+
+    assert not report['written']
+    assert report['tables']['analytics_question_stats'] == 3
+    assert stored(database, 'analytics_question_stats') == []
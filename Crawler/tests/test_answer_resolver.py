@@ -0,0 +1,33 @@
+import pytest
+
+from answer_resolver import AnswerResolver
+from uk_visa_test import Answer
+
+
+def resolve(answer_texts, explanation, strong_texts=()):
+    answers = [Answer(id=f"r{i}", text=text) for i, text in enumerate(answer_texts)]
+    resolver = AnswerResolver(min_confidence=0.5)
+    return resolver.mark_correct(answers, resolver.resolve(answers, list(strong_texts), explanation))
+
+
+@pytest.mark.parametrize('explanation, expected', [
+    ("The correct answer isCharles II.", ['r1']),
+    ("The correct answer isthe Reformation.", ['r2']),
+    ("Baroness Tanni Grey-ThompsonandEllie Simmondsare the correct answers.", ['r0', 'r3']),
+])
+def test_words_glued_by_the_scraper_still_resolve(explanation, expected):
+    answers = ['Baroness Tanni Grey-Thompson', 'Charles II', 'The Reformation', 'Ellie Simmonds']
+    assert resolve(answers, explanation) == expected
+
+
+def test_whole_word_match_wins_over_substrings():
+    # "No" is inside "Not", but the exact answer is found first
+    assert resolve(['No', 'Not sure'], "Not sure is the correct answer.") == ['r1']
+
+
+def test_strong_emphasis_takes_precedence():
+    assert resolve(['Edinburgh', 'Cardiff'], "Cardiff is the correct answer.", strong_texts=['Edinburgh']) == ['r0']
+
+
+def test_unrelated_explanation_resolves_nothing():
+    assert resolve(['Edinburgh', 'Cardiff'], "Wales has its own assembly.") == []
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from async_crawler import AsyncCrawlEngine, CrawlStats
+from rate_limit import HostRateLimiter, TokenBucket
+from stub_server import StubServer, build_pages_from_json
+from uk_visa_test import UKVisaTestCrawler
+
+
+@pytest.mark.parametrize('p, count, expected', [
+    (95, 20, 19),
+    (90, 10, 9),
+    (50, 10, 5),
+    (99, 10, 10),
+    (7, 100, 7),
+    (100, 20, 20),
+    (0, 20, 1),
+])
+def test_percentile_is_nearest_rank(p, count, expected):
+    stats = CrawlStats(latencies=[float(value) for value in range(count, 0, -1)])
+    assert stats.percentile(p) == expected
+
+
+def test_percentile_of_no_samples_is_zero():
+    assert CrawlStats().percentile(99) == 0.0
+
+
+JOBS = [
+    ('test-3-1', 'chapter_3', '1', 'chapter'),
+    ('test-1', None, '1', 'comprehensive'),
+    ('british-citizenship-test-1', None, '1', 'exam')
+]
+
+
+def test_async_engine_returns_each_jobs_questions_in_order(bank_file):
+    pages = build_pages_from_json(bank_file)
+    del pages['test-1']
+    with StubServer(pages, latency=0.01, jitter=0.01, seed=3) as server:
+        engine = AsyncCrawlEngine(UKVisaTestCrawler(base_url=server.base_url), concurrency=3, rate=0)
+        results = engine.crawl_jobs(JOBS)
+
+    assert [[q.id for q in questions] if questions is not None else None for questions in results] == [
+        ['p0', 'p1'], None, ['p0']
+    ]
+    assert (engine.stats.pages, engine.stats.errors) == (2, 1)
+
+
+def test_async_engine_stays_within_its_concurrency(bank_file):
+    pages = build_pages_from_json(bank_file)
+    # The stub answers 429 to any request beyond two in flight
+    with StubServer(pages, latency=0.05, max_in_flight=2) as server:
+        engine = AsyncCrawlEngine(UKVisaTestCrawler(base_url=server.base_url), concurrency=2, rate=0)
+        results = engine.crawl_jobs(JOBS * 2)
+
+    assert all(questions is not None for questions in results)
+
+
+def test_token_bucket_paces_requests_after_the_burst():
+    bucket = TokenBucket(rate=100, capacity=2)
+    waits = [bucket.reserve() for _ in range(5)]
+
+    assert waits[:2] == [0.0, 0.0]
+    assert waits[2:] == pytest.approx([0.01, 0.02, 0.03], abs=0.002)
+
+
+def test_host_rate_limiter_keeps_one_bucket_per_host():
+    limiter = HostRateLimiter(rate=1, capacity=1)
+    assert limiter.bucket_for('http://a.test/x') is limiter.bucket_for('http://a.test/y')
+    assert limiter.bucket_for('http://a.test/x') is not limiter.bucket_for('http://b.test/x')
+
+    started = time.monotonic()
+    asyncio.run(limiter.acquire('http://a.test/x'))
+    asyncio.run(limiter.acquire('http://b.test/x'))
+    assert time.monotonic() - started < 0.5
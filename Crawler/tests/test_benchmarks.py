@@ -0,0 +1,153 @@
+import json
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+import benchmarks
+from stub_server import StubServer, build_pages_from_json, load_recording
+from uk_visa_test import UKVisaTestCrawler
+
+
+@pytest.fixture
+def pages(bank_file):
+    return build_pages_from_json(bank_file)
+
+
+def test_load_recording_round_trips_recorded_pages(tmp_path, pages):
+    crawler = UKVisaTestCrawler(record_dir=str(tmp_path / 'recording'))
+    for test_path, html in pages.items():
+        crawler.record_page(test_path, html)
+    (tmp_path / 'recording' / 'notes.txt').write_text('not a page')
+
+    assert load_recording(str(tmp_path / 'recording')) == pages
+
+
+def test_recorded_crawl_replays_to_the_same_questions(tmp_path, pages, monkeypatch):
+    monkeypatch.setattr(benchmarks.Config, 'CRAWLER_DELAY', 0)
+    with StubServer(pages) as server:
+        crawler = UKVisaTestCrawler(base_url=server.base_url, record_dir=str(tmp_path / 'recording'))
+        crawler.test_configs = {
+            'chapter_tests': {'chapter_3': ['test-3-1']},
+            'comprehensive_tests': ['test-1'],
+            'exam_tests': ['british-citizenship-test-1']
+        }
+        crawler.crawl_all_tests()
+
+    assert load_recording(str(tmp_path / 'recording')) == pages
+    assert len(crawler.questions_data) == 4
+
+
+def test_stub_serves_pages_with_etag(pages):
+    with StubServer(pages) as server:
+        response = requests.get(f"{server.base_url}/test-3-1")
+        assert response.status_code == 200
+        assert response.text == pages['test-3-1']
+
+        repeat = requests.get(f"{server.base_url}/test-3-1", headers={'If-None-Match': response.headers['ETag']})
+        assert repeat.status_code == 304
+        assert requests.get(f"{server.base_url}/test-99").status_code == 404
+
+
+def test_stub_throttles_with_retry_after(pages):
+    with StubServer(pages, throttle_rate=1.0, retry_after=0.25, seed=1) as server:
+        response = requests.get(f"{server.base_url}/test-3-1")
+        counts = server.counts
+
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '0.25'
+    assert counts['requests'] == 1
+    assert counts['throttled'] == 1
+
+
+def test_stub_injects_server_errors(pages):
+    with StubServer(pages, error_rate=1.0, seed=1) as server:
+        statuses = {requests.get(f"{server.base_url}/test-3-1").status_code for _ in range(20)}
+        counts = server.counts
+
+    assert statuses <= {500, 502, 503}
+    assert counts['errors'] == 20
+    assert counts['throttled'] == 0
+
+
+def test_stub_fault_rates_are_reproducible_by_seed(pages):
+    def statuses(seed):
+        with StubServer(pages, throttle_rate=0.3, error_rate=0.3, retry_after=0, seed=seed) as server:
+            return [requests.get(f"{server.base_url}/test-3-1").status_code for _ in range(30)]
+
+    first = statuses(7)
+    assert first == statuses(7)
+    assert {200, 429} <= set(first)
+
+
+def test_stub_rejects_requests_beyond_capacity(pages):
+    first = {}
+    with StubServer(pages, latency=0.2, max_in_flight=1) as server:
+        thread = threading.Thread(target=lambda: first.update(status=requests.get(f"{server.base_url}/test-3-1").status_code))
+        thread.start()
+        while server.counts['requests'] == 0:
+            time.sleep(0.001)
+        second = requests.get(f"{server.base_url}/test-1").status_code
+        thread.join()
+
+    assert first['status'] == 200
+    assert second == 429
+
+
+def _baseline(**cases):
+    return {'cases': {case: {'min_sec': min_sec, 'median_sec': min_sec, 'rounds': 1} for case, min_sec in cases.items()}}
+
+
+def _results(**cases):
+    return _baseline(**cases)['cases']
+
+
+def test_compare_flags_cases_slower_than_tolerance():
+    baseline = _baseline(extract_question_data=0.5, save_to_json=0.1)
+    results = _results(extract_question_data=0.7, save_to_json=0.12)
+
+    assert benchmarks.compare(results, baseline, tolerance=0.3) == ['extract_question_data']
+    assert benchmarks.compare(results, baseline, tolerance=0.5) == []
+
+
+def test_compare_ignores_slowdowns_within_timer_noise():
+    # Three times slower, but by less than MIN_REGRESSION_SEC
+    results = _results(save_to_json=0.003)
+    assert benchmarks.compare(results, _baseline(save_to_json=0.001), tolerance=0.3) == []
+
+
+def test_compare_skips_cases_missing_from_baseline():
+    assert benchmarks.compare(_results(save_to_json=10.0), _baseline(), tolerance=0.3) == []
+
+
+def test_main_fails_the_build_on_a_regression(tmp_path, bank_file, monkeypatch, capsys):
+    baseline_file = str(tmp_path / 'baseline.json')
+    argv = ['benchmarks.py', '--json-file', bank_file, '--baseline', baseline_file,
+            '--cases', 'save_to_json', '--rounds', '1']
+
+    monkeypatch.setattr(sys, 'argv', argv + ['--update-baseline'])
+    benchmarks.main()
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        recorded = json.load(f)
+    assert set(recorded['cases']) == {'save_to_json'}
+
+    monkeypatch.setattr(sys, 'argv', argv)
+    benchmarks.main()
+    assert '✅ No regressions' in capsys.readouterr().out
+
+    slow = recorded['cases']['save_to_json']['min_sec'] * 2 + 1
+    monkeypatch.setattr(benchmarks.BenchmarkSuite, 'run', lambda self, cases=None: _results(save_to_json=slow))
+    with pytest.raises(SystemExit) as exit_info:
+        benchmarks.main()
+    assert exit_info.value.code == 1
+    assert '❌ Slower than baseline' in capsys.readouterr().out
+
+
+def test_crawl_benchmark_restores_the_crawl_delay(pages, monkeypatch):
+    monkeypatch.setattr(benchmarks.Config, 'CRAWLER_DELAY', 0.25)
+    suite = benchmarks.BenchmarkSuite({'test-1': pages['test-1']}, rounds=1, latency=0, jitter=0)
+
+    assert suite.bench_crawl_all_tests()['rounds'] == 1
+    assert benchmarks.Config.CRAWLER_DELAY == 0.25
@@ -0,0 +1,30 @@
+from bulk_loader import BulkLoader
+
+
+def test_bulk_load_batches_statements_and_maps_ids(standin, bank_questions):
+    stats = BulkLoader(standin, batch_size=2).load(bank_questions)
+    standin.commit()
+
+    assert (stats['questions'], stats['answers']) == (4, 16)
+    # Chapters: insert and select. Tests: select, two inserts for three new tests, select again.
+    # The id watermark, then per two questions: their insert, the id lookup and four answer inserts
+    assert stats['statements'] == 2 + 4 + 1 + 2 * 6
+    cursor = standin.cursor()
+    cursor.execute(
+        "SELECT q.question_id, t.test_type, COUNT(a.id), SUM(a.is_correct) FROM questions q "
+        "JOIN tests t ON t.id = q.test_id JOIN answers a ON a.question_id = q.id "
+        "GROUP BY q.id ORDER BY q.id"
+    )
+    assert cursor.fetchall() == [
+        ('p0', 'chapter', 4, 1), ('p1', 'chapter', 4, 1), ('p0', 'comprehensive', 4, 1), ('p0', 'exam', 4, 1)
+    ]
+
+
+def test_bulk_load_reuses_existing_chapters_and_tests(standin, bank_questions):
+    BulkLoader(standin).load(bank_questions)
+    BulkLoader(standin).load(bank_questions)
+    standin.commit()
+
+    cursor = standin.cursor()
+    cursor.execute("SELECT (SELECT COUNT(*) FROM chapters), (SELECT COUNT(*) FROM tests), (SELECT COUNT(*) FROM questions)")
+    assert cursor.fetchone() == (5, 3, 8)
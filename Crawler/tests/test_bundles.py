@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from bulk_loader import BulkLoader
+from bundles import MANIFEST_FILE, build_bundles, load_bank
+from db import Session
+
+
+@pytest.fixture
+def session(standin, bank_questions):
+    BulkLoader(standin).load(bank_questions)
+    standin.commit()
+    return Session.wrap(standin)
+
+
+def read_bundle(output_dir, entry):
+    with open(os.path.join(output_dir, entry['file']), encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_bundles_serve_tests_with_and_without_answers(session, tmp_path):
+    output_dir = str(tmp_path / 'bundles')
+    report = build_bundles(load_bank(session), output_dir)
+
+    assert (report['questions'], report['test_bundles'], report['chapter_bundles']) == (4, 3, 1)
+    with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+        manifest = json.load(f)
+    chapter_test = manifest['tests']['1']
+    assert (chapter_test['test_type'], chapter_test['chapter_name'], chapter_test['question_count']) == \
+        ('chapter', 'Chapter 3: A Long and Illustrious History', 2)
+
+    questions = read_bundle(output_dir, chapter_test['variants']['questions'])
+    answers = read_bundle(output_dir, chapter_test['variants']['answers'])
+    assert [q['question_id'] for q in answers['questions']] == ['p0', 'p1']
+    assert [a['answer_id'] for a in answers['questions'][1]['answers'] if a['is_correct']] == ['r2']
+    assert all('is_correct' not in a for q in questions['questions'] for a in q['answers'])
+    assert read_bundle(output_dir, manifest['chapters']['3']['variants']['answers'])['questions'] == answers['questions']
+
+
+def test_rebuild_only_writes_changed_bundles(session, standin, tmp_path):
+    output_dir = str(tmp_path / 'bundles')
+    first = build_bundles(load_bank(session), output_dir)
+    assert build_bundles(load_bank(session), output_dir)['files_written'] == 0
+
+    session.execute("UPDATE answers SET answer_text = 'Reworded' WHERE id = 1")
+    standin.commit()
+    second = build_bundles(load_bank(session), output_dir, prune=True)
+
+    # Both variants of the test and of its chapter, each plain and gzipped
+    assert (second['files_written'], second['files_pruned']) == (8, 8)
+    assert second['version'] != first['version']
@@ -0,0 +1,79 @@
+import pytest
+
+from crawl_queue import CrawlQueue
+from stub_server import StubServer, build_pages_from_json
+from uk_visa_test import UKVisaTestCrawler
+
+JOBS = [
+    ('test-3-1', 'chapter_3', '1', 'chapter'),
+    ('test-1', None, '1', 'comprehensive'),
+    ('british-citizenship-test-1', None, '1', 'exam')
+]
+
+
+@pytest.fixture(autouse=True)
+def no_crawl_delay(monkeypatch):
+    monkeypatch.setattr('uk_visa_test.Config.CRAWLER_DELAY', 0)
+
+
+def run(base_url, queue_file, **queue_options):
+    crawler = UKVisaTestCrawler(base_url=base_url)
+    queue = CrawlQueue(queue_file, **queue_options)
+    try:
+        crawler._crawl_with_queue(queue, JOBS, use_async=False, concurrency=None, parse_workers=None)
+        return crawler, queue.summary()
+    finally:
+        queue.close()
+
+
+def test_resumes_after_an_interrupted_run(bank_file, tmp_path, monkeypatch):
+    queue_file = str(tmp_path / 'queue.sqlite')
+    with StubServer(build_pages_from_json(bank_file)) as server:
+        expected, _ = run(server.base_url, str(tmp_path / 'uninterrupted.sqlite'))
+        requests = server.counts['requests']
+
+        # Die while parsing the second page, after it was fetched and checkpointed
+        parse = UKVisaTestCrawler.extract_question_data
+        calls = []
+
+        def interrupted(self, *args, **kwargs):
+            calls.append(args)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+            return parse(self, *args, **kwargs)
+
+        monkeypatch.setattr(UKVisaTestCrawler, 'extract_question_data', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            run(server.base_url, queue_file)
+        monkeypatch.setattr(UKVisaTestCrawler, 'extract_question_data', parse)
+
+        queue = CrawlQueue(queue_file)
+        assert queue.summary() == {'pending': 1, 'fetched': 1, 'parsed': 1, 'failed': 0}
+        queue.close()
+
+        crawler, summary = run(server.base_url, queue_file)
+        # Two fetches by the interrupted run, then only the page it never reached
+        assert server.counts['requests'] == requests + 2 + 1
+
+    assert summary == {'pending': 0, 'fetched': 0, 'parsed': 3, 'failed': 0}
+    assert [(q.id, q.test_type, q.correct_answers) for q in crawler.questions_data] == \
+        [(q.id, q.test_type, q.correct_answers) for q in expected.questions_data]
+
+
+def test_failed_pages_are_retried_then_given_up(bank_file, tmp_path):
+    queue_file = str(tmp_path / 'queue.sqlite')
+    pages = build_pages_from_json(bank_file)
+    del pages['test-1']
+    with StubServer(pages) as server:
+        crawler, summary = run(server.base_url, queue_file, max_attempts=2, backoff=0)
+        assert server.counts['requests'] == 3 + 1
+
+    assert summary == {'pending': 0, 'fetched': 0, 'parsed': 2, 'failed': 1}
+    assert crawler.failed_tests == ['test-1']
+
+    queue = CrawlQueue(queue_file, max_attempts=2)
+    assert [(f['test_path'], f['attempts']) for f in queue.failures()] == [('test-1', 2)]
+    assert queue.due_jobs() == []
+    assert queue.retry_failed() == 1
+    assert queue.due_jobs() == [JOBS[1]]
+    queue.close()
@@ -0,0 +1,76 @@
+import pytest
+
+import sqlite_standin
+from db import Database
+from uk_visa_test import UKVisaTestCrawler
+
+
+def standin_database(tmp_path, pool_size=2, **options):
+    path = str(tmp_path / 'pool.sqlite')
+    sqlite_standin.connect(path).close()
+    return Database(connect=lambda: sqlite_standin.connect(path, create_schema=False), pool_size=pool_size, **options)
+
+
+def test_prepared_statement_times_every_run(tmp_path):
+    database = standin_database(tmp_path)
+    sql = "INSERT INTO chapters (chapter_number, name) VALUES (%s, %s)"
+    with database.transaction() as session:
+        with session.prepare(sql) as insert:
+            for number in range(1, 6):
+                insert.execute((number, f"Chapter {number}"))
+            assert insert.lastrowid == 5
+
+    entry = next(entry for entry in database.stats.summary()['queries'] if entry['sql'] == sql)
+    assert entry['calls'] == 5
+    assert database.query_one("SELECT COUNT(*) AS n FROM chapters")['n'] == 5
+
+
+def test_row_by_row_save_matches_bulk_load(standin, bank_questions):
+    crawler = UKVisaTestCrawler()
+    crawler.questions_data = bank_questions
+    crawler.save_to_database(connection=standin)
+
+    bulk = sqlite_standin.connect()
+    crawler.save_to_database(bulk=True, connection=bulk)
+
+    query = ("SELECT t.test_type, t.test_number, q.question_id, a.answer_id, a.answer_text, a.is_correct "
+             "FROM answers a JOIN questions q ON q.id = a.question_id JOIN tests t ON t.id = q.test_id "
+             "ORDER BY t.test_type, t.test_number, q.question_id, a.answer_id")
+    rows = []
+    for connection in (standin, bulk):
+        cursor = connection.cursor()
+        cursor.execute(query)
+        rows.append(cursor.fetchall())
+    assert len(rows[0]) == 16
+    assert rows[0] == rows[1]
+
+
+class UnreachableConnection:
+    """A connection whose server has gone away: every ping fails"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+    def ping(self, reconnect=False):
+        raise ConnectionError('server has gone away')
+
+
+def test_failed_ping_gives_the_slot_back(tmp_path, monkeypatch):
+    monkeypatch.setattr('db.Config.DB_POOL_PING_AFTER', -1)
+    path = str(tmp_path / 'pool.sqlite')
+    sqlite_standin.connect(path).close()
+    connections = iter([UnreachableConnection(sqlite_standin.connect(path, create_schema=False))])
+    database = Database(connect=lambda: next(connections, None) or sqlite_standin.connect(path, create_schema=False),
+                        pool_size=1, timeout=1)
+
+    with database.connection():
+        pass
+    with pytest.raises(ConnectionError):
+        with database.connection():
+            pass
+
+    # The dead connection was discarded and its slot reopened, rather than the checkout timing out
+    assert database.query_one("SELECT COUNT(*) AS n FROM chapters")['n'] == 0
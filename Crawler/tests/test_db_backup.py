@@ -0,0 +1,83 @@
+import json
+import sqlite3
+
+import pytest
+
+import sqlite_standin
+from bulk_loader import BulkLoader
+from conftest import USER_ANSWERS_SQL
+from db import Database
+from db_backup import backup_database, read_manifest, restore_database
+
+TABLES = ['chapters', 'tests', 'questions', 'answers', 'users', 'user_test_attempts', 'user_answers']
+
+
+def open_database(path):
+    connection = sqlite_standin.connect(path)
+    connection.sqlite.executescript(USER_ANSWERS_SQL)
+    connection.close()
+    return Database(connect=lambda: sqlite_standin.connect(path, create_schema=False), pool_size=2)
+
+
+def add_answers(path, attempt_id, count):
+    with sqlite3.connect(path) as connection:
+        connection.executemany(
+            "INSERT INTO user_answers (attempt_id, question_id, selected_answer_ids, is_correct) VALUES (?, ?, ?, ?)",
+            [(attempt_id, question_id % 4 + 1, json.dumps([f"r{question_id % 4}"]), question_id % 2)
+             for question_id in range(count)]
+        )
+
+
+def rows(path):
+    with sqlite3.connect(path) as connection:
+        return {table: connection.execute(f"SELECT * FROM {table} ORDER BY id").fetchall() for table in TABLES}
+
+
+@pytest.fixture
+def source(tmp_path, bank_questions):
+    path = str(tmp_path / 'source.sqlite')
+    database = open_database(path)
+    with database.transaction() as session:
+        BulkLoader(session.connection).load(bank_questions)
+    with sqlite3.connect(path) as connection:
+        connection.execute("INSERT INTO users (email) VALUES ('a@example.com'), ('b@example.com')")
+        connection.execute(
+            "INSERT INTO user_test_attempts (user_id, test_id, score, total_questions) VALUES (1, 1, 2, 2), (2, 3, 0, 1)"
+        )
+    add_answers(path, 1, 5)
+    return path, database
+
+
+def test_incremental_backup_restores_to_the_source(source, tmp_path):
+    path, database = source
+    full = backup_database(database, str(tmp_path / 'full'), chunk_size=2)
+    add_answers(path, 2, 3)
+    with sqlite3.connect(path) as connection:
+        connection.execute("UPDATE user_test_attempts SET score = 1, completed_at = '2026-10-17 12:00:00' WHERE id = 2")
+    incremental = backup_database(database, str(tmp_path / 'incremental'), since=str(tmp_path / 'full'))
+
+    assert full['tables']['user_answers']['rows'] == 5
+    assert 'subscriptions' not in full['tables']
+    answers = incremental['tables']['user_answers']
+    assert (answers['mode'], answers['since_id'], answers['rows'], answers['high_water']) == ('append', 5, 3, 8)
+    assert incremental['tables']['user_test_attempts']['mode'] == 'full'
+
+    target = str(tmp_path / 'target.sqlite')
+    restored = restore_database(open_database(target), str(tmp_path / 'incremental'), workers=1, batch_size=3)
+
+    assert restored == {'chapters': 5, 'tests': 3, 'questions': 4, 'answers': 16, 'users': 2,
+                        'user_test_attempts': 2, 'user_answers': 8}
+    assert rows(target) == rows(path)
+
+
+def test_restore_refuses_a_corrupt_backup(source, tmp_path):
+    _, database = source
+    backup_dir = str(tmp_path / 'full')
+    backup_database(database, backup_dir)
+    with open(f"{backup_dir}/{read_manifest(backup_dir)['tables']['answers']['file']}", 'ab') as f:
+        f.write(b'x')
+
+    target = str(tmp_path / 'target.sqlite')
+    with pytest.raises(ValueError):
+        restore_database(open_database(target), backup_dir, workers=1)
+    assert rows(target)['questions'] == []
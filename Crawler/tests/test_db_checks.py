@@ -0,0 +1,59 @@
+import pytest
+
+import sqlite_standin
+from bulk_loader import BulkLoader
+from db import Database
+from db_checks import CHECKS, run_checks
+
+
+@pytest.fixture
+def database(standin, bank_questions, tmp_path):
+    BulkLoader(standin).load(bank_questions)
+    standin.commit()
+    path = str(tmp_path / 'standin.sqlite')
+    # One worker thread, since SQLite connections stay on the thread that opened them
+    return Database({'database': 'standin'}, connect=lambda: sqlite_standin.connect(path, create_schema=False), pool_size=1)
+
+
+def test_clean_bank_passes(database):
+    report = run_checks(database, workers=1)
+
+    assert report['status'] == 'pass'
+    assert report['summary'] == {'pass': len(CHECKS), 'fail': 0, 'error': 0}
+    assert report['database'] == 'standin'
+
+
+def test_every_check_finds_its_rows(database, standin):
+    cursor = standin.cursor()
+    # p0 of the chapter test loses its correct answer, p1 gains a second one
+    cursor.execute("UPDATE answers SET is_correct = 0 WHERE question_id = 1")
+    cursor.execute("UPDATE answers SET is_correct = 1 WHERE question_id = 2 AND answer_id = 'r0'")
+    cursor.execute("INSERT INTO questions (test_id, question_id, question_text, question_type) VALUES (1, 'p1', 'Again?', 'checkbox')")
+    cursor.execute("INSERT INTO tests (test_number, test_type) VALUES ('2', 'exam')")
+    standin.commit()
+    # SQLite only switches foreign keys off outside a transaction
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    cursor.execute("INSERT INTO answers (question_id, answer_id, answer_text) VALUES (99, 'r0', 'Orphan')")
+    standin.commit()
+
+    report = run_checks(database, workers=1, sample_size=1)
+    checks = report['checks']
+
+    assert report['status'] == 'fail'
+    assert {name: check['count'] for name, check in checks.items()} == {
+        'no_correct_answer': 2,
+        'radio_multiple_correct': 1,
+        'orphan_answers': 1,
+        'empty_tests': 1,
+        'duplicate_question_ids': 1
+    }
+    assert checks['duplicate_question_ids']['sample'] == [
+        {'test_id': 1, 'question_id': 'p1', 'copies': 2, 'first_id': 2, 'last_id': 5}
+    ]
+    assert len(checks['no_correct_answer']['sample']) == 1
+
+
+def test_named_checks_only(database):
+    report = run_checks(database, names=['empty_tests'], workers=1)
+
+    assert list(report['checks']) == ['empty_tests']
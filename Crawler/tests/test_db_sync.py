@@ -0,0 +1,120 @@
+import copy
+
+from db_sync import SyncLoader
+from uk_visa_test import UKVisaTestCrawler
+
+
+def question_rows(connection):
+    """(test_id, question_id, question_text) -> [(answer_id, answer_text, is_correct)] for every question row"""
+    cursor = connection.cursor()
+    cursor.execute(
+        "SELECT q.test_id, q.question_id, q.question_text, a.answer_id, a.answer_text, a.is_correct "
+        "FROM questions q LEFT JOIN answers a ON a.question_id = q.id ORDER BY q.id, a.id"
+    )
+    rows = {}
+    for test_id, question_id, question_text, answer_id, answer_text, is_correct in cursor.fetchall():
+        answers = rows.setdefault((test_id, question_id, question_text), [])
+        if answer_id is not None:
+            answers.append((answer_id, answer_text, bool(is_correct)))
+    cursor.close()
+    return rows
+
+
+def test_sync_into_empty_database_inserts_everything(standin, bank_questions):
+    stats = SyncLoader(standin).sync(bank_questions)
+
+    assert (stats['inserted'], stats['updated'], stats['deleted'], stats['unchanged']) == (4, 0, 0, 0)
+    rows = question_rows(standin)
+    assert len(rows) == 4
+    assert all(len(answers) == 4 for answers in rows.values())
+
+
+def test_resync_of_unchanged_bank_writes_nothing(standin, bank_questions):
+    SyncLoader(standin).sync(bank_questions)
+    before = question_rows(standin)
+
+    stats = SyncLoader(standin).sync(bank_questions)
+
+    assert (stats['inserted'], stats['updated'], stats['deleted'], stats['unchanged']) == (0, 0, 0, 4)
+    assert question_rows(standin) == before
+
+
+def question_ids(connection):
+    cursor = connection.cursor()
+    cursor.execute("SELECT question_id, test_id, id FROM questions")
+    ids = {(question_id, test_id): db_id for question_id, test_id, db_id in cursor.fetchall()}
+    cursor.close()
+    return ids
+
+
+def test_resync_applies_inserts_and_updates_in_place(standin, bank_questions):
+    SyncLoader(standin).sync(bank_questions)
+    ids = question_ids(standin)
+
+    changed = bank_questions[0]
+    changed.question_text = 'Which statement is true now?'
+    changed.answers[0].is_correct, changed.answers[1].is_correct = True, False
+    added = copy.deepcopy(bank_questions[1])
+    added.id = 'p2'
+    stats = SyncLoader(standin).sync(bank_questions + [added])
+
+    assert (stats['inserted'], stats['updated'], stats['deleted'], stats['unchanged']) == (1, 1, 0, 3)
+    # Updated questions keep their row id, so users' answers stay attached
+    assert {key: db_id for key, db_id in question_ids(standin).items() if key[0] != 'p2'} == ids
+    rows = question_rows(standin)
+    assert len(rows) == 5
+    changed_answers = next(answers for key, answers in rows.items() if key[2] == 'Which statement is true now?')
+    assert [answer_id for answer_id, _, correct in changed_answers if correct] == ['r0']
+    assert len(changed_answers) == 4
+
+
+def test_missing_questions_are_kept_unless_delete_missing(standin, bank_questions):
+    SyncLoader(standin).sync(bank_questions)
+
+    stats = SyncLoader(standin).sync(bank_questions[1:])
+    assert stats['deleted'] == 0
+    assert len(question_rows(standin)) == 4
+
+    stats = SyncLoader(standin).sync(bank_questions[1:], delete_missing=True)
+    assert stats['deleted'] == 1
+    assert sorted(key[1] for key in question_rows(standin)) == ['p0', 'p0', 'p1']
+
+    cursor = standin.cursor()
+    cursor.execute("SELECT COUNT(*) FROM answers")
+    assert cursor.fetchone()[0] == 12
+
+
+def test_delete_missing_only_reaches_crawled_tests(standin, bank_questions):
+    SyncLoader(standin).sync(bank_questions)
+
+    # Only the chapter test came back from this crawl, without its second question
+    stats = SyncLoader(standin).sync(bank_questions[:1], delete_missing=True)
+
+    assert stats['deleted'] == 1
+    assert len(question_rows(standin)) == 3
+
+
+def test_dry_run_reports_changes_without_writing(standin, bank_questions):
+    SyncLoader(standin).sync(bank_questions)
+    before = question_rows(standin)
+
+    bank_questions[0].explanation = 'Statement number 1 is no longer the correct answer.'
+    stats = SyncLoader(standin).sync(bank_questions[:2], delete_missing=True, dry_run=True)
+
+    assert (stats['updated'], stats['deleted'], stats['dry_run']) == (1, 0, True)
+    assert question_rows(standin) == before
+
+
+def test_crawler_refuses_deletes_after_a_failed_crawl(standin, bank_questions):
+    crawler = UKVisaTestCrawler()
+    crawler.questions_data = bank_questions
+    crawler.save_to_database(sync=True, connection=standin)
+
+    crawler.questions_data = bank_questions[1:]
+    crawler.failed_tests = ['test-3-2']
+    crawler.save_to_database(sync=True, delete_missing=True, connection=standin)
+    assert len(question_rows(standin)) == 4
+
+    crawler.failed_tests = []
+    crawler.save_to_database(sync=True, delete_missing=True, connection=standin)
+    assert len(question_rows(standin)) == 3
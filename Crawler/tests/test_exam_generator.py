@@ -0,0 +1,73 @@
+import random
+
+import pytest
+
+from conftest import make_question
+from exam_generator import GENERAL, ExamGenerator, allocate_quotas, question_key
+from uk_visa_test import question_from_dict
+
+WORDS = ['king', 'queen', 'parliament', 'castle', 'river', 'battle', 'charter', 'poet', 'island', 'festival',
+         'church', 'union', 'election', 'court', 'navy', 'empire', 'railway', 'garden', 'bridge', 'museum',
+         'saint', 'abbey', 'treaty', 'council', 'harbour', 'mountain', 'novel', 'anthem', 'flag', 'coin']
+
+
+def make_questions():
+    """Six distinct questions per chapter 1-3, plus comprehensive rewordings of chapter 1's first two"""
+    rng = random.Random(5)
+    questions = []
+    for chapter in (1, 2, 3):
+        for number in range(6):
+            q = make_question('chapter', f"chapter_{chapter}", '1', f"p{number}", 0)
+            q['question_text'] = ' '.join(rng.sample(WORDS, 10)) + '?'
+            questions.append(q)
+    for number, original in enumerate(questions[:2]):
+        copy = make_question('comprehensive', None, '1', f"p{number}", 0)
+        copy['question_text'] = original['question_text'].rstrip('?').upper() + ' ?'
+        questions.append(copy)
+    standalone = make_question('exam', None, '1', 'p0', 0)
+    standalone['question_text'] = 'Which of these statements about the Magna Carta is correct?'
+    questions.append(standalone)
+    return [question_from_dict(q) for q in questions]
+
+
+@pytest.fixture
+def generator():
+    return ExamGenerator(make_questions(), size=8)
+
+
+def test_rewordings_share_a_concept_and_chapter(generator):
+    assert generator.summary()['concepts'] == 19
+    assert generator.pools == {'chapter_1': (0, 1, 2, 3, 4, 5), 'chapter_2': (6, 7, 8, 9, 10, 11),
+                               'chapter_3': (12, 13, 14, 15, 16, 17), GENERAL: (18,)}
+    assert sum(generator.quotas.values()) == 8
+    assert generator.quotas[GENERAL] == 1
+
+
+def test_exams_are_reproducible_and_never_repeat_a_concept(generator):
+    exams = generator.generate_many(50, seed=11)
+
+    assert generator.generate(seed=11 + 7) == exams[7]
+    for exam in exams:
+        concepts = [generator.concept_of[generator.positions[key]] for key in exam['question_keys']]
+        assert len(concepts) == len(set(concepts)) == 8
+        assert exam['chapters'] == generator.quotas
+    # Both wordings of a duplicated question turn up across exams
+    drawn = {key for exam in exams for key in exam['question_keys']}
+    assert {question_key(generator.questions[0]), question_key(generator.questions[18])} <= drawn
+
+
+def test_excluding_prefers_unseen_concepts(generator):
+    seen = generator.generate(seed=1)['question_keys']
+    fresh = generator.excluding(seen).generate(seed=2)
+
+    assert fresh['repeats'] == 1  # the general pool has a single concept
+    assert len(set(fresh['question_keys']) & set(seen)) <= 1
+
+
+def test_allocate_quotas():
+    # One each first, then the other 21 by weight
+    assert allocate_quotas(24, {'a': 10, 'b': 5, 'c': 1}, {'a': 100, 'b': 100, 'c': 100}) == {'a': 15, 'b': 7, 'c': 2}
+    # A pool that runs out hands its share to the others
+    assert allocate_quotas(10, {'a': 9, 'b': 1}, {'a': 3, 'b': 20}) == {'a': 3, 'b': 7}
+    with pytest.raises(ValueError):
+        allocate_quotas(10, {'a': 1, 'b': 1}, {'a': 3, 'b': 3})
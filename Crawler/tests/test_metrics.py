@@ -0,0 +1,83 @@
+import pickle
+
+from db import Session
+from metrics import Metrics, metrics
+from stub_server import build_pages_from_json
+from uk_visa_test import UKVisaTestCrawler
+
+
+def test_worker_metrics_merge_into_the_parent():
+    worker = Metrics()
+    worker.collect_only()
+    worker.count('unresolved_answers', 2)
+    worker.observe('resolve_seconds', 0.002)
+    with worker.timer('parse', parser='lxml'):
+        pass
+
+    parent = Metrics()
+    parent.configure(output='unused.json')
+    parent.count('unresolved_answers')
+    parent.observe('resolve_seconds', 0.02)
+    # Results cross the process boundary pickled
+    parent.merge(pickle.loads(pickle.dumps(worker.collect())))
+
+    summary = parent.summary()
+    assert summary['counters'] == {'unresolved_answers': 3}
+    assert summary['histograms']['resolve_seconds']['count'] == 2
+    assert summary['histograms']['resolve_seconds']['buckets']['0.005'] == 1
+    assert summary['histograms']['parse_seconds{parser=lxml}']['count'] == 1
+    assert worker.summary()['counters'] == {}
+
+
+def test_merge_is_a_no_op_while_disabled():
+    worker = Metrics()
+    worker.collect_only()
+    worker.count('empty_pages')
+
+    parent = Metrics()
+    parent.merge(worker.collect())
+    assert parent.summary()['counters'] == {}
+
+
+
+def _run_queries(connection) -> Session:
+    session = Session.wrap(connection)
+    session.execute("INSERT INTO chapters (chapter_number, name) VALUES (%s, %s)", (1, 'Values'))
+    with session.prepare("SELECT id FROM chapters WHERE chapter_number = %s") as select:
+        select.execute((1,))
+    return session
+
+
+def test_queries_feed_the_histogram_while_enabled(standin, monkeypatch):
+    monkeypatch.setattr(metrics, 'enabled', True)
+    metrics.reset()
+    try:
+        _run_queries(standin)
+        histograms = metrics.summary()['histograms']
+    finally:
+        metrics.reset()
+    assert histograms['db_query_seconds{statement=INSERT}']['count'] == 1
+    assert histograms['db_query_seconds{statement=SELECT}']['count'] == 1
+
+
+def test_disabled_metrics_make_no_calls_per_statement_or_question(standin, bank_file, monkeypatch):
+    timers = []
+
+    def observe(*args, **kwargs):
+        raise AssertionError('metrics.observe called while metrics are off')
+
+    def timer(name, *args, **kwargs):
+        timers.append(name)
+        return Metrics().timer(name)
+
+    monkeypatch.setattr(metrics, 'observe', observe)
+    monkeypatch.setattr(metrics, 'timer', timer)
+    session = _run_queries(standin)
+    assert [entry['calls'] for entry in session.stats.summary()['queries']] == [1, 1]
+
+    crawler = UKVisaTestCrawler()
+    pages = build_pages_from_json(bank_file)
+    questions = crawler.extract_question_data(pages['test-3-1'], 'chapter_3', '1', 'chapter')
+    assert len(questions) == 2
+    # One parse timer for the page, none per resolved question
+    assert timers == ['parse']
@@ -0,0 +1,50 @@
+from conftest import make_question
+from near_duplicates import find_near_duplicates, lsh_params, normalize_text
+
+
+def question(question_id, text, correct=0, test_number='1'):
+    q = make_question('comprehensive', None, test_number, question_id, correct)
+    q['question_text'] = text
+    return q
+
+
+QUESTIONS = [
+    question('p0', 'When did the Romans leave Britain and return to defend other parts of their empire?'),
+    question('p1', 'When did the Romans leave Britain, returning to defend other parts of their Empire?', test_number='2'),
+    question('p2', 'What is the capital city of Scotland, home to the Scottish Parliament?'),
+    question('p3', 'Which flower is the national symbol of Wales and worn on St David\'s Day?'),
+    question('p4', 'which flower is the national symbol of Wales and worn on St David\'s day', correct=2, test_number='3')
+]
+
+
+def test_reworded_and_repeated_questions_cluster():
+    clusters = find_near_duplicates(QUESTIONS, threshold=0.7)
+
+    assert sorted(sorted(o['id'] for o in c['occurrences']) for c in clusters) == [['p0', 'p1'], ['p3', 'p4']]
+    romans = next(c for c in clusters if c['occurrences'][0]['id'] == 'p0')
+    assert romans['variants'] == 2
+    assert 0.7 <= romans['similarity'] < 1.0
+    assert not romans['conflicting_correct_answers']
+
+
+def test_verbatim_repeats_flag_conflicting_answers():
+    wales = next(c for c in find_near_duplicates(QUESTIONS, threshold=0.7) if c['occurrences'][0]['id'] == 'p3')
+
+    # Punctuation and case are normalised away, so both are one text
+    assert wales['variants'] == 1
+    assert wales['similarity'] == 1.0
+    assert wales['answer_set_agreement'] == 1.0
+    assert wales['correct_answer_agreement'] == 0.5
+    assert wales['conflicting_correct_answers']
+
+
+def test_distinct_questions_do_not_cluster():
+    assert find_near_duplicates([QUESTIONS[0], QUESTIONS[2], QUESTIONS[3]], threshold=0.7) == []
+
+
+def test_lsh_params():
+    bands, rows = lsh_params(128, 0.8)
+
+    assert bands * rows == 128
+    assert (1 / bands) ** (1 / rows) <= 0.8
+    assert normalize_text("St David's  Day?") == 'st david s day'
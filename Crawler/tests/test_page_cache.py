@@ -0,0 +1,57 @@
+from page_cache import PageCache
+from stub_server import StubServer, build_pages_from_json
+from uk_visa_test import UKVisaTestCrawler
+
+JOB = ('test-3-1', 'chapter_3', '1', 'chapter')
+
+
+def crawl_once(base_url, cache_dir):
+    crawler = UKVisaTestCrawler(base_url=base_url, cache_dir=cache_dir)
+    questions = crawler.crawl_test(*JOB)
+    crawler.page_cache.save()
+    return crawler, questions
+
+
+def test_a_304_is_served_from_the_cache(bank_file, tmp_path, monkeypatch):
+    pages = build_pages_from_json(bank_file)
+    with StubServer(pages) as server:
+        _, first = crawl_once(server.base_url, str(tmp_path))
+
+        def no_parsing(*args, **kwargs):
+            raise AssertionError('an unchanged page was parsed again')
+
+        monkeypatch.setattr(UKVisaTestCrawler, 'extract_question_data', no_parsing)
+        crawler, second = crawl_once(server.base_url, str(tmp_path))
+
+    assert crawler.page_cache.summary() == {'hits': 1, 'not_modified': 1, 'misses': 0}
+    assert [(q.id, q.correct_answers) for q in second] == [(q.id, q.correct_answers) for q in first]
+
+
+def test_a_changed_page_is_parsed_again(bank_file, tmp_path):
+    pages = build_pages_from_json(bank_file)
+    with StubServer(pages) as server:
+        crawl_once(server.base_url, str(tmp_path))
+    pages['test-3-1'] = pages['test-3-1'].replace('Statement number 2', 'Statement number two')
+    with StubServer(pages) as server:
+        crawler, questions = crawl_once(server.base_url, str(tmp_path))
+
+    assert crawler.page_cache.summary() == {'hits': 0, 'not_modified': 0, 'misses': 1}
+    assert 'Statement number two' in [answer.text for answer in questions[0].answers]
+
+
+def test_results_of_another_parse_version_are_a_miss(tmp_path):
+    html = '<html>page</html>'
+    key = PageCache.context_key('chapter_3', '1', 'chapter')
+    cache = PageCache(str(tmp_path), parse_version='lxml/parser-1/resolver-1')
+    cache.store('test-3-1', key, html, {'ETag': '"abc"'}, [{'id': 'p0'}])
+    cache.save()
+
+    same = PageCache(str(tmp_path), parse_version='lxml/parser-1/resolver-1')
+    assert same.lookup('test-3-1', key, None) == [{'id': 'p0'}]
+
+    newer = PageCache(str(tmp_path), parse_version='lxml/parser-1/resolver-2')
+    assert newer.lookup('test-3-1', key, None) is None
+    # Validators survive the re-parse, so the next crawl can still get a 304
+    newer.store('test-3-1', key, newer.read_html('test-3-1'), {}, [{'id': 'p0', 'v': 2}])
+    assert newer.conditional_headers('test-3-1') == {'If-None-Match': '"abc"'}
+    assert newer.lookup('test-3-1', key, html) == [{'id': 'p0', 'v': 2}]
@@ -0,0 +1,49 @@
+import pytest
+
+from conftest import make_question
+from parsers import ParsedQuestion, compare_backends, get_parser, load_pages
+from stub_server import render_test_page
+
+BACKENDS = ['html.parser', 'bs4-lxml', 'lxml']
+
+
+def edge_case_page():
+    """A checkbox question with markup in its text, and a question without an explanation"""
+    checkbox = make_question('chapter', 'chapter_4', '1', 'p0', 1)
+    checkbox['question_type'] = 'checkbox'
+    checkbox['question_text'] = 'Which TWO of these are <true> & fair?'
+    checkbox['answers'][2]['is_correct'] = True
+    checkbox['explanation'] = 'Statement number 1 and Statement number 2 are both correct.'
+    bare = make_question('chapter', 'chapter_4', '1', 'p1', 0)
+    bare['explanation'] = ''
+    return render_test_page([checkbox, bare])
+
+
+def test_backends_agree_on_rendered_pages(bank_file):
+    pages = load_pages(json_file=bank_file)
+    pages['edge-cases'] = edge_case_page()
+
+    assert compare_backends(pages, ['bs4-lxml', 'lxml']) == {'bs4-lxml': [], 'lxml': []}
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_parsed_fields(backend):
+    checkbox, bare = get_parser(backend).parse(edge_case_page())
+
+    assert checkbox == ParsedQuestion(
+        question_id='p0',
+        question_text='Which TWO of these are <true> & fair?',
+        question_type='checkbox',
+        answers=[(f"r{i}", f"Statement number {i}") for i in range(4)],
+        # get_text(strip=True) joins the text around <strong> without spaces, as the original crawler did
+        explanation='Statement number 1andStatement number 2are both correct.',
+        strong_texts=['Statement number 1', 'Statement number 2']
+    )
+    assert bare.question_type == 'radio'
+    assert bare.explanation is None
+    assert bare.strong_texts == []
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_parser('selectolax')
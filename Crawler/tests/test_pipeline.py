@@ -0,0 +1,43 @@
+import threading
+
+from pipeline import CrawlPipeline
+from stub_server import StubServer, build_pages_from_json
+from uk_visa_test import UKVisaTestCrawler
+
+
+def run_with_timeout(pipeline, jobs, timeout=60):
+    results = []
+    worker = threading.Thread(target=lambda: results.append(pipeline.run_jobs(jobs)), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    assert not worker.is_alive(), 'run_jobs did not finish'
+    return results[0]
+
+
+def test_pipeline_returns_each_jobs_questions_in_order(bank_file):
+    pages = build_pages_from_json(bank_file)
+    del pages['test-1']
+    with StubServer(pages) as server:
+        crawler = UKVisaTestCrawler(base_url=server.base_url)
+        jobs = [
+            ('test-3-1', 'chapter_3', '1', 'chapter'),
+            ('test-1', None, '1', 'comprehensive'),
+            ('british-citizenship-test-1', None, '1', 'exam')
+        ]
+        results = run_with_timeout(CrawlPipeline(crawler, fetch_workers=2, parse_workers=1), jobs)
+
+    assert [len(questions) if questions is not None else None for questions in results] == [2, None, 1]
+    assert [question.id for question in results[0]] == ['p0', 'p1']
+    assert results[2][0].correct_answers == ['r3']
+
+
+def test_a_failed_recording_fails_the_job_instead_of_hanging(bank_file, tmp_path):
+    pages = build_pages_from_json(bank_file)
+    blocker = tmp_path / 'recording'
+    blocker.write_text('a file where the recording directory should be')
+    with StubServer(pages) as server:
+        crawler = UKVisaTestCrawler(base_url=server.base_url, record_dir=str(blocker))
+        results = run_with_timeout(CrawlPipeline(crawler, fetch_workers=2, parse_workers=1),
+                                   [('test-3-1', 'chapter_3', '1', 'chapter')])
+
+    assert results == [None]
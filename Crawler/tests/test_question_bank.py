@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import make_bank
+from question_bank import QuestionBank, write_question_bank
+
+
+@pytest.fixture
+def bank_path(tmp_path):
+    path = str(tmp_path / 'bank.ukqb')
+    assert write_question_bank(make_bank(), path) == 4
+    return path
+
+
+def test_round_trip(bank_path):
+    with QuestionBank(bank_path) as bank:
+        assert len(bank) == 4
+        assert list(bank.iter_questions()) == make_bank()
+        assert bank.metadata() == {
+            'total_questions': 4,
+            'test_types': {'chapter': 2, 'comprehensive': 1, 'exam': 1}
+        }
+
+
+def test_index_lookups(bank_path):
+    with QuestionBank(bank_path) as bank:
+        assert [q['id'] for q in bank.by_test('chapter', '1', 'chapter_3')] == ['p0', 'p1']
+        assert [q['test_type'] for q in bank.by_test('exam', '1')] == ['exam']
+        assert [q['test_type'] for q in bank.by_chapter(None)] == ['comprehensive', 'exam']
+        assert len(bank.by_question_type('radio')) == 4
+        assert bank.by_question_type('checkbox') == []
+        assert bank.by_chapter('chapter_9') == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'bank.json'
+    path.write_bytes(b'{"questions": []}' + b'\0' * 64)
+
+    with pytest.raises(ValueError):
+        QuestionBank(str(path))
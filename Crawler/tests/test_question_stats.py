@@ -0,0 +1,47 @@
+from conftest import make_bank, make_question
+from question_bank import QuestionBank, write_question_bank
+from question_stats import QuestionFrame, compute_statistics
+
+
+def make_questions():
+    """The shared bank plus an unresolved checkbox question in comprehensive test 3"""
+    unresolved = make_question('comprehensive', None, '3', 'p0', 0)
+    unresolved.update(question_type='checkbox', explanation='', correct_answers=[])
+    unresolved['answers'] = unresolved['answers'][:3]
+    return make_bank() + [unresolved]
+
+
+def test_statistics():
+    stats = compute_statistics(QuestionFrame.from_questions(make_questions()), expected_comprehensive=3)
+
+    assert stats['total_questions'] == 5
+    assert stats['by_test_type'] == {'chapter': 2, 'comprehensive': 2, 'exam': 1}
+    assert stats['by_chapter'] == {'chapter_3': 2, 'comprehensive': 3}
+    assert stats['by_question_type'] == {'radio': 4, 'checkbox': 1}
+    assert stats['answer_distribution'] == {'3_answers': 1, '4_answers': 4}
+    assert stats['comprehensive_tests'] == {'test_1': 1, 'test_3': 1}
+    assert stats['coverage']['comprehensive'] == {'expected': 3, 'found': 2, 'missing': [2]}
+    assert stats['coverage']['chapter_tests']['chapter_3'] == 1
+    assert stats['quality'] == {
+        'missing_explanations': 1,
+        'missing_correct_answers': 1,
+        'missing_correct_by_test_type': {'comprehensive': 1}
+    }
+
+
+def test_bank_columns_give_the_same_statistics(tmp_path):
+    path = str(tmp_path / 'bank.ukqb')
+    write_question_bank(make_questions(), path)
+
+    with QuestionBank(path) as bank:
+        from_bank = compute_statistics(QuestionFrame.from_bank(bank))
+
+    assert from_bank == compute_statistics(QuestionFrame.from_questions(make_questions()))
+
+
+def test_empty_frame():
+    stats = compute_statistics(QuestionFrame.from_questions([]))
+
+    assert stats['total_questions'] == 0
+    assert stats['answer_distribution'] == {}
+    assert stats['coverage']['comprehensive']['found'] == 0
@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import make_bank
+from question_store import QuestionStore
+from question_stream import iter_questions
+from stub_server import StubServer, build_pages_from_json
+from uk_visa_test import UKVisaTestCrawler
+
+JOBS = [
+    ('test-3-1', 'chapter_3', '1', 'chapter'),
+    ('test-1', None, '1', 'comprehensive'),
+    ('british-citizenship-test-1', None, '1', 'exam')
+]
+
+
+def test_store_hands_back_equal_questions(bank_questions):
+    store = QuestionStore(bank_questions)
+
+    assert len(store) == 4
+    assert list(store) == bank_questions
+    assert store[-1] == bank_questions[-1]
+    assert store[1:3] == bank_questions[1:3]
+    with pytest.raises(IndexError):
+        store[4]
+
+
+def test_repeated_strings_are_stored_once(bank_questions):
+    store = QuestionStore(bank_questions + bank_questions)
+
+    assert len(store) == 8
+    # Answer texts "Statement number 0-3" are shared by every question
+    assert store.answer_texts[:4] == store.answer_texts[4:8]
+    assert len(store.texts) == len(QuestionStore(bank_questions).texts)
+    assert store.count('test_type', 'chapter') == 4
+    assert store.count('chapter', 'chapter_9') == 0
+
+
+def test_crawled_store_exports_the_bank(bank_file, tmp_path, monkeypatch):
+    monkeypatch.setattr('uk_visa_test.Config.CRAWLER_DELAY', 0)
+    with StubServer(build_pages_from_json(bank_file)) as server:
+        crawler = UKVisaTestCrawler(base_url=server.base_url)
+        crawler._crawl_jobs(JOBS, use_async=False, concurrency=None, parse_workers=None, queue=None)
+
+    assert isinstance(crawler.questions_data, QuestionStore)
+    output = str(tmp_path / 'export.json')
+    crawler.save_to_json(output)
+    metadata = {}
+    # Explanations lose the spaces around <strong> when parsed (see test_parsers.py)
+    exported = [dict(q, explanation=None) for q in iter_questions(output, metadata)]
+    assert exported == [dict(q, explanation=None) for q in make_bank()]
+    assert metadata['test_types'] == {'chapter': 2, 'comprehensive': 1, 'exam': 1}
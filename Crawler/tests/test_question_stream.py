@@ -0,0 +1,55 @@
+import json
+
+import question_stream
+from conftest import make_bank
+from data_utils import DataAnalyzer
+from question_stream import QuestionWriter, convert, iter_questions, read_metadata
+
+METADATA = {'source': 'stub', 'total_questions': 4}
+
+
+def write_export(path, metadata=None):
+    with QuestionWriter(str(path), metadata=metadata) as writer:
+        for question in make_bank():
+            writer.write(question)
+    return writer
+
+
+def test_json_layout_matches_json_dump(tmp_path):
+    path = tmp_path / 'export.json'
+    write_export(path, METADATA)
+
+    expected = json.dumps({'metadata': METADATA, 'questions': make_bank()}, indent=2, ensure_ascii=False)
+    assert path.read_text(encoding='utf-8') == expected
+
+
+def test_reads_across_chunk_boundaries(tmp_path, monkeypatch):
+    path = tmp_path / 'export.json'
+    write_export(path)
+    # Every value straddles several reads
+    monkeypatch.setattr(question_stream, 'CHUNK_SIZE', 7)
+
+    metadata = {}
+    assert list(iter_questions(str(path), metadata)) == make_bank()
+    assert metadata == {'total_questions': 4, 'test_types': {'chapter': 2, 'comprehensive': 1, 'exam': 1}}
+
+
+def test_convert_round_trip(tmp_path):
+    source = tmp_path / 'export.json'
+    write_export(source, METADATA)
+
+    assert convert(str(source), str(tmp_path / 'export.ndjson')) == 4
+    assert convert(str(tmp_path / 'export.ndjson'), str(tmp_path / 'back.json')) == 4
+    assert (tmp_path / 'back.json').read_text(encoding='utf-8') == source.read_text(encoding='utf-8')
+    assert read_metadata(str(tmp_path / 'export.ndjson')) == METADATA
+
+
+def test_streaming_analyzer_matches_loaded(tmp_path):
+    path = tmp_path / 'export.ndjson'
+    write_export(path)
+    loaded = DataAnalyzer(json_file=str(path))
+    streaming = DataAnalyzer(json_file=str(path), streaming=True)
+
+    assert 'questions' not in streaming.data
+    assert streaming.get_statistics() == loaded.get_statistics()
+    assert streaming.find_questions_without_correct_answers() == []
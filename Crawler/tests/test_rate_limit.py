@@ -0,0 +1,71 @@
+from email.utils import formatdate
+
+import pytest
+
+from async_crawler import AsyncCrawlEngine
+from rate_limit import AdaptiveScheduler, parse_retry_after
+from stub_server import StubServer, build_pages_from_json
+from uk_visa_test import UKVisaTestCrawler
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('3', 3.0),
+    (' 0.5 ', 0.5),
+    ('-2', 0.0),
+    (formatdate(1_000_030, usegmt=True), 30.0),
+    (formatdate(999_000, usegmt=True), 0.0),
+    ('soon', None),
+    ('', None),
+    (None, None)
+])
+def test_parse_retry_after(value, expected):
+    assert parse_retry_after(value, now=1_000_000) == expected
+
+
+def scheduler(**options):
+    return AdaptiveScheduler(**dict(dict(initial=2, maximum=4, backoff=0.1, max_retries=2, seed=1), **options))
+
+
+def test_window_grows_only_while_full():
+    aimd = scheduler()
+    first, second = aimd.acquire_sync(), aimd.acquire_sync()
+    assert aimd._try_acquire() > 0
+
+    assert aimd.complete(first, 200) is None
+    assert aimd.limit == 2.5
+    aimd.complete(second, 200)
+    # Half the window was idle, so that success says nothing about a wider one
+    assert aimd.limit == 2.5
+
+
+def test_one_burst_of_throttling_cuts_once():
+    aimd = scheduler(initial=4)
+    sent = [aimd.acquire_sync() for _ in range(4)]
+
+    delay = aimd.complete(sent[0], 429, retry_after='0.2')
+    assert aimd.limit == 2.0
+    assert delay >= 0.2
+    assert aimd.complete(sent[1], 503) is not None
+    assert aimd.limit == 2.0
+    # New requests wait out the Retry-After pause
+    assert aimd._try_acquire() > 0.1
+    assert aimd.counts['cuts'] == 1
+
+    # Not retried: a client error, and a server error past max_retries
+    assert aimd.complete(sent[2], 404) is None
+    assert aimd.complete(sent[3], 500, attempt=2) is None
+    assert aimd.counts['retries'] == 2
+
+
+def test_adaptive_crawl_of_a_throttling_stub_fetches_every_page(bank_file):
+    with StubServer(build_pages_from_json(bank_file), latency=0.05, max_in_flight=1, retry_after=0.05, seed=3) as server:
+        crawler = UKVisaTestCrawler(base_url=server.base_url)
+        crawler.scheduler = scheduler(initial=3, backoff=0.05, max_retries=10)
+        jobs = [job for job in crawler.get_test_jobs() if job[0] in ('test-3-1', 'test-1', 'british-citizenship-test-1')]
+        results = AsyncCrawlEngine(crawler, concurrency=3, rate=0).crawl_jobs(jobs)
+
+    assert all(questions for questions in results)
+    summary = crawler.scheduler.summary()
+    assert summary['ok'] == 3
+    assert server.counts['overloaded'] > 0
+    assert summary['retries'] == summary['throttled'] == server.counts['overloaded']
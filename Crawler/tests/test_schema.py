@@ -0,0 +1,51 @@
+import pytest
+
+from bulk_loader import BulkLoader
+from conftest import USER_ANSWERS_SQL
+from db import Session
+from schema import HOT_QUERIES, MIGRATIONS, AddIndex, has_index, plan_findings
+
+
+def migration_indexes():
+    indexes = {}
+    for migration in MIGRATIONS:
+        for step in migration.steps:
+            if isinstance(step, AddIndex):
+                indexes.setdefault(step.table, {})[step.name] = list(step.columns)
+    return indexes
+
+
+@pytest.mark.parametrize('query', HOT_QUERIES, ids=lambda query: query.name)
+def test_hot_query_runs_and_its_indexes_are_migrated(standin, bank_questions, query):
+    standin.sqlite.executescript(USER_ANSWERS_SQL)
+    BulkLoader(standin).load(bank_questions)
+    Session.wrap(standin).query(query.sql, query.params)
+
+    indexes = migration_indexes()
+    assert [(table, columns) for table, columns in query.indexes if not has_index(indexes, table, columns)] == []
+
+
+def test_has_index_matches_leading_columns():
+    indexes = {'answers': {'idx_correct': ['question_id', 'is_correct', 'answer_id']}}
+
+    assert has_index(indexes, 'answers', ['question_id'])
+    assert has_index(indexes, 'answers', ['QUESTION_ID', 'is_correct'])
+    assert not has_index(indexes, 'answers', ['is_correct'])
+    assert not has_index(indexes, 'questions', ['test_id'])
+
+
+def test_plan_findings():
+    plan = [
+        {'select_type': 'SIMPLE', 'table': 'uta', 'type': 'ALL', 'rows': 5000, 'Extra': 'Using where; Using filesort'},
+        {'select_type': 'SIMPLE', 'table': 't', 'type': 'eq_ref', 'rows': 1, 'Extra': None},
+        {'select_type': 'SIMPLE', 'table': 'c', 'type': 'ALL', 'rows': 5, 'Extra': 'Using temporary'},
+        {'select_type': 'DEPENDENT SUBQUERY', 'table': 'a', 'type': 'index', 'rows': 8000, 'Extra': ''}
+    ]
+
+    assert plan_findings(plan) == [
+        'full table scan of uta (~5000 rows)',
+        'filesort on uta',
+        'temporary table for c',
+        'full index scan of a (~8000 rows)',
+        'dependent subquery scans a once per outer row'
+    ]
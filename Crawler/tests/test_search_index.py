@@ -0,0 +1,60 @@
+import json
+
+from conftest import make_question
+from search_index import SearchIndex, stem, update_index
+
+TEXTS = [
+    'At what age can you vote in a general election?',
+    'Who voted to leave the European Union in the referendum?',
+    'Which flower is the national symbol of Wales?',
+    'Where is the Scottish Parliament and who elects its members?',
+    'Which festival is celebrated on the fifth of November with fireworks?'
+]
+
+
+def write_bank(path, texts):
+    questions = []
+    for number, text in enumerate(texts):
+        question = make_question('comprehensive', None, '1', f"p{number}", 0)
+        question['question_text'] = text
+        questions.append(question)
+    path.write_text(json.dumps({'questions': questions}), encoding='utf-8')
+
+
+def search(path, query):
+    with SearchIndex(path) as index:
+        return [result['key'] for result in index.search(query)]
+
+
+def test_stemmed_and_phrase_search(tmp_path):
+    source = tmp_path / 'bank.json'
+    write_bank(source, TEXTS)
+    report = update_index(str(source))
+    index_path = str(tmp_path / 'bank.uksi')
+
+    assert (report['documents'], report['tokenized']) == (5, 5)
+    assert {stem(word) for word in ('vote', 'votes', 'voted', 'voting')} == {'vot'}
+    assert sorted(search(index_path, 'voting')) == ['comprehensive//1/p0', 'comprehensive//1/p1']
+    assert search(index_path, '"european union" voting') == ['comprehensive//1/p1']
+    assert search(index_path, '"union european"') == []
+    assert search(index_path, 'zeppelin') == []
+
+
+def test_incremental_update_matches_a_rebuild(tmp_path):
+    source = tmp_path / 'bank.json'
+    write_bank(source, TEXTS)
+    update_index(str(source))
+    assert update_index(str(source))['unchanged']
+
+    edited = TEXTS[:1] + ['Which poet wrote Auld Lang Syne for the new year?'] + TEXTS[2:4]
+    write_bank(source, edited)
+    report = update_index(str(source))
+    assert (report['documents'], report['reused'], report['tokenized'], report['removed']) == (4, 3, 1, 1)
+
+    update_index(str(source), str(tmp_path / 'rebuilt.uksi'), rebuild=True)
+    for query in ('vote', 'poet new year', 'parliament members', '"national symbol"', 'fireworks'):
+        incremental = SearchIndex(str(tmp_path / 'bank.uksi'))
+        rebuilt = SearchIndex(str(tmp_path / 'rebuilt.uksi'))
+        assert incremental.search(query) == rebuilt.search(query)
+        incremental.close()
+        rebuilt.close()
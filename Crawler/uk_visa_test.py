@@ -1,400 +1,699 @@
 import requests
-from bs4 import BeautifulSoup
-import mysql.connector
-import json
+import os
+import sys
 import time
-import re
 from typing import List, Dict, Optional
 from dataclasses import dataclass
 import logging
+import argparse
+
+from answer_resolver import RESOLVER_VERSION, AnswerResolver
+from config import Config
+from db import Session, get_database
+from metrics import metrics
+from page_cache import PageCache
+from parsers import PARSER_VERSION, get_parser
+from question_stream import QuestionWriter
+from schema import create_database, migrate
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-@dataclass
+@dataclass(slots=True)
 class Answer:
     id: str
     text: str
     is_correct: bool = False
 
-@dataclass
+@dataclass(slots=True)
 class Question:
     id: str
     chapter: str | None
     test_number: str
+    test_type: str  # 'chapter' or 'comprehensive' or 'exam'
     question_text: str
     question_type: str  # 'radio' or 'checkbox'
     answers: List[Answer]
     explanation: str
     correct_answers: List[str]  # List of correct answer IDs
 
+CHAPTERS = [
+    (1, "Chapter 1: The Values and Principles of the UK"),
+    (2, "Chapter 2: What is the UK?"),
+    (3, "Chapter 3: A Long and Illustrious History"),
+    (4, "Chapter 4: A Modern, Thriving Society"),
+    (5, "Chapter 5: The UK Government, the Law and Your Role")
+]
+
+def question_to_dict(question: Question) -> Dict:
+    """Serialize a question to the JSON export layout"""
+    return {
+        "id": question.id,
+        "chapter": question.chapter,
+        "test_number": question.test_number,
+        "test_type": question.test_type,
+        "question_text": question.question_text,
+        "question_type": question.question_type,
+        "answers": [
+            {
+                "id": answer.id,
+                "text": answer.text,
+                "is_correct": answer.is_correct
+            }
+            for answer in question.answers
+        ],
+        "explanation": question.explanation,
+        "correct_answers": question.correct_answers
+    }
+
+def question_from_dict(data: Dict) -> Question:
+    """Rebuild a question from the JSON export layout, sharing one copy of each repeated label"""
+    chapter = data.get("chapter")
+    return Question(
+        id=sys.intern(data["id"]),
+        chapter=sys.intern(chapter) if chapter else chapter,
+        test_number=sys.intern(data["test_number"]),
+        test_type=sys.intern(data.get("test_type", "chapter")),
+        question_text=data["question_text"],
+        question_type=sys.intern(data["question_type"]),
+        answers=[Answer(id=sys.intern(a["id"]), text=a["text"], is_correct=a.get("is_correct", False)) for a in data["answers"]],
+        explanation=data.get("explanation", ""),
+        correct_answers=[sys.intern(answer_id) for answer_id in data.get("correct_answers", [])]
+    )
+
 class UKVisaTestCrawler:
-    def __init__(self, db_config: Optional[Dict] = None):
-        self.base_url = "https://lifeintheuktestweb.co.uk"
+    def __init__(self, db_config: Optional[Dict] = None, base_url: Optional[str] = None, cache_dir: Optional[str] = None,
+                 parser_backend: Optional[str] = None, record_dir: Optional[str] = None):
+        self.base_url = base_url or "https://lifeintheuktestweb.co.uk"
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0.0.0 Safari/537.36'
         })
         self.db_config = db_config
-        self.questions_data = []
+        # Pooled, so schema creation and saving share one connection
+        self.database = get_database(db_config) if db_config else None
+        # Compact column store; imported here as it builds on the dataclasses above
+        from question_store import QuestionStore
+        
+        self.questions_data = QuestionStore()
+        self.record_dir = record_dir
+        self.parser_backend = parser_backend or Config.PARSER_BACKEND
+        self.parser = get_parser(self.parser_backend)
+        self.answer_resolver = AnswerResolver()
+        # Cached parses only count as hits when this parser and resolver produced them
+        parse_version = f"{self.parser_backend}/parser-{PARSER_VERSION}/resolver-{RESOLVER_VERSION}"
+        self.page_cache = PageCache(cache_dir, parse_version) if cache_dir else None
+        # rate_limit.AdaptiveScheduler when crawling with --adaptive; replaces the fixed delay and rate limit
+        self.scheduler = None
+        # Test paths whose page could not be fetched or parsed in this run
+        self.failed_tests: List[str] = []
         
-        # Test URLs organized 
-        self.test_urls = {
-            f"test-3-{i}" for i in range(1, 11)
+        # Test URLs organized by type
+        self.test_configs = {
+            # Chapter-based tests
+            "chapter_tests": {
+                "chapter_1": [
+                    "test-1-2"  # Chapters 1 & 2 combined test
+                ],
+                "chapter_2": [
+                    "test-1-2"  # Same test, but we'll mark it for both chapters
+                ],
+                "chapter_3": [
+                    f"test-3-{i}" for i in range(1, 11)
+                ],
+                "chapter_4": [
+                    f"test-4-{i}" for i in range(1, 13)
+                ],
+                "chapter_5": [
+                    f"test-5-{i}" for i in range(1, 11)
+                ]
+            },
+            # Comprehensive tests (no specific chapter)
+            "comprehensive_tests": [
+                f"test-{i}" for i in range(1, 41)
+            ],
+            # Exam tests
+            "exam_tests": [
+                f"british-citizenship-test-{i}" for i in range(1, 16)
+            ]
         }
 
-    def extract_question_data(self, html_content: str, chapter: str | None, test_number: str) -> List[Question]:
+    def get_test_jobs(self) -> List[tuple]:
+        """List every test to crawl as (test_path, chapter, test_number, test_type)"""
+        jobs = []
+        
+        for chapter, test_paths in self.test_configs["chapter_tests"].items():
+            for test_path in test_paths:
+                jobs.append((test_path, chapter, test_path.split('-')[-1], "chapter"))
+        
+        for test_path in self.test_configs["comprehensive_tests"]:
+            jobs.append((test_path, None, test_path.split('-')[-1], "comprehensive"))
+        
+        for test_path in self.test_configs["exam_tests"]:
+            jobs.append((test_path, None, test_path.split('-')[-1], "exam"))
+        
+        return jobs
+
+    def extract_question_data(self, html_content: str, chapter: str | None, test_number: str, test_type: str) -> List[Question]:
         """Extract question data from HTML content"""
-        soup = BeautifulSoup(html_content, 'html.parser')
         questions = []
+        # Checked once per page, so while metrics are off the per-question loop makes no timer calls
+        timed = metrics.enabled or metrics.tracing
         
-        # Find all question containers
-        question_containers = soup.find_all('div', class_='container_question')
+        with metrics.timer('parse', parser=self.parser_backend):
+            records = list(self.parser.parse(html_content))
+        if not records:
+            metrics.count('empty_pages', test_type=test_type)
         
-        for container in question_containers:
-            try:
-                question_id = container.get('data-id_question', '')
-                
-                # Extract question text
-                question_element = container.find('div', class_='question')
-                if not question_element:
-                    continue
-                    
-                question_text = question_element.get_text(strip=True)
-                
-                # Extract answers
-                answers = []
-                answer_container = container.find('ul', class_='container_answer')
-                if not answer_container:
-                    continue
-                
-                answer_items = answer_container.find_all('li')
-                question_type = 'radio'  # default
-                
-                for item in answer_items:
-                    input_element = item.find('input')
-                    if not input_element:
-                        continue
-                        
-                    answer_id = input_element.get('data-id_answer', '')
-                    input_type = input_element.get('type', 'radio')
-                    if input_type == 'checkbox':
-                        question_type = 'checkbox'
-                    
-                    # Get answer text (remove the input element)
-                    label = item.find('label')
-                    if label:
-                        # Clone the label and remove input to get clean text
-                        label_copy = BeautifulSoup(str(label), 'html.parser').find('label')
-                        input_in_label = label_copy.find('input')
-                        if input_in_label:
-                            input_in_label.decompose()
-                        answer_text = label_copy.get_text(strip=True)
-                    else:
-                        answer_text = item.get_text(strip=True)
-                    
-                    answers.append(Answer(id=answer_id, text=answer_text))
-                
-                # Extract explanation and correct answers
-                explanation = ""
-                correct_answers = []
-                explanation_container = container.find('div', class_='container_explication')
-                
-                if explanation_container:
-                    explanation = explanation_container.get_text(strip=True)
-                    
-                    # Try to identify correct answers from explanation
-                    # Look for strong tags or specific patterns
-                    strong_elements = explanation_container.find_all('strong')
-                    for strong in strong_elements:
-                        strong_text = strong.get_text(strip=True)
-                        # Match this text with answers
-                        for answer in answers:
-                            if strong_text.lower() in answer.text.lower() or answer.text.lower() in strong_text.lower():
-                                answer.is_correct = True
-                                correct_answers.append(answer.id)
-                    
-                    # If no strong tags found, try to parse explanation text
-                    if not correct_answers:
-                        correct_answers = self._parse_correct_answers_from_explanation(explanation, answers)
-                
-                question = Question(
-                    id=question_id,
-                    chapter=chapter if chapter else None,
-                    test_number=test_number,
-                    question_text=question_text,
-                    question_type=question_type,
-                    answers=answers,
-                    explanation=explanation,
-                    correct_answers=correct_answers
-                )
-                
-                questions.append(question)
+        for record in records:
+            answers = [Answer(id=answer_id, text=answer_text) for answer_id, answer_text in record.answers]
+            
+            # Extract explanation and correct answers
+            explanation = ""
+            correct_answers = []
+            
+            if record.explanation is not None:
+                explanation = record.explanation
                 
-            except Exception as e:
-                logger.error(f"Error extracting question from container: {e}")
-                continue
+                # Strong tags first, then explanation phrasings, matched through the resolver's token index
+                if timed:
+                    with metrics.timer('resolve'):
+                        resolutions = self.answer_resolver.resolve(answers, record.strong_texts, explanation)
+                        correct_answers = self.answer_resolver.mark_correct(answers, resolutions)
+                else:
+                    resolutions = self.answer_resolver.resolve(answers, record.strong_texts, explanation)
+                    correct_answers = self.answer_resolver.mark_correct(answers, resolutions)
+                if not correct_answers:
+                    metrics.count('unresolved_answers')
+            
+            question = Question(
+                id=record.question_id,
+                chapter=chapter if chapter else None,
+                test_number=test_number,
+                test_type=test_type,
+                question_text=record.question_text,
+                question_type=record.question_type,
+                answers=answers,
+                explanation=explanation,
+                correct_answers=correct_answers
+            )
+            
+            questions.append(question)
         
         return questions
 
     def _parse_correct_answers_from_explanation(self, explanation: str, answers: List[Answer]) -> List[str]:
         """Try to identify correct answers from explanation text"""
-        correct_ids = []
+        resolutions = self.answer_resolver.resolve(answers, [], explanation)
+        return self.answer_resolver.mark_correct(answers, resolutions)
+
+    def process_page(self, test_path: str, chapter: str | None, test_number: str, test_type: str,
+                     html_content: Optional[str], headers: Optional[Dict] = None) -> List[Question]:
+        """Turn a fetched page into questions, reusing cached results for unchanged pages.
+
+        html_content is None when the server answered 304 Not Modified.
+        """
+        if self.record_dir and html_content is not None:
+            self.record_page(test_path, html_content)
+        
+        if self.page_cache is None:
+            return self.extract_question_data(html_content, chapter, test_number, test_type)
+        
+        context_key = PageCache.context_key(chapter, test_number, test_type)
+        cached = self.page_cache.lookup(test_path, context_key, html_content)
+        if cached is not None:
+            logger.info(f"Page cache hit for {test_path}")
+            metrics.count('page_cache_hits')
+            return [question_from_dict(q) for q in cached]
         
-        # Common patterns in explanations
-        patterns = [
-            r"correct answer[s]?[:\s]*([^.]+)",
-            r"answer[s]?[:\s]*([^.]+)\s+is correct",
-            r"([^.]+)\s+is the correct answer"
-        ]
+        if html_content is None:
+            html_content = self.page_cache.read_html(test_path)
         
-        explanation_lower = explanation.lower()
+        questions = self.extract_question_data(html_content, chapter, test_number, test_type)
+        self.page_cache.store(test_path, context_key, html_content, headers or {},
+                              [question_to_dict(q) for q in questions])
+        return questions
+
+    def record_page(self, test_path: str, html_content: str):
+        """Snapshot a fetched page as <record_dir>/<test_path>.html for offline replay"""
+        os.makedirs(self.record_dir, exist_ok=True)
+        with open(os.path.join(self.record_dir, f"{test_path}.html"), 'w', encoding='utf-8') as f:
+            f.write(html_content)
+
+    def fetch_page(self, test_path: str, headers: Optional[Dict] = None) -> tuple:
+        """Fetch a test page as (html, response headers); html is None on 304 Not Modified.
         
-        for pattern in patterns:
-            matches = re.findall(pattern, explanation_lower, re.IGNORECASE)
-            for match in matches:
-                for answer in answers:
-                    if answer.text.lower() in match.lower() or match.lower() in answer.text.lower():
-                        answer.is_correct = True
-                        if answer.id not in correct_ids:
-                            correct_ids.append(answer.id)
+        With a scheduler, the request waits for a slot in its window and
+        429/5xx/timeouts are retried after the delay it prescribes.
+        """
+        if self.scheduler is None:
+            return self._get_page(test_path, headers)
         
-        return correct_ids
+        attempt = 0
+        while True:
+            sent_at = self.scheduler.acquire_sync()
+            try:
+                result = self._get_page(test_path, headers)
+            except Exception as e:
+                response = getattr(e, 'response', None)
+                delay = self.scheduler.complete(sent_at, getattr(response, 'status_code', None),
+                                                response.headers.get('Retry-After') if response is not None else None,
+                                                attempt)
+                if delay is None:
+                    raise
+                logger.warning(f"Retrying {test_path} in {delay:.2f}s after: {e}")
+                time.sleep(delay)
+                attempt += 1
+            else:
+                self.scheduler.complete(sent_at, 200 if result[0] is not None else 304)
+                return result
 
-    def crawl_test(self, test_path: str, chapter: str | None, test_number: str) -> List[Question]:
+    def _get_page(self, test_path: str, headers: Optional[Dict]) -> tuple:
+        url = f"{self.base_url}/{test_path}"
+        with metrics.timer('fetch', attributes={'test_path': test_path}) as timer:
+            response = self.session.get(url, headers=headers or {}, timeout=Config.CRAWLER_TIMEOUT)
+            timer.set(status=response.status_code)
+            if response.status_code == 304:
+                metrics.count('pages_not_modified')
+                return None, response.headers
+            
+            response.raise_for_status()
+            return response.text, response.headers
+
+    def crawl_test(self, test_path: str, chapter: str | None, test_number: str, test_type: str) -> List[Question]:
         """Crawl a single test and return questions"""
         url = f"{self.base_url}/{test_path}"
         logger.info(f"Crawling: {url}")
         
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
+            headers = self.page_cache.conditional_headers(test_path) if self.page_cache else {}
+            html_content, response_headers = self.fetch_page(test_path, headers)
             
-            questions = self.extract_question_data(response.text, chapter, test_number)
+            questions = self.process_page(test_path, chapter, test_number, test_type, html_content, response_headers)
             logger.info(f"Extracted {len(questions)} questions from {test_path}")
             
             return questions
             
         except Exception as e:
             logger.error(f"Error crawling {url}: {e}")
+            self.failed_tests.append(test_path)
             return []
 
-    def crawl_all_tests(self):
-        """Crawl all tests and collect data"""
-        logger.info("Starting to crawl all tests...")
+    def crawl_queued_test(self, queue, job: tuple):
+        """Crawl one queued test, checkpointing the fetched page and then its questions"""
+        test_path, chapter, test_number, test_type = job
+        logger.info(f"Crawling: {self.base_url}/{test_path}")
         
-        if chapter is None:
-            for test_paths in self.test_urls.items():
-                
-                for test_path in test_paths:
-                    # Extract test number from path
-                    test_number = test_path.split('-')[-1]
-                    
-                    questions = self.crawl_test(test_path, None, test_number)
-                    self.questions_data.extend(questions)
+        try:
+            headers = self.page_cache.conditional_headers(test_path) if self.page_cache else {}
+            html_content, response_headers = self.fetch_page(test_path, headers)
+            if html_content is not None:
+                queue.mark_fetched(job, html_content, response_headers)
+            
+            questions = self.process_page(test_path, chapter, test_number, test_type, html_content, response_headers)
+        except Exception as e:
+            queue.mark_failed(job, str(e))
+            return
+        
+        logger.info(f"Extracted {len(questions)} questions from {test_path}")
+        queue.mark_parsed(job, [question_to_dict(q) for q in questions])
+
+    def _crawl_batch(self, jobs: List[tuple], concurrency: Optional[int],
+                     parse_workers: Optional[int]) -> List[Optional[List[Question]]]:
+        """Per-job questions from the concurrent engines, None for jobs that failed"""
+        if parse_workers:
+            from pipeline import CrawlPipeline
+            
+            return CrawlPipeline(self, fetch_workers=concurrency, parse_workers=parse_workers).run_jobs(jobs)
+        
+        from async_crawler import AsyncCrawlEngine
+        
+        return AsyncCrawlEngine(self, concurrency=concurrency).crawl_jobs(jobs)
+
+    def _crawl_with_queue(self, queue, jobs: List[tuple], use_async: bool, concurrency: Optional[int],
+                          parse_workers: Optional[int]):
+        """Work through the persistent queue until every job is parsed or out of attempts"""
+        queue.enqueue(jobs)
+        
+        # Pages fetched by a run that died before parsing them
+        for job in queue.fetched_jobs():
+            html_content, response_headers = queue.fetched_page(job)
+            try:
+                questions = self.process_page(*job, html_content, response_headers)
+            except Exception as e:
+                queue.mark_failed(job, f"parse error: {e}")
+                continue
+            queue.mark_parsed(job, [question_to_dict(q) for q in questions])
+        
+        while True:
+            due = queue.due_jobs()
+            if not due:
+                retry_at = queue.next_retry_at()
+                if retry_at is None:
+                    break
+                time.sleep(max(0.0, retry_at - time.time()))
+                continue
+            
+            logger.info(f"Crawl queue: {len(due)} jobs due, {queue.summary()}")
+            if use_async or parse_workers:
+                for job, questions in zip(due, self._crawl_batch(due, concurrency, parse_workers)):
+                    if questions is None:
+                        queue.mark_failed(job, "fetch or parse failed")
+                    else:
+                        queue.mark_parsed(job, [question_to_dict(q) for q in questions])
+            else:
+                for job in due:
+                    self.crawl_queued_test(queue, job)
                     
                     # Be respectful to the server
-                    time.sleep(1)
+                    if self.scheduler is None:
+                        time.sleep(Config.CRAWLER_DELAY)
+        
+        self.questions_data.extend(question_from_dict(q) for q in queue.results())
+        
+        failures = queue.failures()
+        self.failed_tests.extend(f['test_path'] for f in failures)
+        if failures:
+            logger.error(
+                f"{len(failures)} tests failed after retries: " + ', '.join(f['test_path'] for f in failures)
+            )
+
+    def crawl_all_tests(self, use_async: bool = False, concurrency: Optional[int] = None,
+                        parse_workers: Optional[int] = None, queue=None):
+        """Crawl all tests and collect data.
+
+        With a CrawlQueue, progress is checkpointed per page and an interrupted
+        run picks up where it stopped; failed pages are retried with backoff.
+        """
+        logger.info("Starting to crawl all tests...")
+        
+        with metrics.timer('crawl', engine='queue' if queue is not None else 'pipeline' if parse_workers
+                           else 'async' if use_async else 'sequential'):
+            self._crawl_jobs(self.get_test_jobs(), use_async, concurrency, parse_workers, queue)
+        metrics.gauge('questions_crawled', len(self.questions_data))
+        if self.scheduler is not None:
+            self.scheduler.log_summary()
         
         logger.info(f"Crawling completed. Total questions: {len(self.questions_data)}")
+        
+        if self.page_cache:
+            self.page_cache.save()
+            cache_stats = self.page_cache.summary()
+            logger.info(
+                f"Page cache: {cache_stats['hits']} hits "
+                f"({cache_stats['not_modified']} not modified), {cache_stats['misses']} misses"
+            )
 
-    def save_to_json(self, filename: str = "uk_visa_all_questions.json"):
-        """Save collected data to JSON file"""
-        data = {
-            "metadata": {
-                "total_questions": len(self.questions_data),
-                "crawled_at": time.strftime("%Y-%m-%d %H:%M:%S"),
-                "source": "lifeintheuktestweb.co.uk"
-            },
-            "questions": []
-        }
+    def _crawl_jobs(self, jobs: List[tuple], use_async: bool, concurrency: Optional[int],
+                    parse_workers: Optional[int], queue):
+        if queue is not None:
+            self._crawl_with_queue(queue, jobs, use_async, concurrency, parse_workers)
+        elif use_async or parse_workers:
+            # Imported lazily (by _crawl_batch) so the sequential path works without aiohttp
+            for job, questions in zip(jobs, self._crawl_batch(jobs, concurrency, parse_workers)):
+                if questions is None:
+                    self.failed_tests.append(job[0])
+                else:
+                    self.questions_data.extend(questions)
+        else:
+            for test_path, chapter, test_number, test_type in jobs:
+                questions = self.crawl_test(test_path, chapter, test_number, test_type)
+                self.questions_data.extend(questions)
+                
+                # Be respectful to the server
+                if self.scheduler is None:
+                    time.sleep(Config.CRAWLER_DELAY)
+
+    def _count_test_type(self, test_type: str) -> int:
+        from question_store import QuestionStore
         
-        for question in self.questions_data:
-            question_dict = {
-                "id": question.id,
-                "chapter": question.chapter,
-                "test_number": question.test_number,
-                "question_text": question.question_text,
-                "question_type": question.question_type,
-                "answers": [
-                    {
-                        "id": answer.id,
-                        "text": answer.text,
-                        "is_correct": answer.is_correct
-                    }
-                    for answer in question.answers
-                ],
-                "explanation": question.explanation,
-                "correct_answers": question.correct_answers
+        if isinstance(self.questions_data, QuestionStore):
+            return self.questions_data.count('test_type', test_type)
+        return len([q for q in self.questions_data if q.test_type == test_type])
+
+    def save_to_json(self, filename: str = "uk_visa_all_questions.json"):
+        """Save collected data to JSON file (NDJSON for .ndjson/.jsonl names), one question at a time"""
+        metadata = {
+            "total_questions": len(self.questions_data),
+            "crawled_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "source": "lifeintheuktestweb.co.uk",
+            "test_types": {
+                test_type: self._count_test_type(test_type) for test_type in ("chapter", "comprehensive", "exam")
             }
-            data["questions"].append(question_dict)
+        }
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        with metrics.timer('json_write'), QuestionWriter(filename, metadata=metadata) as writer:
+            for question in self.questions_data:
+                writer.write(question_to_dict(question))
         
         logger.info(f"Data saved to {filename}")
 
     def create_database_schema(self):
-        """Create MySQL database schema"""
+        """Create the MySQL database and bring its schema up to date (see schema.py)"""
         if not self.db_config:
             logger.error("Database configuration not provided")
             return
         
-        connection = mysql.connector.connect(**self.db_config)
-        cursor = connection.cursor()
-        
-        # Create tables
-        schema_sql = """
-        CREATE DATABASE IF NOT EXISTS uk_visa_test CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
-        USE uk_visa_test;
-        
-        CREATE TABLE IF NOT EXISTS chapters (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(50) NOT NULL UNIQUE,
-            description TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
-        
-        CREATE TABLE IF NOT EXISTS tests (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            chapter_id INT DEFAULT NULL,
-            test_number VARCHAR(10) NOT NULL,
-            title VARCHAR(255),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (chapter_id) REFERENCES chapters(id),
-            UNIQUE KEY unique_chapter_test (chapter_id, test_number)
-        );
-        
-        CREATE TABLE IF NOT EXISTS questions (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            test_id INT NOT NULL,
-            question_id VARCHAR(50) NOT NULL,
-            question_text TEXT NOT NULL,
-            question_type ENUM('radio', 'checkbox') NOT NULL,
-            explanation TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (test_id) REFERENCES tests(id),
-            INDEX idx_question_id (question_id)
-        );
-        
-        CREATE TABLE IF NOT EXISTS answers (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            question_id INT NOT NULL,
-            answer_id VARCHAR(50) NOT NULL,
-            answer_text TEXT NOT NULL,
-            is_correct BOOLEAN DEFAULT FALSE,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (question_id) REFERENCES questions(id),
-            INDEX idx_answer_id (answer_id)
-        );
-        """
+        create_database(self.db_config)
+        applied = migrate(self.database)
         
-        # Execute schema creation
-        for statement in schema_sql.split(';'):
-            if statement.strip():
-                cursor.execute(statement)
-        
-        connection.commit()
-        cursor.close()
-        connection.close()
+        logger.info(f"Database schema created successfully ({len(applied)} migrations applied)")
+
+    def _insert_chapters(self, session) -> Dict[str, int]:
+        """Insert chapter data"""
+        chapter_mapping = {}
+        for chapter_num, chapter_name in CHAPTERS:
+            session.execute(
+                "INSERT IGNORE INTO chapters (chapter_number, name) VALUES (%s, %s)",
+                (chapter_num, chapter_name), prepared=True
+            )
+            result = session.query_one(
+                "SELECT id FROM chapters WHERE chapter_number = %s",
+                (chapter_num,), prepared=True
+            )
+            if result:
+                chapter_mapping[f"chapter_{chapter_num}"] = result['id']
         
-        logger.info("Database schema created successfully")
+        return chapter_mapping
 
-    def save_to_database(self):
-        """Save collected data to MySQL database"""
-        if not self.db_config:
-            logger.error("Database configuration not provided")
-            return
+    def _save_rows(self, session):
+        """Insert collected data one row at a time, reusing a prepared statement per query"""
+        chapter_mapping = self._insert_chapters(session)
         
-        connection = mysql.connector.connect(**self.db_config)
-        cursor = connection.cursor()
+        # Insert tests and questions
+        test_mapping = {}
         
-        try:
-            # Use the database
-            cursor.execute("USE uk_visa_test")
-            
-            # Insert chapters
-            chapters = {}
+        with session.prepare(
+            "INSERT INTO questions (test_id, question_id, question_text, question_type, explanation) VALUES (%s, %s, %s, %s, %s)"
+        ) as insert_question, session.prepare(
+            "INSERT INTO answers (question_id, answer_id, answer_text, is_correct) VALUES (%s, %s, %s, %s)"
+        ) as insert_answer:
             for question in self.questions_data:
-                chapter_name = question.chapter
-                if chapter_name not in chapters:
-                    cursor.execute(
-                        "INSERT IGNORE INTO chapters (name) VALUES (%s)",
-                        (chapter_name,)
-                    )
-                    cursor.execute("SELECT id FROM chapters WHERE name = %s", (chapter_name,))
-                    chapters[chapter_name] = cursor.fetchone()[0]
-            
-            # Insert tests and questions
-            tests = {}
-            for question in self.questions_data:
-                chapter_id = chapters[question.chapter]
-                test_key = f"{chapter_id}_{question.test_number}"
+                chapter_id = chapter_mapping.get(question.chapter) if question.chapter else None
+                test_key = f"{question.test_type}_{question.test_number}_{question.chapter or 'none'}"
                 
-                if test_key not in tests:
-                    cursor.execute(
-                        "INSERT IGNORE INTO tests (chapter_id, test_number) VALUES (%s, %s)",
-                        (chapter_id, question.test_number)
+                if test_key not in test_mapping:
+                    session.execute(
+                        "INSERT IGNORE INTO tests (chapter_id, test_number, test_type, url) VALUES (%s, %s, %s, %s)",
+                        (chapter_id, question.test_number, question.test_type, f"test-{question.test_number}"),
+                        prepared=True
                     )
-                    cursor.execute(
-                        "SELECT id FROM tests WHERE chapter_id = %s AND test_number = %s",
-                        (chapter_id, question.test_number)
-                    )
-                    tests[test_key] = cursor.fetchone()[0]
+                    
+                    # Get test ID - handle NULL chapter_id properly
+                    if chapter_id is None:
+                        result = session.query_one(
+                            "SELECT id FROM tests WHERE chapter_id IS NULL AND test_number = %s AND test_type = %s",
+                            (question.test_number, question.test_type), prepared=True
+                        )
+                    else:
+                        result = session.query_one(
+                            "SELECT id FROM tests WHERE chapter_id = %s AND test_number = %s AND test_type = %s",
+                            (chapter_id, question.test_number, question.test_type), prepared=True
+                        )
+                    test_mapping[test_key] = result['id']
                 
-                test_id = tests[test_key]
+                test_id = test_mapping[test_key]
                 
                 # Insert question
-                cursor.execute(
-                    "INSERT INTO questions (test_id, question_id, question_text, question_type, explanation) VALUES (%s, %s, %s, %s, %s)",
+                insert_question.execute(
                     (test_id, question.id, question.question_text, question.question_type, question.explanation)
                 )
                 
-                question_db_id = cursor.lastrowid
+                question_db_id = insert_question.lastrowid
                 
                 # Insert answers
                 for answer in question.answers:
-                    cursor.execute(
-                        "INSERT INTO answers (question_id, answer_id, answer_text, is_correct) VALUES (%s, %s, %s, %s)",
-                        (question_db_id, answer.id, answer.text, answer.is_correct)
-                    )
+                    insert_answer.execute((question_db_id, answer.id, answer.text, answer.is_correct))
+
+    def save_to_database(self, bulk: bool = False, batch_size: Optional[int] = None, commit_per_batch: bool = False,
+                         sync: bool = False, delete_missing: bool = False, connection=None):
+        """Save collected data through the database pool (or to an open DB-API connection, which is left open).
+
+        With sync and delete_missing, questions that disappeared from crawled
+        tests are deleted, unless some page failed in this run.
+        """
+        if connection is None:
+            if not self.database:
+                logger.error("Database configuration not provided")
+                return
             
-            connection.commit()
+            with self.database.connection() as connection:
+                self._save_with(connection, bulk, batch_size, commit_per_batch, sync, delete_missing)
+        else:
+            self._save_with(connection, bulk, batch_size, commit_per_batch, sync, delete_missing)
+        
+        if self.database:
+            self.database.log_stats()
+
+    def _save_with(self, connection, bulk: bool, batch_size: Optional[int], commit_per_batch: bool, sync: bool,
+                   delete_missing: bool):
+        session = Session.wrap(connection, self.database.stats if self.database else None)
+        mode = 'sync' if sync else 'bulk' if bulk else 'rows'
+        
+        try:
+            with metrics.timer('db_load', mode=mode):
+                self._load(connection, session, bulk, batch_size, commit_per_batch, sync, delete_missing)
             logger.info("Data saved to database successfully")
             
         except Exception as e:
             logger.error(f"Error saving to database: {e}")
             connection.rollback()
         finally:
-            cursor.close()
-            connection.close()
+            session.pooled.clear_statements()
+
+    def _load(self, connection, session, bulk: bool, batch_size: Optional[int], commit_per_batch: bool, sync: bool,
+              delete_missing: bool):
+        if sync:
+            from db_sync import SyncLoader
+            
+            if delete_missing and self.failed_tests:
+                # Deletes cascade to users' answers, so an incomplete crawl never removes anything
+                logger.error(
+                    f"Not deleting missing questions: {len(self.failed_tests)} tests failed in this crawl "
+                    f"({', '.join(self.failed_tests)})"
+                )
+                delete_missing = False
+            SyncLoader(connection, batch_size=batch_size).sync(self.questions_data, delete_missing=delete_missing)
+        elif bulk:
+            from bulk_loader import BulkLoader
+            
+            loader = BulkLoader(connection, batch_size=batch_size, commit_per_batch=commit_per_batch)
+            loader.load(self.questions_data)
+        else:
+            self._save_rows(session)
+        
+        connection.commit()
+
+    def build_bundles(self, output_dir: str):
+        """Write per-test and per-chapter API bundles from the database just loaded (see bundles.py)"""
+        if not self.database:
+            logger.error("Database configuration not provided")
+            return
+        
+        from bundles import build_bundles, load_bank
+        
+        with self.database.transaction() as session:
+            bank = load_bank(session)
+        report = build_bundles(bank, output_dir)
+        logger.info(
+            f"Built {report['test_bundles']} test and {report['chapter_bundles']} chapter bundles "
+            f"in {report['build_sec']}s ({report['bytes']} bytes, {report['gzip_bytes']} gzipped)"
+        )
 
 def main():
-    # Database configuration (update with your MySQL credentials)
-    db_config = {
-        'host': 'localhost',
-        'user': 'root',
-        'password': '',
-        'database': 'uk_visa_test',
-        'charset': 'utf8mb4'
-    }
+    parser = argparse.ArgumentParser(description='UK Visa Test Crawler')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                       help='Fetch test pages concurrently')
+    parser.add_argument('--concurrency', type=int,
+                       help='Max in-flight requests in async/pipeline mode')
+    parser.add_argument('--parse-workers', type=int,
+                       help='Parse pages in a process pool of this size, decoupled from fetching')
+    parser.add_argument('--base-url', help='Crawl a different host (e.g. a local stub server)')
+    parser.add_argument('--cache-dir', default=None,
+                       help='Page cache directory for incremental re-crawls')
+    parser.add_argument('--bulk', action='store_true',
+                       help='Load the database with batched multi-row inserts')
+    parser.add_argument('--batch-size', type=int,
+                       help='Rows per INSERT batch in bulk mode')
+    parser.add_argument('--sync', action='store_true',
+                       help='Apply only inserts/updates/deletes against the current database')
+    parser.add_argument('--delete-missing', action='store_true',
+                       help='With --sync, delete questions no longer on their crawled test pages '
+                            '(skipped if any page failed; removes those questions\' user answers)')
+    parser.add_argument('--parser', dest='parser_backend', choices=['html.parser', 'bs4-lxml', 'lxml'],
+                       help='HTML parser backend')
+    parser.add_argument('--queue-file', default=None,
+                       help='SQLite work queue that checkpoints progress so an interrupted crawl can resume')
+    parser.add_argument('--retry-failed', action='store_true',
+                       help='With --queue-file, give pages that ran out of attempts another round of retries')
+    parser.add_argument('--restart', action='store_true',
+                       help='With --queue-file, discard saved progress and crawl everything again')
+    parser.add_argument('--adaptive', action='store_true',
+                       help='Pace requests by server responses (AIMD concurrency, Retry-After, jittered retries) '
+                            'instead of a fixed delay')
+    parser.add_argument('--max-attempts', type=int,
+                       help='Attempts per page before it is left as failed')
+    parser.add_argument('--bundle-dir', default=None,
+                       help='After saving to the database, write per-test and per-chapter API bundles here (see bundles.py)')
+    parser.add_argument('--search-index', default=None,
+                       help='Also update this full-text search index from the JSON export (see search_index.py)')
+    parser.add_argument('--record-dir', default=None,
+                       help='Snapshot every fetched page here for offline replay (see stub_server.py)')
+    parser.add_argument('--metrics-output', default=None,
+                       help='Write crawl metrics here: Prometheus text for .prom, else a JSON summary (see metrics.py)')
+    parser.add_argument('--trace-output', default=None,
+                       help='Write fetch/parse/load spans here as JSON lines')
     
-    # Initialize crawler
-    crawler = UKVisaTestCrawler(db_config)
+    args = parser.parse_args()
+    metrics.configure(args.metrics_output, args.trace_output)
+    
+    # Initialize crawler (database settings come from Config.DB_CONFIG / .env)
+    crawler = UKVisaTestCrawler(Config.DB_CONFIG, base_url=args.base_url, cache_dir=args.cache_dir,
+                                parser_backend=args.parser_backend, record_dir=args.record_dir)
+    
+    if args.adaptive:
+        from rate_limit import AdaptiveScheduler
+        
+        crawler.scheduler = AdaptiveScheduler(maximum=args.concurrency)
     
     # Create database schema
     crawler.create_database_schema()
     
+    queue = None
+    if args.queue_file:
+        from crawl_queue import CrawlQueue
+        
+        queue = CrawlQueue(args.queue_file, max_attempts=args.max_attempts)
+        if args.restart:
+            queue.reset()
+        if args.retry_failed:
+            logger.info(f"Retrying {queue.retry_failed()} failed tests")
+    
     # Crawl all tests
-    crawler.crawl_all_tests()
+    crawler.crawl_all_tests(use_async=args.use_async, concurrency=args.concurrency,
+                            parse_workers=args.parse_workers, queue=queue)
     
     # Save to JSON file
     crawler.save_to_json()
     
+    if args.search_index:
+        from search_index import update_index
+        
+        report = update_index("uk_visa_all_questions.json", args.search_index)
+        logger.info(
+            f"Search index: {report['tokenized']} questions tokenized, {report['reused']} reused, "
+            f"{report['removed']} removed ({report['terms']} terms)"
+        )
+    
     # Save to database
-    crawler.save_to_database()
+    crawler.save_to_database(bulk=args.bulk, batch_size=args.batch_size, sync=args.sync,
+                             delete_missing=args.delete_missing)
+    
+    if args.bundle_dir:
+        crawler.build_bundles(args.bundle_dir)
     
+    metrics.flush()
     print(f"Crawling completed! Found {len(crawler.questions_data)} questions.")
 
 if __name__ == "__main__":